@@ -0,0 +1,29 @@
+-- *************************************************************************************************************
+-- ** إضافة أعمدة RowVersion لجداول المزامنة التزايدية (python/change_sync.py)                                **
+-- ** اختياري: بدونها تعتمد المزامنة على CreatedAt/UpdatedAt وتفحص الجدول كاملًا في كل دورة.                **
+-- *************************************************************************************************************
+USE AlwaseetGroup;
+GO
+
+PRINT 'Adding RowVersion columns...';
+IF COL_LENGTH('sales.Invoices', 'RowVersion') IS NULL
+    ALTER TABLE sales.Invoices ADD RowVersion ROWVERSION;
+GO
+IF COL_LENGTH('sales.InvoiceItems', 'RowVersion') IS NULL
+    ALTER TABLE sales.InvoiceItems ADD RowVersion ROWVERSION;
+GO
+IF COL_LENGTH('inventory.Products', 'RowVersion') IS NULL
+    ALTER TABLE inventory.Products ADD RowVersion ROWVERSION;
+GO
+
+-- مؤشرات تجعل "الصفوف الأحدث من العلامة" بحثًا في المؤشر بدل فحص الجدول
+PRINT 'Creating RowVersion Indexes...';
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Invoices_RowVersion' AND object_id = OBJECT_ID('sales.Invoices'))
+    CREATE INDEX IX_Invoices_RowVersion ON sales.Invoices(RowVersion);
+GO
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_InvoiceItems_RowVersion' AND object_id = OBJECT_ID('sales.InvoiceItems'))
+    CREATE INDEX IX_InvoiceItems_RowVersion ON sales.InvoiceItems(RowVersion);
+GO
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Products_RowVersion' AND object_id = OBJECT_ID('inventory.Products'))
+    CREATE INDEX IX_Products_RowVersion ON inventory.Products(RowVersion);
+GO
@@ -0,0 +1,521 @@
+import argparse
+import calendar
+import datetime
+import decimal
+import sqlite3
+import time
+
+from change_sync import (SyncTable, decode_mark, detect_method, encode_mark, fetch_upper_bound,
+                         initial_mark, iter_changes)
+from test import _pyodbc, connect_to_database, print_result
+
+AGGREGATES_FILE = "aggregates.sqlite"
+
+# الفواتير خارج نافذة الشهر لا تعود إليها، فيكفي الاحتفاظ بتفاصيل آخر 32 يومًا لحساب الفروق
+RETENTION_DAYS = 32
+
+# الأعمدة التي تحتاجها sales.vw_DashboardKPIs فقط، بنفس آلية العلامات في change_sync
+KPI_INVOICES_TABLE = SyncTable(
+    "sales.Invoices",
+    ["InvoiceId", "InvoiceDate", "CompanyId", "TotalAmount", "Status", "AmountDue"],
+    "InvoiceId",
+    "sales.Invoices AS i",
+    "COALESCE(i.UpdatedAt, i.CreatedAt, '19000101')",
+    "sales.Invoices", "i",
+)
+
+KPI_PRODUCTS_TABLE = SyncTable(
+    "inventory.Products",
+    ["ProductId", "CompanyId", "Quantity", "MinimumQuantity"],
+    "ProductId",
+    "inventory.Products AS p",
+    "COALESCE(p.UpdatedAt, p.CreatedAt, '19000101')",
+    "inventory.Products", "p",
+)
+
+# بنود القيود تُضاف ولا تُعدل (التصحيح بقيد عكسي)، فيكفي ترقيمها بالمفتاح الأساسي
+JOURNAL_DETAILS_QUERY = """
+SELECT TOP (?)
+    jed.EntryDetailId, jed.EntryId, jed.AccountId, jed.DebitAmount, jed.CreditAmount,
+    je.IsPosted, je.CreatedAt
+FROM
+    accounting.JournalEntryDetails AS jed
+INNER JOIN
+    accounting.JournalEntries AS je ON je.EntryId = jed.EntryId
+WHERE
+    jed.EntryDetailId > ?
+ORDER BY
+    jed.EntryDetailId;
+"""
+
+POSTED_ENTRIES_QUERY_TEMPLATE = """
+SELECT EntryId FROM accounting.JournalEntries WHERE IsPosted = 1 AND EntryId IN ({placeholders});
+"""
+
+CHART_VERSION_QUERY = """
+SELECT COUNT(*), MAX(COALESCE(UpdatedAt, CreatedAt)) FROM accounting.ChartOfAccounts;
+"""
+
+CHART_QUERY = """
+SELECT AccountId, AccountCode, AccountName, AccountType, CompanyId, IsActive
+FROM accounting.ChartOfAccounts;
+"""
+
+SERVER_NOW_QUERY = "SELECT GETDATE();"
+
+VIEW_BALANCES_QUERY = "SELECT AccountId, Balance FROM accounting.vw_AccountBalances;"
+VIEW_KPIS_QUERY = """
+SELECT CompanyId, TotalSales, InvoiceCount, TotalReceivables, TotalProducts, LowStockCount
+FROM sales.vw_DashboardKPIs;
+"""
+
+KPI_COLUMNS = ["CompanyId", "TotalSales", "InvoiceCount", "TotalReceivables", "TotalProducts",
+               "LowStockCount"]
+BALANCE_COLUMNS = ["AccountId", "AccountCode", "AccountName", "AccountType", "Balance",
+                   "CompanyId", "IsActive"]
+
+PENDING_BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS _state (
+    name TEXT PRIMARY KEY, method TEXT NOT NULL, mark TEXT NOT NULL, last_key INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS accounts (
+    AccountId INTEGER PRIMARY KEY, AccountCode TEXT, AccountName TEXT, AccountType TEXT,
+    CompanyId INTEGER, IsActive INTEGER);
+CREATE TABLE IF NOT EXISTS account_balances (
+    AccountId INTEGER PRIMARY KEY, BalanceCents INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS pending_details (
+    EntryDetailId INTEGER PRIMARY KEY, EntryId INTEGER NOT NULL, AccountId INTEGER NOT NULL,
+    DeltaCents INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS IX_pending_details_EntryId ON pending_details (EntryId);
+CREATE TABLE IF NOT EXISTS window_invoices (
+    InvoiceId INTEGER PRIMARY KEY, CompanyId INTEGER NOT NULL, InvoiceDate TEXT NOT NULL,
+    Day TEXT NOT NULL, TotalCents INTEGER NOT NULL, ReceivableCents INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS IX_window_invoices_Day ON window_invoices (Day);
+CREATE TABLE IF NOT EXISTS sales_daily (
+    CompanyId INTEGER NOT NULL, Day TEXT NOT NULL, TotalCents INTEGER NOT NULL,
+    InvoiceCount INTEGER NOT NULL, ReceivableCents INTEGER NOT NULL,
+    PRIMARY KEY (CompanyId, Day));
+CREATE TABLE IF NOT EXISTS products (
+    ProductId INTEGER PRIMARY KEY, CompanyId INTEGER NOT NULL, IsLow INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS product_counts (
+    CompanyId INTEGER PRIMARY KEY, TotalProducts INTEGER NOT NULL, LowStockCount INTEGER NOT NULL);
+"""
+
+# جداول كل مُجمِّع؛ تُفرغ مع علامته عند إعادة البناء
+_AGGREGATE_TABLES = {
+    "journal": ("account_balances", "pending_details"),
+    "invoices": ("window_invoices", "sales_daily"),
+    "products": ("products", "product_counts"),
+}
+
+
+def to_cents(value):
+    """DECIMAL(18,2) إلى عدد صحيح بالسنتات (None يبقى None) لتجنب أخطاء التقريب."""
+    if value is None:
+        return None
+    return int((decimal.Decimal(value) * 100).to_integral_value())
+
+
+def from_cents(cents):
+    return (decimal.Decimal(cents) / 100).quantize(decimal.Decimal("0.01"))
+
+
+def month_ago(moment):
+    """يطابق DATEADD(MONTH, -1, moment) في SQL Server (اليوم يُقص لآخر أيام الشهر)."""
+    year, month = (moment.year, moment.month - 1) if moment.month > 1 else (moment.year - 1, 12)
+    return moment.replace(year=year, month=month,
+                          day=min(moment.day, calendar.monthrange(year, month)[1]))
+
+
+def _timestamp(moment):
+    # صيغة ثابتة الطول حتى تصح المقارنة النصية في SQLite
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+class AggregateStore:
+    """
+    مخزن SQLite للمجاميع: أرصدة الحسابات، مجاميع المبيعات اليومية لآخر 32 يومًا، وعدادات
+    المنتجات لكل شركة. كل دفعة فروق تُطبق مع علامتها في معاملة واحدة.
+    """
+
+    def __init__(self, path=AGGREGATES_FILE):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+
+    def load_state(self, name):
+        row = self.db.execute("SELECT method, mark, last_key FROM _state WHERE name = ?",
+                              (name,)).fetchone()
+        if row is None:
+            return None
+        method, mark, last_key = row
+        return method, (int(mark) if method == "identity" else decode_mark(method, mark)), last_key
+
+    def _save_state_locked(self, name, method, mark, last_key):
+        encoded = str(mark) if method == "identity" else encode_mark(method, mark)
+        self.db.execute("INSERT OR REPLACE INTO _state (name, method, mark, last_key) "
+                        "VALUES (?, ?, ?, ?)", (name, method, encoded, last_key))
+
+    def reset(self, name):
+        with self.db:
+            for table in _AGGREGATE_TABLES[name]:
+                self.db.execute(f"DELETE FROM {table}")
+            self.db.execute("DELETE FROM _state WHERE name = ?", (name,))
+
+    # --- أرصدة الحسابات ---
+
+    def replace_accounts(self, rows, version):
+        with self.db:
+            self.db.execute("DELETE FROM accounts")
+            self.db.executemany("INSERT INTO accounts VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.db.execute("INSERT OR REPLACE INTO _state (name, method, mark, last_key) "
+                            "VALUES ('chart', 'version', ?, 0)", (version,))
+
+    def chart_version(self):
+        row = self.db.execute("SELECT mark FROM _state WHERE name = 'chart'").fetchone()
+        return row[0] if row else None
+
+    def _add_balance_locked(self, account_id, delta):
+        self.db.execute(
+            "INSERT INTO account_balances (AccountId, BalanceCents) VALUES (?, ?) "
+            "ON CONFLICT(AccountId) DO UPDATE SET BalanceCents = BalanceCents + excluded.BalanceCents",
+            (account_id, delta))
+
+    def apply_journal(self, posted, pending, last_detail_id):
+        """
+        posted: [(EntryDetailId, AccountId, delta)]، pending: [(EntryDetailId, EntryId, AccountId, delta)]
+
+        البنود حتى آخر معرف محفوظ طُبقت من قبل فتُتجاهل، فلا يُضاف فرق مرتين إذا أُعيدت دفعة.
+        """
+        with self.db:
+            state = self.load_state("journal")
+            applied = state[2] if state else 0
+            for detail_id, account_id, delta in posted:
+                if detail_id > applied:
+                    self._add_balance_locked(account_id, delta)
+            self.db.executemany("INSERT OR REPLACE INTO pending_details VALUES (?, ?, ?, ?)",
+                                (row for row in pending if row[0] > applied))
+            self._save_state_locked("journal", "identity", max(last_detail_id, applied),
+                                    max(last_detail_id, applied))
+
+    def pending_entry_ids(self):
+        return [row[0] for row in self.db.execute("SELECT DISTINCT EntryId FROM pending_details")]
+
+    def post_pending(self, entry_ids):
+        """يضيف بنود القيود التي رُحّلت منذ آخر تشغيل إلى الأرصدة ويحذفها من الانتظار."""
+        placeholders = ", ".join("?" * len(entry_ids))
+        with self.db:
+            rows = self.db.execute(
+                f"SELECT AccountId, SUM(DeltaCents) FROM pending_details "
+                f"WHERE EntryId IN ({placeholders}) GROUP BY AccountId", entry_ids).fetchall()
+            for account_id, delta in rows:
+                self._add_balance_locked(account_id, delta)
+            self.db.execute(f"DELETE FROM pending_details WHERE EntryId IN ({placeholders})",
+                            entry_ids)
+
+    # --- مؤشرات المبيعات ---
+
+    def _add_sales_locked(self, company_id, day, total, count, receivable):
+        self.db.execute(
+            "INSERT INTO sales_daily (CompanyId, Day, TotalCents, InvoiceCount, ReceivableCents) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT(CompanyId, Day) DO UPDATE SET "
+            "TotalCents = TotalCents + excluded.TotalCents, "
+            "InvoiceCount = InvoiceCount + excluded.InvoiceCount, "
+            "ReceivableCents = ReceivableCents + excluded.ReceivableCents",
+            (company_id, day, total, count, receivable))
+
+    def apply_invoices(self, rows, retention_start, method, mark, last_key):
+        """
+        يطبق نسخًا جديدة من الفواتير: تُطرح مساهمة النسخة السابقة (إن كانت ضمن الاحتفاظ)
+        وتُضاف مساهمة النسخة الجديدة إلى مجموع يومها. تطبيق النسخة نفسها مرة ثانية (صف أُعيد
+        جلبه) لا يغير شيئًا.
+        """
+        retention = _timestamp(retention_start)
+        with self.db:
+            for invoice_id, invoice_date, company_id, total, status, amount_due in rows:
+                # المشاهدة تربط بالشركة، فالفواتير بلا CompanyId لا تظهر فيها
+                stamp = _timestamp(invoice_date)
+                current = None
+                if company_id is not None and stamp >= retention:
+                    receivable = (to_cents(amount_due) or 0) if status == "Unpaid" else 0
+                    current = (company_id, stamp, stamp[:10], to_cents(total), receivable)
+                old = self.db.execute(
+                    "SELECT CompanyId, InvoiceDate, Day, TotalCents, ReceivableCents "
+                    "FROM window_invoices WHERE InvoiceId = ?", (invoice_id,)).fetchone()
+                if old == current:
+                    continue
+                if old is not None:
+                    self._add_sales_locked(old[0], old[2], -old[3], -1, -old[4])
+                    self.db.execute("DELETE FROM window_invoices WHERE InvoiceId = ?", (invoice_id,))
+                if current is None:
+                    continue
+                company_id, stamp, day, total_cents, receivable = current
+                self.db.execute("INSERT INTO window_invoices VALUES (?, ?, ?, ?, ?, ?)",
+                                (invoice_id, company_id, stamp, day, total_cents, receivable))
+                self._add_sales_locked(company_id, day, total_cents, 1, receivable)
+            self._save_state_locked("invoices", method, mark, last_key)
+
+    def prune(self, retention_start):
+        retention = _timestamp(retention_start)
+        with self.db:
+            self.db.execute("DELETE FROM window_invoices WHERE InvoiceDate < ?", (retention,))
+            self.db.execute("DELETE FROM sales_daily WHERE Day < ?", (retention[:10],))
+            self.db.execute("DELETE FROM sales_daily WHERE InvoiceCount = 0")
+
+    # --- مؤشرات المخزون ---
+
+    def _add_products_locked(self, company_id, total, low):
+        self.db.execute(
+            "INSERT INTO product_counts (CompanyId, TotalProducts, LowStockCount) VALUES (?, ?, ?) "
+            "ON CONFLICT(CompanyId) DO UPDATE SET TotalProducts = TotalProducts + excluded.TotalProducts, "
+            "LowStockCount = LowStockCount + excluded.LowStockCount",
+            (company_id, total, low))
+
+    def apply_products(self, rows, method, mark, last_key):
+        with self.db:
+            for product_id, company_id, quantity, minimum in rows:
+                # Quantity <= MinimumQuantity مع NULL تعطي UNKNOWN فلا تُحسب
+                is_low = int(quantity is not None and minimum is not None and quantity <= minimum)
+                current = None if company_id is None else (company_id, is_low)
+                old = self.db.execute("SELECT CompanyId, IsLow FROM products WHERE ProductId = ?",
+                                      (product_id,)).fetchone()
+                if old == current:
+                    continue
+                if old is not None:
+                    self._add_products_locked(old[0], -1, -old[1])
+                    self.db.execute("DELETE FROM products WHERE ProductId = ?", (product_id,))
+                if current is None:
+                    continue
+                self.db.execute("INSERT INTO products VALUES (?, ?, ?)", (product_id, company_id, is_low))
+                self._add_products_locked(company_id, 1, is_low)
+            self._save_state_locked("products", method, mark, last_key)
+
+    # --- القراءة ---
+
+    def read_kpis(self, now):
+        """
+        يعيد صفوف sales.vw_DashboardKPIs عند اللحظة now: مجاميع الأيام الكاملة داخل
+        النافذة (حتى 31 صفًا لكل شركة) وفواتير يوم بدايتها فقط، دون المرور على الفواتير.
+        """
+        cutoff = _timestamp(month_ago(now))
+        rows = self.db.execute("""
+            SELECT s.CompanyId, SUM(s.TotalCents), SUM(s.InvoiceCount), SUM(s.ReceivableCents),
+                   p.TotalProducts, p.LowStockCount
+            FROM (
+                SELECT CompanyId, TotalCents, InvoiceCount, ReceivableCents
+                FROM sales_daily WHERE Day > ?
+                UNION ALL
+                SELECT CompanyId, TotalCents, 1, ReceivableCents
+                FROM window_invoices WHERE Day = ? AND InvoiceDate >= ?
+            ) AS s
+            JOIN product_counts AS p ON p.CompanyId = s.CompanyId
+            GROUP BY s.CompanyId
+            HAVING SUM(s.InvoiceCount) > 0
+            ORDER BY s.CompanyId""", (cutoff[:10], cutoff[:10], cutoff)).fetchall()
+        return [(company_id, from_cents(total), count, from_cents(receivable), products, low)
+                for company_id, total, count, receivable, products, low in rows]
+
+    def read_balances(self):
+        rows = self.db.execute("""
+            SELECT a.AccountId, a.AccountCode, a.AccountName, a.AccountType,
+                   COALESCE(b.BalanceCents, 0), a.CompanyId, a.IsActive
+            FROM accounts AS a
+            LEFT JOIN account_balances AS b ON b.AccountId = a.AccountId
+            ORDER BY a.AccountId""").fetchall()
+        return [row[:4] + (from_cents(row[4]),) + row[5:] for row in rows]
+
+    def close(self):
+        self.db.close()
+
+
+def _server_now(cursor):
+    cursor.execute(SERVER_NOW_QUERY)
+    return cursor.fetchone()[0]
+
+
+def refresh_chart(cursor, store):
+    """يعيد تحميل دليل الحسابات (جدول صغير) فقط إذا تغير عدد صفوفه أو آخر تعديل فيه."""
+    cursor.execute(CHART_VERSION_QUERY)
+    count, last_change = cursor.fetchone()
+    version = f"{count}|{last_change}"
+    if version == store.chart_version():
+        return 0
+    cursor.execute(CHART_QUERY)
+    rows = [tuple(row) for row in cursor.fetchall()]
+    store.replace_accounts(rows, version)
+    return len(rows)
+
+
+def refresh_journal(cursor, store, batch_size=5000, settle_seconds=5):
+    """يضيف فروق بنود القيود الجديدة إلى الأرصدة، ويعيد عدد البنود المعالجة."""
+    state = store.load_state("journal")
+    last_id = state[1] if state else 0
+    cutoff = fetch_upper_bound(cursor, "timestamp", settle_seconds)
+    processed = 0
+    while True:
+        cursor.execute(JOURNAL_DETAILS_QUERY, batch_size, last_id)
+        rows = cursor.fetchall()
+        posted, pending = [], []
+        settled, advanced = True, False
+        for detail_id, entry_id, account_id, debit, credit, is_posted, created_at in rows:
+            # قيد حديث جدًا قد تسبقه معاملة لم تُلتزم بمعرف أصغر: نتوقف وننتظر الدورة التالية
+            if created_at is not None and created_at >= cutoff:
+                settled = False
+                break
+            last_id, advanced = detail_id, True
+            processed += 1
+            # DebitAmount - CreditAmount مع NULL يتجاهلها SUM في المشاهدة
+            if account_id is None or debit is None or credit is None:
+                continue
+            delta = to_cents(debit) - to_cents(credit)
+            if is_posted:
+                posted.append((detail_id, account_id, delta))
+            else:
+                pending.append((detail_id, entry_id, account_id, delta))
+        if advanced:
+            store.apply_journal(posted, pending, last_id)
+        if not settled or len(rows) < batch_size:
+            break
+
+    entry_ids = store.pending_entry_ids()
+    for start in range(0, len(entry_ids), PENDING_BATCH_SIZE):
+        batch = entry_ids[start:start + PENDING_BATCH_SIZE]
+        cursor.execute(POSTED_ENTRIES_QUERY_TEMPLATE.format(placeholders=", ".join("?" * len(batch))),
+                       batch)
+        newly_posted = [row[0] for row in cursor.fetchall()]
+        if newly_posted:
+            store.post_pending(newly_posted)
+    return processed
+
+
+def _refresh_tracked(cursor, store, name, table, apply, batch_size, settle_seconds):
+    method, mark_expression = detect_method(cursor, table)
+    state = store.load_state(name)
+    if state is not None and state[0] != method:
+        print(f"  ⚠️ {table.name}: تغيرت طريقة التتبع إلى {method}، سيُعاد بناء مجاميعه.")
+        store.reset(name)
+        state = None
+    mark, last_key = (initial_mark(method), 0) if state is None else state[1:]
+    upper_bound = fetch_upper_bound(cursor, method, settle_seconds)
+    key_index = table.columns.index(table.key)
+    processed = 0
+    for rows in iter_changes(cursor, table, mark_expression, mark, last_key, upper_bound,
+                             batch_size):
+        mark, last_key = rows[-1][-1], rows[-1][key_index]
+        apply([row[:-1] for row in rows], method, mark, last_key)
+        processed += len(rows)
+    return processed
+
+
+def refresh(cursor, store, batch_size=5000, settle_seconds=5):
+    """
+    يحدّث كل المجاميع من النشاط الجديد منذ آخر تشغيل.
+
+    Returns:
+        dict: عدد الصفوف المعالجة لكل مصدر والزمن الكلي.
+    """
+    started = time.perf_counter()
+    retention_start = _server_now(cursor) - datetime.timedelta(days=RETENTION_DAYS)
+    result = {
+        "accounts": refresh_chart(cursor, store),
+        "journal_details": refresh_journal(cursor, store, batch_size, settle_seconds),
+        "invoices": _refresh_tracked(
+            cursor, store, "invoices", KPI_INVOICES_TABLE,
+            lambda rows, method, mark, key: store.apply_invoices(rows, retention_start, method, mark, key),
+            batch_size, settle_seconds),
+        "products": _refresh_tracked(cursor, store, "products", KPI_PRODUCTS_TABLE,
+                                     store.apply_products, batch_size, settle_seconds),
+    }
+    store.prune(retention_start)
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def verify(cursor, store):
+    """
+    يقارن المجاميع المحلية بنتائج المشاهدتين على الخادم ويطبع الفروق.
+
+    شغّله مباشرة بعد refresh: النشاط الذي يحدث بينهما يظهر كفرق.
+
+    Returns:
+        bool: True إذا تطابقت كل القيم.
+    """
+    mismatches = []
+
+    cursor.execute(VIEW_BALANCES_QUERY)
+    expected = {account_id: to_cents(balance) for account_id, balance in cursor.fetchall()}
+    local = {row[0]: to_cents(row[4]) for row in store.read_balances()}
+    for account_id in sorted(set(expected) | set(local)):
+        if expected.get(account_id) != local.get(account_id):
+            mismatches.append(f"AccountId {account_id}: المشاهدة {expected.get(account_id)} "
+                              f"≠ المحلي {local.get(account_id)} (بالسنت)")
+
+    now = _server_now(cursor)
+    cursor.execute(VIEW_KPIS_QUERY)
+    expected = {row[0]: (to_cents(row[1]), row[2], to_cents(row[3]) or 0, row[4], row[5])
+                for row in cursor.fetchall()}
+    local = {row[0]: (to_cents(row[1]), row[2], to_cents(row[3]), row[4], row[5])
+             for row in store.read_kpis(now)}
+    for company_id in sorted(set(expected) | set(local), key=str):
+        if expected.get(company_id) != local.get(company_id):
+            mismatches.append(f"CompanyId {company_id}: المشاهدة {expected.get(company_id)} "
+                              f"≠ المحلي {local.get(company_id)}")
+
+    for line in mismatches:
+        print(f"  ❌ {line}")
+    if mismatches:
+        print(f"⚠️ {len(mismatches)} فرق بين المجاميع والمشاهدات؛ استخدم --rebuild لإعادة البناء.")
+    else:
+        print("✅ المجاميع المحلية تطابق accounting.vw_AccountBalances و sales.vw_DashboardKPIs.")
+    return not mismatches
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="تحديث تزايدي لمجاميع لوحة القيادة وأرصدة الحسابات في مخزن SQLite محلي.")
+    parser.add_argument("--store", default=AGGREGATES_FILE,
+                        help=f"ملف SQLite للمجاميع (افتراضي: {AGGREGATES_FILE})")
+    parser.add_argument("--batch-size", type=int, default=5000, help="عدد الصفوف لكل دفعة (افتراضي: 5000)")
+    parser.add_argument("--settle-seconds", type=int, default=5,
+                        help="تجاهل النشاط الأحدث من N ثانية حتى الدورة التالية (افتراضي: 5)")
+    parser.add_argument("--rebuild", action="store_true", help="حذف المجاميع وإعادة بنائها من البداية")
+    parser.add_argument("--verify", action="store_true", help="مقارنة المجاميع بالمشاهدات بعد التحديث")
+    parser.add_argument("--show", action="store_true",
+                        help="طباعة المؤشرات والأرصدة من المخزن المحلي فقط دون اتصال بالخادم")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    store = AggregateStore(args.store)
+    try:
+        if args.show:
+            print_result("sales.vw_DashboardKPIs (محلي)", KPI_COLUMNS,
+                         store.read_kpis(datetime.datetime.now()))
+            print_result("accounting.vw_AccountBalances (محلي)", BALANCE_COLUMNS,
+                         store.read_balances())
+            raise SystemExit(0)
+
+        cnxn, cursor = connect_to_database()
+        if not cnxn:
+            raise SystemExit(1)
+        db_error = _pyodbc().Error
+        try:
+            if args.rebuild:
+                for name in ("journal", "invoices", "products"):
+                    store.reset(name)
+            result = refresh(cursor, store, args.batch_size, args.settle_seconds)
+            print(f"🔄 {result['journal_details']} بند قيد، {result['invoices']} فاتورة، "
+                  f"{result['products']} منتج، {result['accounts']} حساب محدث "
+                  f"({result['seconds']:.2f}s)")
+            ok = verify(cursor, store) if args.verify else True
+        except db_error as ex:
+            print(f"❌ فشل تحديث المجاميع: {ex}")
+            ok = False
+        finally:
+            cnxn.close()
+        raise SystemExit(0 if ok else 1)
+    finally:
+        store.close()
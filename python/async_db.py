@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+from test import FETCH_BATCH_SIZE, _pyodbc, create_connection_pool
+
+# استعلامات لوحة القيادة (create_views.sql)؛ مستقلة عن بعضها فتُنفذ معًا
+DASHBOARD_QUERIES = {
+    "kpis": "SELECT * FROM sales.vw_DashboardKPIs;",
+    "restock": "SELECT * FROM inventory.vw_ProductDetails WHERE NeedsRestock = 1;",
+    "balances": "SELECT * FROM accounting.vw_AccountBalances WHERE Balance != 0;",
+}
+
+
+class QueryTimeoutError(asyncio.TimeoutError):
+    """يُرفع عندما يتجاوز استعلام مهلته؛ يُلغى الاستعلام على الخادم قبل رفعه."""
+
+
+class _QueryHandle:
+    """
+    حالة استعلام واحد مشتركة بين حلقة الأحداث وخيط التنفيذ: المؤشر النشط وعلامة الإلغاء.
+
+    pyodbc يسمح باستدعاء cursor.cancel() من خيط آخر (SQLCancel)، فيتوقف التنفيذ على
+    الخادم ويعود الخيط العامل بخطأ بدل أن يبقى مشغولًا حتى نهاية الاستعلام.
+    """
+
+    def __init__(self):
+        self.cursor = None
+        self.cancelled = False
+        self.pending = None  # آخر عملية أُرسلت إلى المنفذ
+        self._lock = threading.Lock()
+
+    def attach(self, cursor):
+        with self._lock:
+            self.cursor = cursor
+            if self.cancelled:
+                raise asyncio.CancelledError()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            cursor = self.cursor
+        if cursor is not None:
+            db_error = _pyodbc().Error
+            try:
+                cursor.cancel()
+            except db_error:
+                pass
+
+
+class AsyncDatabase:
+    """
+    واجهة asyncio فوق مجمع الاتصالات: كل استعلام يُنفذ على خيط من منفذ مُدار، وتحد
+    إشارة (Semaphore) عدد الاستعلامات الجارية في الوقت نفسه.
+
+    Args:
+        pool (ConnectionPool): مجمع الاتصالات؛ يُنشأ مجمع بحجم max_concurrency إن لم يُمرر.
+        max_concurrency (int): الحد الأقصى للاستعلامات الجارية معًا (وعدد خيوط المنفذ).
+        timeout (float): المهلة الافتراضية لكل استعلام بالثواني (None = بلا مهلة).
+        batch_size (int): حجم دفعة fetchmany.
+    """
+
+    def __init__(self, pool=None, max_concurrency=8, timeout=None, batch_size=FETCH_BATCH_SIZE):
+        self._own_pool = pool is None
+        # الاتصال المُعاد قبل أقل من probe_after ثانية لا يُفحص: الاستعلامات القصيرة
+        # المتتالية لا تدفع رحلة SELECT 1 إضافية في كل مرة
+        self.pool = pool or create_connection_pool(min_size=0, max_size=max_concurrency,
+                                                   probe_after=30.0)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix="async_db")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """ينتظر انتهاء الخيوط ثم يغلق المنفذ والمجمع (إن كان مملوكًا)."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown, True)
+        if self._own_pool:
+            self.pool.close()
+
+    async def _call(self, handle, timeout, func, *args):
+        """ينفذ func على المنفذ؛ عند انتهاء المهلة أو الإلغاء يُلغى الاستعلام الجاري."""
+        loop = asyncio.get_running_loop()
+        future = handle.pending = loop.run_in_executor(self._executor, func, *args)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as ex:
+            handle.cancel()
+            # خطأ الإلغاء الذي سيعود به الخيط متوقع ولا ينتظره أحد
+            future.add_done_callback(lambda done: done.cancelled() or done.exception())
+            if isinstance(ex, asyncio.TimeoutError):
+                raise QueryTimeoutError(f"تجاوز الاستعلام المهلة ({timeout}s)") from None
+            raise
+
+    async def _acquire(self, timeout):
+        """يستعير اتصالًا على المنفذ؛ إن أُلغي الانتظار يُعاد الاتصال للمجمع عند وصوله."""
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self.pool.acquire)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as ex:
+            future.add_done_callback(
+                lambda done: done.cancelled() or done.exception() or done.result().close())
+            if isinstance(ex, asyncio.TimeoutError):
+                raise QueryTimeoutError(f"لم يتوفر اتصال خلال المهلة ({timeout}s)") from None
+            raise
+
+    def _fetch_all(self, handle, query, params, label):
+        timer = instrumentation.start_query(label)
+        db_error = _pyodbc().Error
+        rows = []
+        with self.pool.connection() as cnxn:
+            cursor = cnxn.cursor()
+            handle.attach(cursor)
+            try:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                if timer:
+                    timer.lap("execute")
+                columns = [column[0] for column in cursor.description] if cursor.description else []
+                while not handle.cancelled:
+                    batch = cursor.fetchmany(self.batch_size)
+                    if not batch:
+                        break
+                    rows.extend(batch)
+                if timer:
+                    timer.lap("fetch")
+                    timer.done(len(rows), 0)
+            except db_error:
+                if timer:
+                    timer.lap("fetch")
+                    timer.done(len(rows), 0, error=True)
+                raise
+            finally:
+                cursor.close()
+        return columns, rows
+
+    async def fetchall(self, query, params=None, timeout=None, label=None):
+        """
+        ينفذ استعلامًا ويعيد (أسماء الأعمدة، الصفوف).
+
+        Raises:
+            QueryTimeoutError: إذا تجاوز الاستعلام المهلة (timeout أو المهلة الافتراضية).
+            pyodbc.Error: أخطاء قاعدة البيانات كما هي.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        handle = _QueryHandle()
+        async with self._semaphore:
+            return await self._call(handle, timeout, self._fetch_all, handle, query, params,
+                                    label or query.strip()[:60])
+
+    async def gather(self, queries, timeout=None):
+        """
+        ينفذ قاموس {الاسم: الاستعلام} بالتوازي ضمن حد التزامن، ويعيد {الاسم: النتيجة}
+        حيث النتيجة (الأعمدة، الصفوف) أو الاستثناء الذي حدث لذلك الاستعلام.
+        """
+        names = list(queries)
+        results = await asyncio.gather(
+            *(self.fetchall(queries[name], timeout=timeout, label=name) for name in names),
+            return_exceptions=True)
+        return dict(zip(names, results))
+
+    async def stream(self, query, params=None, timeout=None, batch_size=None):
+        """
+        يبث صفوف استعلام عبر async for دون تحميلها كاملة في الذاكرة.
+
+        يبقى الاتصال ومقعد التزامن محجوزين حتى انتهاء الحلقة أو الخروج منها. المهلة
+        تُطبق على التنفيذ وعلى كل دفعة fetchmany على حدة. عند الخروج المبكر من الحلقة
+        استخدم contextlib.aclosing ليُعاد الاتصال فورًا:
+
+            async with contextlib.aclosing(db.stream("SELECT * FROM sales.InvoiceItems")) as rows:
+                async for row in rows:
+                    ...
+        """
+        timeout = self.timeout if timeout is None else timeout
+        batch_size = batch_size or self.batch_size
+        handle = _QueryHandle()
+        async with self._semaphore:
+            cnxn = await self._acquire(timeout)
+            try:
+                cursor = cnxn.cursor()
+                handle.attach(cursor)
+                await self._call(handle, timeout, cursor.execute, query, *([params] if params else []))
+                while True:
+                    rows = await self._call(handle, timeout, cursor.fetchmany, batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield row
+            finally:
+                # لا يُعاد الاتصال قبل أن يعود الخيط الذي ما زال يستخدمه (بعد مهلة أو إلغاء)
+                handle.cancel()
+                if handle.pending is not None and not handle.pending.done():
+                    await asyncio.wait([handle.pending])
+                # الإرجاع على المنفذ: قد يتضمن rollback على الخادم
+                await asyncio.get_running_loop().run_in_executor(self._executor, cnxn.close)
+
+    async def run(self, func, *args, timeout=None):
+        """
+        يشغّل دالة متزامنة من test.py (مثل get_database_full_schema) على المنفذ ضمن حد
+        التزامن. عند انتهاء المهلة يتوقف الانتظار فقط؛ الدالة نفسها لا يمكن إلغاؤها.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        async with self._semaphore:
+            return await self._call(_QueryHandle(), timeout, func, *args)
+
+
+async def run_dashboard(max_concurrency=8, timeout=30.0):
+    async with AsyncDatabase(max_concurrency=max_concurrency, timeout=timeout) as db:
+        started = time.perf_counter()
+        results = await db.gather(DASHBOARD_QUERIES)
+        elapsed = time.perf_counter() - started
+    for name, result in results.items():
+        if isinstance(result, BaseException):
+            print(f"❌ {name}: {result}")
+            continue
+        columns, rows = result
+        print(f"\n--- {name}: {len(rows)} صف ---")
+        print(" | ".join(columns))
+        for row in rows[:20]:
+            print(" | ".join(str(value) for value in row))
+    print(f"\n⏱️ {len(results)} استعلام خلال {elapsed:.2f}s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="تنفيذ استعلامات لوحة القيادة بالتوازي عبر asyncio.")
+    parser.add_argument("--concurrency", type=int, default=8, help="الحد الأقصى للاستعلامات الجارية معًا")
+    parser.add_argument("--timeout", type=float, default=30.0, help="مهلة كل استعلام بالثواني")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    asyncio.run(run_dashboard(args.concurrency, args.timeout))
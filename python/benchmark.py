@@ -0,0 +1,833 @@
+import argparse
+import asyncio
+import contextlib
+import datetime
+import decimal
+import hashlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import fake_pyodbc
+
+# يجب أن يسبق استيراد test.py حتى يستخدم المشغل الوهمي بدل pyodbc الحقيقي
+sys.modules["pyodbc"] = fake_pyodbc
+
+import test as toolkit  # noqa: E402
+import async_db  # noqa: E402
+import export_invoices  # noqa: E402
+import folder_tree  # noqa: E402
+import module_definitions  # noqa: E402
+import load_products  # noqa: E402
+import result_writers  # noqa: E402
+from result_writers import TextWriter  # noqa: E402
+
+SCHEMAS = ("inventory", "sales", "purchases", "accounting", "settings")
+
+# صيغة ملف النتائج؛ تُرفع عند تغيير بنيته
+RESULTS_FORMAT_VERSION = 1
+
+
+class SyntheticCatalog(fake_pyodbc.FakeCatalog):
+    """
+    كتالوج اصطناعي يحاكي مخطط AlwaseetGroup بأي حجم: الجداول موزعة على المخططات
+    الخمسة، ولكل جدول أعمدة وفهارس وقيود، إضافة إلى إجراءات ودوال ومشاهدات ومشغلات
+    وجدول بنود فواتير بعدد الصفوف المطلوب. الصفوف تُولد عند الجلب فقط.
+
+    Args:
+        tables (int): عدد الجداول.
+        invoice_rows (int): عدد صفوف sales.InvoiceItems.
+        latency (fake_pyodbc.Latency): أزمنة الشبكة المحاكاة.
+    """
+
+    def __init__(self, tables, invoice_rows=0, latency=None, columns_per_table=8,
+                 indexes_per_table=2, constraints_per_table=2):
+        super().__init__(latency)
+        self.tables = tables
+        self.invoice_rows = invoice_rows
+        self.columns_per_table = columns_per_table
+        self.indexes_per_table = indexes_per_table
+        self.constraints_per_table = constraints_per_table
+        self.procedures = max(1, tables // 2)
+        self.functions = max(1, tables // 4)
+        self.views = max(1, tables // 4)
+        self.triggers = max(1, tables // 10)
+
+        self.register("INFORMATION_SCHEMA.TABLES", self._owner_filtered(self._columns))
+        self.register("sys.indexes AS ind", self._owner_filtered(self._indexes))
+        self.register("o.type = 'P'", self._owner_filtered(self._procedures))
+        self.register("o.type IN ('FN', 'IF', 'TF')", self._owner_filtered(self._functions))
+        self.register("o.type = 'V'", self._owner_filtered(self._views))
+        self.register("c.type IN ('UQ', 'C', 'D')", self._owner_filtered(self._constraints))
+        self.register("sys.triggers AS tr", self._owner_filtered(self._triggers))
+        self.register("COALESCE(p.schema_id, o.schema_id)", self._objects)
+        self.register("FROM sales.InvoiceItems", self._invoice_items)
+        self.register("MIN(InvoiceDate), MAX(InvoiceDate)", self._invoice_date_bounds)
+        self.register("FROM\n    sales.Invoices AS i\nWHERE", self._invoices_in_range)
+        self.register("sales.InvoiceItems AS ii ON", self._invoice_items_in_range)
+        self.register("FROM inventory.Categories", self._category_ids)
+        self.register("SELECT Barcode FROM inventory.Products", lambda query, params: (["Barcode"], []))
+        self.register("INSERT INTO inventory.Products", lambda query, params: None)
+        self.register("AS requested(ObjectName)", self._module_hashes)
+        self.register("m.definition AS Definition", self._module_definitions)
+
+    @staticmethod
+    def _owner_filtered(handler):
+        # استعلامات التحديث التزايدي للقطة المخطط تمرر مفاتيح schema.name كمعاملات
+        def resolve(query, params):
+            columns, rows = handler()
+            if params:
+                wanted = set(params)
+                rows = (row for row in rows if f"{row[0]}.{row[1]}" in wanted)
+            return columns, rows
+        return resolve
+
+    def table(self, index):
+        return SCHEMAS[index % len(SCHEMAS)], f"Table{index:05d}"
+
+    def _sorted_tables(self):
+        return sorted(range(self.tables), key=self.table)
+
+    def _columns(self):
+        columns = ["TABLE_SCHEMA", "TABLE_NAME", "COLUMN_NAME", "DATA_TYPE", "MaxLength",
+                   "NUMERIC_PRECISION", "NUMERIC_SCALE", "IS_NULLABLE", "IsPrimaryKey",
+                   "IsForeignKey", "ReferencedTableName", "ReferencedColumnName"]
+
+        def rows():
+            for index in self._sorted_tables():
+                schema, name = self.table(index)
+                yield (schema, name, "Id", "int", "", 10, 0, "NO", "YES", "NO", None, None)
+                for column in range(1, self.columns_per_table):
+                    if column == 1 and index:
+                        referenced = self.table(index - 1)[1]
+                        yield (schema, name, "ParentId", "int", "", 10, 0, "YES", "NO", "YES",
+                               referenced, "Id")
+                    elif column % 3 == 0:
+                        yield (schema, name, f"Amount{column}", "decimal", "", 18, 2, "YES",
+                               "NO", "NO", None, None)
+                    else:
+                        yield (schema, name, f"Name{column}", "nvarchar", "255", None, None,
+                               "YES", "NO", "NO", None, None)
+        return columns, rows()
+
+    def _indexes(self):
+        columns = ["TableSchema", "TableName", "IndexName", "IndexType", "IndexColumns", "IsUnique"]
+
+        def rows():
+            for index in self._sorted_tables():
+                schema, name = self.table(index)
+                yield (schema, name, f"PK_{name}", "CLUSTERED", "Id", "YES")
+                for number in range(1, self.indexes_per_table):
+                    yield (schema, name, f"IX_{name}_{number}", "NONCLUSTERED",
+                           f"Name{number}", "NO")
+        return columns, rows()
+
+    # طول تعريف الكائن الاصطناعي؛ لا يُنقل في أقسام المخطط بل عند طلب التعريفات فقط
+    DEFINITION_LENGTH = 4000
+    MODIFY_DATE = datetime.datetime(2025, 1, 1)
+
+    def _definition(self, name):
+        header = f"CREATE OR ALTER PROCEDURE {name} AS BEGIN "
+        return (header + "SELECT 1; " * (self.DEFINITION_LENGTH // 10))[:self.DEFINITION_LENGTH]
+
+    @staticmethod
+    def _hash(name):
+        return hashlib.sha256(name.encode("utf-8")).hexdigest().upper()
+
+    def _module_names(self):
+        for count, prefix in ((self.procedures, "sp_Proc"), (self.functions, "fn_Func"),
+                              (self.views, "vw_View")):
+            for i in range(count):
+                yield f"{SCHEMAS[i % len(SCHEMAS)]}.{prefix}{i:05d}"
+        for index in range(self.triggers):
+            schema, name = self.table(index)
+            yield f"{schema}.tr_{name}_Audit"
+
+    def _module_hashes(self, query, params):
+        # معرف الكائن الاصطناعي هو ترتيبه بين الكائنات
+        object_ids = {name: object_id for object_id, name in enumerate(self._module_names(), 1)}
+        return ["ObjectName", "ObjectId", "DefinitionHash"], [
+            (name, object_ids[name], self._hash(name)) for name in params if name in object_ids]
+
+    def _module_definitions(self, query, params):
+        wanted = set(params)
+        return ["ObjectId", "DefinitionHash", "Definition"], [
+            (object_id, self._hash(name), self._definition(name))
+            for object_id, name in enumerate(self._module_names(), 1) if object_id in wanted]
+
+    def _modules(self, count, prefix, type_desc, name_column, with_type=True,
+                 schema_column="RoutineSchema"):
+        names = sorted((SCHEMAS[i % len(SCHEMAS)], f"{prefix}{i:05d}") for i in range(count))
+        columns = [schema_column, name_column] + (["ObjectType"] if with_type else []) + \
+            ["ModifyDate", "DefinitionHash"]
+
+        def rows():
+            for schema, name in names:
+                yield (schema, name) + ((type_desc,) if with_type else ()) + \
+                    (self.MODIFY_DATE, self._hash(f"{schema}.{name}"))
+        return columns, rows()
+
+    def _procedures(self):
+        return self._modules(self.procedures, "sp_Proc", "SQL_STORED_PROCEDURE", "ProcedureName")
+
+    def _functions(self):
+        return self._modules(self.functions, "fn_Func", "SQL_SCALAR_FUNCTION", "FunctionName")
+
+    def _views(self):
+        return self._modules(self.views, "vw_View", "VIEW", "ViewName", with_type=False,
+                             schema_column="ViewSchema")
+
+    def _constraints(self):
+        columns = ["TableSchema", "TableName", "ConstraintName", "ConstraintType",
+                   "ConstraintDefinition"]
+
+        def rows():
+            for index in self._sorted_tables():
+                schema, name = self.table(index)
+                for number in range(self.constraints_per_table):
+                    yield (schema, name, f"DF_{name}_{number}", "DEFAULT_CONSTRAINT", "((0))")
+        return columns, rows()
+
+    def _triggers(self):
+        columns = ["TableSchema", "TableName", "TriggerName", "TriggerType", "IsDisabled",
+                   "ModifyDate", "DefinitionHash"]
+
+        def rows():
+            for index in sorted(range(self.triggers), key=self.table):
+                schema, name = self.table(index)
+                yield (schema, name, f"tr_{name}_Audit", "AFTER", False, self.MODIFY_DATE,
+                       self._hash(f"{schema}.tr_{name}_Audit"))
+        return columns, rows()
+
+    def _objects(self, query, params):
+        columns = ["object_id", "OwnerSchema", "OwnerName", "CreateDate", "ModifyDate"]
+        stamp = "2025-01-01T00:00:00"
+
+        def rows():
+            object_id = 1000
+            for index in range(self.tables):
+                schema, name = self.table(index)
+                for _ in range(1 + self.constraints_per_table):
+                    object_id += 1
+                    yield (object_id, schema, name, stamp, stamp)
+            for count, prefix in ((self.procedures, "sp_Proc"), (self.functions, "fn_Func"),
+                                  (self.views, "vw_View")):
+                for i in range(count):
+                    object_id += 1
+                    yield (object_id, SCHEMAS[i % len(SCHEMAS)], f"{prefix}{i:05d}", stamp, stamp)
+        return columns, rows()
+
+    def _invoice_items(self, query, params):
+        columns = ["InvoiceItemId", "InvoiceId", "ProductId", "Quantity", "UnitPrice",
+                   "DiscountPercent", "DiscountAmount", "TaxPercent", "TaxAmount", "LineTotal"]
+        cents = decimal.Decimal("0.01")
+
+        def rows():
+            for item_id in range(1, self.invoice_rows + 1):
+                quantity = decimal.Decimal(item_id % 9 + 1)
+                price = (decimal.Decimal(item_id % 500) + decimal.Decimal("0.75")).quantize(cents)
+                discount = None if item_id % 4 else decimal.Decimal("5.00")
+                tax = (quantity * price * decimal.Decimal("0.11")).quantize(cents)
+                yield (item_id, item_id // 3 + 1, item_id % 1000 + 1, quantity, price,
+                       discount, discount and (quantity * price * discount / 100).quantize(cents),
+                       decimal.Decimal("11.00"), tax, (quantity * price + tax).quantize(cents))
+        return columns, rows()
+
+
+    # الفواتير موزعة بالتساوي على الأيام ابتداءً من INVOICE_EPOCH، وكل فاتورة لها 3 بنود
+    INVOICE_EPOCH = datetime.datetime(2024, 1, 1)
+    INVOICES_PER_DAY = 200
+
+    def _invoice_date_bounds(self, query, params):
+        invoices = max(1, self.invoice_rows // 3)
+        last = self.INVOICE_EPOCH + datetime.timedelta(days=(invoices - 1) // self.INVOICES_PER_DAY)
+        return ["MinDate", "MaxDate"], [(self.INVOICE_EPOCH, last)]
+
+    def _invoice_ids_in_range(self, params):
+        lo, hi = (datetime.datetime.combine(value, datetime.time()) for value in params)
+        invoices = max(1, self.invoice_rows // 3)
+        first = max(0, (lo - self.INVOICE_EPOCH).days * self.INVOICES_PER_DAY)
+        last = min(invoices, max(0, (hi - self.INVOICE_EPOCH).days * self.INVOICES_PER_DAY))
+        return range(first + 1, last + 1)
+
+    def _invoices_in_range(self, query, params):
+        columns = ["InvoiceId", "InvoiceNumber", "InvoiceDate", "CustomerId", "PaymentMethod",
+                   "SubTotal", "DiscountPercent", "DiscountAmount", "TaxPercent", "TaxAmount",
+                   "TotalAmount", "AmountPaid", "AmountDue", "Status", "Notes", "CompanyId",
+                   "CreatedAt", "UpdatedAt", "CreatedBy"]
+        total = decimal.Decimal("150.00")
+
+        def rows():
+            for invoice_id in self._invoice_ids_in_range(params):
+                date = self.INVOICE_EPOCH + datetime.timedelta(
+                    days=(invoice_id - 1) // self.INVOICES_PER_DAY)
+                yield (invoice_id, f"INV-{invoice_id:08d}", date, invoice_id % 50 + 1, "Cash",
+                       total, None, None, None, None, total, total, decimal.Decimal("0.00"),
+                       "Paid", None, 1, date, None, 1)
+        return columns, rows()
+
+    def _invoice_items_in_range(self, query, params):
+        columns = ["InvoiceItemId", "InvoiceId", "ProductId", "Quantity", "UnitPrice",
+                   "DiscountPercent", "DiscountAmount", "TaxPercent", "TaxAmount", "LineTotal"]
+        price = decimal.Decimal("50.00")
+
+        def rows():
+            for invoice_id in self._invoice_ids_in_range(params):
+                for line in range(3):
+                    yield ((invoice_id - 1) * 3 + line + 1, invoice_id, line + 1,
+                           decimal.Decimal(1), price, None, None, None, None, price)
+        return columns, rows()
+
+    CATEGORIES = 20
+
+    def _category_ids(self, query, params):
+        return ["CategoryId"], [(category_id,) for category_id in range(1, self.CATEGORIES + 1)]
+
+
+def write_products_csv(path, count):
+    """يكتب ملف منتجات CSV اصطناعيًا؛ كل مئة منتج فيها سجل غير صالح لاختبار ملف الرفض."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("name,barcode,categoryId,purchasePrice,salePrice,quantity,unitOfMeasure\n")
+        for index in range(count):
+            price = "" if index % 100 == 99 else f"{index % 500 + 1}.50"
+            f.write(f"Product {index},BC{index:010d},{index % SyntheticCatalog.CATEGORIES + 1},"
+                    f"{price},{index % 500 + 3}.25,{index % 40},piece\n")
+
+
+class _FirstRowWriter(TextWriter):
+    """كاتب نصي يسجل لحظة وصول أول دفعة لقياس زمن ظهور أول صف."""
+
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.first_rows_at = None
+
+    def rows(self, rows):
+        if self.first_rows_at is None:
+            self.first_rows_at = time.perf_counter()
+        return super().rows(rows)
+
+
+def _best_of(repeat, func):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_connect(latency, calls, repeat):
+    """يقارن connect_to_database بدون مجمع ومع مجمع اتصالات."""
+    fake_pyodbc.install(fake_pyodbc.FakeCatalog(latency))
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        def direct():
+            for _ in range(calls):
+                cnxn, cursor = toolkit.connect_to_database()
+                cursor.close()
+                cnxn.close()
+        elapsed, _ = _best_of(repeat, direct)
+        results.append({"benchmark": "connect", "label": "direct", "size": calls,
+                        "seconds": elapsed, "per_call_ms": elapsed * 1000 / calls})
+
+        pool = toolkit.create_connection_pool(min_size=1, max_size=1)
+
+        def pooled():
+            for _ in range(calls):
+                cnxn, cursor = toolkit.connect_to_database(pool)
+                cursor.close()
+                cnxn.close()
+        elapsed, _ = _best_of(repeat, pooled)
+        pool.close()
+        results.append({"benchmark": "connect", "label": "pooled", "size": calls,
+                        "seconds": elapsed, "per_call_ms": elapsed * 1000 / calls})
+    return results
+
+
+def bench_schema(tables, latency, repeat, workers, sink):
+    """يقيس كل قسم من أقسام get_database_full_schema ثم المخطط كاملًا متتابعًا ومتزامنًا."""
+    catalog = SyntheticCatalog(tables, latency=latency)
+    fake_pyodbc.install(catalog)
+    cursor = fake_pyodbc.connect().cursor()
+    results = []
+
+    for section in toolkit.SCHEMA_SECTIONS:
+        writer = TextWriter(sink)
+        before = catalog.counters["rows"]
+        elapsed, _ = _best_of(repeat, lambda: toolkit._run_schema_section(cursor, section, writer))
+        rows = (catalog.counters["rows"] - before) // repeat
+        results.append({"benchmark": "schema.section", "label": f"{section.number}. {section.title}",
+                        "size": tables, "seconds": elapsed, "rows": rows})
+
+    writer = TextWriter(sink)
+    elapsed, _ = _best_of(repeat, lambda: toolkit.get_database_full_schema(cursor, writer=writer))
+    results.append({"benchmark": "schema.full", "label": "sequential", "size": tables,
+                    "seconds": elapsed})
+
+    pool = toolkit.create_connection_pool(min_size=0, max_size=workers)
+    elapsed, _ = _best_of(repeat, lambda: toolkit.get_database_full_schema(
+        cursor, concurrent=True, max_workers=workers, pool=pool, writer=writer))
+    pool.close()
+    results.append({"benchmark": "schema.full", "label": f"concurrent x{workers}", "size": tables,
+                    "seconds": elapsed})
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, "schema_snapshot.json")
+        elapsed, _ = _best_of(1, lambda: toolkit.get_database_full_schema(
+            cursor, use_cache=True, cache_path=cache_path, writer=writer))
+        results.append({"benchmark": "schema.cache", "label": "cold", "size": tables,
+                        "seconds": elapsed})
+        elapsed, _ = _best_of(repeat, lambda: toolkit.get_database_full_schema(
+            cursor, use_cache=True, cache_path=cache_path, writer=writer))
+        results.append({"benchmark": "schema.cache", "label": "warm", "size": tables,
+                        "seconds": elapsed})
+    return results
+
+
+def bench_definitions(tables, latency, repeat, requested=50):
+    """يقيس جلب التعريفات الكاملة لعدد من الكائنات: أول مرة من الخادم ثم من ذاكرة التجزئة."""
+    catalog = SyntheticCatalog(tables, latency=latency)
+    fake_pyodbc.install(catalog)
+    cursor = fake_pyodbc.connect().cursor()
+    names = list(catalog._module_names())[:requested]
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, "module_definitions.json")
+        for label in ("cold", "warm"):
+            elapsed, definitions = _best_of(1 if label == "cold" else repeat, lambda: (
+                module_definitions.fetch_definitions(
+                    cursor, names, module_definitions.DefinitionCache(cache_path))))
+            results.append({"benchmark": "schema.definitions", "label": label, "size": tables,
+                            "seconds": elapsed, "rows": len(definitions)})
+    return results
+
+
+def bench_execute_and_print(invoice_rows, latency, repeat, batch_size, sink):
+    """يقيس execute_and_print على sales.InvoiceItems: الزمن الكلي، أول صف، الصفوف/ثانية."""
+    fake_pyodbc.install(SyntheticCatalog(0, invoice_rows=invoice_rows, latency=latency))
+    cursor = fake_pyodbc.connect().cursor()
+    best = None
+    for _ in range(repeat):
+        writer = _FirstRowWriter(sink)
+        started = time.perf_counter()
+        rows = toolkit.execute_and_print(cursor, "sales.InvoiceItems",
+                                         "SELECT * FROM sales.InvoiceItems",
+                                         batch_size=batch_size, writer=writer)
+        elapsed = time.perf_counter() - started
+        first_row = (writer.first_rows_at or time.perf_counter()) - started
+        if best is None or elapsed < best[0]:
+            best = (elapsed, first_row, rows)
+    elapsed, first_row, rows = best
+    return [{"benchmark": "execute_and_print", "label": f"batch={batch_size}", "size": invoice_rows,
+             "seconds": elapsed, "rows": rows, "first_row_ms": first_row * 1000,
+             "rows_per_sec": rows / elapsed if elapsed else 0.0}]
+
+
+def _print_loop(rows, names, sink):
+    # حلقة الطباعة الأصلية في execute_and_print قبل كتّاب النتائج: print لكل صف
+    print(" | ".join(names), file=sink)
+    print("-" * (sum(len(name) + 3 for name in names) - 3), file=sink)
+    for row in rows:
+        print(" | ".join(str(item) if item is not None else "NULL" for item in row), file=sink)
+
+
+def bench_result_writers(invoice_rows, repeat, batch_size):
+    """
+    يقارن كتّاب النتائج بحلقة print الأصلية على صفوف sales.Invoices (أعداد، Decimal،
+    تواريخ، نصوص، و NULL)، ويسجل حجم الملف الناتج لكل صيغة.
+    """
+    catalog = SyntheticCatalog(0, invoice_rows=invoice_rows * 3)
+    _, [(first, last)] = catalog._invoice_date_bounds(None, None)
+    names, rows = catalog._invoices_in_range(
+        None, (first.date(), last.date() + datetime.timedelta(days=1)))
+    rows = list(rows)
+    batches = [rows[start:start + batch_size] for start in range(0, len(rows), batch_size)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "result")
+
+        def print_loop():
+            # الحلقة الأصلية مع توجيه stdout إلى ملف، كما تُكتب مخرجات الكتّاب
+            with open(path, "w", encoding="utf-8") as out:
+                _print_loop(rows, names, out)
+
+        elapsed, _ = _best_of(repeat, print_loop)
+        results = [{"benchmark": "result_writers", "label": "print loop", "size": len(rows),
+                    "seconds": elapsed, "bytes": os.path.getsize(path),
+                    "rows_per_sec": len(rows) / elapsed if elapsed else 0.0}]
+
+        def write(fmt):
+            with result_writers.create_writer(fmt, path) as writer:
+                writer.start("sales.Invoices")
+                writer.columns(names)
+                for batch in batches:
+                    writer.rows(batch)
+                writer.finish(len(rows))
+
+        for fmt in result_writers.WRITER_FORMATS:
+            elapsed, _ = _best_of(repeat, lambda: write(fmt))
+            results.append({"benchmark": "result_writers", "label": fmt, "size": len(rows),
+                            "seconds": elapsed, "bytes": os.path.getsize(path),
+                            "rows_per_sec": len(rows) / elapsed if elapsed else 0.0})
+    return results
+
+
+def slower_than_print_loop(results):
+    """كتّاب النتائج الأبطأ من حلقة print الأصلية على الحجم نفسه: [(النتيجة، النسبة)]."""
+    baselines = {result["size"]: result["seconds"] for result in results
+                 if result["benchmark"] == "result_writers" and result["label"] == "print loop"}
+    slower = []
+    for result in results:
+        baseline = baselines.get(result["size"])
+        if (result["benchmark"] == "result_writers" and result["label"] != "print loop"
+                and baseline and result["seconds"] >= baseline):
+            slower.append((result, result["seconds"] / baseline))
+    return slower
+
+
+def bench_export(invoice_rows, latency, workers_list, fmt):
+    """يقيس export_invoices بأعداد مختلفة من العمال على نفس البيانات."""
+    catalog = SyntheticCatalog(0, invoice_rows=invoice_rows, latency=latency)
+    fake_pyodbc.install(catalog)
+    results = []
+    for workers in workers_list:
+        with tempfile.TemporaryDirectory() as directory, \
+                contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            export_invoices.export_invoices(partition_days=7, workers=workers, fmt=fmt,
+                                            output_dir=directory)
+            elapsed = time.perf_counter() - started
+        results.append({"benchmark": "export_invoices", "label": f"workers={workers} {fmt}",
+                        "size": invoice_rows, "seconds": elapsed,
+                        "rows_per_sec": invoice_rows * 4 / 3 / elapsed if elapsed else 0.0})
+    return results
+
+
+def bench_load_products(product_rows, latency, batch_sizes):
+    """يقيس load_products بإدراج fast_executemany على دفعات مقابل الإدراج صفًا صفًا."""
+    fake_pyodbc.install(SyntheticCatalog(0, latency=latency))
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "products.csv")
+        write_products_csv(path, product_rows)
+        runs = [(f"fast_executemany batch={size}", size, True) for size in batch_sizes]
+        if product_rows <= 10000:
+            runs.append(("row-by-row", max(batch_sizes), False))
+        for label, batch_size, fast in runs:
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = load_products.load_products(
+                    fake_pyodbc.connect(), path, batch_size=batch_size,
+                    reject_path=os.path.join(directory, "rejects.csv"), fast_executemany=fast)
+            results.append({"benchmark": "load_products", "label": label, "size": product_rows,
+                            "seconds": stats["seconds"], "rows": stats["inserted"],
+                            "rows_per_sec": stats["rows_per_sec"]})
+    return results
+
+
+def bench_async(queries, latency, concurrency_list, rows_per_query=100):
+    """
+    يقيس تنفيذ عدد من الاستعلامات المستقلة: متتابعة على اتصال واحد مقابل AsyncDatabase
+    بحدود تزامن مختلفة من حلقة أحداث واحدة.
+    """
+    fake_pyodbc.install(SyntheticCatalog(0, invoice_rows=rows_per_query, latency=latency))
+    query = "SELECT * FROM sales.InvoiceItems"
+    results = []
+
+    cursor = fake_pyodbc.connect().cursor()
+    started = time.perf_counter()
+    for _ in range(queries):
+        cursor.execute(query)
+        while cursor.fetchmany(toolkit.FETCH_BATCH_SIZE):
+            pass
+    elapsed = time.perf_counter() - started
+    results.append({"benchmark": "async", "label": "sequential", "size": queries,
+                    "seconds": elapsed, "per_call_ms": elapsed * 1000 / queries})
+
+    async def run_all(concurrency):
+        async with async_db.AsyncDatabase(max_concurrency=concurrency) as db:
+            started = time.perf_counter()
+            await asyncio.gather(*(db.fetchall(query) for _ in range(queries)))
+            return time.perf_counter() - started
+
+    for concurrency in concurrency_list:
+        elapsed = asyncio.run(run_all(concurrency))
+        results.append({"benchmark": "async", "label": f"concurrency={concurrency}", "size": queries,
+                        "seconds": elapsed, "per_call_ms": elapsed * 1000 / queries})
+    return results
+
+
+def make_synthetic_tree(root, files, fanout=10, files_per_dir=100):
+    """
+    ينشئ شجرة مجلدات اصطناعية فيها العدد المطلوب من الملفات الفارغة، موزعة بالتساوي على
+    مجلدات بعمق متزايد وتفرع ثابت، مع مجلد node_modules مستثنى في المستويات العليا.
+    """
+    needed = max(1, -(-files // files_per_dir))
+    directories = [root]
+    created = 0
+    index = 0
+    while created < files:
+        path = directories[index]
+        index += 1
+        for child in range(fanout):
+            if len(directories) >= needed:
+                break
+            name = "node_modules" if child == 0 and index <= fanout else f"dir{child:02d}"
+            child_path = os.path.join(path, name)
+            os.mkdir(child_path)
+            directories.append(child_path)
+        count = min(files_per_dir, files - created)
+        for number in range(count):
+            open(os.path.join(path, f"file{number:04d}.txt"), "wb").close()
+        created += count
+    return created
+
+
+def _walk_tree_legacy(startpath, output_file, exclude_dirs):
+    # الخوارزمية السابقة لـ generate_folder_tree: os.walk متتابع مع الكتابة سطرًا سطرًا
+    with open(output_file, "w", encoding="utf-8") as f:
+        for root, dirs, files in os.walk(startpath):
+            level = root.replace(startpath, "").count(os.sep)
+            dirs[:] = [d for d in dirs if d not in exclude_dirs]
+            f.write(f"{'    ' * level}📁 {os.path.basename(root)}/\n")
+            for file in sorted(files):
+                f.write(f"{'    ' * (level + 1)}📄 {file}\n")
+
+
+@contextlib.contextmanager
+def _scandir_latency(seconds):
+    # يحاكي زمن قراءة المجلد على قرص بارد أو مجلد شبكة مشترك لكل من os.walk وfolder_tree
+    real_scandir = os.scandir
+
+    def slow_scandir(path="."):
+        time.sleep(seconds)
+        return real_scandir(path)
+
+    os.scandir = slow_scandir
+    try:
+        yield
+    finally:
+        os.scandir = real_scandir
+
+
+def bench_folder_tree(files, workers_list, repeat, latency=0.0):
+    """
+    يقارن تجوال os.walk المتتابع بمحرك folder_tree القائم على os.scandir بأعداد خيوط
+    مختلفة، على ذاكرة تخزين مؤقت دافئة ثم مع زمن قراءة محاكى لكل مجلد.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        root = os.path.join(directory, "tree")
+        os.mkdir(root)
+        make_synthetic_tree(root, files)
+        output = os.path.join(directory, "folder_tree.txt")
+        exclude = ["node_modules"]
+        ignore = folder_tree.IgnoreMatcher(["node_modules/"])
+
+        for delay in ([0.0, latency] if latency else [0.0]):
+            suffix = f" latency={delay * 1000:g}ms" if delay else ""
+            with _scandir_latency(delay):
+                elapsed, _ = _best_of(repeat, lambda: _walk_tree_legacy(root, output, exclude))
+                results.append({"benchmark": "folder_tree", "label": f"os.walk{suffix}", "size": files,
+                                "seconds": elapsed})
+                # None: الاختيار التلقائي (متتابع ما لم تكن القراءة بطيئة)
+                for workers in list(workers_list) + [None]:
+                    elapsed, stats = _best_of(repeat, lambda: folder_tree.write_folder_tree(
+                        root, output, ignore=ignore, workers=workers))
+                    label = "auto" if workers is None else workers
+                    results.append({"benchmark": "folder_tree", "label": f"scandir workers={label}{suffix}",
+                                    "size": files, "seconds": elapsed, "files": stats["files"]})
+
+        # مطابق بأنماط glob ومسارات مثبتة ونفي، ثم الملخص مع الأحجام (stat لكل ملف)
+        globs = folder_tree.IgnoreMatcher(["node_modules/", "*.log", "file00[0-4]?.txt", "/dir01/dir02/",
+                                           "**/dir09/dir09/", "!file0001.txt"])
+        workers = max(workers_list)
+        for label, options in (("globs", {"ignore": globs}),
+                               ("summary+sizes", {"ignore": ignore, "sizes": True})):
+            elapsed, stats = _best_of(repeat, lambda: folder_tree.write_folder_tree(
+                root, output, workers=workers, **options))
+            results.append({"benchmark": "folder_tree", "label": f"scandir workers={workers} {label}",
+                            "size": files, "seconds": elapsed, "files": stats["files"]})
+
+        # التحديث التزايدي: التشغيل الأول يملأ الذاكرة، ثم تشغيل دون تغيير، ثم بعد إضافة ملف
+        cache_path = os.path.join(directory, "folder_tree_cache.sqlite")
+        workers = max(workers_list)
+        with folder_tree.TreeCache(cache_path, root) as cache:
+            folder_tree.write_folder_tree(root, output, ignore=ignore, workers=workers, cache=cache)
+        time.sleep(folder_tree.RACY_WINDOW_NS / 1e9)
+        for label, change in (("unchanged", None), ("one file added", os.path.join(root, "dir01", "new.txt"))):
+            if change:
+                open(change, "wb").close()
+            started = time.perf_counter()
+            with folder_tree.TreeCache(cache_path, root) as cache:
+                stats = folder_tree.write_folder_tree(root, output, ignore=ignore, workers=workers,
+                                                      cache=cache)
+            results.append({"benchmark": "folder_tree", "label": f"cached {label}", "size": files,
+                            "seconds": time.perf_counter() - started, "files": stats["files"],
+                            "rescanned": stats["rescanned"]})
+    return results
+
+
+def result_key(result):
+    return result["benchmark"], result["label"], result["size"]
+
+
+def compare_results(current, baseline, threshold):
+    """
+    يقارن النتائج الحالية بنتائج مرجعية ويعيد قائمة التراجعات (أبطأ بأكثر من threshold).
+    """
+    previous = {result_key(result): result for result in baseline["results"]}
+    regressions = []
+    print(f"\n{'benchmark':<22} {'label':<42} {'size':>9} {'baseline':>11} {'current':>11} {'ratio':>7}")
+    for result in current["results"]:
+        old = previous.get(result_key(result))
+        if not old or not old["seconds"]:
+            continue
+        ratio = result["seconds"] / old["seconds"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  ⚠️ تراجع"
+            regressions.append((result, old, ratio))
+        print(f"{result['benchmark']:<22} {result['label'][:42]:<42} {result['size']:>9} "
+              f"{old['seconds'] * 1000:>9.1f}ms {result['seconds'] * 1000:>9.1f}ms {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(",") if item]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="قياس أداء أدوات قاعدة البيانات (test.py) على كتالوج اصطناعي ومشغل pyodbc وهمي.")
+    parser.add_argument("--tables", type=_int_list, default=[10, 100, 1000, 10000],
+                        help="أحجام الكتالوج (عدد الجداول) مفصولة بفواصل")
+    parser.add_argument("--invoice-rows", type=_int_list, default=[10000, 100000, 1000000],
+                        help="أعداد صفوف sales.InvoiceItems لقياس execute_and_print")
+    parser.add_argument("--batch-size", type=int, default=toolkit.FETCH_BATCH_SIZE,
+                        help="حجم دفعة fetchmany")
+    parser.add_argument("--connect-calls", type=int, default=50,
+                        help="عدد استدعاءات connect_to_database في قياس الاتصال")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="عدد الخيوط للمخطط المتزامن")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="عدد التكرارات؛ يُحتفظ بأفضل زمن")
+    parser.add_argument("--connect-latency-ms", type=float, default=20.0,
+                        help="زمن مصافحة الاتصال المحاكى")
+    parser.add_argument("--execute-latency-ms", type=float, default=1.0,
+                        help="زمن الذهاب والإياب المحاكى لكل استعلام")
+    parser.add_argument("--fetch-latency-ms", type=float, default=0.1,
+                        help="زمن الذهاب والإياب المحاكى لكل دفعة fetch")
+    parser.add_argument("--writer-rows", type=_int_list, default=[200000],
+                        help="أعداد صفوف sales.Invoices لقياس كتّاب النتائج مقابل print")
+    parser.add_argument("--export-workers", type=_int_list, default=[1, 2, 4],
+                        help="أعداد العمال لقياس export_invoices (على أكبر حجم من --invoice-rows)")
+    parser.add_argument("--product-rows", type=_int_list, default=[10000, 100000],
+                        help="أعداد المنتجات لقياس load_products")
+    parser.add_argument("--load-batch-sizes", type=_int_list, default=[1000, 5000],
+                        help="أحجام دفعات executemany لقياس load_products")
+    parser.add_argument("--async-queries", type=int, default=64,
+                        help="عدد الاستعلامات المستقلة لقياس AsyncDatabase")
+    parser.add_argument("--async-concurrency", type=_int_list, default=[1, 8, 32],
+                        help="حدود التزامن لقياس AsyncDatabase")
+    parser.add_argument("--tree-files", type=_int_list, default=[1000000],
+                        help="أعداد الملفات في الشجرة الاصطناعية لقياس folder_tree")
+    parser.add_argument("--tree-workers", type=_int_list, default=[1, 8, 32],
+                        help="أعداد الخيوط لقياس folder_tree")
+    parser.add_argument("--tree-latency-ms", type=float, default=1.0,
+                        help="زمن قراءة المجلد المحاكى (قرص بارد أو مجلد شبكة)؛ 0 للقياس الدافئ فقط")
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="ملف حفظ النتائج (JSON)")
+    parser.add_argument("--compare",
+                        help="ملف نتائج مرجعي للمقارنة وكشف التراجعات")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="نسبة التباطؤ التي تعد تراجعًا (افتراضي: 0.10)")
+    return parser.parse_args(argv)
+
+
+def run(args):
+    latency = fake_pyodbc.Latency(connect=args.connect_latency_ms / 1000,
+                                  execute=args.execute_latency_ms / 1000,
+                                  fetch=args.fetch_latency_ms / 1000)
+    results = []
+    with open(os.devnull, "w", encoding="utf-8") as sink:
+        print("⏱️ قياس connect_to_database ...")
+        results.extend(bench_connect(latency, args.connect_calls, args.repeat))
+        for tables in args.tables:
+            print(f"⏱️ قياس get_database_full_schema على {tables} جدول ...")
+            results.extend(bench_schema(tables, latency, args.repeat, args.workers, sink))
+            results.extend(bench_definitions(tables, latency, args.repeat))
+        for rows in args.invoice_rows:
+            print(f"⏱️ قياس execute_and_print على {rows} صف ...")
+            results.extend(bench_execute_and_print(rows, latency, args.repeat, args.batch_size, sink))
+        for rows in args.writer_rows:
+            print(f"⏱️ قياس كتّاب النتائج على {rows} صف ...")
+            results.extend(bench_result_writers(rows, args.repeat, args.batch_size))
+        if args.export_workers and args.invoice_rows:
+            print("⏱️ قياس export_invoices ...")
+            results.extend(bench_export(max(args.invoice_rows), latency, args.export_workers, "csv"))
+        for rows in args.product_rows:
+            print(f"⏱️ قياس load_products على {rows} منتج ...")
+            results.extend(bench_load_products(rows, latency, args.load_batch_sizes))
+        if args.async_queries:
+            print(f"⏱️ قياس AsyncDatabase على {args.async_queries} استعلام ...")
+            results.extend(bench_async(args.async_queries, latency, args.async_concurrency))
+        for files in args.tree_files:
+            print(f"⏱️ قياس folder_tree على شجرة من {files} ملف ...")
+            results.extend(bench_folder_tree(files, args.tree_workers, args.repeat, args.tree_latency_ms / 1000))
+
+    return {
+        "version": RESULTS_FORMAT_VERSION,
+        "meta": {
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items()
+                     if key not in ("output", "compare")},
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run(args)
+
+    print(f"\n{'benchmark':<22} {'label':<42} {'size':>9} {'time':>11}")
+    for result in report["results"]:
+        extra = ""
+        if "rows_per_sec" in result:
+            extra = f"  {result['rows_per_sec']:,.0f} rows/s"
+            if "first_row_ms" in result:
+                extra += f", أول صف {result['first_row_ms']:.1f}ms"
+            if "bytes" in result:
+                extra += f", {result['bytes'] / 1024 / 1024:.1f} MB"
+        elif "per_call_ms" in result:
+            extra = f"  {result['per_call_ms']:.2f}ms/call"
+        print(f"{result['benchmark']:<22} {result['label'][:42]:<42} {result['size']:>9} "
+              f"{result['seconds'] * 1000:>9.1f}ms{extra}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ تم حفظ النتائج في: {args.output}")
+
+    # كل كاتب نتائج يجب أن يكون أسرع من حلقة print التي حل محلها
+    slower = slower_than_print_loop(report["results"])
+    for result, ratio in slower:
+        print(f"❌ كاتب {result['label']} أبطأ من حلقة print على {result['size']} صف ({ratio:.2f}x)")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} تراجع في الأداء تجاوز {args.threshold:.0%}")
+            sys.exit(1)
+        print("\n✅ لا توجد تراجعات في الأداء.")
+    if slower:
+        sys.exit(1)
@@ -0,0 +1,338 @@
+import argparse
+import datetime
+import decimal
+import sqlite3
+import time
+from collections import namedtuple
+
+import instrumentation
+from test import _pyodbc, connect_to_database
+
+# جدول مصدر واحد للمزامنة:
+#   columns: الأعمدة المنسوخة، key: المفتاح الأساسي (يكسر التعادل بين صفوف العلامة نفسها)،
+#   source: جملة FROM، changed_at: تعبير آخر تعديل عند غياب عمود rowversion،
+#   rowversion_table: الجدول الذي يُبحث فيه عن عمود rowversion و alias الخاص به،
+#   parent: عمود الصف الأب لجداول البنود التي تُعاد كلها مع أبيها (انظر LocalStore.apply).
+SyncTable = namedtuple("SyncTable", ["name", "columns", "key", "source", "changed_at",
+                                     "rowversion_table", "alias", "parent"], defaults=(None,))
+
+SYNC_TABLES = [
+    SyncTable(
+        "sales.Invoices",
+        ["InvoiceId", "InvoiceNumber", "InvoiceDate", "CustomerId", "PaymentMethod", "SubTotal",
+         "DiscountPercent", "DiscountAmount", "TaxPercent", "TaxAmount", "TotalAmount",
+         "AmountPaid", "AmountDue", "Status", "Notes", "CompanyId", "CreatedAt", "UpdatedAt",
+         "CreatedBy"],
+        "InvoiceId",
+        "sales.Invoices AS i",
+        "COALESCE(i.UpdatedAt, i.CreatedAt, '19000101')",
+        "sales.Invoices", "i",
+    ),
+    # البنود بلا CreatedAt/UpdatedAt؛ تُكتب مع فاتورتها (sales.sp_CreateSalesInvoice) فتتبع
+    # علامة الفاتورة، وتُعاد كلها عند تعديل الفاتورة فتحل محل بنودها المحلية (البند المحذوف
+    # من فاتورة معدلة يُحذف محليًا). حذف الفاتورة نفسها أو كل بنودها لا يُنسخ: لا يعود أي صف
+    SyncTable(
+        "sales.InvoiceItems",
+        ["InvoiceItemId", "InvoiceId", "ProductId", "Quantity", "UnitPrice", "DiscountPercent",
+         "DiscountAmount", "TaxPercent", "TaxAmount", "LineTotal"],
+        "InvoiceItemId",
+        "sales.InvoiceItems AS ii INNER JOIN sales.Invoices AS i ON i.InvoiceId = ii.InvoiceId",
+        "COALESCE(i.UpdatedAt, i.CreatedAt, '19000101')",
+        "sales.InvoiceItems", "ii", "InvoiceId",
+    ),
+    SyncTable(
+        "inventory.Products",
+        ["ProductId", "Name", "Barcode", "Description", "CategoryId", "PurchasePrice",
+         "SalePrice", "Quantity", "UnitOfMeasure", "MinimumQuantity", "ImageUrl", "CompanyId",
+         "CreatedAt", "UpdatedAt", "CreatedBy", "IsActive"],
+        "ProductId",
+        "inventory.Products AS p",
+        "COALESCE(p.UpdatedAt, p.CreatedAt, '19000101')",
+        "inventory.Products", "p",
+    ),
+]
+
+# system_type_id = 189 هو timestamp/rowversion
+ROWVERSION_COLUMN_QUERY = """
+SELECT TOP 1 c.name
+FROM sys.columns AS c
+WHERE c.object_id = OBJECT_ID(?) AND c.system_type_id = 189;
+"""
+
+# الحد الأعلى لكل دورة: الصفوف الأحدث منه قد تكون ضمن معاملات لم تُلتزم بعد
+ROWVERSION_UPPER_BOUND_QUERY = "SELECT MIN_ACTIVE_ROWVERSION();"
+TIMESTAMP_UPPER_BOUND_QUERY = "SELECT CONVERT(DATETIME2(6), DATEADD(SECOND, -?, SYSDATETIME()));"
+
+# أعمدة DATETIME2(7) أدق من datetime في بايثون (ميكروثانية)؛ لو قورنت كما هي لكانت العلامة
+# المحفوظة أصغر من قيمة صفها فيُعاد جلبه، وتدور الصفحات بلا نهاية إذا اشترك batch_size صف أو
+# أكثر في التوقيت نفسه. لذلك تُقرّب العلامة إلى الميكروثانية في الاستعلام نفسه
+TIMESTAMP_MARK = "CONVERT(DATETIME2(6), {})"
+
+ROWVERSION_START = b"\x00" * 8
+TIMESTAMP_START = datetime.datetime(1900, 1, 1)
+
+STATE_TABLE = "_sync_state"
+
+
+def build_changes_query(table, mark):
+    """
+    استعلام صفحة تغييرات بترقيم keyset: الصفوف بعد (العلامة، المفتاح) وقبل الحد الأعلى،
+    مرتبة بالعلامة ثم المفتاح.
+
+    Args:
+        table (SyncTable): الجدول.
+        mark (str): تعبير العلامة (عمود rowversion أو تعبير changed_at).
+    """
+    key = f"{table.alias}.{table.key}"
+    columns = ", ".join(f"{table.alias}.{column}" for column in table.columns)
+    return f"""
+SELECT TOP (?)
+    {columns}, {mark} AS SyncMark
+FROM
+    {table.source}
+WHERE
+    ({mark} > ? OR ({mark} = ? AND {key} > ?)) AND {mark} < ?
+ORDER BY
+    {mark}, {key};
+"""
+
+
+def encode_mark(method, mark):
+    """يحول العلامة إلى نص قابل للحفظ."""
+    return mark.hex() if method == "rowversion" else mark.isoformat()
+
+
+def decode_mark(method, text):
+    return bytes.fromhex(text) if method == "rowversion" else datetime.datetime.fromisoformat(text)
+
+
+def initial_mark(method):
+    return ROWVERSION_START if method == "rowversion" else TIMESTAMP_START
+
+
+def _sqlite_value(value):
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def _local_name(table_name):
+    return table_name.replace(".", "_")
+
+
+class LocalStore:
+    """
+    نسخة SQLite محلية. كل دفعة تُطبق مع تحديث علامة جدولها في المعاملة نفسها، فإما أن
+    تُحفظ البيانات والعلامة معًا أو لا يُحفظ أي منهما.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} ("
+            "table_name TEXT PRIMARY KEY, method TEXT NOT NULL, mark TEXT NOT NULL, "
+            "last_key INTEGER NOT NULL, rows INTEGER NOT NULL DEFAULT 0, synced_at TEXT)")
+        self.db.commit()
+
+    def ensure_table(self, table):
+        columns = ", ".join(f'"{column}"' for column in table.columns)
+        self.db.execute(f'CREATE TABLE IF NOT EXISTS "{_local_name(table.name)}" '
+                        f'({columns}, PRIMARY KEY ("{table.key}"))')
+        if table.parent:
+            self.db.execute(f'CREATE INDEX IF NOT EXISTS "IX_{_local_name(table.name)}_{table.parent}" '
+                            f'ON "{_local_name(table.name)}" ("{table.parent}")')
+        self.db.commit()
+
+    def load_state(self, table_name):
+        """يعيد (method, mark, last_key, rows) أو None إن لم يُزامن الجدول من قبل."""
+        row = self.db.execute(f"SELECT method, mark, last_key, rows FROM {STATE_TABLE} "
+                              "WHERE table_name = ?", (table_name,)).fetchone()
+        if row is None:
+            return None
+        method, mark, last_key, rows = row
+        return method, decode_mark(method, mark), last_key, rows
+
+    def reset(self, table):
+        with self.db:
+            self.db.execute(f'DELETE FROM "{_local_name(table.name)}"')
+            self.db.execute(f"DELETE FROM {STATE_TABLE} WHERE table_name = ?", (table.name,))
+
+    def apply(self, table, rows, method, mark, last_key, replaced_parents=()):
+        """
+        يكتب دفعة (upsert) ويحدث العلامة ذريًا. replaced_parents: الآباء الذين أُعيدت بنودهم
+        كاملة؛ تُحذف بنودهم المحلية أولًا فلا يبقى بند حُذف من المصدر.
+        """
+        placeholders = ", ".join("?" * len(table.columns))
+        with self.db:
+            if replaced_parents:
+                self.db.executemany(
+                    f'DELETE FROM "{_local_name(table.name)}" WHERE "{table.parent}" = ?',
+                    ((_sqlite_value(parent),) for parent in replaced_parents))
+            self.db.executemany(
+                f'INSERT OR REPLACE INTO "{_local_name(table.name)}" VALUES ({placeholders})',
+                ([_sqlite_value(value) for value in row] for row in rows))
+            self.db.execute(
+                f"INSERT INTO {STATE_TABLE} (table_name, method, mark, last_key, rows, synced_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(table_name) DO UPDATE SET method = excluded.method, "
+                "mark = excluded.mark, last_key = excluded.last_key, "
+                "rows = rows + excluded.rows, synced_at = excluded.synced_at",
+                (table.name, method, encode_mark(method, mark), last_key, len(rows),
+                 datetime.datetime.now().isoformat(timespec="seconds")))
+
+    def close(self):
+        self.db.close()
+
+
+def detect_method(cursor, table):
+    """يعيد ("rowversion", تعبير العمود) إن وُجد عمود rowversion، وإلا ("timestamp", changed_at)."""
+    cursor.execute(ROWVERSION_COLUMN_QUERY, table.rowversion_table)
+    row = cursor.fetchone()
+    if row:
+        return "rowversion", f"{table.alias}.[{row[0]}]"
+    return "timestamp", TIMESTAMP_MARK.format(table.changed_at)
+
+
+def fetch_upper_bound(cursor, method, settle_seconds=5):
+    """الحد الأعلى للدورة: الصفوف الأحدث منه قد تكون ضمن معاملات لم تُلتزم بعد."""
+    if method == "rowversion":
+        cursor.execute(ROWVERSION_UPPER_BOUND_QUERY)
+    else:
+        cursor.execute(TIMESTAMP_UPPER_BOUND_QUERY, settle_seconds)
+    return cursor.fetchone()[0]
+
+
+def iter_changes(cursor, table, mark_expression, mark, last_key, upper_bound, batch_size=5000):
+    """
+    يولد دفعات الصفوف المتغيرة بعد (mark, last_key) وقبل upper_bound. آخر عمود في كل
+    صف هو علامته (SyncMark)؛ يحفظ المستدعي علامة ومفتاح آخر صف بعد تطبيق كل دفعة.
+    """
+    query = build_changes_query(table, mark_expression)
+    key_index = table.columns.index(table.key)
+    while True:
+        timer = instrumentation.start_query(f"sync.{table.name}")
+        cursor.execute(query, batch_size, mark, mark, last_key, upper_bound)
+        if timer:
+            timer.lap("execute")
+        rows = cursor.fetchall()
+        if timer:
+            timer.lap("fetch")
+            timer.done(len(rows), 0)
+        if rows:
+            position = rows[-1][-1], rows[-1][key_index]
+            if position == (mark, last_key):
+                raise RuntimeError(f"{table.name}: لم تتقدم العلامة بعد صفحة كاملة عند {position}")
+            mark, last_key = position
+            yield rows
+        if len(rows) < batch_size:
+            return
+
+
+def sync_table(cursor, store, table, batch_size=5000, settle_seconds=5):
+    """
+    يجلب صفوف جدول واحد الأحدث من علامته ويطبقها على المخزن المحلي.
+
+    كلفة الدورة تتناسب مع عدد التغييرات: كل صفحة تبدأ من آخر (علامة، مفتاح) محفوظين،
+    وتنتهي الدورة عند أول صفحة غير ممتلئة.
+
+    Returns:
+        dict: {"table", "method", "rows", "batches", "seconds"}
+    """
+    started = time.perf_counter()
+    method, mark_expression = detect_method(cursor, table)
+    store.ensure_table(table)
+
+    state = store.load_state(table.name)
+    if state is not None and state[0] != method:
+        # تغيرت طريقة التتبع (أُضيف عمود rowversion مثلًا): العلامة القديمة غير قابلة للمقارنة
+        print(f"  ⚠️ {table.name}: تغيرت طريقة التتبع إلى {method}، ستُعاد المزامنة كاملة.")
+        store.reset(table)
+        state = None
+    if state is None:
+        mark, last_key = initial_mark(method), 0
+    else:
+        _, mark, last_key, _ = state
+
+    upper_bound = fetch_upper_bound(cursor, method, settle_seconds)
+    key_index = table.columns.index(table.key)
+    parent_index = table.columns.index(table.parent) if table.parent else None
+    # بنود الأب الواحد قد تتوزع على أكثر من صفحة، فتُستبدل مرة واحدة عند أول ظهور له في
+    # الدورة. الأب الذي يشترك في العلامة المستأنف منها ربما طُبق جزء من بنوده في دورة
+    # سابقة، فلا تُحذف بنوده
+    start_mark = mark
+    replaced = set()
+    synced = batches = 0
+    for rows in iter_changes(cursor, table, mark_expression, mark, last_key, upper_bound,
+                             batch_size):
+        mark, last_key = rows[-1][-1], rows[-1][key_index]
+        parents = ()
+        if parent_index is not None:
+            parents = {row[parent_index] for row in rows if row[-1] != start_mark} - replaced
+            replaced |= parents
+        store.apply(table, [row[:-1] for row in rows], method, mark, last_key, parents)
+        synced += len(rows)
+        batches += 1
+
+    return {"table": table.name, "method": method, "rows": synced, "batches": batches,
+            "seconds": time.perf_counter() - started}
+
+
+def sync_all(cursor, store, tables=SYNC_TABLES, batch_size=5000, settle_seconds=5):
+    """يزامن كل الجداول بالترتيب ويطبع ملخصًا لكل منها."""
+    results = []
+    db_error = _pyodbc().Error
+    for table in tables:
+        try:
+            result = sync_table(cursor, store, table, batch_size, settle_seconds)
+        except db_error as ex:
+            print(f"❌ فشلت مزامنة {table.name}: {ex}")
+            continue
+        results.append(result)
+        print(f"  🔄 {result['table']}: {result['rows']} صف متغير "
+              f"({result['batches']} دفعة، {result['method']}، {result['seconds']:.2f}s)")
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="مزامنة تزايدية لجداول المبيعات والمخزون إلى نسخة SQLite محلية.")
+    parser.add_argument("--store", default="replica.sqlite", help="ملف SQLite المحلي (افتراضي: replica.sqlite)")
+    parser.add_argument("--tables", help="الجداول مفصولة بفواصل (افتراضي: كل الجداول)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="عدد الصفوف لكل دفعة (افتراضي: 5000)")
+    parser.add_argument("--settle-seconds", type=int, default=5,
+                        help="تأخير الحد الأعلى عند التتبع بالتاريخ لتجنب المعاملات الجارية (افتراضي: 5)")
+    parser.add_argument("--interval", type=float,
+                        help="تكرار المزامنة كل N ثانية بدل دورة واحدة")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    tables = SYNC_TABLES
+    if args.tables:
+        names = {name.strip() for name in args.tables.split(",")}
+        tables = [table for table in SYNC_TABLES if table.name in names]
+        unknown = names - {table.name for table in tables}
+        if unknown:
+            raise SystemExit(f"❌ جداول غير معروفة: {', '.join(sorted(unknown))}")
+
+    cnxn, cursor = connect_to_database()
+    if not cnxn:
+        raise SystemExit(1)
+    store = LocalStore(args.store)
+    try:
+        while True:
+            print(f"⏳ دورة مزامنة {datetime.datetime.now():%Y-%m-%d %H:%M:%S}")
+            sync_all(cursor, store, tables, args.batch_size, args.settle_seconds)
+            if not args.interval:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n⏹️ تم إيقاف المزامنة.")
+    finally:
+        store.close()
+        cnxn.close()
@@ -0,0 +1,324 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolError(Exception):
+    """الأصل المشترك لأخطاء المجمع."""
+
+
+class PoolTimeoutError(PoolError):
+    """يُرفع عندما لا يتوفر اتصال في المجمع خلال المهلة المحددة."""
+
+
+class PoolClosedError(PoolError):
+    """يُرفع عند طلب اتصال من مجمع مغلق."""
+
+
+class ConnectionReleasedError(PoolError):
+    """يُرفع عند استخدام اتصال مستعار بعد إعادته إلى المجمع."""
+
+
+class PooledConnection:
+    """
+    غلاف حول اتصال حقيقي تم استعارته من المجمع.
+
+    يمرر كل الخصائص إلى الاتصال الأصلي، ويتتبع المؤشرات التي فُتحت خلال الاستعارة
+    لإغلاقها عند الإرجاع. استدعاء close() يعيد الاتصال إلى المجمع بدل إغلاقه فعليًا،
+    لذلك تعمل الشيفرة الحالية التي تستدعي cnxn.close() دون تعديل.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._cursors = []
+        self._released = False
+
+    def _check(self):
+        if self._released:
+            raise ConnectionReleasedError("الاتصال أُعيد إلى المجمع ولا يمكن استخدامه")
+
+    def cursor(self):
+        self._check()
+        cursor = self._raw.cursor()
+        self._cursors.append(cursor)
+        return cursor
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self)
+
+    def __getattr__(self, name):
+        # الاتصال الخام قد يكون مستعارًا الآن لخيط آخر، فلا يُمرر إليه شيء بعد الإرجاع
+        self._check()
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    مجمع اتصالات آمن للاستخدام من عدة خيوط (threads).
+
+    لا يعتمد على pyodbc مباشرة: يكفي تمرير دالة connect تعيد اتصالًا متوافقًا مع
+    DB-API، مثل lambda: pyodbc.connect(CONNECTION_STRING) أو sqlite3.connect،
+    مما يسمح بقياس أداء منطق المجمع دون SQL Server.
+
+    Args:
+        connect (callable): دالة بلا معاملات تنشئ اتصالًا جديدًا.
+        min_size (int): عدد الاتصالات التي تُفتح مسبقًا ولا تُزال بسبب الخمول.
+        max_size (int): الحد الأقصى لعدد الاتصالات المفتوحة في آن واحد.
+        idle_timeout (float): ثوانٍ يُغلق بعدها الاتصال الخامل الزائد عن min_size.
+        acquire_timeout (float): أقصى مدة انتظار لاتصال متاح قبل رفع PoolTimeoutError.
+        probe_query (str): استعلام خفيف للتحقق من أن الاتصال ما زال حيًا (None للتعطيل).
+        probe_after (float): لا يُفحص الاتصال إذا أُعيد إلى المجمع قبل أقل من هذه المدة.
+        reap_interval (float): كل كم ثانية يغلق خيط خلفي الاتصالات الخاملة المنتهية
+            (افتراضي: نصف idle_timeout بحد أقصى 60؛ 0 للتعطيل والاكتفاء بالإزالة عند
+            الاستعارة والإرجاع).
+    """
+
+    def __init__(self, connect, min_size=1, max_size=5, idle_timeout=300.0,
+                 acquire_timeout=30.0, probe_query="SELECT 1", probe_after=0.0,
+                 reap_interval=None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("يجب أن يكون 0 <= min_size <= max_size و max_size >= 1")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.probe_query = probe_query
+        self.probe_after = probe_after
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # عناصر (raw, وقت الإرجاع)؛ الأحدث في اليمين
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "hits": 0,
+            "misses": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "max_wait": 0.0,
+            "probe_failures": 0,
+            "evictions": 0,
+            "discarded": 0,
+        }
+
+        for _ in range(min_size):
+            raw = self._connect()
+            with self._lock:
+                self._size += 1
+                self._idle.append((raw, time.monotonic()))
+
+        if reap_interval is None:
+            reap_interval = min(idle_timeout / 2, 60.0) if idle_timeout else 0
+        self._reaper_stop = threading.Event()
+        self._reaper = None
+        if reap_interval:
+            self._reaper = threading.Thread(target=self._reap, args=(reap_interval,),
+                                            name="db-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def acquire(self, timeout=None):
+        """
+        يستعير اتصالًا من المجمع، ويعيد PooledConnection.
+
+        يُفضَّل الاتصال الخامل الأحدث استخدامًا، ويُفتح اتصال جديد فقط عند عدم وجود
+        اتصال خامل وعدم بلوغ max_size، وإلا ينتظر حتى يُعاد اتصال.
+        """
+        if timeout is None:
+            timeout = self.acquire_timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            raw = None
+            returned_at = None
+            evicted = []
+            with self._lock:
+                while True:
+                    if self._closed:
+                        outcome = "closed"
+                        break
+                    evicted.extend(self._evict_idle_locked())
+                    if self._idle:
+                        raw, returned_at = self._idle.pop()
+                        outcome = "idle"
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        outcome = "new"
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._record_wait_locked(started, waited)
+                        outcome = "timeout"
+                        break
+                    waited = True
+                    self._lock.wait(remaining)
+            # إغلاق الاتصالات الفعلية قد يستغرق رحلة شبكة، فيجري خارج القفل
+            self._close_all(evicted)
+            if outcome == "closed":
+                raise PoolClosedError("المجمع مغلق")
+            if outcome == "timeout":
+                raise PoolTimeoutError(
+                    f"لم يتوفر اتصال خلال {timeout} ثانية (max_size={self.max_size})")
+
+            if raw is None:
+                try:
+                    raw = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+                hit = False
+            else:
+                if not self._is_alive(raw, returned_at):
+                    self._discard(raw, probe_failed=True)
+                    continue
+                hit = True
+
+            with self._lock:
+                self._stats["checkouts"] += 1
+                self._stats["hits" if hit else "misses"] += 1
+                self._record_wait_locked(started, waited)
+            return PooledConnection(self, raw)
+
+    def release(self, conn):
+        """يعيد اتصالًا مستعارًا إلى المجمع بعد إغلاق مؤشراته والتراجع عن أي معاملة معلقة."""
+        raw = conn._raw
+        for cursor in conn._cursors:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        conn._cursors.clear()
+
+        try:
+            raw.rollback()
+        except Exception:
+            self._discard(raw)
+            return
+
+        with self._lock:
+            closed = self._closed
+            if closed:
+                self._size -= 1
+            else:
+                self._idle.append((raw, time.monotonic()))
+                evicted = self._evict_idle_locked()
+            self._lock.notify()
+        self._close_all([raw] if closed else evicted)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """مدير سياق: with pool.connection() as cnxn: ..."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def evict_idle(self):
+        """يغلق الاتصالات الخاملة التي تجاوزت idle_timeout؛ يعيد عددها."""
+        with self._lock:
+            evicted = self._evict_idle_locked()
+        self._close_all(evicted)
+        return len(evicted)
+
+    def stats(self):
+        """يعيد نسخة من العدادات مع نسبة الإصابة ومتوسط زمن الانتظار."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+        checkouts = stats["checkouts"]
+        stats["hit_rate"] = stats["hits"] / checkouts if checkouts else 0.0
+        stats["avg_wait"] = stats["wait_time"] / checkouts if checkouts else 0.0
+        return stats
+
+    def close(self):
+        """يغلق كل الاتصالات الخاملة؛ الاتصالات المستعارة تُغلق عند إرجاعها."""
+        with self._lock:
+            self._closed = True
+            idle = [raw for raw, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._lock.notify_all()
+        self._reaper_stop.set()
+        self._close_all(idle)
+
+    def _is_alive(self, raw, returned_at):
+        if not self.probe_query:
+            return True
+        if self.probe_after and time.monotonic() - returned_at < self.probe_after:
+            return True
+        try:
+            cursor = raw.cursor()
+            try:
+                cursor.execute(self.probe_query)
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, raw, probe_failed=False):
+        self._close_raw(raw)
+        with self._lock:
+            self._size -= 1
+            self._stats["discarded"] += 1
+            if probe_failed:
+                self._stats["probe_failures"] += 1
+            self._lock.notify()
+
+    def _evict_idle_locked(self):
+        # الأقدم في اليسار؛ نزيل ما تجاوز idle_timeout مع إبقاء min_size اتصالًا على الأقل،
+        # ونعيد الاتصالات المزالة ليغلقها المستدعي بعد تحرير القفل
+        evicted = []
+        if not self.idle_timeout:
+            return evicted
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size:
+            raw, returned_at = self._idle[0]
+            if now - returned_at < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._stats["evictions"] += 1
+            evicted.append(raw)
+        return evicted
+
+    def _reap(self, interval):
+        while not self._reaper_stop.wait(interval):
+            self.evict_idle()
+
+    def _record_wait_locked(self, started, waited):
+        if waited:
+            elapsed = time.monotonic() - started
+            self._stats["waits"] += 1
+            self._stats["wait_time"] += elapsed
+            self._stats["max_wait"] = max(self._stats["max_wait"], elapsed)
+
+    @classmethod
+    def _close_all(cls, raws):
+        for raw in raws:
+            cls._close_raw(raw)
+
+    @staticmethod
+    def _close_raw(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
@@ -0,0 +1,302 @@
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from db_pool import PoolError
+from result_writers import WRITER_FORMATS, create_writer
+from test import FETCH_BATCH_SIZE, _pyodbc, create_connection_pool, execute_and_print
+
+# امتداد الملف لكل صيغة مخرجات
+FORMAT_EXTENSIONS = {"text": "txt", "aligned": "txt", "csv": "csv", "jsonl": "jsonl", "columnar": "awcol"}
+
+CHECKPOINT_VERSION = 2
+
+# حدود الفترة الكاملة؛ MIN/MAX على عمود مفهرس (IX_Invoices_InvoiceDate) يُقرأ من طرفي الفهرس
+DATE_BOUNDS_QUERY = "SELECT MIN(InvoiceDate), MAX(InvoiceDate) FROM sales.Invoices;"
+
+# شرط النطاق InvoiceDate >= ? AND InvoiceDate < ? قابل للبحث في IX_Invoices_InvoiceDate،
+# والنطاقات نصف المفتوحة لا تتداخل فلا يتكرر أي صف بين قسمين
+INVOICES_PARTITION_QUERY = """
+SELECT
+    i.InvoiceId, i.InvoiceNumber, i.InvoiceDate, i.CustomerId, i.PaymentMethod,
+    i.SubTotal, i.DiscountPercent, i.DiscountAmount, i.TaxPercent, i.TaxAmount,
+    i.TotalAmount, i.AmountPaid, i.AmountDue, i.Status, i.Notes, i.CompanyId,
+    i.CreatedAt, i.UpdatedAt, i.CreatedBy
+FROM
+    sales.Invoices AS i
+WHERE
+    i.InvoiceDate >= ? AND i.InvoiceDate < ?
+ORDER BY
+    i.InvoiceDate, i.InvoiceId;
+"""
+
+INVOICE_ITEMS_PARTITION_QUERY = """
+SELECT
+    ii.InvoiceItemId, ii.InvoiceId, ii.ProductId, ii.Quantity, ii.UnitPrice,
+    ii.DiscountPercent, ii.DiscountAmount, ii.TaxPercent, ii.TaxAmount, ii.LineTotal
+FROM
+    sales.Invoices AS i
+INNER JOIN
+    sales.InvoiceItems AS ii ON ii.InvoiceId = i.InvoiceId
+WHERE
+    i.InvoiceDate >= ? AND i.InvoiceDate < ?
+ORDER BY
+    ii.InvoiceId, ii.InvoiceItemId;
+"""
+
+EXPORT_TABLES = (
+    ("invoices", "sales.Invoices", INVOICES_PARTITION_QUERY),
+    ("invoice_items", "sales.InvoiceItems", INVOICE_ITEMS_PARTITION_QUERY),
+)
+
+
+def make_partitions(start, end, partition_days):
+    """
+    يقسم الفترة [start, end] إلى نطاقات نصف مفتوحة [lo, hi) بطول partition_days يومًا.
+    """
+    partitions = []
+    lo = start
+    last = end + datetime.timedelta(days=1)
+    step = datetime.timedelta(days=partition_days)
+    while lo < last:
+        hi = min(lo + step, last)
+        partitions.append((lo, hi))
+        lo = hi
+    return partitions
+
+
+def partition_key(lo, hi):
+    return f"{lo:%Y-%m-%d}_{hi:%Y-%m-%d}"
+
+
+class Checkpoint:
+    """
+    ملف تتبع الأقسام المكتملة. يُحفظ بشكل ذري بعد كل قسم حتى يُستأنف التصدير المقطوع
+    من حيث توقف. معاملات التصدير تُخزن معه، ولا يُستأنف تصدير بمعاملات مختلفة.
+
+    الفترة المحسوبة (start, end) تُحفظ أيضًا: إذا لم تُحدد عند الاستئناف تُستخدم الفترة
+    المحفوظة بدل MIN/MAX الحالية، فلا تمنع فاتورة جديدة استئناف تصدير قديم.
+    """
+
+    def __init__(self, path, params):
+        self.path = path
+        self.params = params
+        self.start = None
+        self.end = None
+        self.completed = {}
+        self._lock = threading.Lock()
+
+    def load(self, start=None, end=None):
+        """
+        يحمل الأقسام المكتملة والفترة المحفوظة، ويعيد False إن كان الملف لتصدير بمعاملات
+        أخرى. start و end تُقارن بالفترة المحفوظة فقط إذا حُددت صراحة.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return True
+        params = dict(data.get("params") or {})
+        if data.get("version") == 1:
+            # الإصدار الأول خزن الفترة ضمن المعاملات
+            data["range"] = {"start": params.pop("start", None), "end": params.pop("end", None)}
+        elif data.get("version") != CHECKPOINT_VERSION:
+            return False
+        saved = data.get("range") or {}
+        saved_start = _parse_date(saved["start"]) if saved.get("start") else None
+        saved_end = _parse_date(saved["end"]) if saved.get("end") else None
+        if params != self.params:
+            return False
+        if (start is not None and start != saved_start) or (end is not None and end != saved_end):
+            return False
+        self.start, self.end = saved_start, saved_end
+        self.completed = data.get("completed", {})
+        return True
+
+    def mark_done(self, key, info):
+        with self._lock:
+            self.completed[key] = info
+            self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CHECKPOINT_VERSION, "params": self.params,
+                       "range": {"start": self.start.isoformat(), "end": self.end.isoformat()},
+                       "completed": self.completed}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def export_partition(pool, lo, hi, output_dir, fmt, batch_size):
+    """
+    يصدر قسمًا واحدًا (الفواتير وبنودها) إلى ملفاته الخاصة على اتصال مستقل.
+
+    يُكتب كل ملف باسم مؤقت ثم يُعاد تسميته بعد نجاحه، فلا يبقى ملف ناقص عند الانقطاع.
+
+    Returns:
+        dict: عدد الصفوف لكل جدول والزمن المستغرق.
+    """
+    key = partition_key(lo, hi)
+    started = time.perf_counter()
+    info = {}
+    with pool.connection() as cnxn:
+        cursor = cnxn.cursor()
+        for name, table, query in EXPORT_TABLES:
+            final_path = os.path.join(output_dir, name, f"{key}.{FORMAT_EXTENSIONS[fmt]}")
+            tmp_path = f"{final_path}.part"
+            try:
+                with create_writer(fmt, tmp_path) as writer:
+                    rows = execute_and_print(cursor, f"{table} {key}", query, (lo, hi),
+                                             batch_size=batch_size, writer=writer,
+                                             label=f"export.{name}")
+            except BaseException:
+                # انقطاع أثناء الكتابة (Ctrl-C): لا يبقى ملف .part خلفه
+                os.remove(tmp_path)
+                raise
+            if rows is None:
+                os.remove(tmp_path)
+                raise RuntimeError(f"فشل تصدير {table} للفترة {key}")
+            os.replace(tmp_path, final_path)
+            info[name] = rows
+    info["seconds"] = round(time.perf_counter() - started, 3)
+    return info
+
+
+def export_invoices(start=None, end=None, partition_days=30, workers=4, fmt="csv",
+                    output_dir="exports", checkpoint_path=None, restart=False,
+                    batch_size=FETCH_BATCH_SIZE, pool=None):
+    """
+    يصدر sales.Invoices و sales.InvoiceItems مقسمة حسب InvoiceDate وبالتوازي.
+
+    Args:
+        start (datetime.date): بداية الفترة (افتراضي: أقدم فاتورة).
+        end (datetime.date): نهاية الفترة شاملة (افتراضي: أحدث فاتورة).
+        partition_days (int): طول كل قسم بالأيام.
+        workers (int): عدد الأقسام التي تُصدر في الوقت نفسه (اتصال لكل منها).
+        fmt (str): صيغة الملفات (csv, jsonl, columnar, text).
+        output_dir (str): مجلد المخرجات.
+        checkpoint_path (str): ملف نقطة الاستئناف (افتراضي: output_dir/checkpoint.json).
+        restart (bool): تجاهل نقطة الاستئناف والبدء من جديد.
+        batch_size (int): حجم دفعة fetchmany.
+        pool (ConnectionPool): مجمع اتصالات؛ يُنشأ مجمع مؤقت إن لم يُمرر.
+
+    Returns:
+        bool: True إذا اكتملت كل الأقسام.
+    """
+    own_pool = pool is None
+    if own_pool:
+        pool = create_connection_pool(min_size=0, max_size=workers)
+    try:
+        checkpoint_path = checkpoint_path or os.path.join(output_dir, "checkpoint.json")
+        checkpoint = Checkpoint(checkpoint_path, {"partition_days": partition_days, "format": fmt})
+        if not restart:
+            if not checkpoint.load(start, end):
+                print(f"❌ نقطة الاستئناف {checkpoint_path} تخص تصديرًا بمعاملات مختلفة. "
+                      "استخدم --restart للبدء من جديد.")
+                return False
+            start = start or checkpoint.start
+            end = end or checkpoint.end
+
+        if start is None or end is None:
+            with pool.connection() as cnxn:
+                cursor = cnxn.cursor()
+                cursor.execute(DATE_BOUNDS_QUERY)
+                first, last = cursor.fetchone()
+            if first is None:
+                print("  لا توجد فواتير للتصدير.")
+                return True
+            start = start or first.date()
+            end = end or last.date()
+        checkpoint.start, checkpoint.end = start, end
+
+        for name, _, _ in EXPORT_TABLES:
+            os.makedirs(os.path.join(output_dir, name), exist_ok=True)
+
+        partitions = make_partitions(start, end, partition_days)
+        pending = [(lo, hi) for lo, hi in partitions
+                   if partition_key(lo, hi) not in checkpoint.completed]
+        print(f"📦 {len(partitions)} قسم ({len(partitions) - len(pending)} مكتمل مسبقًا)، "
+              f"{workers} عامل، الصيغة: {fmt}")
+
+        started = time.perf_counter()
+        failures = 0
+        exported = {name: 0 for name, _, _ in EXPORT_TABLES}
+        partition_errors = (_pyodbc().Error, PoolError, RuntimeError, OSError)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(export_partition, pool, lo, hi, output_dir, fmt, batch_size):
+                       partition_key(lo, hi) for lo, hi in pending}
+            try:
+                for future in as_completed(futures):
+                    key = futures[future]
+                    try:
+                        info = future.result()
+                    except partition_errors as ex:
+                        failures += 1
+                        print(f"❌ فشل القسم {key}: {ex}")
+                        continue
+                    checkpoint.mark_done(key, info)
+                    for name in exported:
+                        exported[name] += info[name]
+                    print(f"  ✅ {key}: {info['invoices']} فاتورة، {info['invoice_items']} بند "
+                          f"({info['seconds']:.2f}s)")
+            except BaseException:
+                # Ctrl-C: تُلغى الأقسام التي لم تبدأ، وتُنتظر الجارية (لا يمكن إيقاف خيط)
+                # ثم يُسجل كل قسم اكتمل حتى يتخطاه الاستئناف
+                executor.shutdown(wait=True, cancel_futures=True)
+                for future, key in futures.items():
+                    if (key not in checkpoint.completed and future.done() and not future.cancelled()
+                            and future.exception() is None):
+                        checkpoint.completed[key] = future.result()
+                checkpoint.save()
+                print(f"\n⚠️ أُوقف التصدير بعد {len(checkpoint.completed)} قسم مكتمل؛ "
+                      "أعد تشغيل الأمر نفسه للاستئناف.")
+                raise
+
+        elapsed = time.perf_counter() - started
+        total_rows = sum(exported.values())
+        rate = total_rows / elapsed if elapsed else 0.0
+        print(f"\n📊 تم تصدير {exported['invoices']} فاتورة و {exported['invoice_items']} بند "
+              f"خلال {elapsed:.2f}s ({rate:,.0f} صف/ثانية)")
+        if failures:
+            print(f"⚠️ فشل {failures} قسم؛ أعد تشغيل الأمر نفسه لاستئناف الأقسام المتبقية.")
+        return failures == 0
+    finally:
+        if own_pool:
+            pool.close()
+
+
+def _parse_date(value):
+    return datetime.date.fromisoformat(value)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="تصدير فواتير المبيعات وبنودها مقسمة حسب تاريخ الفاتورة وبالتوازي.")
+    parser.add_argument("--start", type=_parse_date, help="بداية الفترة YYYY-MM-DD (افتراضي: أقدم فاتورة)")
+    parser.add_argument("--end", type=_parse_date, help="نهاية الفترة YYYY-MM-DD (افتراضي: أحدث فاتورة)")
+    parser.add_argument("--partition-days", type=int, default=30, help="طول كل قسم بالأيام (افتراضي: 30)")
+    parser.add_argument("--workers", type=int, default=4, help="عدد الاتصالات المتوازية (افتراضي: 4)")
+    parser.add_argument("--format", choices=[f for f in WRITER_FORMATS if f != "aligned"], default="csv",
+                        help="صيغة ملفات التصدير (افتراضي: csv)")
+    parser.add_argument("--output-dir", default="exports", help="مجلد المخرجات (افتراضي: exports)")
+    parser.add_argument("--checkpoint", help="ملف نقطة الاستئناف (افتراضي: OUTPUT_DIR/checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="تجاهل نقطة الاستئناف والبدء من جديد")
+    parser.add_argument("--batch-size", type=int, default=FETCH_BATCH_SIZE, help="حجم دفعة fetchmany")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    ok = export_invoices(start=args.start, end=args.end, partition_days=args.partition_days,
+                         workers=args.workers, fmt=args.format, output_dir=args.output_dir,
+                         checkpoint_path=args.checkpoint, restart=args.restart,
+                         batch_size=args.batch_size)
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,178 @@
+# مشغل وهمي بواجهة pyodbc لقياس أداء أدوات قاعدة البيانات دون SQL Server.
+#
+# لا ينفذ SQL فعليًا: كل استعلام يُطابق مع معالج مسجل في الكتالوج (FakeCatalog) يعيد
+# أسماء الأعمدة ومولدًا للصفوف، فتُنتج الصفوف عند الطلب دون تحميلها في الذاكرة. يمكن
+# محاكاة زمن المصافحة عند الاتصال وزمن الذهاب والإياب لكل استدعاء.
+#
+# الاستخدام (قبل استيراد test.py):
+#     import sys, fake_pyodbc
+#     sys.modules["pyodbc"] = fake_pyodbc
+#     fake_pyodbc.install(catalog)
+import itertools
+import threading
+import time
+
+
+class Error(Exception):
+    """يطابق pyodbc.Error: args[0] هو SQLSTATE."""
+
+
+class DatabaseError(Error):
+    pass
+
+
+class OperationalError(DatabaseError):
+    pass
+
+
+class ProgrammingError(DatabaseError):
+    pass
+
+
+class Latency:
+    """أزمنة محاكاة بالثواني: المصافحة، تنفيذ الاستعلام، كل دفعة fetch."""
+
+    def __init__(self, connect=0.0, execute=0.0, fetch=0.0):
+        self.connect = connect
+        self.execute = execute
+        self.fetch = fetch
+
+
+class FakeCatalog:
+    """
+    سجل معالجات الاستعلامات. كل معالج هو (needle, handler): أول معالج يظهر needle في
+    نص استعلامه يُستخدم، و handler(query, params) يعيد (أسماء الأعمدة، iterable للصفوف).
+    """
+
+    def __init__(self, latency=None):
+        self.latency = latency or Latency()
+        self._handlers = [("SELECT 1", lambda query, params: (["Probe"], [(1,)]))]
+        self._lock = threading.Lock()
+        self.counters = {"connects": 0, "executes": 0, "fetches": 0, "rows": 0, "writes": 0}
+
+    def register(self, needle, handler):
+        """يسجل معالجًا؛ المعالجات المسجلة لاحقًا تُفحص أولًا."""
+        self._handlers.insert(0, (needle, handler))
+
+    def resolve(self, query, params):
+        for needle, handler in self._handlers:
+            if needle in query:
+                return handler(query, params)
+        raise ProgrammingError("42000", f"[fake_pyodbc] لا يوجد معالج للاستعلام: {query.strip()[:80]}")
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+
+_catalog = FakeCatalog()
+
+
+def install(catalog):
+    """يحدد الكتالوج المستخدم لكل الاتصالات الجديدة."""
+    global _catalog
+    _catalog = catalog
+
+
+class Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self.fast_executemany = False
+        self._rows = iter(())
+        self._closed = False
+
+    def execute(self, query, *params):
+        if self._closed:
+            raise ProgrammingError("HY010", "Attempt to use a closed cursor.")
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = tuple(params[0])
+        catalog = self.connection.catalog
+        catalog.count("executes")
+        if catalog.latency.execute:
+            time.sleep(catalog.latency.execute)
+        result = catalog.resolve(query, params)
+        if result is None:
+            # أوامر لا تعيد صفوفًا (INSERT/UPDATE/MERGE)
+            self.description = None
+            self._rows = iter(())
+            return self
+        columns, rows = result
+        self.description = [(name, None, None, None, None, None, True) for name in columns]
+        self._rows = iter(rows)
+        return self
+
+    def executemany(self, query, seq_of_params):
+        catalog = self.connection.catalog
+        batch = list(seq_of_params)
+        # مع fast_executemany تُرسل الدفعة كاملة في رحلة واحدة، وإلا رحلة لكل صف
+        trips = 1 if self.fast_executemany else len(batch)
+        if catalog.latency.execute:
+            time.sleep(catalog.latency.execute * trips)
+        catalog.count("executes", trips)
+        catalog.count("writes", len(batch))
+        catalog.resolve(query, batch)
+        self.description = None
+        self.rowcount = len(batch)
+
+    def fetchmany(self, size=1):
+        catalog = self.connection.catalog
+        if catalog.latency.fetch:
+            time.sleep(catalog.latency.fetch)
+        rows = list(itertools.islice(self._rows, size))
+        catalog.count("fetches")
+        catalog.count("rows", len(rows))
+        return rows
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchall(self):
+        rows = list(self._rows)
+        self.connection.catalog.count("rows", len(rows))
+        return rows
+
+    def cancel(self):
+        self._rows = iter(())
+
+    def close(self):
+        self._closed = True
+        self._rows = iter(())
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+
+class Connection:
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.autocommit = False
+        self.closed = False
+
+    def cursor(self):
+        if self.closed:
+            raise ProgrammingError("08003", "Attempt to use a closed connection.")
+        return Cursor(self)
+
+    def execute(self, query, *params):
+        return self.cursor().execute(query, *params)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        if self.closed:
+            raise ProgrammingError("08003", "Attempt to use a closed connection.")
+
+    def close(self):
+        self.closed = True
+
+
+def connect(connection_string="", **kwargs):
+    catalog = _catalog
+    if catalog.latency.connect:
+        time.sleep(catalog.latency.connect)
+    catalog.count("connects")
+    return Connection(catalog)
@@ -0,0 +1,802 @@
+import argparse
+import contextlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# عدد المجلدات التي تُقرأ مسبقًا لكل خيط؛ يحد الذاكرة المحجوزة للقوائم المنتظرة
+PREFETCH_PER_WORKER = 4
+
+# عند عدم تحديد عدد الخيوط تبدأ القراءة متتابعة، ولا تُستخدم الخيوط إلا إذا تجاوز متوسط
+# قراءة أول ADAPTIVE_SAMPLE مجلدات SLOW_SCAN_SECONDS. على قرص محلي دافئ تستغرق قراءة
+# مجلد من 100 ملف نحو 0.05ms فلا تكسب الخيوط شيئًا (100 ألف ملف: 0.17s متتابعًا
+# و0.12-0.16s بالخيوط)؛ مع زمن 1ms لكل مجلد (قرص بارد أو مجلد شبكة) تنخفض من 1.16s
+# متتابعًا إلى 0.27s بثمانية خيوط (bench_folder_tree في benchmark.py)
+ADAPTIVE_SAMPLE = 8
+SLOW_SCAN_SECONDS = 0.0005
+
+# صيغة قاعدة ذاكرة المجلدات؛ تُرفع عند تغيير بنيتها
+CACHE_VERSION = 2
+
+# دقة mtime في بعض أنظمة الملفات ثانيتان (FAT)؛ المجلد الذي عُدل قرب لحظة القراءة
+# قد يتغير مرة أخرى دون أن يتغير mtime فلا يُوثق بقائمته المحفوظة
+RACY_WINDOW_NS = 2_000_000_000
+
+# حجم كتلة النسخ عند تضمين أجزاء الملف السابق
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# أنماط الاستثناء الافتراضية بصيغة .gitignore (النمط المنتهي بـ / يطابق المجلدات فقط)
+DEFAULT_IGNORE_PATTERNS = (
+    "__pycache__/",       # مجلدات بايثون المؤقتة
+    ".git/",              # مجلدات Git للتحكم بالإصدار
+    "venv/",              # بيئات بايثون الافتراضية
+    "node_modules/",      # مجلد مكتبات JavaScript/TypeScript (الضخم!)
+    ".vscode/",           # إعدادات VS Code
+    ".idea/",             # إعدادات PyCharm/IntelliJ IDEA
+    "build/",             # مجلدات البناء
+    "dist/",              # مجلدات التوزيع
+    "__MACOSX/",          # مجلدات مؤقتة من macOS عند فك الضغط
+    ".gitignore",         # ملفات Git لتجاهل الملفات
+    ".env",               # ملفات المتغيرات البيئية
+    "pyproject.toml",     # إعدادات مشاريع بايثون الحديثة
+    "package-lock.json",  # ملفات قفل التبعيات في Node.js
+    "yarn.lock",          # ملفات قفل التبعيات في Yarn
+    "README.md",          # ملفات الـ Readme
+    "LICENSE",            # ملفات الترخيص
+)
+
+_GLOB_SPECIAL = re.compile(r"[*?\[\\]")
+
+_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS _state (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, dirs TEXT NOT NULL, files TEXT NOT NULL,
+    chunk_offset INTEGER, chunk_length INTEGER);
+"""
+
+
+def default_workers():
+    # عدد الخيوط عند التحول إليها: قراءة المجلدات البطيئة تنتظر القرص أو الشبكة، وscandir
+    # يحرر GIL أثناء الاستدعاء
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def _glob_to_regex(pattern):
+    """يحول نمط glob بصيغة .gitignore إلى تعبير نمطي؛ * و? لا يتجاوزان / بخلاف **."""
+    parts = []
+    index = 0
+    length = len(pattern)
+    while index < length:
+        char = pattern[index]
+        if char == "*":
+            if pattern.startswith("**", index) and (index == 0 or pattern[index - 1] == "/"):
+                if index + 2 == length:
+                    parts.append(".*")
+                    index += 2
+                    continue
+                if pattern[index + 2] == "/":
+                    parts.append("(?:.*/)?")
+                    index += 3
+                    continue
+            while index < length and pattern[index] == "*":
+                index += 1
+            parts.append("[^/]*")
+            continue
+        if char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", index + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[index + 1:end]
+                if body[0] in "!^":
+                    body = "^" + body[1:]
+                parts.append("[" + body.replace("\\", "\\\\") + "]")
+                index = end
+        elif char == "\\" and index + 1 < length:
+            index += 1
+            parts.append(re.escape(pattern[index]))
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    return "".join(parts)
+
+
+class IgnoreMatcher:
+    """
+    مطابق استثناءات بصيغة .gitignore يُترجم مرة واحدة: الأسماء الحرفية في قاموس، وأنماط
+    glob على الاسم في تعبير نمطي واحد، والأنماط المثبتة بمسار (تحتوي /) في تعبير آخر
+    على المسار النسبي. آخر قاعدة مطابقة هي التي تقرر كما في git، و! تعيد تضمين ما
+    استثنته قاعدة سابقة. المجلد المستثنى لا يُنزل إليه أصلًا.
+
+    Args:
+        patterns (Iterable[str]): أسطر بصيغة .gitignore.
+    """
+
+    def __init__(self, patterns=()):
+        self.patterns = []
+        self._rules = []
+        self._compiled = None
+        for pattern in patterns:
+            self.add(pattern)
+
+    @classmethod
+    def from_names(cls, dirs=(), files=()):
+        """يبني مطابقًا من قوائم أسماء حرفية للمجلدات وللملفات (الصيغة القديمة)."""
+        matcher = cls()
+        for name in dirs:
+            matcher.add(_GLOB_SPECIAL.sub(r"\\\g<0>", name) + "/")
+        for name in files:
+            matcher.add(_GLOB_SPECIAL.sub(r"\\\g<0>", name))
+        return matcher
+
+    def add(self, pattern):
+        """يضيف سطرًا واحدًا؛ الأسطر الفارغة والتعليقات (#) تُهمل."""
+        line = pattern.rstrip("\r\n")
+        if line.endswith("\\ "):
+            line = line.rstrip(" ") + " "
+        else:
+            line = line.rstrip(" ")
+        if not line or line.startswith("#"):
+            return
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith(("\\!", "\\#")):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return
+        # الشرطة المائلة في البداية أو الوسط تثبت النمط بالنسبة للجذر
+        anchored = "/" in line
+        line = line.lstrip("/")
+        self.patterns.append(pattern.rstrip("\r\n"))
+        self._rules.append((negated, dir_only, anchored, line))
+        self._compiled = None
+
+    def add_file(self, path):
+        """يضيف أنماط ملف بصيغة .gitignore؛ الملف غير الموجود يُهمل."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self.add(line)
+        except FileNotFoundError:
+            pass
+
+    def _compile(self):
+        compiled = {}
+        for is_dir in (False, True):
+            literals = {}
+            globs = []
+            paths = []
+            for index, (negated, dir_only, anchored, body) in enumerate(self._rules):
+                if dir_only and not is_dir:
+                    continue
+                if anchored:
+                    paths.append(f"(?P<r{index}>{_glob_to_regex(body)})")
+                elif _GLOB_SPECIAL.search(body):
+                    globs.append(f"(?P<r{index}>{_glob_to_regex(body)})")
+                else:
+                    literals[body] = (index, negated)
+            # البدائل بترتيب تنازلي فأول بديل يطابق هو آخر قاعدة في الملف
+            compiled[is_dir] = (
+                literals,
+                frozenset(name for name, (_, negated) in literals.items() if not negated),
+                re.compile("|".join(reversed(globs))) if globs else None,
+                re.compile("|".join(reversed(paths))) if paths else None,
+            )
+        self._compiled = compiled
+        return compiled
+
+    def ignored(self, name, relative, is_dir):
+        """
+        Args:
+            name (str): اسم المدخل.
+            relative (str): مساره النسبي من الجذر بفواصل /.
+            is_dir (bool): هل هو مجلد.
+        """
+        literals, _, glob_re, path_re = (self._compiled or self._compile())[is_dir]
+        best = literals.get(name)
+        for regex, subject in ((glob_re, name), (path_re, relative)):
+            if regex is None:
+                continue
+            match = regex.fullmatch(subject)
+            if match is not None:
+                index = int(match.lastgroup[1:])
+                if best is None or index > best[0]:
+                    best = (index, self._rules[index][0])
+        return best is not None and not best[1]
+
+    def filter(self, directory, names, is_dir):
+        """
+        يعيد الأسماء غير المستثناة من مدخلات مجلد واحد (القائمة نفسها إذا لم يُستثن شيء).
+
+        Args:
+            directory (str): المسار النسبي للمجلد الحاوي بفواصل / ("" للجذر).
+        """
+        _, ignored_names, glob_re, path_re = (self._compiled or self._compile())[is_dir]
+        if glob_re is None and path_re is None:
+            # أسماء حرفية فقط: يكفي تقاطع مع مجموعة
+            if ignored_names.isdisjoint(names):
+                return names
+            return [name for name in names if name not in ignored_names]
+        prefix = f"{directory}/" if directory else ""
+        return [name for name in names if not self.ignored(name, prefix + name, is_dir)]
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def scan_directory(path, sizes=False):
+    """
+    يقرأ محتوى مجلد واحد بـ os.scandir مستفيدًا من نوع المدخل (d_type) الذي يعيده
+    النظام مع الاسم، فلا يُستدعى stat لكل ملف.
+
+    Args:
+        path (str): مسار المجلد.
+        sizes (bool): أعد أحجام الملفات أيضًا؛ يتطلب stat لكل ملف على POSIX (على Windows
+            يأتي الحجم مع قراءة المجلد).
+
+    Returns:
+        tuple: (أسماء المجلدات الفرعية، أسماء الملفات، أحجامها أو None) مرتبة أبجديًا، أو
+        None إذا تعذرت قراءة المجلد. الروابط الرمزية إلى مجلدات لا تُتبع ولا تُدرج، كما في
+        os.walk.
+    """
+    dirs = []
+    files = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    if sizes:
+                        try:
+                            size = entry.stat(follow_symlinks=False).st_size
+                        except OSError:
+                            size = 0
+                        files.append((entry.name, size))
+                    else:
+                        files.append(entry.name)
+                elif not entry.is_symlink():
+                    dirs.append(entry.name)
+    except OSError:
+        return None
+    dirs.sort()
+    files.sort()
+    if sizes:
+        return dirs, [name for name, _ in files], [size for _, size in files]
+    return dirs, files, None
+
+
+def own_files(startpath, paths):
+    """
+    يحول مسارات ملفات الأداة نفسها (ملف النتائج ومؤقته وذاكرة المجلدات) إلى
+    {المسار النسبي للمجلد بفواصل /: أسماء الملفات} لاستبعادها من الشجرة؛ المسارات
+    خارج الجذر تُهمل.
+    """
+    root = os.path.abspath(startpath)
+    excluded = {}
+    for path in paths:
+        relative = os.path.relpath(os.path.abspath(path), root)
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep) or os.path.isabs(relative):
+            continue
+        directory, name = os.path.split(relative)
+        excluded.setdefault(directory.replace(os.sep, "/"), set()).add(name)
+    return excluded
+
+
+def walk_tree(startpath, ignore=None, workers=None, scan=scan_directory, max_depth=None, exclude=None):
+    """
+    يمر على شجرة المجلدات بترتيب عمقي ثابت (المجلد ثم مجلداته الفرعية أبجديًا)
+    مثل os.walk من الأعلى إلى الأسفل، لكن قراءة المجلدات التالية في الترتيب تجري
+    مسبقًا على مجموعة خيوط. الترتيب الناتج لا يعتمد على عدد الخيوط.
+
+    دون workers تبدأ القراءة متتابعة وتتحول إلى default_workers() خيطًا فقط إذا كانت
+    قراءة المجلدات بطيئة (انظر SLOW_SCAN_SECONDS).
+
+    Args:
+        startpath (str): المجلد الجذر.
+        ignore (IgnoreMatcher): الاستثناءات؛ المجلد المستثنى لا يُقرأ ولا يُنزل إليه.
+        workers (int): عدد الخيوط؛ 1 للقراءة المتتابعة (افتراضي: حسب سرعة القراءة).
+        scan (callable): دالة قراءة المجلد (افتراضي: scan_directory، أو TreeCache.scan).
+        max_depth (int): لا يُنزل إلى ما بعد هذا العمق (الجذر عمقه 0).
+        exclude (dict): ملفات تُحذف من القوائم بغض النظر عن ignore، كما تعيدها own_files.
+
+    Yields:
+        tuple: (level, path, files, sizes) لكل مجلد أمكنت قراءته؛ sizes أحجام files أو
+        None، والقوائم للقراءة فقط.
+    """
+    adaptive = workers is None
+    workers = default_workers() if adaptive else workers
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 and not adaptive else None
+    window = workers * PREFETCH_PER_WORKER
+    scanned = 0
+    scan_seconds = 0.0
+
+    # المكدس مرتب بحيث يكون آخره هو المجلد التالي في المخرجات؛
+    # كل عنصر [level, path, المسار النسبي بفواصل /, future]
+    stack = [[0, startpath, "", None]]
+    try:
+        while stack:
+            level, path, relative, future = stack.pop()
+            if adaptive and executor is None:
+                scan_started = time.perf_counter()
+                listing = scan(path)
+                scanned += 1
+                scan_seconds += time.perf_counter() - scan_started
+                if scanned >= ADAPTIVE_SAMPLE and scan_seconds >= SLOW_SCAN_SECONDS * scanned and workers > 1:
+                    executor = ThreadPoolExecutor(max_workers=workers)
+            elif future is None or future.cancel():
+                # لم يبدأ أي خيط بقراءته بعد؛ قراءته هنا أسرع من انتظار دوره في الطابور
+                listing = scan(path)
+            else:
+                listing = future.result()
+            if listing is None:
+                continue
+            dirs, files, sizes = listing
+            if exclude and relative in exclude:
+                names = exclude[relative]
+                if sizes is not None:
+                    sizes = [size for name, size in zip(files, sizes) if name not in names]
+                files = [name for name in files if name not in names]
+            if ignore is not None:
+                kept = ignore.filter(relative, files, False)
+                if kept is not files and sizes is not None:
+                    keep = set(kept)
+                    sizes = [size for name, size in zip(files, sizes) if name in keep]
+                files = kept
+                dirs = ignore.filter(relative, dirs, True)
+            yield level, path, files, sizes
+
+            if max_depth is not None and level >= max_depth:
+                continue
+            prefix = os.path.join(path, "")
+            relative_prefix = f"{relative}/" if relative else ""
+            for name in reversed(dirs):
+                stack.append([level + 1, prefix + name, relative_prefix + name, None])
+            if executor is not None:
+                # اطلب قراءة المجلدات التالية في الترتيب مسبقًا ضمن نافذة محدودة
+                for node in stack[-1:-window - 1:-1]:
+                    if node[3] is None:
+                        node[3] = executor.submit(scan, node[1])
+    finally:
+        if executor is not None:
+            for node in stack:
+                if node[3] is not None:
+                    node[3].cancel()
+            executor.shutdown(wait=True)
+
+
+class TreeCache:
+    """
+    ذاكرة SQLite دائمة لقوائم المجلدات مفتاحها mtime المجلد: إضافة ملف أو حذفه أو إعادة
+    تسميته تغير mtime المجلد الحاوي، فالمجلد الذي لم يتغير mtime له تُستخدم قائمته
+    المحفوظة ويكفيه استدعاء stat واحد بدل قراءته كاملًا.
+
+    تحفظ الذاكرة أيضًا موضع أسطر ملفات كل مجلد في ملف الهيكل السابق، فتُنسخ أسطر
+    المجلدات التي لم تتغير كما هي بدل إعادة توليدها، ولا يُحفظ عند الانتهاء إلا ما تغير.
+    أحجام الملفات لا تُحفظ: تعديل محتوى ملف لا يغير mtime المجلد.
+
+    Args:
+        path (str): ملف قاعدة الذاكرة.
+        startpath (str): المجلد الجذر؛ تُهمل الذاكرة المحفوظة لجذر آخر.
+    """
+
+    def __init__(self, path, startpath):
+        self.path = path
+        self.root = os.path.abspath(startpath)
+        self.startpath = startpath
+        self._prefix = os.path.join(startpath, "")
+        self.previous = {}
+        self.previous_settings = None
+        self.output_size = None
+        self.loaded = False
+        self.entries = {}
+        self.chunks = {}
+        self.rescanned = 0
+        self._lock = threading.Lock()
+        self._trusted_before = 0
+        self._started_ns = time.time_ns()
+
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_CACHE_SCHEMA)
+        state = dict(self.db.execute("SELECT name, value FROM _state"))
+        if state.get("version") != str(CACHE_VERSION) or state.get("root") != self.root:
+            return
+        self.previous = {
+            relative: (mtime_ns, json.loads(dirs), json.loads(files), offset, length)
+            for relative, mtime_ns, dirs, files, offset, length in self.db.execute(
+                "SELECT path, mtime_ns, dirs, files, chunk_offset, chunk_length FROM directories")
+        }
+        self.previous_settings = json.loads(state["settings"])
+        self.output_size = int(state["output_size"])
+        self._trusted_before = int(state["scanned_at_ns"]) - RACY_WINDOW_NS
+        self.loaded = True
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _relative(self, path):
+        return "" if path == self.startpath else path[len(self._prefix):]
+
+    def scan(self, path):
+        """بديل scan_directory: يعيد القائمة المحفوظة إذا لم يتغير mtime المجلد."""
+        relative = self._relative(path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        entry = self.previous.get(relative)
+        rescanned = entry is None or entry[0] != mtime_ns or mtime_ns >= self._trusted_before
+        if rescanned:
+            # stat قبل القراءة: لو تغير المجلد بينهما يُحفظ mtime أقدم فيُعاد فحصه في المرة القادمة
+            listing = scan_directory(path)
+            if listing is None:
+                return None
+            if entry is not None and listing[:2] == entry[1:3]:
+                # تغير mtime دون تغير القائمة (ملف مؤقت أُنشئ وحُذف مثلًا): يبقى جزؤه صالحًا
+                entry = (mtime_ns,) + entry[1:]
+            else:
+                entry = (mtime_ns, listing[0], listing[1], None, None)
+        with self._lock:
+            self.entries[relative] = entry
+            if rescanned:
+                self.rescanned += 1
+        return entry[1], entry[2], None
+
+    def modified(self):
+        """هل تغيرت أي قائمة مجلد عن التشغيل السابق؟"""
+        if self.entries.keys() != self.previous.keys():
+            return True
+        return any(entry[1] is not self.previous[relative][1] or entry[2] is not self.previous[relative][2]
+                   for relative, entry in self.entries.items())
+
+    def reusable_chunk(self, path):
+        """(offset, length) لأسطر ملفات المجلد في ملف الهيكل السابق إذا لم تتغير قائمته، وإلا None."""
+        relative = self._relative(path)
+        entry = self.entries.get(relative)
+        previous = self.previous.get(relative)
+        if (entry is None or previous is None or entry[3] is None
+                or entry[1] is not previous[1] or entry[2] is not previous[2]):
+            return None
+        return entry[3], entry[4]
+
+    def record_chunk(self, path, offset, length):
+        self.chunks[self._relative(path)] = (offset, length)
+
+    def own_paths(self):
+        """ملف القاعدة وملفات SQLite المرافقة له؛ تُستبعد من الشجرة إذا وقعت داخلها."""
+        return [self.path] + [self.path + suffix for suffix in ("-wal", "-shm", "-journal")]
+
+    def changes(self, ignore=None, exclude=None):
+        """
+        يقارن قوائم هذا التشغيل بالتشغيل السابق متجاهلًا ما يستثنيه ignore وملفات exclude
+        (كما تعيدها own_files).
+
+        Returns:
+            list: أزواج ("+" أو "-", المسار النسبي) مرتبة حسب المسار؛ المجلدات تنتهي بفاصل
+            المسار. قائمة فارغة إذا لم توجد ذاكرة سابقة.
+        """
+        if not self.loaded:
+            return []
+        changes = []
+        for relative in self.previous.keys() | self.entries.keys():
+            old = self.previous.get(relative)
+            new = self.entries.get(relative)
+            if old is not None and new is not None and old[1] is new[1] and old[2] is new[2]:
+                continue
+            prefix = os.path.join(relative, "") if relative else ""
+            directory = relative.replace(os.sep, "/")
+            for position, suffix, is_dir in ((1, os.sep, True), (2, "", False)):
+                old_names = set(old[position]) if old else set()
+                new_names = set(new[position]) if new else set()
+                if not is_dir and exclude and directory in exclude:
+                    old_names -= exclude[directory]
+                    new_names -= exclude[directory]
+                for sign, names in (("+", new_names - old_names), ("-", old_names - new_names)):
+                    if ignore is not None:
+                        names = ignore.filter(directory, list(names), is_dir)
+                    changes.extend((sign, f"{prefix}{name}{suffix}") for name in names)
+        changes.sort(key=lambda change: change[1])
+        return changes
+
+    def save(self, settings, output_size):
+        """
+        يحفظ ما تغير في معاملة واحدة: المجلدات المعاد قراءتها، وحذف المجلدات التي لم تعد
+        موجودة أو صارت مستثناة، ومواضع الأجزاء الجديدة في ملف الهيكل.
+        """
+        upserts = []
+        moved = []
+        for relative, entry in self.entries.items():
+            offset, length = self.chunks.get(relative, entry[3:5])
+            if entry is not self.previous.get(relative):
+                upserts.append((relative, entry[0], json.dumps(entry[1], ensure_ascii=False),
+                                json.dumps(entry[2], ensure_ascii=False), offset, length))
+            elif (offset, length) != entry[3:5]:
+                moved.append((offset, length, relative))
+        state = {"version": str(CACHE_VERSION), "root": self.root, "scanned_at_ns": str(self._started_ns),
+                 "settings": json.dumps(settings, ensure_ascii=False), "output_size": str(output_size)}
+        with self.db:
+            if not self.loaded:
+                self.db.execute("DELETE FROM directories")
+            self.db.executemany("DELETE FROM directories WHERE path = ?",
+                                ((relative,) for relative in self.previous.keys() - self.entries.keys()))
+            self.db.executemany("INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?, ?, ?)", upserts)
+            self.db.executemany("UPDATE directories SET chunk_offset = ?, chunk_length = ? WHERE path = ?",
+                                moved)
+            self.db.executemany("INSERT OR REPLACE INTO _state (name, value) VALUES (?, ?)", state.items())
+
+
+def _copy_range(source, target, start, length):
+    source.seek(start)
+    remaining = length
+    while remaining:
+        block = source.read(min(remaining, COPY_CHUNK_SIZE))
+        if not block:
+            raise OSError("ملف الهيكل السابق أقصر من المتوقع")
+        target.write(block)
+        remaining -= len(block)
+
+
+def _tool_paths(output_file, cache=None):
+    paths = [output_file, f"{output_file}.tmp"]
+    if cache is not None:
+        paths.extend(cache.own_paths())
+    return paths
+
+
+def _subtree_totals(walk):
+    """عدد الملفات ومجموع أحجامها لكل مجلد مع ما تحته، في مرور عكسي واحد على الترتيب العمقي."""
+    totals = [None] * len(walk)
+    pending = []
+    for index in range(len(walk) - 1, -1, -1):
+        level, _, files, sizes = walk[index]
+        count = len(files)
+        size = sum(sizes) if sizes is not None else 0
+        while pending and pending[-1][0] > level:
+            _, child_count, child_size = pending.pop()
+            count += child_count
+            size += child_size
+        totals[index] = (count, size)
+        pending.append((level, count, size))
+    return totals
+
+
+def write_folder_tree(startpath, output_file, indent_char='    ', ignore=None, workers=None, cache=None,
+                      max_depth=None, max_files=None, summary=False, sizes=False):
+    """
+    يكتب هيكل المجلد إلى output_file بالصيغة المعتادة (📁 للمجلدات و📄 للملفات)،
+    عبر ملف مؤقت يُستبدل بالملف النهائي في النهاية.
+
+    مع cache (TreeCache) لا يُعاد قراءة إلا المجلدات التي تغير mtime لها، وتُنسخ أسطر
+    ملفات المجلدات التي لم تتغير من الملف السابق كما هي، ولا يُعاد كتابة الملف إطلاقًا
+    إذا لم يتغير شيء منذ التشغيل السابق بنفس الإعدادات.
+
+    Args:
+        ignore (IgnoreMatcher): الاستثناءات.
+        max_depth (int): لا تُكتب المجلدات الأعمق من هذا المستوى.
+        max_files (int): أقصى عدد من الملفات يُكتب لكل مجلد؛ الباقي سطر ملخص واحد.
+        summary (bool): أضف إلى كل مجلد عدد الملفات تحته (مع المجلدات الأعمق من max_depth).
+        sizes (bool): أضف مجموع الأحجام أيضًا؛ لا يُستخدم مع cache.
+
+    Returns:
+        dict: عدد المجلدات والملفات والزمن المستغرق، وهل كُتب الملف، وعدد المجلدات
+        المعاد قراءتها عند استخدام cache.
+    """
+    if sizes and cache is not None:
+        raise ValueError("أحجام الملفات تتطلب stat لكل ملف ولا يمكن أخذها من ذاكرة المجلدات")
+    summary = summary or sizes
+    started = time.perf_counter()
+    if cache is not None:
+        scan = cache.scan
+    else:
+        scan = (lambda path: scan_directory(path, sizes=True)) if sizes else scan_directory
+    tmp_path = f"{output_file}.tmp"
+    # ملف النتائج ومؤقته وذاكرة المجلدات قد تقع داخل الشجرة نفسها (المجلد الحالي افتراضيًا)،
+    # والقراءة بلا ذاكرة تجري أثناء الكتابة، فلا تُدرج في الهيكل
+    exclude = own_files(startpath, _tool_paths(output_file, cache))
+    # مع الملخص تُقرأ المجلدات الأعمق أيضًا لتدخل في المجاميع، لكنها لا تُكتب
+    walk = walk_tree(startpath, ignore, workers, scan, None if summary else max_depth, exclude)
+    written = True
+    splice = False
+    if cache is not None or summary:
+        # يلزم معرفة ما تغير أو مجاميع ما تحت كل مجلد قبل الكتابة، فتُجمع الشجرة أولًا
+        walk = list(walk)
+    if cache is not None:
+        settings = [os.path.abspath(output_file), indent_char, ignore.patterns if ignore is not None else [],
+                    max_depth, max_files, summary]
+        # الملف السابق صالح للتضمين فقط إذا بقي كما كتبناه (لم يُعدل أو يُستبدل يدويًا)
+        intact = (cache.loaded and settings == cache.previous_settings and os.path.exists(output_file)
+                  and os.path.getsize(output_file) == cache.output_size)
+        written = not intact or cache.modified()
+        splice = intact and written
+    totals = _subtree_totals(walk) if summary else None
+
+    directories = 0
+    file_count = 0
+    output_size = cache.output_size if cache is not None else None
+    if written:
+        newline = os.linesep
+        with open(tmp_path, 'wb') as f, \
+                (open(output_file, 'rb') if splice else contextlib.nullcontext()) as previous:
+            header = f"Folder Tree for: {os.path.basename(startpath)}{newline}{'=' * 30}{newline}{newline}"
+            position = f.write(header.encode('utf-8'))
+            for index, (level, path, files, _) in enumerate(walk):
+                directories += 1
+                file_count += len(files)
+                if max_depth is not None and level > max_depth:
+                    continue
+                name = os.path.basename(startpath) if level == 0 else os.path.basename(path)
+                line = f'{indent_char * level}📁 {name}/'
+                if summary:
+                    count, size = totals[index]
+                    line += f'  ({count} ملف، {format_size(size)})' if sizes else f'  ({count} ملف)'
+                position += f.write(f'{line}{newline}'.encode('utf-8'))
+
+                chunk = cache.reusable_chunk(path) if splice else None
+                if chunk is not None:
+                    length = chunk[1]
+                    _copy_range(previous, f, *chunk)
+                else:
+                    file_indent = indent_char * (level + 1)
+                    shown = files if max_files is None else files[:max_files]
+                    lines = [f'{file_indent}📄 {file}{newline}' for file in shown]
+                    if len(files) > len(shown):
+                        lines.append(f'{file_indent}📄 … و{len(files) - len(shown)} ملف آخر{newline}')
+                    length = f.write(''.join(lines).encode('utf-8'))
+                if cache is not None:
+                    cache.record_chunk(path, position, length)
+                position += length
+        os.replace(tmp_path, output_file)
+        output_size = position
+    else:
+        directories = len(walk)
+        file_count = sum(len(files) for _, _, files, _ in walk)
+
+    stats = {"directories": directories, "files": file_count, "written": written, "spliced": splice}
+    if cache is not None:
+        if written or cache.rescanned:
+            cache.save(settings, output_size)
+        stats["rescanned"] = cache.rescanned
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def build_ignore(patterns=None, ignore_files=(), use_defaults=True):
+    """
+    يبني مطابق الاستثناءات: DEFAULT_IGNORE_PATTERNS ثم أنماط ملفات .gitignore المعطاة
+    ثم patterns، فالأنماط اللاحقة (ومنها !) تتغلب على السابقة.
+    """
+    matcher = IgnoreMatcher(DEFAULT_IGNORE_PATTERNS if use_defaults else ())
+    for path in ignore_files:
+        matcher.add_file(path)
+    for pattern in patterns or ():
+        matcher.add(pattern)
+    return matcher
+
+
+def generate_folder_tree(startpath, output_file='folder_tree.txt', indent_char='    ', ignore=None, workers=None,
+                         cache_file=None, show_changes=False, max_depth=None, max_files=None, summary=False,
+                         sizes=False):
+    """
+    ينشئ هيكل شجري للمجلدات والملفات داخل مسار معين ويطبع ملخص التشغيل.
+
+    Args:
+        startpath (str): المسار الأساسي للمجلد الذي سيتم تحليل هيكله.
+        output_file (str): اسم الملف الذي سيتم حفظ الهيكل فيه.
+        indent_char (str): الأحرف المستخدمة للمسافة البادئة (افتراضي: 4 مسافات).
+        ignore (IgnoreMatcher): الاستثناءات (افتراضي: DEFAULT_IGNORE_PATTERNS).
+        workers (int): عدد خيوط قراءة المجلدات؛ 1 للقراءة المتتابعة (افتراضي: حسب سرعة القراءة).
+        cache_file (str): ملف ذاكرة قوائم المجلدات؛ يُعاد قراءة المجلدات المتغيرة فقط.
+        show_changes (bool): اطبع الملفات والمجلدات المضافة والمحذوفة منذ التشغيل السابق.
+        max_depth (int): أعمق مستوى يُكتب.
+        max_files (int): أقصى عدد ملفات يُكتب لكل مجلد.
+        summary (bool): أضف عدد الملفات تحت كل مجلد.
+        sizes (bool): أضف مجموع أحجام الملفات تحت كل مجلد.
+    """
+    if ignore is None:
+        ignore = build_ignore()
+    if sizes and cache_file:
+        print("⚠️ الأحجام تتطلب قراءة كل ملف، فلن تُستخدم ذاكرة المجلدات في هذا التشغيل.")
+        cache_file = None
+
+    print(f"جاري إنشاء هيكل المجلد لـ: {startpath}")
+    print(f"سيتم حفظ النتائج في: {output_file}")
+
+    # القراءة بـ os.scandir على مجموعة خيوط مع الحفاظ على ترتيب ثابت للمخرجات
+    cache = TreeCache(cache_file, startpath) if cache_file else None
+    try:
+        stats = write_folder_tree(startpath, output_file, indent_char, ignore, workers=workers, cache=cache,
+                                  max_depth=max_depth, max_files=max_files, summary=summary, sizes=sizes)
+        print(f"📊 {stats['directories']} مجلد و{stats['files']} ملف في {stats['seconds']:.2f} ثانية")
+        if cache is not None:
+            if cache.loaded:
+                print(f"♻️ أُعيدت قراءة {stats['rescanned']} مجلد فقط، والباقي من الذاكرة")
+            else:
+                print("🆕 لا توجد ذاكرة سابقة، قُرئت الشجرة كاملة")
+            if not stats["written"]:
+                print("لم يتغير شيء منذ التشغيل السابق، الملف كما هو.")
+            if show_changes and cache.loaded:
+                changes = cache.changes(ignore, own_files(startpath, _tool_paths(output_file, cache)))
+                print(f"\n🔀 التغييرات منذ التشغيل السابق ({len(changes)}):")
+                for sign, path in changes:
+                    print(f"  {sign} {path}")
+    finally:
+        if cache is not None:
+            cache.close()
+    print("\n✅ تم الانتهاء من إنشاء ملف هيكل المجلد.")
+    print(f"يمكنك فتح الملف '{output_file}' لرؤية الهيكل.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="إنشاء ملف هيكل شجري لمجلد.")
+    parser.add_argument("path", nargs="?", help="المجلد المراد تحليله (يُطلب عند التشغيل إذا لم يُحدد)")
+    parser.add_argument("--output", default="folder_tree.txt", help="ملف النتائج")
+    parser.add_argument("--workers", type=int, help="عدد خيوط قراءة المجلدات (1 للقراءة المتتابعة؛ "
+                        "افتراضيًا تُستخدم الخيوط فقط إذا كانت القراءة بطيئة)")
+    parser.add_argument("--cache", default="folder_tree_cache.sqlite",
+                        help="ملف ذاكرة قوائم المجلدات للتحديث التزايدي")
+    parser.add_argument("--no-cache", action="store_true", help="اقرأ الشجرة كاملة دون ذاكرة")
+    parser.add_argument("--diff", action="store_true", help="اطبع المضاف والمحذوف منذ التشغيل السابق")
+    parser.add_argument("--ignore", action="append", default=[], metavar="PATTERN",
+                        help="نمط استثناء إضافي بصيغة .gitignore (يتكرر؛ !نمط يعيد التضمين)")
+    parser.add_argument("--ignore-file", action="append", default=[], metavar="FILE",
+                        help="ملف أنماط بصيغة .gitignore، مثل .gitignore الخاص بالمشروع (يتكرر)")
+    parser.add_argument("--no-default-ignore", action="store_true",
+                        help="لا تستخدم قائمة الاستثناءات الافتراضية")
+    parser.add_argument("--max-depth", type=int, help="أعمق مستوى يُكتب (الجذر 0)")
+    parser.add_argument("--max-files", type=int, help="أقصى عدد ملفات يُكتب لكل مجلد")
+    parser.add_argument("--summary", action="store_true", help="أضف عدد الملفات تحت كل مجلد")
+    parser.add_argument("--sizes", action="store_true",
+                        help="أضف مجموع أحجام الملفات تحت كل مجلد (يعطل ذاكرة المجلدات)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # بدون وسيط: اطلب المسار من المستخدم عند التشغيل
+    project_folder_path = args.path
+    if project_folder_path is None:
+        project_folder_path = input("الرجاء إدخال المسار الكامل للمجلد الذي تريد تحليل هيكله (أو اضغط Enter للمجلد الحالي): ").strip()
+
+    # إذا ترك المستخدم الإدخال فارغًا، استخدم المجلد الحالي الذي يتم تشغيل السكربت منه
+    if not project_folder_path:
+        project_folder_path = os.getcwd()
+        print(f"لم يتم تحديد مسار، سيتم استخدام المجلد الحالي: {project_folder_path}")
+
+    # تحقق مما إذا كان المسار المدخل موجودًا وهو مجلد فعلاً
+    if not os.path.isdir(project_folder_path):
+        print(f"❌ خطأ: المسار '{project_folder_path}' غير موجود أو ليس مجلدًا. يرجى التحقق من المسار والمحاولة مرة أخرى.")
+        return 1
+
+    ignore = build_ignore(args.ignore, args.ignore_file, use_defaults=not args.no_default_ignore)
+    generate_folder_tree(project_folder_path, args.output, ignore=ignore, workers=args.workers,
+                         cache_file=None if args.no_cache else args.cache, show_changes=args.diff,
+                         max_depth=args.max_depth, max_files=args.max_files, summary=args.summary,
+                         sizes=args.sizes)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
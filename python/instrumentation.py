@@ -0,0 +1,211 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+
+# حدود مدرجات زمن الاستجابة بالمللي ثانية (الفئة الأخيرة مفتوحة: أكبر من آخر حد)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+# متغير البيئة الذي يفعّل القياس تلقائيًا ويحدد ملف التقرير عند الخروج
+REPORT_ENV_VAR = "ALWASEET_QUERY_STATS"
+
+PHASES = ("execute", "fetch", "format", "total")
+
+
+class _LabelStats:
+    """إحصاءات مجمعة لاستعلامات تحمل الوسم نفسه."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.max_seconds = dict.fromkeys(PHASES, 0.0)
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, timings, rows, size, error):
+        self.count += 1
+        self.errors += 1 if error else 0
+        self.rows += rows
+        self.bytes += size
+        for phase, seconds in timings.items():
+            self.seconds[phase] += seconds
+            if seconds > self.max_seconds[phase]:
+                self.max_seconds[phase] = seconds
+        self.histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, timings["total"] * 1000)] += 1
+
+    def percentile(self, fraction):
+        """تقدير المئين من المدرج (الحد الأعلى للفئة التي يقع فيها)."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.histogram):
+            seen += bucket_count
+            if seen >= target:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return float(LATENCY_BUCKETS_MS[index])
+                return self.max_seconds["total"] * 1000
+        return self.max_seconds["total"] * 1000
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "total_ms": {phase: round(seconds * 1000, 3) for phase, seconds in self.seconds.items()},
+            "avg_ms": {phase: round(seconds * 1000 / self.count, 3) if self.count else 0.0
+                       for phase, seconds in self.seconds.items()},
+            "max_ms": {phase: round(seconds * 1000, 3) for phase, seconds in self.max_seconds.items()},
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "histogram_ms": {
+                (f"<={bound}" if index < len(LATENCY_BUCKETS_MS) else f">{LATENCY_BUCKETS_MS[-1]}"): count
+                for index, (bound, count) in enumerate(
+                    zip(LATENCY_BUCKETS_MS + (None,), self.histogram))
+                if count
+            },
+        }
+
+
+class QueryRecorder:
+    """
+    يسجل زمن التنفيذ والجلب والتنسيق وعدد الصفوف والحجم التقريبي لكل استعلام حسب وسمه.
+
+    Args:
+        stream_path (str): ملف JSON Lines يُضاف إليه سجل لكل استعلام فور انتهائه (اختياري).
+    """
+
+    def __init__(self, stream_path=None):
+        self._lock = threading.Lock()
+        self._labels = {}
+        self._stream = open(stream_path, "a", encoding="utf-8") if stream_path else None
+        self.started_at = time.time()
+
+    def record(self, label, execute=0.0, fetch=0.0, format_seconds=0.0, rows=0, size=0, error=False):
+        timings = {"execute": execute, "fetch": fetch, "format": format_seconds,
+                   "total": execute + fetch + format_seconds}
+        with self._lock:
+            stats = self._labels.get(label)
+            if stats is None:
+                stats = self._labels[label] = _LabelStats()
+            stats.add(timings, rows, size, error)
+            if self._stream:
+                self._stream.write(json.dumps({
+                    "ts": round(time.time(), 3),
+                    "label": label,
+                    "execute_ms": round(execute * 1000, 3),
+                    "fetch_ms": round(fetch * 1000, 3),
+                    "format_ms": round(format_seconds * 1000, 3),
+                    "rows": rows,
+                    "bytes": size,
+                    "error": error,
+                }, ensure_ascii=False) + "\n")
+                self._stream.flush()
+
+    def report(self):
+        """يعيد تقريرًا مرتبًا تنازليًا حسب الزمن الكلي لكل وسم."""
+        with self._lock:
+            labels = {label: stats.to_dict() for label, stats in self._labels.items()}
+        ordered = sorted(labels.items(), key=lambda item: item[1]["total_ms"]["total"], reverse=True)
+        return {
+            "started_at": round(self.started_at, 3),
+            "generated_at": round(time.time(), 3),
+            "latency_buckets_ms": list(LATENCY_BUCKETS_MS),
+            "queries": dict(ordered),
+        }
+
+    def dump(self, path):
+        """يكتب التقرير بصيغة JSON إلى الملف المحدد."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        with self._lock:
+            if self._stream:
+                self._stream.close()
+                self._stream = None
+
+
+class QueryTimer:
+    """
+    يقيس مراحل استعلام واحد. يُستخدم داخل execute_and_print:
+    timer.lap("execute") ... ثم timer.done(rows, size).
+    """
+
+    __slots__ = ("_recorder", "_label", "_times", "_mark")
+
+    def __init__(self, recorder, label):
+        self._recorder = recorder
+        self._label = label
+        self._times = {"execute": 0.0, "fetch": 0.0, "format": 0.0}
+        self._mark = time.perf_counter()
+
+    def lap(self, phase):
+        """ينسب الزمن المنقضي منذ آخر نقطة إلى المرحلة المحددة."""
+        now = time.perf_counter()
+        self._times[phase] += now - self._mark
+        self._mark = now
+
+    def done(self, rows, size, error=False):
+        times = self._times
+        self._recorder.record(self._label, times["execute"], times["fetch"], times["format"],
+                              rows=rows, size=size, error=error)
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """يعيد المسجل النشط أو None إذا لم يكن القياس مفعّلًا."""
+    return _recorder
+
+
+def enable(report_path=None, stream_path=None):
+    """
+    يفعّل القياس لكل الاستعلامات.
+
+    Args:
+        report_path (str): ملف تقرير JSON يُكتب عند خروج البرنامج (اختياري).
+        stream_path (str): ملف JSON Lines يُكتب فيه كل استعلام فور انتهائه (اختياري).
+    """
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = QueryRecorder(stream_path)
+            if report_path:
+                atexit.register(_dump_at_exit, _recorder, report_path)
+        return _recorder
+
+
+def disable():
+    global _recorder
+    with _recorder_lock:
+        if _recorder is not None:
+            _recorder.close()
+        _recorder = None
+
+
+def start_query(label):
+    """يعيد QueryTimer إذا كان القياس مفعلًا، وإلا None (دون أي كلفة إضافية)."""
+    recorder = _recorder
+    return QueryTimer(recorder, label) if recorder is not None else None
+
+
+def _dump_at_exit(recorder, path):
+    try:
+        recorder.dump(path)
+    finally:
+        recorder.close()
+
+
+if os.environ.get(REPORT_ENV_VAR):
+    enable(report_path=os.environ[REPORT_ENV_VAR])
@@ -0,0 +1,450 @@
+import argparse
+import csv
+import decimal
+import json
+import os
+import re
+import time
+
+from test import _pyodbc, connect_to_database
+
+# ربط حقول data/products.json (camelCase) بأعمدة inventory.Products. ملفات CSV يمكن أن
+# تستخدم أيًّا من الاسمين في صف العناوين.
+FIELD_MAP = (
+    ("name", "Name"),
+    ("barcode", "Barcode"),
+    ("description", "Description"),
+    ("categoryId", "CategoryId"),
+    ("purchasePrice", "PurchasePrice"),
+    ("salePrice", "SalePrice"),
+    ("quantity", "Quantity"),
+    ("unitOfMeasure", "UnitOfMeasure"),
+    ("minimumQuantity", "MinimumQuantity"),
+    ("imageUrl", "ImageUrl"),
+    ("companyId", "CompanyId"),
+    ("createdBy", "CreatedBy"),
+    ("isActive", "IsActive"),
+)
+COLUMNS = [column for _, column in FIELD_MAP]
+
+# نفس أعمدة inventory.sp_AddProduct مع IsActive، لكن بإدراج واحد لكل دفعة بدل استدعاء لكل صف
+INSERT_PRODUCT_QUERY = (
+    f"INSERT INTO inventory.Products ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(COLUMNS))});"
+)
+EXISTING_BARCODES_QUERY = "SELECT Barcode FROM inventory.Products;"
+CATEGORY_IDS_QUERY = "SELECT CategoryId FROM inventory.Categories;"
+
+CENTS = decimal.Decimal("0.01")
+# أكبر قيمة تتسع في DECIMAL(18,2)
+MAX_DECIMAL = decimal.Decimal("9999999999999999.99")
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def iter_json_array(path, chunk_size=1024 * 1024):
+    """
+    يقرأ مصفوفة JSON كبيرة عنصرًا عنصرًا دون تحميل الملف كاملًا في الذاكرة.
+
+    يتقدم مؤشر داخل المخزن المؤقت بعد كل عنصر، ولا يُقص المخزن إلا عند قراءة جزء جديد،
+    فيبقى التحليل خطيًا في حجم الملف. الفواصل المكررة أو المفقودة بين العناصر خطأ.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer, pos, eof = "", 0, False
+        state = "open"  # open: قبل "["، first: أول عنصر أو "]"، item: عنصر، next: "," أو "]"
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer):
+                if eof:
+                    raise ValueError(f"'{path}': نهاية غير متوقعة لمصفوفة JSON")
+                buffer, pos, eof = _refill(f, buffer, pos, chunk_size)
+                continue
+            char = buffer[pos]
+            if state == "open":
+                if char != "[":
+                    raise ValueError(f"'{path}' لا يحتوي مصفوفة JSON")
+                pos += 1
+                state = "first"
+                continue
+            if state in ("first", "next") and char == "]":
+                return
+            if state == "next":
+                if char != ",":
+                    raise ValueError(f"'{path}': يُتوقع ',' أو ']' بعد العنصر وليس {char!r}")
+                pos += 1
+                state = "item"
+                continue
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise
+                buffer, pos, eof = _refill(f, buffer, pos, chunk_size)
+                continue
+            if end == len(buffer) and not eof:
+                # رقم في نهاية الجزء قد يكمل في الجزء التالي
+                buffer, pos, eof = _refill(f, buffer, pos, chunk_size)
+                continue
+            yield item
+            pos = end
+            state = "next"
+
+
+def _refill(f, buffer, pos, chunk_size):
+    chunk = f.read(chunk_size)
+    return buffer[pos:] + chunk, 0, not chunk
+
+
+def iter_csv(path):
+    """يقرأ ملف CSV صفًا صفًا ويعيد كل صف كقاموس بأسماء حقول products.json."""
+    aliases = {column.lower(): field for field, column in FIELD_MAP}
+    aliases.update({field.lower(): field for field, _ in FIELD_MAP})
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = [aliases.get(name.strip().lower(), name.strip()) for name in next(reader, [])]
+        for values in reader:
+            yield {name: (value if value != "" else None) for name, value in zip(header, values)}
+
+
+def iter_records(path):
+    if path.lower().endswith(".json"):
+        return iter_json_array(path)
+    return iter_csv(path)
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- محولات الأعمدة: كل محول يعمل على عمود كامل من الدفعة ويعيد القيم وأخطاء الصفوف ---
+
+def _text_column(values, max_length, required=False):
+    # max_length=None لأعمدة NVARCHAR(MAX)
+    out, errors = [], {}
+    for index, value in enumerate(values):
+        if value is None or (isinstance(value, str) and not value.strip()):
+            if required:
+                errors[index] = "قيمة مطلوبة"
+            out.append(None)
+            continue
+        value = str(value).strip()
+        if max_length is not None and len(value) > max_length:
+            errors[index] = f"أطول من {max_length} حرفًا"
+        out.append(value)
+    return out, errors
+
+
+def _decimal_column(values, required=False, default=None):
+    out, errors = [], {}
+    for index, value in enumerate(values):
+        if value is None or value == "":
+            if required:
+                errors[index] = "قيمة مطلوبة"
+            out.append(default)
+            continue
+        try:
+            number = decimal.Decimal(str(value)).quantize(CENTS)
+        except (decimal.InvalidOperation, ValueError):
+            errors[index] = f"قيمة عددية غير صالحة: {value!r}"
+            out.append(None)
+            continue
+        if number < 0 or number > MAX_DECIMAL:
+            errors[index] = f"قيمة خارج النطاق: {value!r}"
+        out.append(number)
+    return out, errors
+
+
+def _int_column(values, default=None, allowed=None):
+    out, errors = [], {}
+    for index, value in enumerate(values):
+        if value is None or value == "":
+            out.append(default)
+            continue
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            errors[index] = f"رقم صحيح غير صالح: {value!r}"
+            out.append(None)
+            continue
+        if allowed is not None and number not in allowed:
+            errors[index] = f"المعرف {number} غير موجود"
+        out.append(number)
+    return out, errors
+
+
+def _bool_column(values, default=True):
+    truthy = {"1", "true", "yes", "y", "نعم"}
+    out = []
+    for value in values:
+        if value is None or value == "":
+            out.append(default)
+        elif isinstance(value, bool):
+            out.append(value)
+        else:
+            out.append(str(value).strip().lower() in truthy)
+    return out, {}
+
+
+def _barcode_key(barcode):
+    return barcode.casefold() if barcode is not None else None
+
+
+class ProductValidator:
+    """
+    يتحقق من دفعة كاملة عمودًا عمودًا ويحولها إلى صفوف جاهزة للإدراج.
+
+    Args:
+        company_id (int): الشركة الافتراضية عند غياب companyId.
+        created_by (int): المستخدم الافتراضي عند غياب createdBy.
+        category_ids (set): معرفات الفئات الموجودة (None لتخطي التحقق).
+        existing_barcodes (set): الباركودات الموجودة مسبقًا في الجدول.
+    """
+
+    def __init__(self, company_id=1, created_by=1, category_ids=None, existing_barcodes=None):
+        self.company_id = company_id
+        self.created_by = created_by
+        self.category_ids = category_ids
+        # SQL Server يقارن بترتيب غير حساس لحالة الأحرف، فـ "abc" و "ABC" مكرران
+        self.seen_barcodes = {_barcode_key(barcode) for barcode in existing_barcodes or ()}
+
+    def validate(self, records):
+        """يعيد ([(موقع السجل، الصف)], [(موقع السجل، سبب الرفض)])."""
+        columns = {field: [record.get(field) for record in records] for field, _ in FIELD_MAP}
+        checks = [
+            _text_column(columns["name"], 255, required=True),
+            _text_column(columns["barcode"], 100),
+            _text_column(columns["description"], None),
+            _int_column(columns["categoryId"], allowed=self.category_ids),
+            _decimal_column(columns["purchasePrice"], required=True),
+            _decimal_column(columns["salePrice"], required=True),
+            _decimal_column(columns["quantity"], default=decimal.Decimal("0.00")),
+            _text_column(columns["unitOfMeasure"], 50),
+            _decimal_column(columns["minimumQuantity"]),
+            _text_column(columns["imageUrl"], None),
+            _int_column(columns["companyId"], default=self.company_id),
+            _int_column(columns["createdBy"], default=self.created_by),
+            _bool_column(columns["isActive"]),
+        ]
+        values = [converted for converted, _ in checks]
+        errors = {}
+        for (_, column), (_, column_errors) in zip(FIELD_MAP, checks):
+            for index, message in column_errors.items():
+                errors.setdefault(index, []).append(f"{column}: {message}")
+
+        # الباركود فريد (UNIQUE يسمح بقيمة NULL واحدة فقط في SQL Server)
+        for index, barcode in enumerate(values[1]):
+            if index in errors:
+                continue
+            key = _barcode_key(barcode)
+            if key in self.seen_barcodes:
+                errors[index] = [f"Barcode: مكرر ({barcode})"]
+            else:
+                self.seen_barcodes.add(key)
+
+        valid, rejected = [], []
+        for index, row in enumerate(zip(*values)):
+            if index in errors:
+                rejected.append((index, "; ".join(errors[index])))
+            else:
+                valid.append((index, row))
+        return valid, rejected
+
+
+class RejectWriter:
+    """يكتب السجلات المرفوضة إلى CSV مع رقم السجل وسبب الرفض."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, number, record, reason):
+        if self._file is None:
+            self._file = open(self.path, "w", encoding="utf-8-sig", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["_record", "_error"] + [field for field, _ in FIELD_MAP])
+        self._writer.writerow([number, reason] + [record.get(field) for field, _ in FIELD_MAP])
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _fetch_set(cursor, query):
+    cursor.execute(query)
+    values = set()
+    while True:
+        rows = cursor.fetchmany(10000)
+        if not rows:
+            return values
+        values.update(row[0] for row in rows)
+
+
+def _insert_transaction(cnxn, cursor, rows, batch_size):
+    """يدرج صفوف معاملة واحدة على دفعات executemany ثم يلتزم بها."""
+    for start in range(0, len(rows), batch_size):
+        cursor.executemany(INSERT_PRODUCT_QUERY, rows[start:start + batch_size])
+    cnxn.commit()
+
+
+def _insert_isolating(cnxn, cursor, pending, batch_size, reject):
+    """
+    يعيد إدراج صفوف معاملة فاشلة بالتنصيف: كل نصف يُجرب في معاملة خاصة به، والنصف
+    الفاشل يُقسم مجددًا حتى يبقى الصف المسبب للخطأ وحده فيُرفض. صف سيئ واحد بين N
+    صف يكلف نحو log2(N) محاولة بدل N رحلة.
+
+    Args:
+        pending (list): عناصر (رقم السجل، السجل، الصف).
+        reject (callable): reject(number, record, error) للصف الذي فشل وحده.
+
+    Returns:
+        int: عدد الصفوف المدرجة.
+    """
+    db_error = _pyodbc().Error
+    inserted = 0
+    middle = len(pending) // 2
+    stack = [pending[middle:], pending[:middle]]
+    while stack:
+        chunk = stack.pop()
+        if not chunk:
+            continue
+        try:
+            if len(chunk) == 1:
+                cursor.execute(INSERT_PRODUCT_QUERY, chunk[0][2])
+                cnxn.commit()
+            else:
+                _insert_transaction(cnxn, cursor, [row for _, _, row in chunk], batch_size)
+            inserted += len(chunk)
+        except db_error as ex:
+            cnxn.rollback()
+            if len(chunk) == 1:
+                reject(chunk[0][0], chunk[0][1], ex)
+            else:
+                middle = len(chunk) // 2
+                stack.append(chunk[middle:])
+                stack.append(chunk[:middle])
+    return inserted
+
+
+def load_products(cnxn, path, batch_size=5000, commit_size=50000, reject_path="products_rejects.csv",
+                  company_id=1, created_by=1, check_categories=True, dry_run=False,
+                  fast_executemany=True):
+    """
+    يحمل المنتجات من ملف JSON أو CSV إلى inventory.Products على دفعات.
+
+    التحقق والتحويل يتمان لكل دفعة عمودًا عمودًا قبل الإرسال، والإدراج يتم عبر
+    executemany مع fast_executemany (رحلة واحدة لكل دفعة). إذا فشلت معاملة كاملة
+    يُتراجع عنها ويعاد إدراج صفوفها بالتنصيف لعزل الصفوف المسببة للخطأ في ملف الرفض.
+
+    Args:
+        cnxn: اتصال قاعدة البيانات.
+        path (str): ملف المنتجات (.json أو .csv).
+        batch_size (int): عدد الصفوف في كل استدعاء executemany.
+        commit_size (int): عدد الصفوف في كل معاملة.
+        reject_path (str): ملف CSV للسجلات المرفوضة.
+        company_id (int): الشركة الافتراضية.
+        created_by (int): المستخدم الافتراضي.
+        check_categories (bool): التحقق من وجود categoryId في inventory.Categories.
+        dry_run (bool): التحقق فقط دون إدراج.
+        fast_executemany (bool): تفعيل fast_executemany في pyodbc.
+
+    Returns:
+        dict: {"read", "inserted", "rejected", "seconds", "rows_per_sec"}
+    """
+    started = time.perf_counter()
+    cursor = cnxn.cursor()
+    cursor.fast_executemany = fast_executemany
+
+    category_ids = _fetch_set(cursor, CATEGORY_IDS_QUERY) if check_categories else None
+    validator = ProductValidator(company_id, created_by, category_ids,
+                                 _fetch_set(cursor, EXISTING_BARCODES_QUERY))
+    rejects = RejectWriter(reject_path)
+    stats = {"read": 0, "inserted": 0, "rejected": 0}
+    pending = []  # صفوف المعاملة الحالية: (رقم السجل، السجل، الصف)
+    db_error = _pyodbc().Error
+
+    def flush():
+        if not pending:
+            return
+        rows = [row for _, _, row in pending]
+        if dry_run:
+            stats["inserted"] += len(rows)
+        else:
+            try:
+                _insert_transaction(cnxn, cursor, rows, batch_size)
+                stats["inserted"] += len(rows)
+            except db_error:
+                cnxn.rollback()
+                stats["inserted"] += _insert_isolating(
+                    cnxn, cursor, pending, batch_size,
+                    lambda number, record, ex: rejects.write(
+                        number, record, f"SQL: {ex.args[-1] if ex.args else ex}"))
+        pending.clear()
+        elapsed = time.perf_counter() - started
+        print(f"  ⏳ {stats['inserted']:,} صف مدرج، {rejects.count:,} مرفوض "
+              f"({stats['inserted'] / elapsed if elapsed else 0:,.0f} صف/ثانية)")
+
+    try:
+        for records in _batches(iter_records(path), batch_size):
+            first_number = stats["read"] + 1
+            stats["read"] += len(records)
+            valid, rejected = validator.validate(records)
+            for index, reason in rejected:
+                rejects.write(first_number + index, records[index], reason)
+            pending.extend((first_number + index, records[index], row) for index, row in valid)
+            if len(pending) >= commit_size:
+                flush()
+        flush()
+    finally:
+        rejects.close()
+
+    stats["rejected"] = rejects.count
+    stats["seconds"] = time.perf_counter() - started
+    stats["rows_per_sec"] = stats["inserted"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="تحميل المنتجات بكميات كبيرة إلى inventory.Products.")
+    parser.add_argument("path", nargs="?", default=os.path.join("..", "data", "products.json"),
+                        help="ملف المنتجات .json أو .csv (افتراضي: ../data/products.json)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="عدد الصفوف لكل دفعة (افتراضي: 5000)")
+    parser.add_argument("--commit-size", type=int, default=50000,
+                        help="عدد الصفوف لكل معاملة (افتراضي: 50000)")
+    parser.add_argument("--reject-file", default="products_rejects.csv",
+                        help="ملف السجلات المرفوضة (افتراضي: products_rejects.csv)")
+    parser.add_argument("--company-id", type=int, default=1, help="الشركة الافتراضية (افتراضي: 1)")
+    parser.add_argument("--created-by", type=int, default=1, help="المستخدم الافتراضي (افتراضي: 1)")
+    parser.add_argument("--skip-category-check", action="store_true",
+                        help="عدم التحقق من وجود categoryId في inventory.Categories")
+    parser.add_argument("--dry-run", action="store_true", help="التحقق فقط دون إدراج")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    cnxn, cursor = connect_to_database()
+    if not cnxn:
+        raise SystemExit(1)
+    cursor.close()
+    try:
+        result = load_products(cnxn, args.path, batch_size=args.batch_size,
+                               commit_size=args.commit_size, reject_path=args.reject_file,
+                               company_id=args.company_id, created_by=args.created_by,
+                               check_categories=not args.skip_category_check, dry_run=args.dry_run)
+    finally:
+        cnxn.close()
+    print(f"\n✅ قُرئ {result['read']:,} سجل، أُدرج {result['inserted']:,}، رُفض {result['rejected']:,} "
+          f"خلال {result['seconds']:.2f}s ({result['rows_per_sec']:,.0f} صف/ثانية)")
+    if result["rejected"]:
+        print(f"⚠️ السجلات المرفوضة في: {args.reject_file}")
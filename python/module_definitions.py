@@ -0,0 +1,147 @@
+import json
+import os
+
+# أقسام المخطط 3 و 4 و 5 و 7 تجلب DefinitionHash فقط؛ النص الكامل يُجلب من هنا عند الطلب.
+# التجزئة تُحسب بالتعبير نفسه في الموضعين حتى تتطابق المفاتيح (HASHBYTES بلا حد 8000 بايت
+# منذ SQL Server 2016).
+DEFINITION_HASH_EXPRESSION = "CONVERT(CHAR(64), HASHBYTES('SHA2_256', m.definition), 2)"
+
+# الأسماء تُحل على الخادم بـ OBJECT_ID فتُطابق كما يكتبها المستخدم ([sales].[X] أو
+# SALES.x)، وتعود النتائج مع الاسم المطلوب نفسه ومعرف الكائن. OBJECT_ID('schema.name')
+# يعمل للمشغلات أيضًا: مخططها هو مخطط الجدول التابعة له
+HASHES_QUERY_TEMPLATE = f"""
+SELECT
+    requested.ObjectName,
+    m.object_id AS ObjectId,
+    {DEFINITION_HASH_EXPRESSION} AS DefinitionHash
+FROM
+    (VALUES {{placeholders}}) AS requested(ObjectName)
+    JOIN sys.sql_modules AS m ON m.object_id = OBJECT_ID(requested.ObjectName);
+"""
+
+DEFINITIONS_QUERY_TEMPLATE = f"""
+SELECT
+    m.object_id AS ObjectId,
+    {DEFINITION_HASH_EXPRESSION} AS DefinitionHash,
+    m.definition AS Definition
+FROM
+    sys.sql_modules AS m
+WHERE
+    m.object_id IN ({{placeholders}});
+"""
+
+DEFINITIONS_CACHE_FILE = "module_definitions.json"
+
+# عدد الكائنات في كل استعلام (SQL Server يسمح بـ 2100 معامل كحد أقصى)
+DEFINITION_BATCH_SIZE = 200
+
+
+def _name_placeholders(count):
+    return ", ".join(["(?)"] * count)
+
+
+def _id_placeholders(count):
+    return ", ".join(["?"] * count)
+
+
+class DefinitionCache:
+    """
+    نصوص تعريفات الكائنات مفهرسة بتجزئتها (SHA2_256). التعريف الذي لم يتغير لا يُنقل
+    مرة أخرى، ولو تغير اسم الكائن أو نُسخ إلى قاعدة أخرى بالنص نفسه.
+
+    Args:
+        path (str): ملف JSON للحفظ بين التشغيلات (None = في الذاكرة فقط).
+    """
+
+    def __init__(self, path=DEFINITIONS_CACHE_FILE):
+        self.path = path
+        self.definitions = {}
+        self._dirty = False
+        if path:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.definitions = json.load(f)
+            except (OSError, ValueError):
+                self.definitions = {}
+
+    def get(self, definition_hash):
+        return self.definitions.get(definition_hash)
+
+    def put(self, definition_hash, definition):
+        if self.definitions.get(definition_hash) != definition:
+            self.definitions[definition_hash] = definition
+            self._dirty = True
+
+    def save(self):
+        """يحفظ الملف بشكل ذري إن أُضيفت تعريفات جديدة."""
+        if not self.path or not self._dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.definitions, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def _batched(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def fetch_hashes(cursor, names, batch_size=DEFINITION_BATCH_SIZE):
+    """
+    يعيد {الاسم كما طُلب: (ObjectId, DefinitionHash)} للكائنات الموجودة فقط؛ الأسماء
+    المختلفة لكائن واحد (حالة الأحرف أو الأقواس) تعود كلها بمعرفه نفسه.
+    """
+    hashes = {}
+    for batch in _batched(list(names), batch_size):
+        cursor.execute(HASHES_QUERY_TEMPLATE.format(placeholders=_name_placeholders(len(batch))),
+                       batch)
+        for name, object_id, definition_hash in cursor.fetchall():
+            hashes[name] = (object_id, definition_hash)
+    return hashes
+
+
+def fetch_definitions(cursor, names, cache, hashes=None, batch_size=DEFINITION_BATCH_SIZE):
+    """
+    يعيد {schema.name: (DefinitionHash, Definition)} للكائنات المطلوبة فقط، بالأسماء كما
+    مُررت.
+
+    التجزئات المعروفة مسبقًا (مثل عمود DefinitionHash في أقسام المخطط) تُمرر في hashes؛
+    وإلا تُحل الأسماء الناقصة إلى معرفاتها وتجزئاتها أولًا في استعلام خفيف. بعدها تُجلب
+    على دفعات، حسب معرف الكائن، نصوص التعريفات غير الموجودة في الذاكرة فقط؛ فالكائن
+    المطلوب باسمين لا يُنقل تعريفه إلا مرة واحدة.
+
+    Args:
+        cursor: مؤشر قاعدة البيانات.
+        names (list): أسماء الكائنات بصيغة schema.name.
+        cache (DefinitionCache): ذاكرة التعريفات حسب التجزئة.
+        hashes (dict): تجزئات معروفة {schema.name: DefinitionHash} (اختياري).
+        batch_size (int): عدد الكائنات في كل استعلام.
+    """
+    names = list(dict.fromkeys(names))
+    known = dict(hashes or {})
+    object_ids = {}
+    unresolved = [name for name in names if name not in known or cache.get(known[name]) is None]
+    if unresolved:
+        for name, (object_id, definition_hash) in fetch_hashes(cursor, unresolved, batch_size).items():
+            object_ids[name] = object_id
+            known[name] = definition_hash
+
+    to_fetch = list(dict.fromkeys(object_id for name, object_id in object_ids.items()
+                                  if cache.get(known[name]) is None))
+    fetched = {}
+    for batch in _batched(to_fetch, batch_size):
+        cursor.execute(DEFINITIONS_QUERY_TEMPLATE.format(placeholders=_id_placeholders(len(batch))),
+                       batch)
+        for object_id, definition_hash, definition in cursor.fetchall():
+            fetched[object_id] = definition_hash
+            cache.put(definition_hash, definition)
+    cache.save()
+    # تجزئة تغيرت بين الاستعلامين تُستبدل بتجزئة النص المجلوب فعلًا
+    for name, object_id in object_ids.items():
+        if object_id in fetched:
+            known[name] = fetched[object_id]
+
+    return {name: (known[name], cache.get(known[name])) for name in names
+            if name in known and cache.get(known[name]) is not None}
@@ -0,0 +1,1018 @@
+import datetime
+import hashlib
+import os
+import re
+from collections import Counter
+
+import schema_cache
+from schema_cache import owner_key, owner_sort_key
+
+DATABASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "database")
+
+# السكربتات التي تعرّف المخطط، بترتيب تشغيلها على قاعدة جديدة
+DEFAULT_SCRIPTS = [
+    os.path.join(DATABASE_DIR, "init.sql"),
+    os.path.join(DATABASE_DIR, "create_views.sql"),
+    os.path.join(DATABASE_DIR, "test-data.sql"),
+]
+
+# أعمدة كل قسم كما تعيدها استعلامات SCHEMA_SECTIONS في test.py
+SECTION_COLUMNS = {
+    1: ["TABLE_SCHEMA", "TABLE_NAME", "COLUMN_NAME", "DATA_TYPE", "MaxLength", "NUMERIC_PRECISION",
+        "NUMERIC_SCALE", "IS_NULLABLE", "IsPrimaryKey", "IsForeignKey", "ReferencedTableName",
+        "ReferencedColumnName"],
+    2: ["TableSchema", "TableName", "IndexName", "IndexType", "IndexColumns", "IsUnique"],
+    3: ["RoutineSchema", "ProcedureName", "ObjectType", "ModifyDate", "DefinitionHash"],
+    4: ["RoutineSchema", "FunctionName", "ObjectType", "ModifyDate", "DefinitionHash"],
+    5: ["ViewSchema", "ViewName", "ModifyDate", "DefinitionHash"],
+    6: ["TableSchema", "TableName", "ConstraintName", "ConstraintType", "ConstraintDefinition"],
+    7: ["TableSchema", "TableName", "TriggerName", "TriggerType", "IsDisabled", "ModifyDate",
+        "DefinitionHash"],
+}
+
+# أعمدة لا يمكن معرفتها من السكربتات (أو تختلف بالمسافات فقط)؛ لا تُقارن افتراضيًا
+DIFF_IGNORED_COLUMNS = ("ModifyDate", "DefinitionHash")
+
+# نوع العمود المحسوب يستنتجه الخادم من التعبير؛ من السكربتات يُعرض هكذا ولا تُقارن
+# أعمدة النوع وقابلية NULL له مع الخادم
+COMPUTED_DATA_TYPE = "(computed)"
+_INFERRED_COLUMNS = ("DATA_TYPE", "MaxLength", "NUMERIC_PRECISION", "NUMERIC_SCALE", "IS_NULLABLE")
+
+_IDENT = r'(?:\[(?:[^\]]|\]\])+\]|"[^"]+"|[A-Za-z_@#][\w@#$]*)'
+_QUALIFIED = rf"{_IDENT}(?:\s*\.\s*{_IDENT}){{0,2}}"
+
+_GO_LINE = re.compile(r"^[ \t]*GO(?:[ \t]+\d+)?[ \t]*;?[ \t]*$", re.IGNORECASE | re.MULTILINE)
+_STATEMENT = re.compile(
+    r"\b(?:(?P<create>CREATE(?:\s+OR\s+ALTER)?)\s+(?P<kind>TABLE|VIEW|PROC(?:EDURE)?|FUNCTION|TRIGGER"
+    r"|(?:UNIQUE\s+)?(?:(?:NON)?CLUSTERED\s+)?(?:COLUMNSTORE\s+)?INDEX)\b"
+    r"|(?P<alter>ALTER)\s+(?P<akind>TABLE|VIEW|PROC(?:EDURE)?|FUNCTION|TRIGGER)\b"
+    r"|(?P<drop>DROP)\s+(?P<dkind>TABLE|VIEW|PROC(?:EDURE)?|FUNCTION|TRIGGER|INDEX)\b"
+    r"|(?P<exec>EXEC(?:UTE)?)\s*\()",
+    re.IGNORECASE)
+_NAME = re.compile(rf"\s*(?:IF\s+EXISTS\s+)?(?P<name>{_QUALIFIED})", re.IGNORECASE)
+_PART = re.compile(_IDENT)
+# شرط "أنشئ إن لم يكن موجودًا": التعريف الموجود مسبقًا يبقى كما هو
+_GUARD = re.compile(
+    r"\bIF\s+(?:NOT\s+EXISTS\b|(?:OBJECT_ID|COL_LENGTH|TYPE_ID|INDEXPROPERTY)\s*\(.*?\)\s+IS\s+NULL\b)",
+    re.IGNORECASE | re.DOTALL)
+GUARD_WINDOW = 2000
+_GUARD_BOUNDARY = re.compile(r";|\bEND\b|\bGO\b", re.IGNORECASE)
+_STATEMENT_START = re.compile(
+    r"(?:IF|ELSE|BEGIN|END|ALTER|CREATE|DROP|PRINT|SELECT|INSERT|UPDATE|DELETE|EXEC|EXECUTE|SET|"
+    r"DECLARE|USE|GO|WITH|MERGE|TRUNCATE|RETURN)\b", re.IGNORECASE)
+
+# (DATA_TYPE, NUMERIC_PRECISION, NUMERIC_SCALE) كما في INFORMATION_SCHEMA.COLUMNS
+_NUMERIC_TYPES = {
+    "tinyint": (3, 0), "smallint": (5, 0), "int": (10, 0), "bigint": (19, 0),
+    "money": (19, 4), "smallmoney": (10, 4), "real": (24, None), "float": (53, None),
+}
+_CHARACTER_TYPES = {"char", "varchar", "nchar", "nvarchar", "binary", "varbinary"}
+_LARGE_TYPES = {"text": 2147483647, "ntext": 1073741823, "image": 2147483647, "xml": -1}
+_TYPE_ALIASES = {"rowversion": "timestamp", "integer": "int", "dec": "decimal",
+                 "character": "char", "national": "nchar"}
+
+_AUTO_NAME = re.compile(r"^(PK|UQ|DF|CK|FK)__.+__(?:[0-9A-Fa-f]{8,16}|auto)$")
+
+
+def mask_sql(text):
+    """
+    يعيد (masked, strings): نسخة من النص بنفس الطول تُستبدل فيها التعليقات ومحتوى النصوص
+    بمسافات، ومحتوى المعرفات [..] و ".." بـ "_"، فتعمل التعابير النمطية على البنية فقط
+    وتبقى المواقع صالحة لقراءة الأسماء والقيم من النص الأصلي. strings: {بداية: نهاية}
+    لكل نص حرفي (تشمل علامات الاقتباس).
+    """
+    out = list(text)
+    strings = {}
+    i, length = 0, len(text)
+    while i < length:
+        char = text[i]
+        if char == "-" and text.startswith("--", i):
+            end = text.find("\n", i)
+            end = length if end == -1 else end
+            out[i:end] = " " * (end - i)
+            i = end
+        elif char == "/" and text.startswith("/*", i):
+            depth, j = 1, i + 2
+            while j < length and depth:
+                if text.startswith("/*", j):
+                    depth, j = depth + 1, j + 2
+                elif text.startswith("*/", j):
+                    depth, j = depth - 1, j + 2
+                else:
+                    j += 1
+            for k in range(i, j):
+                if out[k] != "\n":
+                    out[k] = " "
+            i = j
+        elif char == "'":
+            j = i + 1
+            while j < length:
+                if text[j] == "'":
+                    if text.startswith("''", j):
+                        j += 2
+                        continue
+                    break
+                j += 1
+            end = min(j + 1, length)
+            for k in range(i + 1, end - 1):
+                if out[k] != "\n":
+                    out[k] = " "
+            strings[i] = end
+            i = end
+        elif char in "[\"":
+            close = "]" if char == "[" else '"'
+            j = i + 1
+            while j < length:
+                if text[j] == close:
+                    if text.startswith(close * 2, j):
+                        j += 2
+                        continue
+                    break
+                j += 1
+            for k in range(i + 1, min(j, length)):
+                out[k] = "_"
+            i = j + 1
+        else:
+            i += 1
+    return "".join(out), strings
+
+
+def _batches(masked):
+    """حدود الدفعات المفصولة بسطور GO."""
+    start = 0
+    for match in _GO_LINE.finditer(masked):
+        yield start, match.start()
+        start = match.end()
+    yield start, len(masked)
+
+
+def _unquote(identifier):
+    identifier = identifier.strip()
+    if identifier.startswith("["):
+        return identifier[1:-1].replace("]]", "]")
+    if identifier.startswith('"'):
+        return identifier[1:-1]
+    return identifier
+
+
+def _split_name(text, default_schema="dbo"):
+    parts = [_unquote(part) for part in _PART.findall(text)]
+    if len(parts) == 1:
+        return default_schema, parts[0]
+    return parts[-2], parts[-1]
+
+
+def _balanced(masked, pos):
+    """pos عند "("؛ يعيد الموقع بعد ")" المقابلة."""
+    depth = 0
+    for i in range(pos, len(masked)):
+        if masked[i] == "(":
+            depth += 1
+        elif masked[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return len(masked)
+
+
+def _split_top_level(masked, start, end):
+    """يقسم [start, end) عند الفواصل خارج الأقواس ويعيد [(بداية، نهاية)]."""
+    parts, depth, begin = [], 0, start
+    for i in range(start, end):
+        char = masked[i]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append((begin, i))
+            begin = i + 1
+    parts.append((begin, end))
+    return [(s, e) for s, e in parts if masked[s:e].strip()]
+
+
+def _statement_end(masked, pos, end):
+    """نهاية جملة ALTER TABLE: أول ";" أو أول سطر يبدأ بكلمة جملة جديدة، خارج الأقواس."""
+    depth = 0
+    for i in range(pos, end):
+        char = masked[i]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0 and char == ";":
+            return i
+        elif depth == 0 and char == "\n":
+            j = i + 1
+            while j < end and masked[j] in " \t":
+                j += 1
+            if _STATEMENT_START.match(masked, j, end):
+                return i
+    return end
+
+
+def _column_list(text):
+    columns = []
+    for part in text.split(","):
+        words = part.split()
+        if words and words[-1].upper() in ("ASC", "DESC") and len(words) > 1:
+            words = words[:-1]
+        if words:
+            columns.append(_unquote(" ".join(words)))
+    return columns
+
+
+def _type_info(type_name, args):
+    """يعيد (DATA_TYPE, MaxLength, NUMERIC_PRECISION, NUMERIC_SCALE) لتعريف النوع."""
+    data_type = _TYPE_ALIASES.get(type_name.lower(), type_name.lower())
+    args = [arg.strip() for arg in args.split(",")] if args else []
+    if data_type in _CHARACTER_TYPES:
+        if args and args[0].upper() == "MAX":
+            return data_type, "MAX", None, None
+        return data_type, args[0] if args else "1", None, None
+    if data_type in _LARGE_TYPES:
+        length = _LARGE_TYPES[data_type]
+        return data_type, "MAX" if length == -1 else str(length), None, None
+    if data_type in ("decimal", "numeric"):
+        precision = int(args[0]) if args else 18
+        scale = int(args[1]) if len(args) > 1 else 0
+        return data_type, "", precision, scale
+    if data_type == "float" and args and int(args[0]) <= 24:
+        return "real", "", 24, None
+    if data_type in _NUMERIC_TYPES:
+        precision, scale = _NUMERIC_TYPES[data_type]
+        return data_type, "", precision, scale
+    return data_type, "", None, None
+
+
+def _strip_parentheses(expression):
+    expression = expression.strip()
+    while expression.startswith("(") and _balanced(expression, 0) == len(expression):
+        expression = expression[1:-1].strip()
+    return expression
+
+
+def normalize_default(expression):
+    """يحاكي صيغة sys.default_constraints: DEFAULT 1 ← ((1))، DEFAULT GETDATE() ← (getdate())."""
+    expression = _strip_parentheses(expression)
+    if re.fullmatch(r"[-+]?\d+(?:\.\d+)?", expression):
+        return f"(({expression}))"
+    call = re.fullmatch(r"(\w+)\s*\(\s*\)", expression)
+    if call:
+        return f"({call.group(1).lower()}())"
+    return f"({expression})"
+
+
+_CHECK_TOKEN = re.compile(
+    r"\s*(?:(?P<string>N?'(?:[^']|'')*')|(?P<ident>\[(?:[^\]]|\]\])+\]|\"[^\"]+\")"
+    r"|(?P<number>\d+(?:\.\d+)?)|(?P<word>[A-Za-z_@#][\w@#$]*)|(?P<op>[<>!]=|<>|[-+*/%=<>(),.]))")
+_CHECK_KEYWORDS = {"AND": " AND ", "OR": " OR ", "NOT": "NOT ", "IS": " IS ", "NULL": "NULL",
+                   "LIKE": " like "}
+_CHECK_COMPARISONS = {"=", "<", ">", "<=", ">=", "<>", "!="}
+
+
+def _check_tokens(expression):
+    tokens, pos = [], 0
+    while pos < len(expression):
+        match = _CHECK_TOKEN.match(expression, pos)
+        if match is None:
+            if expression[pos:].strip():
+                return None
+            break
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        previous = tokens[-1] if tokens else None
+        if kind == "number" and previous and previous[1] == "-" and (
+                len(tokens) == 1 or tokens[-2][1] in _CHECK_COMPARISONS | {"(", ","}
+                or tokens[-2][1].upper() in _CHECK_KEYWORDS):
+            tokens.pop()
+            value = "-" + value
+        tokens.append((kind, value))
+        # (0) كما يخزنها الخادم تعود رقمًا عاديًا، فتبقى الدالة ثابتة عند إعادة تطبيقها
+        if (value == ")" and len(tokens) >= 3 and tokens[-2][0] == "number" and tokens[-3][1] == "("
+                and (len(tokens) == 3 or tokens[-4][0] != "word")):
+            number = tokens[-2]
+            del tokens[-3:]
+            tokens.append(number)
+    return tokens
+
+
+def _check_atom(kind, value):
+    if kind == "ident" or kind == "word":
+        return "[" + _unquote(value).replace("]", "]]") + "]"
+    if kind == "number":
+        return f"({value})"
+    return value
+
+
+def normalize_check(expression):
+    """
+    يحاكي صيغة OBJECT_DEFINITION لقيود CHECK: CHECK (Price >= 0) ← ([Price]>=(0))،
+    وIN وBETWEEN على عمود تُفك إلى مقارنات كما يخزنها الخادم.
+    """
+    tokens = _check_tokens(_strip_parentheses(expression))
+    if tokens is None:
+        return f"({_strip_parentheses(expression)})"
+    pieces = []
+    i = 0
+    while i < len(tokens):
+        kind, value = tokens[i]
+        following = tokens[i + 1][1] if i + 1 < len(tokens) else None
+        keyword = value.upper() if kind == "word" else None
+        operand = pieces[-1] if pieces and pieces[-1].startswith("[") else None
+        if keyword == "IN" and operand and following == "(":
+            close = next((j for j in range(i + 2, len(tokens)) if tokens[j][1] == ")"), None)
+            values = tokens[i + 2:close] if close else []
+            items = values[0::2]
+            if (items and all(k in ("string", "number") for k, _ in items)
+                    and all(v == "," for _, v in values[1::2]) and len(values) % 2):
+                # الخادم يخزن IN كسلسلة OR بترتيب معكوس
+                chain = " OR ".join(f"{operand}={_check_atom(k, v)}" for k, v in reversed(items))
+                whole = len(pieces) == 1 and close == len(tokens) - 1
+                pieces[-1] = chain if whole else f"({chain})"
+                i = close + 1
+                continue
+        if keyword == "BETWEEN" and operand and i + 3 < len(tokens) and tokens[i + 2][1].upper() == "AND":
+            low, high = tokens[i + 1], tokens[i + 3]
+            if low[0] in ("string", "number") and high[0] in ("string", "number"):
+                pair = f"{operand}>={_check_atom(*low)} AND {operand}<={_check_atom(*high)}"
+                whole = len(pieces) == 1 and i + 4 == len(tokens)
+                pieces[-1] = pair if whole else f"({pair})"
+                i += 4
+                continue
+        if keyword in _CHECK_KEYWORDS:
+            pieces.append(_CHECK_KEYWORDS[keyword])
+        elif kind == "word" and following == "(" and not (pieces and pieces[-1] == "."):
+            pieces.append(value.lower())
+        elif kind == "op":
+            pieces.append(value)
+        else:
+            pieces.append(_check_atom(kind, value))
+        i += 1
+    return "(" + "".join(pieces) + ")"
+
+
+def definition_hash(definition):
+    """تجزئة HASHBYTES('SHA2_256', definition) لنص NVARCHAR (UTF-16LE) بنفس صيغة الأقسام."""
+    return hashlib.sha256(definition.encode("utf-16-le")).hexdigest().upper()
+
+
+class SchemaModel:
+    """
+    نموذج المخطط المبني من سكربتات SQL: الجداول (الأعمدة والقيود والفهارس) والإجراءات
+    والدوال والمشاهدات والمشغلات.
+
+    السكربتات تُطبق بالترتيب كما لو نُفذت على قاعدة جديدة: CREATE داخل IF NOT EXISTS لا
+    يستبدل كائنًا موجودًا، و CREATE OR ALTER / ALTER / DROP ثم CREATE تستبدله.
+    التعريفات المتعارضة تُسجل في warnings.
+    """
+
+    def __init__(self):
+        self.tables = {}
+        self.modules = {}
+        self.warnings = []
+        self.sources = []
+
+    def parse_file(self, path):
+        with open(path, "r", encoding="utf-8-sig") as f:
+            self.parse(f.read(), os.path.basename(path))
+
+    def parse(self, text, source="<sql>"):
+        self.sources.append(source)
+        masked, strings = mask_sql(text)
+        for start, end in _batches(masked):
+            self._parse_batch(text, masked, strings, start, end, source, guarded=False)
+
+    # --- المرور على الجمل ---
+
+    def _is_guarded(self, masked, start, pos):
+        # الشرط يسبق الجملة مباشرة؛ نافذة محدودة تبقي الدفعات الطويلة خطية
+        tail = masked[max(start, pos - GUARD_WINDOW):pos]
+        boundaries = list(_GUARD_BOUNDARY.finditer(tail))
+        if boundaries:
+            tail = tail[boundaries[-1].end():]
+        return bool(_GUARD.search(tail))
+
+    def _parse_batch(self, text, masked, strings, start, end, source, guarded):
+        pos = start
+        while True:
+            match = _STATEMENT.search(masked, pos, end)
+            if match is None:
+                return
+            pos = match.end()
+            statement_guarded = guarded or self._is_guarded(masked, start, match.start())
+
+            if match.group("exec"):
+                # EXEC('CREATE PROCEDURE ...'): النص الداخلي دفعة مستقلة
+                literal = re.compile(r"\s*N?'").match(masked, pos)
+                if literal is None or literal.end() - 1 not in strings:
+                    continue
+                string_start = literal.end() - 1
+                string_end = strings[string_start]
+                inner = text[string_start + 1:string_end - 1].replace("''", "'")
+                inner_masked, inner_strings = mask_sql(inner)
+                self._parse_batch(inner, inner_masked, inner_strings, 0, len(inner), source,
+                                  statement_guarded)
+                pos = string_end
+                continue
+
+            name = _NAME.match(masked, pos, end)
+            if name is None:
+                continue
+            schema, object_name = _split_name(text[name.start("name"):name.end("name")])
+            pos = name.end()
+
+            if match.group("drop"):
+                self._drop(match.group("dkind").upper(), text, masked, name, end)
+                continue
+            kind = (match.group("kind") or match.group("akind")).upper()
+            if kind == "TABLE":
+                if match.group("alter"):
+                    pos = self._alter_table(schema, object_name, text, masked, pos, end, source,
+                                            statement_guarded)
+                else:
+                    pos = self._create_table(schema, object_name, text, masked, pos, end, source,
+                                             statement_guarded)
+            elif kind.endswith("INDEX"):
+                pos = self._create_index(kind, object_name, text, masked, pos, end, statement_guarded)
+            else:
+                # الوحدات البرمجية تمتد حتى نهاية الدفعة
+                replace = not statement_guarded or match.group("alter") or "ALTER" in match.group("create").upper()
+                self._module(kind, schema, object_name, text, masked, pos, start, end, source, replace)
+                return
+
+    # --- الجداول ---
+
+    def _create_table(self, schema, name, text, masked, pos, end, source, guarded):
+        if name.startswith("#"):
+            return pos
+        opening = masked.find("(", pos, end)
+        if opening == -1:
+            return pos
+        closing = _balanced(masked, opening)
+        table = {"schema": schema, "name": name, "columns": [], "pk": None, "uniques": [],
+                 "fks": [], "checks": [], "defaults": [], "indexes": {}, "source": source}
+        for item_start, item_end in _split_top_level(masked, opening + 1, closing - 1):
+            self._table_item(table, text, masked, item_start, item_end)
+
+        key = owner_key(schema, name).lower()
+        existing = self.tables.get(key)
+        if existing is not None:
+            if _table_signature(existing) != _table_signature(table):
+                action = "أُبقي تعريف" if guarded else "استُبدل تعريف"
+                self.warnings.append(f"{schema}.{name}: تعريفان مختلفان في {existing['source']} و "
+                                     f"{source}؛ {action} {existing['source']}")
+            if guarded:
+                return closing
+        self.tables[key] = table
+        return closing
+
+    def _alter_table(self, schema, name, text, masked, pos, end, source, guarded):
+        table = self.tables.get(owner_key(schema, name).lower())
+        statement_end = _statement_end(masked, pos, end)
+        action = re.compile(r"\s*(ADD|DROP\s+COLUMN|DROP\s+CONSTRAINT|DROP|ALTER\s+COLUMN)\b",
+                            re.IGNORECASE).match(masked, pos, statement_end)
+        if action is None:
+            return statement_end  # REBUILD, SET, ENABLE TRIGGER ...
+        if table is None:
+            self.warnings.append(f"{schema}.{name}: ALTER TABLE في {source} على جدول غير معرف")
+            return statement_end
+        verb = " ".join(action.group(1).upper().split())
+        items = _split_top_level(masked, action.end(), statement_end)
+        if verb == "ADD":
+            for item_start, item_end in items:
+                column = _PART.match(masked[item_start:item_end].strip())
+                if (guarded and column and any(c["name"].lower() == _unquote(column.group(0)).lower()
+                                               for c in table["columns"])):
+                    continue
+                self._table_item(table, text, masked, item_start, item_end)
+        elif verb == "ALTER COLUMN":
+            for item_start, item_end in items:
+                column = self._column(text, masked, item_start, item_end)
+                for index, existing in enumerate(table["columns"]):
+                    if existing["name"].lower() == column["name"].lower():
+                        table["columns"][index] = dict(column, primary_key=existing["primary_key"])
+        else:
+            for item_start, item_end in items:
+                names = [_unquote(part) for part in _PART.findall(text[item_start:item_end])
+                         if part.upper() not in ("IF", "EXISTS", "COLUMN", "CONSTRAINT")]
+                for dropped in names:
+                    _drop_from_table(table, dropped)
+        return statement_end
+
+    def _table_item(self, table, text, masked, start, end):
+        item = masked[start:end]
+        stripped = item.lstrip()
+        offset = start + len(item) - len(stripped)
+        constraint = re.match(rf"CONSTRAINT\s+({_IDENT})\s+", stripped, re.IGNORECASE)
+        name = None
+        if constraint:
+            name = _unquote(text[offset + constraint.start(1):offset + constraint.end(1)])
+            offset += constraint.end()
+            stripped = masked[offset:end]
+        head = re.match(r"(PRIMARY\s+KEY|UNIQUE|FOREIGN\s+KEY|CHECK|DEFAULT|INDEX)\b", stripped,
+                        re.IGNORECASE)
+        if head is None:
+            table["columns"].append(self._column(text, masked, offset, end, table))
+            return
+        keyword = " ".join(head.group(1).upper().split())
+        body = text[offset:end]
+        lists = [text[offset + m.start() + 1:offset + _balanced(stripped, m.start()) - 1]
+                 for m in re.finditer(r"\(", stripped) if _depth_at(stripped, m.start()) == 0]
+        if keyword == "PRIMARY KEY":
+            table["pk"] = {"name": name, "columns": _column_list(lists[0]) if lists else [],
+                           "clustered": not re.search(r"\bNONCLUSTERED\b", body, re.IGNORECASE)}
+        elif keyword == "UNIQUE":
+            table["uniques"].append({"name": name, "columns": _column_list(lists[0]) if lists else [],
+                                     "clustered": bool(re.search(r"\bCLUSTERED\b", body.split("(")[0],
+                                                                 re.IGNORECASE)
+                                                       and not re.search(r"\bNONCLUSTERED\b",
+                                                                         body.split("(")[0], re.IGNORECASE))})
+        elif keyword == "FOREIGN KEY":
+            reference = re.search(rf"REFERENCES\s+({_QUALIFIED})", stripped, re.IGNORECASE)
+            if reference and lists:
+                ref_schema, ref_table = _split_name(text[offset + reference.start(1):offset + reference.end(1)])
+                table["fks"].append({"name": name, "columns": _column_list(lists[0]),
+                                     "ref": owner_key(ref_schema, ref_table),
+                                     "ref_columns": _column_list(lists[1]) if len(lists) > 1 else []})
+        elif keyword == "CHECK":
+            table["checks"].append({"name": name, "expression": lists[0] if lists else ""})
+        elif keyword == "DEFAULT":
+            target = re.search(rf"\bFOR\s+({_IDENT})\s*$", stripped, re.IGNORECASE)
+            if target:
+                expression = text[offset + head.end():offset + target.start()]
+                column = _unquote(text[offset + target.start(1):offset + target.end(1)])
+                table["defaults"] = [d for d in table["defaults"] if d["column"].lower() != column.lower()]
+                table["defaults"].append({"name": name, "column": column, "expression": expression})
+        elif keyword == "INDEX":
+            index_name = re.match(rf"INDEX\s+({_IDENT})", stripped, re.IGNORECASE)
+            if index_name and lists:
+                index = {"name": _unquote(text[offset + index_name.start(1):offset + index_name.end(1)]),
+                         "type": "CLUSTERED" if re.search(r"\bCLUSTERED\b", body.split("(")[0], re.IGNORECASE)
+                         and not re.search(r"\bNONCLUSTERED\b", body.split("(")[0], re.IGNORECASE)
+                         else "NONCLUSTERED",
+                         "columns": _column_list(lists[0]),
+                         "unique": bool(re.search(r"\bUNIQUE\b", body.split("(")[0], re.IGNORECASE))}
+                table["indexes"][index["name"].lower()] = index
+
+    def _column(self, text, masked, start, end, table=None):
+        """يحلل تعريف عمود وقيوده المضمنة (PRIMARY KEY, UNIQUE, DEFAULT, REFERENCES, CHECK)."""
+        item = masked[start:end]
+        head = re.match(rf"\s*({_IDENT})\s+(?:({_IDENT}(?:\s*\.\s*{_IDENT})?)\s*(\([^)]*\))?)?", item)
+        name = _unquote(text[start + head.start(1):start + head.end(1)])
+        column = {"name": name, "data_type": None, "length": "", "precision": None, "scale": None,
+                  "nullable": True, "primary_key": False}
+        pos = head.end()
+        type_text = text[start + head.start(2):start + head.end(2)] if head.group(2) else ""
+        if type_text and type_text.upper() != "AS":
+            args = text[start + head.start(3) + 1:start + head.end(3) - 1] if head.group(3) else ""
+            _, type_name = _split_name(type_text)
+            column["data_type"], column["length"], column["precision"], column["scale"] = \
+                _type_info(type_name, args)
+            if column["data_type"] == "timestamp":
+                column["nullable"] = False
+        else:
+            pos = head.start(2) if head.group(2) else pos  # عمود محسوب: AS (expression)
+            column["data_type"] = COMPUTED_DATA_TYPE
+
+        constraint_name = None
+        option = re.compile(
+            rf"\s*(?:(?P<constraint>CONSTRAINT\s+(?P<cname>{_IDENT}))|(?P<pk>PRIMARY\s+KEY(?:\s+(?:NON)?CLUSTERED)?)"
+            rf"|(?P<unique>UNIQUE(?:\s+(?:NON)?CLUSTERED)?)|(?P<notnull>NOT\s+NULL)|(?P<null>NULL)"
+            rf"|(?P<identity>IDENTITY)|(?P<default>DEFAULT)|(?P<references>(?:FOREIGN\s+KEY\s+)?REFERENCES\s+"
+            rf"(?P<ref>{_QUALIFIED}))|(?P<check>CHECK)|(?P<paren>\()|(?P<other>\S+))",
+            re.IGNORECASE)
+        while pos < len(item):
+            match = option.match(item, pos)
+            if match is None:
+                break
+            pos = match.end()
+            if match.group("constraint"):
+                constraint_name = _unquote(text[start + match.start("cname"):start + match.end("cname")])
+                continue
+            if match.group("pk"):
+                column["primary_key"] = True
+                column["nullable"] = False
+                if table is not None:
+                    table["pk"] = {"name": constraint_name, "columns": [name],
+                                   "clustered": "NONCLUSTERED" not in match.group("pk").upper()}
+            elif match.group("unique"):
+                if table is not None:
+                    table["uniques"].append({"name": constraint_name, "columns": [name],
+                                             "clustered": match.group("unique").upper().endswith(" CLUSTERED")})
+            elif match.group("notnull"):
+                column["nullable"] = False
+            elif match.group("identity"):
+                column["nullable"] = False
+                after = re.match(r"\s*\(", item[pos:])
+                if after:
+                    pos = _balanced(item, pos + after.end() - 1)
+            elif match.group("default"):
+                expression_start = pos + len(item[pos:]) - len(item[pos:].lstrip())
+                expression_end = _default_end(item, expression_start)
+                if table is not None:
+                    table["defaults"].append({"name": constraint_name, "column": name,
+                                              "expression": text[start + expression_start:start + expression_end]})
+                pos = expression_end
+            elif match.group("references"):
+                ref_schema, ref_table = _split_name(text[start + match.start("ref"):start + match.end("ref")])
+                ref_columns = []
+                after = re.match(r"\s*\(", item[pos:])
+                if after:
+                    closing = _balanced(item, pos + after.end() - 1)
+                    ref_columns = _column_list(text[start + pos + after.end():start + closing - 1])
+                    pos = closing
+                if table is not None:
+                    table["fks"].append({"name": constraint_name, "columns": [name],
+                                         "ref": owner_key(ref_schema, ref_table), "ref_columns": ref_columns})
+            elif match.group("check"):
+                after = re.match(r"\s*\(", item[pos:])
+                if after:
+                    opening = pos + after.end() - 1
+                    closing = _balanced(item, opening)
+                    if table is not None:
+                        table["checks"].append({"name": constraint_name,
+                                                "expression": text[start + opening + 1:start + closing - 1]})
+                    pos = closing
+            elif match.group("paren"):
+                pos = _balanced(item, match.start("paren"))
+            else:
+                continue
+            constraint_name = None
+        return column
+
+    def _create_index(self, kind, name, text, masked, pos, end, guarded):
+        target = re.compile(rf"\s*ON\s+(?P<table>{_QUALIFIED})\s*\(", re.IGNORECASE).match(masked, pos, end)
+        if target is None:
+            return pos
+        table = self.tables.get(owner_key(*_split_name(text[target.start("table"):target.end("table")])).lower())
+        closing = _balanced(masked, target.end() - 1)
+        columns = _column_list(text[target.end():closing - 1])
+        include = re.compile(r"\s*INCLUDE\s*\(", re.IGNORECASE).match(masked, closing, end)
+        if include:
+            include_end = _balanced(masked, include.end() - 1)
+            # STRING_AGG بترتيب key_ordinal: الأعمدة المضمنة (key_ordinal = 0) أولًا
+            columns = _column_list(text[include.end():include_end - 1]) + columns
+            closing = include_end
+        if table is None:
+            return closing
+        kind = " ".join(kind.split())
+        index_type = "CLUSTERED" if re.search(r"\bCLUSTERED\b", kind) and "NONCLUSTERED" not in kind \
+            else "NONCLUSTERED"
+        if "COLUMNSTORE" in kind:
+            index_type += " COLUMNSTORE"
+        key = name.lower()
+        if guarded and key in table["indexes"]:
+            return closing
+        table["indexes"][key] = {"name": name, "type": index_type, "columns": columns,
+                                 "unique": kind.startswith("UNIQUE")}
+        return closing
+
+    def _drop(self, kind, text, masked, name, end):
+        schema, object_name = _split_name(text[name.start("name"):name.end("name")])
+        if kind == "INDEX":
+            target = re.compile(rf"\s*ON\s+(?P<table>{_QUALIFIED})", re.IGNORECASE).match(masked, name.end(), end)
+            if target:
+                table_key = owner_key(*_split_name(text[target.start("table"):target.end("table")]))
+            else:
+                # الصيغة القديمة DROP INDEX table.index
+                parts = [_unquote(p) for p in _PART.findall(text[name.start("name"):name.end("name")])]
+                table_key, object_name = owner_key(*_split_name(".".join(parts[:-1]))), parts[-1]
+            table = self.tables.get(table_key.lower())
+            if table is not None:
+                table["indexes"].pop(object_name.lower(), None)
+        elif kind == "TABLE":
+            self.tables.pop(owner_key(schema, object_name).lower(), None)
+        else:
+            self.modules.pop(owner_key(schema, object_name).lower(), None)
+
+    # --- الوحدات البرمجية ---
+
+    def _module(self, kind, schema, name, text, masked, pos, start, end, source, replace):
+        key = owner_key(schema, name).lower()
+        existing = self.modules.get(key)
+        definition = text[start:end].strip("\r\n")
+        if existing is not None and not replace:
+            if existing["definition"].strip() != definition.strip():
+                self.warnings.append(f"{schema}.{name}: تعريف مختلف في {source} لم يُطبق (IF NOT EXISTS)؛ "
+                                     f"يبقى تعريف {existing['source']}")
+            return
+        module = {"kind": kind, "schema": schema, "name": name, "definition": definition,
+                  "source": source, "object_type": None, "table": None, "instead_of": False}
+        if kind.startswith("PROC"):
+            module["kind"] = "PROCEDURE"
+            module["object_type"] = "SQL_STORED_PROCEDURE"
+        elif kind == "FUNCTION":
+            returns = re.compile(r"\bRETURNS\s+(@\w+\s+)?(TABLE)?", re.IGNORECASE).search(masked, pos, end)
+            if returns and returns.group(2) and not returns.group(1):
+                module["object_type"] = "SQL_INLINE_TABLE_VALUED_FUNCTION"
+            elif returns and returns.group(2):
+                module["object_type"] = "SQL_TABLE_VALUED_FUNCTION"
+            else:
+                module["object_type"] = "SQL_SCALAR_FUNCTION"
+        elif kind == "TRIGGER":
+            target = re.compile(rf"\s*ON\s+(?P<table>{_QUALIFIED})\s+(?P<when>INSTEAD\s+OF|AFTER|FOR)?",
+                                re.IGNORECASE).match(masked, pos, end)
+            if target is None:
+                return
+            table_schema, table_name = _split_name(text[target.start("table"):target.end("table")])
+            # المشغل يأخذ مخطط جدوله
+            module["schema"] = table_schema
+            module["table"] = owner_key(table_schema, table_name)
+            module["instead_of"] = bool(target.group("when")) and target.group("when").upper().startswith("INSTEAD")
+            key = owner_key(table_schema, name).lower()
+        self.modules[key] = module
+
+    # --- بناء لقطة بنفس صيغة schema_cache ---
+
+    def section_rows(self):
+        """يعيد {رقم القسم: {owner_key: [rows]}} بنفس أعمدة وترتيب استعلامات الأقسام."""
+        sections = {number: {} for number in SECTION_COLUMNS}
+        tables = {key: table for key, table in self.tables.items()}
+
+        for table in tables.values():
+            owner = owner_key(table["schema"], table["name"])
+            pk_columns = {c.lower() for c in table["pk"]["columns"]} if table["pk"] else set()
+            references = {}
+            for fk in table["fks"]:
+                referenced = tables.get(fk["ref"].lower())
+                # استعلام القسم 1 يعرض فقط المفاتيح الأجنبية التي تشير إلى مفتاح أساسي
+                if referenced is None or referenced["pk"] is None:
+                    continue
+                ref_columns = fk["ref_columns"] or referenced["pk"]["columns"]
+                if [c.lower() for c in ref_columns] != [c.lower() for c in referenced["pk"]["columns"]]:
+                    continue
+                for column, ref_column in zip(fk["columns"], ref_columns):
+                    references.setdefault(column.lower(), (referenced["name"], ref_column))
+            rows = []
+            for column in table["columns"]:
+                is_pk = column["primary_key"] or column["name"].lower() in pk_columns
+                reference = references.get(column["name"].lower())
+                rows.append([table["schema"], table["name"], column["name"], column["data_type"],
+                             column["length"], column["precision"], column["scale"],
+                             "NO" if (not column["nullable"] or is_pk) else "YES",
+                             "YES" if is_pk else "NO", "YES" if reference else "NO",
+                             reference[0] if reference else None, reference[1] if reference else None])
+            sections[1][owner] = rows
+
+            indexes = []
+            if table["pk"]:
+                indexes.append([table["pk"]["name"] or f"PK__{table['name']}__auto",
+                                "CLUSTERED" if table["pk"]["clustered"] else "NONCLUSTERED",
+                                table["pk"]["columns"], "YES"])
+            for unique in table["uniques"]:
+                indexes.append([unique["name"] or f"UQ__{table['name']}__{'_'.join(unique['columns'])}__auto",
+                                "CLUSTERED" if unique["clustered"] else "NONCLUSTERED",
+                                unique["columns"], "YES"])
+            for index in table["indexes"].values():
+                indexes.append([index["name"], index["type"], index["columns"],
+                                "YES" if index["unique"] else "NO"])
+            if indexes:
+                sections[2][owner] = sorted(
+                    ([table["schema"], table["name"], name, index_type, ", ".join(columns), unique]
+                     for name, index_type, columns, unique in indexes),
+                    key=lambda row: row[2].casefold())
+
+            constraints = [[unique["name"] or f"UQ__{table['name']}__{'_'.join(unique['columns'])}__auto",
+                            "UNIQUE_CONSTRAINT", None] for unique in table["uniques"]]
+            constraints += [[check["name"] or f"CK__{table['name']}__auto", "CHECK_CONSTRAINT",
+                             normalize_check(check["expression"])] for check in table["checks"]]
+            constraints += [[default["name"] or f"DF__{table['name']}__{default['column']}__auto",
+                             "DEFAULT_CONSTRAINT", normalize_default(default["expression"])]
+                            for default in table["defaults"]]
+            if constraints:
+                sections[6][owner] = sorted(
+                    ([table["schema"], table["name"]] + row for row in constraints),
+                    key=lambda row: (row[3], row[2].casefold()))
+
+        for module in self.modules.values():
+            digest = definition_hash(module["definition"])
+            owner = owner_key(module["schema"], module["name"])
+            if module["kind"] == "PROCEDURE":
+                sections[3][owner] = [[module["schema"], module["name"], module["object_type"], None, digest]]
+            elif module["kind"] == "FUNCTION":
+                sections[4][owner] = [[module["schema"], module["name"], module["object_type"], None, digest]]
+            elif module["kind"] == "VIEW":
+                sections[5][owner] = [[module["schema"], module["name"], None, digest]]
+            elif module["kind"] == "TRIGGER" and module["table"].lower() in tables:
+                table = tables[module["table"].lower()]
+                rows = sections[7].setdefault(owner_key(table["schema"], table["name"]), [])
+                rows.append([table["schema"], table["name"], module["name"],
+                             "INSTEAD OF" if module["instead_of"] else "AFTER", False, None, digest])
+                rows.sort(key=lambda row: row[2].casefold())
+        return sections
+
+    def schema_move_warnings(self):
+        """جداول بالاسم نفسه في أكثر من مخطط (مثل settings.Users و security.Users)."""
+        by_name = {}
+        for table in self.tables.values():
+            by_name.setdefault(table["name"].lower(), []).append(table)
+        warnings = []
+        for tables in by_name.values():
+            if len(tables) > 1:
+                listed = "، ".join(f"{t['schema']}.{t['name']} ({t['source']})" for t in tables)
+                warnings.append(f"الجدول نفسه معرف في أكثر من مخطط: {listed}")
+        return warnings
+
+
+def _depth_at(text, pos):
+    return text.count("(", 0, pos) - text.count(")", 0, pos)
+
+
+def _default_end(item, pos):
+    """نهاية تعبير DEFAULT: قوس متوازن، أو نص حرفي، أو كلمة مع استدعاء اختياري."""
+    if pos >= len(item):
+        return pos
+    if item[pos] == "(":
+        return _balanced(item, pos)
+    literal = re.match(r"N?'", item[pos:])
+    if literal:
+        close = item.find("'", pos + literal.end())
+        return len(item) if close == -1 else close + 1
+    word = re.match(r"[-+]?[\w.]+", item[pos:])
+    end = pos + (word.end() if word else 1)
+    call = re.match(r"\s*\(", item[end:])
+    if word and call and not re.fullmatch(r"[-+]?[\d.]+", word.group(0)):
+        end = _balanced(item, end + call.end() - 1)
+    return end
+
+
+def _drop_from_table(table, name):
+    lowered = name.lower()
+    table["columns"] = [c for c in table["columns"] if c["name"].lower() != lowered]
+    table["uniques"] = [u for u in table["uniques"] if (u["name"] or "").lower() != lowered]
+    table["fks"] = [f for f in table["fks"] if (f["name"] or "").lower() != lowered]
+    table["checks"] = [c for c in table["checks"] if (c["name"] or "").lower() != lowered]
+    table["defaults"] = [d for d in table["defaults"] if (d["name"] or "").lower() != lowered]
+    if table["pk"] and (table["pk"]["name"] or "").lower() == lowered:
+        table["pk"] = None
+
+
+def _table_signature(table):
+    return [(c["name"].lower(), c["data_type"], c["length"], c["precision"], c["scale"], c["nullable"])
+            for c in table["columns"]]
+
+
+def parse_scripts(paths=None):
+    """يحلل السكربتات بالترتيب ويعيد SchemaModel."""
+    model = SchemaModel()
+    for path in paths or DEFAULT_SCRIPTS:
+        model.parse_file(path)
+    model.warnings.extend(model.schema_move_warnings())
+    return model
+
+
+def build_offline_snapshot(sections, paths=None):
+    """
+    يبني لقطة مخطط من السكربتات بنفس بنية schema_cache.build_snapshot، فتُطبع بـ
+    snapshot_rows وتُقارن بـ diff_snapshots كأي لقطة حية.
+    """
+    paths = paths or DEFAULT_SCRIPTS
+    model = parse_scripts(paths)
+    rows = model.section_rows()
+    snapshot = {
+        "version": schema_cache.SNAPSHOT_FORMAT_VERSION,
+        "fingerprint": schema_cache.sections_fingerprint(sections),
+        "identity": "scripts:" + ",".join(os.path.basename(path) for path in paths),
+        "objects": {},
+        "sections": {},
+        "warnings": model.warnings,
+        "refreshed_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    for section in sections:
+        snapshot["sections"][str(section.number)] = {"columns": SECTION_COLUMNS[section.number],
+                                                     "owners": rows.get(section.number, {})}
+    return snapshot
+
+
+def _normalized_row(columns, row, ignored):
+    values = []
+    for column, value in zip(columns, row):
+        if column in ignored:
+            continue
+        if column in ("IndexName", "ConstraintName") and isinstance(value, str):
+            auto = _AUTO_NAME.match(value)
+            if auto:
+                value = f"{auto.group(1)}__(auto)"
+        if isinstance(value, str) and column != "ConstraintDefinition":
+            value = value.casefold()
+        values.append("" if value is None else str(value))
+    return tuple(values)
+
+
+def _format_row(columns, row, ignored):
+    return ", ".join(str(value) for column, value in zip(columns[2:], row[2:])
+                     if column not in ignored and value not in (None, ""))
+
+
+def diff_snapshots(left, right, ignored_columns=DIFF_IGNORED_COLUMNS, left_label="السكربتات",
+                   right_label="الخادم"):
+    """
+    يقارن لقطتي مخطط (من السكربتات أو من الخادم) ويعيد صفوف
+    [Section, ObjectName, Change, Detail] مرتبة حسب القسم ثم الكائن.
+
+    أسماء القيود المولدة تلقائيًا (PK__Users__3214EC07...) تُقارن كنوعها فقط، والجداول
+    الموجودة في طرف واحد بالاسم نفسه في مخطط آخر تُعرض كنقل محتمل مع فروق أعمدتها.
+    """
+    ignored = set(ignored_columns or ())
+    result = []
+    only_left_tables, only_right_tables = {}, {}
+    for number in sorted(set(left["sections"]) | set(right["sections"]), key=int):
+        left_section = left["sections"].get(number, {"columns": [], "owners": {}})
+        right_section = right["sections"].get(number, {"columns": [], "owners": {}})
+        columns = left_section["columns"] or right_section["columns"]
+        left_owners = {key.lower(): (key, rows) for key, rows in left_section["owners"].items()}
+        right_owners = {key.lower(): (key, rows) for key, rows in right_section["owners"].items()}
+        for key in sorted(set(left_owners) | set(right_owners), key=owner_sort_key):
+            if key not in right_owners:
+                name, rows = left_owners[key]
+                if number == "1":
+                    only_left_tables[key] = rows
+                else:
+                    result.append([int(number), name, f"في {left_label} فقط", f"{len(rows)} صف"])
+                continue
+            if key not in left_owners:
+                name, rows = right_owners[key]
+                if number == "1":
+                    only_right_tables[key] = rows
+                else:
+                    result.append([int(number), name, f"في {right_label} فقط", f"{len(rows)} صف"])
+                continue
+            name, left_rows = left_owners[key]
+            _, right_rows = right_owners[key]
+            left_rows, right_rows = _mask_computed(columns, left_rows, right_rows)
+            left_counts = Counter(_normalized_row(columns, row, ignored) for row in left_rows)
+            right_counts = Counter(_normalized_row(columns, row, ignored) for row in right_rows)
+            if left_counts == right_counts:
+                continue
+            missing = left_counts - right_counts
+            extra = right_counts - left_counts
+            details = [f"{left_label}: {_format_row(columns, row, ignored)}" for row in left_rows
+                       if missing[_normalized_row(columns, row, ignored)]]
+            details += [f"{right_label}: {_format_row(columns, row, ignored)}" for row in right_rows
+                        if extra[_normalized_row(columns, row, ignored)]]
+            result.append([int(number), name, "مختلف", " | ".join(details)])
+
+    result.extend(_table_moves(only_left_tables, only_right_tables, left_label, right_label))
+    result.sort(key=lambda row: (row[0], owner_sort_key(row[1])))
+    return result
+
+
+def _mask_computed(columns, left_rows, right_rows):
+    """يوحد أعمدة النوع وقابلية NULL للأعمدة المحسوبة في الطرفين قبل المقارنة."""
+    if "DATA_TYPE" not in columns:
+        return left_rows, right_rows
+    name_index, type_index = columns.index("COLUMN_NAME"), columns.index("DATA_TYPE")
+    computed = {row[name_index].lower() for row in list(left_rows) + list(right_rows)
+                if row[type_index] == COMPUTED_DATA_TYPE}
+    if not computed:
+        return left_rows, right_rows
+    positions = [columns.index(column) for column in _INFERRED_COLUMNS if column in columns]
+
+    def mask(rows):
+        masked = []
+        for row in rows:
+            if row[name_index].lower() in computed:
+                row = list(row)
+                for position in positions:
+                    row[position] = COMPUTED_DATA_TYPE if position == type_index else None
+            masked.append(row)
+        return masked
+
+    return mask(left_rows), mask(right_rows)
+
+
+def _table_moves(only_left, only_right, left_label, right_label):
+    """يطابق الجداول الموجودة في طرف واحد بالاسم نفسه في مخطط آخر (settings.Users ↔ security.Users)."""
+    def by_name(tables):
+        grouped = {}
+        for key, rows in tables.items():
+            grouped.setdefault(key.partition(".")[2], []).append((key, rows))
+        return grouped
+
+    def columns_of(rows):
+        return {row[2].lower(): (row[2], row[3], row[4], row[7]) for row in rows}
+
+    result = []
+    left_names, right_names = by_name(only_left), by_name(only_right)
+    for name in set(left_names) | set(right_names):
+        lefts, rights = left_names.get(name, []), right_names.get(name, [])
+        for key, rows in lefts:
+            title = f"{rows[0][0]}.{rows[0][1]}"
+            if not rights:
+                result.append([1, title, f"في {left_label} فقط", f"{len(rows)} عمود"])
+                continue
+            for other_key, other_rows in rights:
+                left_columns, right_columns = columns_of(rows), columns_of(other_rows)
+                details = [f"-{left_columns[c][0]}" for c in left_columns if c not in right_columns]
+                details += [f"+{right_columns[c][0]}" for c in right_columns if c not in left_columns]
+                details += [f"{left_columns[c][0]}: {' '.join(str(v) for v in left_columns[c][1:] if v)} → "
+                            f"{' '.join(str(v) for v in right_columns[c][1:] if v)}"
+                            for c in left_columns if c in right_columns and left_columns[c] != right_columns[c]]
+                result.append([1, title, f"نُقل إلى {other_rows[0][0]}.{other_rows[0][1]}؟",
+                               "; ".join(details) or "الأعمدة متطابقة"])
+        if not lefts:
+            for key, rows in rights:
+                result.append([1, f"{rows[0][0]}.{rows[0][1]}", f"في {right_label} فقط", f"{len(rows)} عمود"])
+    return result
@@ -0,0 +1,359 @@
+import datetime
+import decimal
+import json
+import os
+
+# إحصاءات DMV تبدأ من آخر تشغيل للخادم؛ مدة التشغيل تحوّل العدادات إلى معدلات يومية
+SERVER_INFO_QUERY = """
+SELECT sqlserver_start_time AS ServerStartTime, SYSDATETIME() AS CapturedAt
+FROM sys.dm_os_sys_info;
+"""
+
+MISSING_INDEXES_QUERY = """
+SELECT
+    OBJECT_SCHEMA_NAME(mid.object_id, mid.database_id) AS TableSchema,
+    OBJECT_NAME(mid.object_id, mid.database_id) AS TableName,
+    mid.equality_columns AS EqualityColumns,
+    mid.inequality_columns AS InequalityColumns,
+    mid.included_columns AS IncludedColumns,
+    migs.user_seeks AS UserSeeks,
+    migs.user_scans AS UserScans,
+    migs.avg_total_user_cost AS AvgTotalUserCost,
+    migs.avg_user_impact AS AvgUserImpact
+FROM
+    sys.dm_db_missing_index_details AS mid
+INNER JOIN
+    sys.dm_db_missing_index_groups AS mig ON mig.index_handle = mid.index_handle
+INNER JOIN
+    sys.dm_db_missing_index_group_stats AS migs ON migs.group_handle = mig.index_group_handle
+WHERE
+    mid.database_id = DB_ID();
+"""
+
+# كل فهارس المستخدم، حتى التي لم تُستخدم منذ التشغيل (لا صف لها في usage_stats)
+INDEX_USAGE_QUERY = """
+SELECT
+    SCHEMA_NAME(t.schema_id) AS TableSchema,
+    t.name AS TableName,
+    i.name AS IndexName,
+    i.type_desc AS IndexType,
+    i.is_primary_key AS IsPrimaryKey,
+    i.is_unique AS IsUnique,
+    ISNULL(us.user_seeks, 0) AS UserSeeks,
+    ISNULL(us.user_scans, 0) AS UserScans,
+    ISNULL(us.user_lookups, 0) AS UserLookups,
+    ISNULL(us.user_updates, 0) AS UserUpdates,
+    ISNULL(ps.UsedPages, 0) AS UsedPages
+FROM
+    sys.indexes AS i
+INNER JOIN
+    sys.tables AS t ON t.object_id = i.object_id
+LEFT JOIN
+    sys.dm_db_index_usage_stats AS us
+        ON us.database_id = DB_ID() AND us.object_id = i.object_id AND us.index_id = i.index_id
+LEFT JOIN (
+    SELECT object_id, index_id, SUM(used_page_count) AS UsedPages
+    FROM sys.dm_db_partition_stats
+    GROUP BY object_id, index_id
+) AS ps ON ps.object_id = i.object_id AND ps.index_id = i.index_id
+WHERE
+    t.is_ms_shipped = 0
+    AND i.index_id > 0;
+"""
+
+# وضع LIMITED يقرأ صفحات المستوى الأعلى فقط، فيبقى خفيفًا على الجداول الكبيرة
+FRAGMENTATION_QUERY = """
+SELECT
+    SCHEMA_NAME(t.schema_id) AS TableSchema,
+    t.name AS TableName,
+    i.name AS IndexName,
+    ps.index_type_desc AS IndexType,
+    ps.avg_fragmentation_in_percent AS FragmentationPercent,
+    ps.page_count AS PageCount
+FROM
+    sys.dm_db_index_physical_stats(DB_ID(), NULL, NULL, NULL, 'LIMITED') AS ps
+INNER JOIN
+    sys.indexes AS i ON i.object_id = ps.object_id AND i.index_id = ps.index_id
+INNER JOIN
+    sys.tables AS t ON t.object_id = ps.object_id
+WHERE
+    ps.index_id > 0
+    AND ps.alloc_unit_type_desc = 'IN_ROW_DATA'
+    AND t.is_ms_shipped = 0;
+"""
+
+# أعلى الاستعلامات بالمعالج أو بالقراءات في هذه القاعدة، مع مجاميعها الكلية لحساب النسب
+TOP_QUERIES_QUERY = """
+WITH DatabaseStats AS (
+    SELECT
+        qs.*,
+        SUM(qs.total_worker_time) OVER () AS AllWorkerTime,
+        SUM(qs.total_logical_reads) OVER () AS AllLogicalReads,
+        ROW_NUMBER() OVER (ORDER BY qs.total_worker_time DESC) AS CpuRank,
+        ROW_NUMBER() OVER (ORDER BY qs.total_logical_reads DESC) AS ReadsRank
+    FROM
+        sys.dm_exec_query_stats AS qs
+    CROSS APPLY
+        sys.dm_exec_plan_attributes(qs.plan_handle) AS pa
+    WHERE
+        pa.attribute = 'dbid' AND CONVERT(INT, pa.value) = DB_ID()
+)
+SELECT
+    ds.execution_count AS ExecutionCount,
+    ds.total_worker_time AS TotalWorkerTime,
+    ds.total_logical_reads AS TotalLogicalReads,
+    ds.total_elapsed_time AS TotalElapsedTime,
+    ds.AllWorkerTime,
+    ds.AllLogicalReads,
+    OBJECT_SCHEMA_NAME(st.objectid, st.dbid) + '.' + OBJECT_NAME(st.objectid, st.dbid) AS ObjectName,
+    SUBSTRING(st.text, ds.statement_start_offset / 2 + 1,
+        (CASE ds.statement_end_offset WHEN -1 THEN DATALENGTH(st.text)
+         ELSE ds.statement_end_offset END - ds.statement_start_offset) / 2 + 1) AS StatementText
+FROM
+    DatabaseStats AS ds
+CROSS APPLY
+    sys.dm_exec_sql_text(ds.sql_handle) AS st
+WHERE
+    ds.CpuRank <= ? OR ds.ReadsRank <= ?;
+"""
+
+DMV_QUERIES = {
+    "missing_indexes": MISSING_INDEXES_QUERY,
+    "index_usage": INDEX_USAGE_QUERY,
+    "fragmentation": FRAGMENTATION_QUERY,
+    "top_queries": TOP_QUERIES_QUERY,
+}
+
+DEFAULT_TOP_QUERIES = 20
+
+# الفهارس الأصغر من 1000 صفحة (~8 MB) لا تستفيد عمليًا من إعادة البناء
+FRAGMENTATION_MIN_PAGES = 1000
+REORGANIZE_THRESHOLD = 5.0
+REBUILD_THRESHOLD = 30.0
+
+STATEMENT_PREVIEW_LENGTH = 200
+
+
+def _json_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return value
+
+
+def collect(cursor, top=DEFAULT_TOP_QUERIES):
+    """
+    يجمع نتائج استعلامات DMV الخام في قاموس قابل للحفظ كـ JSON (انظر save_fixtures).
+
+    يتطلب صلاحية VIEW SERVER STATE (أو VIEW DATABASE STATE لإحصاءات الفهارس).
+    """
+    cursor.execute(SERVER_INFO_QUERY)
+    start_time, captured_at = cursor.fetchone()
+    snapshot = {"server_start_time": _json_value(start_time), "captured_at": _json_value(captured_at)}
+    for name, query in DMV_QUERIES.items():
+        if name == "top_queries":
+            cursor.execute(query, top, top)
+        else:
+            cursor.execute(query)
+        columns = [column[0] for column in cursor.description]
+        snapshot[name] = {"columns": columns,
+                          "rows": [[_json_value(value) for value in row] for row in cursor.fetchall()]}
+    return snapshot
+
+
+def save_fixtures(snapshot, path):
+    """يحفظ نتائج DMV المسجلة بشكل ذري لإعادة تحليلها لاحقًا دون خادم."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def load_fixtures(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _records(snapshot, name):
+    section = snapshot.get(name) or {"columns": [], "rows": []}
+    return [dict(zip(section["columns"], row)) for row in section["rows"]]
+
+
+def uptime_days(snapshot):
+    """مدة تجميع الإحصاءات بالأيام (يوم واحد على الأقل حتى لا تتضخم المعدلات بعد إعادة التشغيل)."""
+    try:
+        start = datetime.datetime.fromisoformat(snapshot["server_start_time"])
+        captured = datetime.datetime.fromisoformat(snapshot["captured_at"])
+    except (KeyError, TypeError, ValueError):
+        return 1.0
+    return max((captured - start).total_seconds() / 86400, 1.0)
+
+
+def _split_columns(text):
+    # أعمدة DMV بصيغة "[CompanyId], [InvoiceDate]"
+    return [column.strip().strip("[]") for column in text.split(",")] if text else []
+
+
+def _index_name(record):
+    return f"{record['TableSchema']}.{record['TableName']}.{record['IndexName']}"
+
+
+def _size_mb(pages):
+    return round((pages or 0) * 8 / 1024, 2)
+
+
+def rank_missing_indexes(snapshot):
+    """
+    يرتب اقتراحات الفهارس الناقصة حسب مقياس التحسين المعتاد:
+    avg_total_user_cost × avg_user_impact% × (seeks + scans).
+
+    الاقتراح الذي تكون أعمدة مفتاحه بادئة لاقتراح آخر على الجدول نفسه (وأعمدته المضمنة
+    مغطاة به) يُدمج فيه: فهرس واحد يخدم الطلبين، ويُضاف أثره إلى أثر الأشمل.
+    """
+    days = uptime_days(snapshot)
+    suggestions = []
+    for record in _records(snapshot, "missing_indexes"):
+        keys = _split_columns(record["EqualityColumns"]) + _split_columns(record["InequalityColumns"])
+        requests = (record["UserSeeks"] or 0) + (record["UserScans"] or 0)
+        impact = (record["AvgTotalUserCost"] or 0) * (record["AvgUserImpact"] or 0) / 100 * requests
+        suggestions.append({
+            "table": f"{record['TableSchema']}.{record['TableName']}",
+            "keys": keys,
+            "included": _split_columns(record["IncludedColumns"]),
+            "requests": requests,
+            "avg_user_impact": record["AvgUserImpact"] or 0,
+            "impact": impact,
+        })
+
+    # الأطول مفتاحًا أولًا حتى يُدمج كل اقتراح في أشمل اقتراح يغطيه
+    suggestions.sort(key=lambda s: (s["table"], -len(s["keys"]), -s["impact"]))
+    merged = []
+    for suggestion in suggestions:
+        target = next((m for m in merged
+                       if m["table"] == suggestion["table"]
+                       and m["keys"][:len(suggestion["keys"])] == suggestion["keys"]
+                       and set(suggestion["included"]) <= set(m["keys"]) | set(m["included"])), None)
+        if target is None:
+            merged.append(dict(suggestion, merged=0))
+        else:
+            target["impact"] += suggestion["impact"]
+            target["requests"] += suggestion["requests"]
+            target["merged"] += 1
+
+    merged.sort(key=lambda s: -s["impact"])
+    columns = ["Rank", "TableName", "KeyColumns", "IncludedColumns", "Requests", "AvgUserImpact",
+               "EstimatedImpact", "ImpactPerDay", "MergedSuggestions", "SuggestedIndex"]
+    rows = []
+    for rank, s in enumerate(merged, 1):
+        table_name = s["table"].split(".", 1)[1]
+        name = f"IX_{table_name}_{'_'.join(s['keys'])}"
+        statement = f"CREATE NONCLUSTERED INDEX [{name}] ON {s['table']} ({', '.join(s['keys'])})"
+        if s["included"]:
+            statement += f" INCLUDE ({', '.join(s['included'])})"
+        rows.append((rank, s["table"], ", ".join(s["keys"]), ", ".join(s["included"]), s["requests"],
+                     round(s["avg_user_impact"], 1), round(s["impact"], 1), round(s["impact"] / days, 1),
+                     s["merged"], statement + ";"))
+    return columns, rows
+
+
+def rank_index_usage(snapshot):
+    """
+    الفهارس غير العنقودية التي تكلف تحديثات أكثر مما توفر من قراءات، مرتبة حسب
+    التحديثات الزائدة يوميًا. المفاتيح الأساسية والفهارس الفريدة تُستثنى لأنها تفرض قيودًا.
+    """
+    days = uptime_days(snapshot)
+    candidates = []
+    for record in _records(snapshot, "index_usage"):
+        if record["IndexType"] != "NONCLUSTERED" or record["IsPrimaryKey"] or record["IsUnique"]:
+            continue
+        reads = record["UserSeeks"] + record["UserScans"] + record["UserLookups"]
+        writes = record["UserUpdates"]
+        if writes <= reads:
+            continue
+        if reads == 0:
+            recommendation = "غير مستخدم منذ تشغيل الخادم: مرشح للحذف"
+        else:
+            recommendation = "تكلفة التحديث أعلى من الفائدة: راجع الحاجة إليه أو ادمجه"
+        candidates.append((_index_name(record), reads, writes, _size_mb(record["UsedPages"]),
+                           (writes - reads) / days, recommendation))
+
+    candidates.sort(key=lambda c: (-c[4], -c[3]))
+    columns = ["Rank", "IndexName", "Reads", "Writes", "SizeMB", "EstimatedImpact", "Recommendation"]
+    rows = [(rank, name, reads, writes, size, round(impact, 1), recommendation)
+            for rank, (name, reads, writes, size, impact, recommendation) in enumerate(candidates, 1)]
+    return columns, rows
+
+
+def rank_fragmentation(snapshot):
+    """
+    حجم وتجزئة كل فهرس، مرتبة حسب الصفحات المهدرة تقديريًا (الصفحات × نسبة التجزئة):
+    إعادة التنظيم بين 5% و 30%، وإعادة البناء فوق 30%، للفهارس من 1000 صفحة فأكثر.
+    """
+    entries = []
+    for record in _records(snapshot, "fragmentation"):
+        fragmentation = record["FragmentationPercent"] or 0
+        pages = record["PageCount"] or 0
+        if pages < FRAGMENTATION_MIN_PAGES:
+            recommendation = "لا حاجة (فهرس صغير)"
+        elif fragmentation >= REBUILD_THRESHOLD:
+            recommendation = "ALTER INDEX ... REBUILD"
+        elif fragmentation >= REORGANIZE_THRESHOLD:
+            recommendation = "ALTER INDEX ... REORGANIZE"
+        else:
+            recommendation = "لا حاجة"
+        impact = pages * fragmentation / 100 if pages >= FRAGMENTATION_MIN_PAGES else 0.0
+        entries.append((_index_name(record), record["IndexType"], round(fragmentation, 1), pages,
+                        _size_mb(pages), impact, recommendation))
+
+    entries.sort(key=lambda e: (-e[5], -e[3], e[0]))
+    columns = ["Rank", "IndexName", "IndexType", "FragmentationPercent", "PageCount", "SizeMB",
+               "EstimatedImpact", "Recommendation"]
+    rows = [(rank, name, index_type, fragmentation, pages, size, round(impact, 1), recommendation)
+            for rank, (name, index_type, fragmentation, pages, size, impact, recommendation)
+            in enumerate(entries, 1)]
+    return columns, rows
+
+
+def rank_top_queries(snapshot):
+    """
+    أثقل الاستعلامات في القاعدة: الأثر التقديري هو متوسط حصتها من زمن المعالج ومن
+    القراءات المنطقية لكل الاستعلامات المخزنة خططها.
+    """
+    entries = []
+    for record in _records(snapshot, "top_queries"):
+        executions = record["ExecutionCount"] or 1
+        cpu_share = 100 * record["TotalWorkerTime"] / record["AllWorkerTime"] if record["AllWorkerTime"] else 0
+        reads_share = (100 * record["TotalLogicalReads"] / record["AllLogicalReads"]
+                       if record["AllLogicalReads"] else 0)
+        statement = " ".join((record["StatementText"] or "").split())
+        if len(statement) > STATEMENT_PREVIEW_LENGTH:
+            statement = statement[:STATEMENT_PREVIEW_LENGTH] + "..."
+        entries.append((record["ObjectName"] or "(ad hoc)", record["ExecutionCount"],
+                        round(cpu_share, 1), round(reads_share, 1),
+                        # total_worker_time بالميكروثانية
+                        round(record["TotalWorkerTime"] / executions / 1000, 2),
+                        round(record["TotalLogicalReads"] / executions, 1),
+                        (cpu_share + reads_share) / 2, statement))
+
+    entries.sort(key=lambda e: -e[6])
+    columns = ["Rank", "ObjectName", "Executions", "CpuPercent", "ReadsPercent", "AvgCpuMs",
+               "AvgLogicalReads", "EstimatedImpact", "Statement"]
+    rows = [(rank,) + entry[:6] + (round(entry[6], 1), entry[7]) for rank, entry in enumerate(entries, 1)]
+    return columns, rows
+
+
+# أقسام التقرير بالترتيب: (العنوان، دالة الترتيب)
+ADVISOR_SECTIONS = [
+    ("الفهارس الناقصة المقترحة", rank_missing_indexes),
+    ("استخدام الفهارس مقابل تكلفة التحديث", rank_index_usage),
+    ("تجزئة وحجم الفهارس", rank_fragmentation),
+    ("أثقل الاستعلامات (المعالج والقراءات)", rank_top_queries),
+]
+
+
+def analyze(snapshot):
+    """يعيد [(العنوان، الأعمدة، الصفوف)] لكل أقسام التقرير من لقطة DMV حية أو مسجلة."""
+    return [(title, *rank(snapshot)) for title, rank in ADVISOR_SECTIONS]
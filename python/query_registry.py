@@ -0,0 +1,278 @@
+import argparse
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import instrumentation
+from test import FETCH_BATCH_SIZE, _pyodbc, connect_to_database, print_result
+
+# استعلام مسمى: ttl مدة صلاحية نتيجته بالثواني (0 = بلا تخزين)، و tables الجداول والمشاهدات
+# التي يعتمد عليها، وتُستخدم لإبطال نتائجه عند تغيرها.
+NamedQuery = namedtuple("NamedQuery", ["name", "sql", "ttl", "tables"])
+
+# استعلامات لوحة القيادة على مشاهدات create_views.sql، مع الجداول الأساسية لكل مشاهدة
+DASHBOARD_QUERIES = [
+    NamedQuery(
+        "dashboard.kpis",
+        "SELECT * FROM sales.vw_DashboardKPIs WHERE CompanyId = ?;",
+        60,
+        ("sales.vw_DashboardKPIs", "sales.Invoices", "inventory.Products"),
+    ),
+    NamedQuery(
+        "dashboard.restock",
+        "SELECT * FROM inventory.vw_ProductDetails WHERE NeedsRestock = 1 AND CompanyId = ?;",
+        120,
+        ("inventory.vw_ProductDetails", "inventory.Products", "inventory.Categories"),
+    ),
+    NamedQuery(
+        "dashboard.balances",
+        "SELECT * FROM accounting.vw_AccountBalances WHERE CompanyId = ? AND Balance != 0;",
+        300,
+        ("accounting.vw_AccountBalances", "accounting.ChartOfAccounts",
+         "accounting.JournalEntries", "accounting.JournalEntryDetails"),
+    ),
+]
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+# تقدير تقريبي لحجم الصف في الذاكرة: غلاف الصف + لكل قيمة
+_ROW_OVERHEAD = 64
+_VALUE_OVERHEAD = 32
+
+
+def estimate_size(columns, rows):
+    """تقدير حجم النتيجة بالبايت (يكفي للمقارنة مع حد الذاكرة، وليس قياسًا دقيقًا)."""
+    size = sum(len(column) for column in columns) + _ROW_OVERHEAD
+    for row in rows:
+        size += _ROW_OVERHEAD
+        for value in row:
+            size += _VALUE_OVERHEAD
+            if isinstance(value, (str, bytes)):
+                size += len(value)
+    return size
+
+
+class _CacheEntry:
+    __slots__ = ("columns", "rows", "expires_at", "size", "tables")
+
+    def __init__(self, columns, rows, expires_at, size, tables):
+        self.columns = columns
+        self.rows = rows
+        self.expires_at = expires_at
+        self.size = size
+        self.tables = tables
+
+
+class ResultCache:
+    """
+    ذاكرة نتائج بصلاحية زمنية لكل عنصر وإخراج الأقدم استخدامًا (LRU) عند تجاوز حد الحجم.
+
+    Args:
+        max_bytes (int): الحد الأقصى للحجم التقديري لكل النتائج المخزنة.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # الأحدث استخدامًا في النهاية
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0,
+                       "invalidations": 0, "oversize": 0}
+
+    def get(self, key):
+        """يعيد (الأعمدة، الصفوف) أو None إن لم توجد نتيجة صالحة."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove_locked(key)
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry.columns, entry.rows
+
+    def put(self, key, columns, rows, ttl, tables=()):
+        size = estimate_size(columns, rows)
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+            if size > self.max_bytes:
+                self._stats["oversize"] += 1
+                return
+            while self._bytes + size > self.max_bytes:
+                self._remove_locked(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+            self._entries[key] = _CacheEntry(columns, rows, time.monotonic() + ttl, size,
+                                             frozenset(table.casefold() for table in tables))
+            self._bytes += size
+
+    def invalidate(self, schema=None, table=None):
+        """
+        يحذف النتائج المعتمدة على جدول أو على أي كائن في مخطط؛ بدون معاملات يُفرغ كل
+        الذاكرة. المقارنة غير حساسة لحالة الأحرف كأسماء SQL Server. يعيد عدد النتائج المحذوفة.
+
+        Args:
+            schema (str): المخطط؛ وحده يبطل كل كائنات المخطط، ومع table يحدد الجدول.
+            table (str): اسم الجدول كاملًا (schema.table)، أو دون مخطط إذا مُرر schema.
+        """
+        if schema and table:
+            table, schema = f"{schema}.{table}", None
+        table = table.casefold() if table else None
+        prefix = f"{schema.casefold()}." if schema else None
+        with self._lock:
+            keys = [key for key, entry in self._entries.items()
+                    if (table is None and prefix is None)
+                    or (table is not None and table in entry.tables)
+                    or (prefix is not None and any(name.startswith(prefix) for name in entry.tables))]
+            for key in keys:
+                self._remove_locked(key)
+            self._stats["invalidations"] += len(keys)
+            return len(keys)
+
+    def _remove_locked(self, key):
+        self._bytes -= self._entries.pop(key).size
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), bytes=self._bytes,
+                         max_bytes=self.max_bytes)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+class QueryRegistry:
+    """
+    سجل استعلامات مسماة ومعاملاتها على اتصال واحد، خلف ذاكرة نتائج.
+
+    لكل استعلام مؤشر خاص به على الاتصال: pyodbc يحضّر الجملة (SQLPrepare) عند أول تنفيذ
+    ويعيد استخدامها ما دام نص الاستعلام على المؤشر نفسه لم يتغير، فتُحضَّر كل جملة مرة
+    واحدة لكل اتصال مهما تغيرت المعاملات.
+
+    Args:
+        cnxn: اتصال قاعدة البيانات.
+        queries (list): استعلامات NamedQuery تُسجل مباشرة.
+        cache (ResultCache): ذاكرة النتائج؛ تُنشأ بحجم max_bytes إن لم تُمرر.
+        max_bytes (int): حد حجم الذاكرة الافتراضية.
+    """
+
+    def __init__(self, cnxn, queries=(), cache=None, max_bytes=DEFAULT_CACHE_BYTES):
+        self.cnxn = cnxn
+        self.cache = cache or ResultCache(max_bytes)
+        self._queries = {}
+        self._cursors = {}
+        # الاتصال الواحد لا يُستخدم من عدة خيوط في الوقت نفسه
+        self._execute_lock = threading.Lock()
+        for query in queries:
+            self.register(query.name, query.sql, query.ttl, query.tables)
+
+    def register(self, name, sql, ttl=60, tables=()):
+        if name in self._queries:
+            raise ValueError(f"الاستعلام '{name}' مسجل مسبقًا")
+        self._queries[name] = NamedQuery(name, sql, ttl, tuple(tables))
+
+    def names(self):
+        return list(self._queries)
+
+    def _execute(self, query, params):
+        timer = instrumentation.start_query(f"registry.{query.name}")
+        db_error = _pyodbc().Error
+        with self._execute_lock:
+            cursor = self._cursors.get(query.name)
+            if cursor is None:
+                cursor = self._cursors[query.name] = self.cnxn.cursor()
+            try:
+                if params:
+                    cursor.execute(query.sql, params)
+                else:
+                    cursor.execute(query.sql)
+                if timer:
+                    timer.lap("execute")
+                columns = [column[0] for column in cursor.description]
+                rows = []
+                while True:
+                    batch = cursor.fetchmany(FETCH_BATCH_SIZE)
+                    if not batch:
+                        break
+                    rows.extend(batch)
+            except db_error:
+                if timer:
+                    timer.lap("fetch")
+                    timer.done(0, 0, error=True)
+                raise
+        if timer:
+            timer.lap("fetch")
+            timer.done(len(rows), 0)
+        return columns, rows
+
+    def fetch(self, name, params=(), refresh=False):
+        """
+        يعيد (الأعمدة، الصفوف) للاستعلام المسمى؛ من الذاكرة إن كانت النتيجة ضمن صلاحيتها.
+
+        Args:
+            name (str): اسم الاستعلام المسجل.
+            params (tuple): معاملات الاستعلام (جزء من مفتاح الذاكرة).
+            refresh (bool): تجاوز الذاكرة وإعادة التنفيذ ثم تخزين النتيجة الجديدة.
+        """
+        query = self._queries[name]
+        key = (name, tuple(params))
+        if query.ttl > 0 and not refresh:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        columns, rows = self._execute(query, tuple(params))
+        if query.ttl > 0:
+            self.cache.put(key, columns, rows, query.ttl, query.tables)
+        return columns, rows
+
+    def invalidate(self, schema=None, table=None):
+        return self.cache.invalidate(schema=schema, table=table)
+
+    def stats(self):
+        return self.cache.stats()
+
+    def close(self):
+        with self._execute_lock:
+            for cursor in self._cursors.values():
+                cursor.close()
+            self._cursors.clear()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="قراءة استعلامات لوحة القيادة عبر سجل الاستعلامات وذاكرة النتائج.")
+    parser.add_argument("--company-id", type=int, default=1, help="معرف الشركة (افتراضي: 1)")
+    parser.add_argument("--repeat", type=int, default=3, help="عدد مرات القراءة لإظهار أثر الذاكرة (افتراضي: 3)")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_CACHE_BYTES / 1024 / 1024,
+                        help="حد حجم ذاكرة النتائج بالميغابايت")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    cnxn, cursor = connect_to_database()
+    if not cnxn:
+        raise SystemExit(1)
+    cursor.close()
+    registry = QueryRegistry(cnxn, DASHBOARD_QUERIES, max_bytes=int(args.max_mb * 1024 * 1024))
+    db_error = _pyodbc().Error
+    try:
+        for attempt in range(1, args.repeat + 1):
+            started = time.perf_counter()
+            for name in registry.names():
+                try:
+                    columns, rows = registry.fetch(name, (args.company_id,))
+                except db_error as ex:
+                    print(f"❌ فشل {name}: {ex}")
+                    continue
+                if attempt == 1:
+                    print_result(name, columns, rows)
+            print(f"⏱️ القراءة {attempt}: {(time.perf_counter() - started) * 1000:.1f}ms")
+    finally:
+        registry.close()
+        cnxn.close()
+    stats = registry.stats()
+    print(f"📊 ذاكرة النتائج: {stats['hits']} إصابة، {stats['misses']} إخفاق "
+          f"({stats['hit_rate']:.0%})، {stats['entries']} نتيجة، {stats['bytes'] / 1024:.1f} KB")
@@ -0,0 +1,784 @@
+import csv
+import datetime
+import decimal
+import io
+import itertools
+import json
+import marshal
+import operator
+import struct
+import sys
+import tempfile
+import uuid
+
+# حجم مخزن الكتابة عند الكتابة إلى ملف (كتابات كبيرة وقليلة بدل سطر بسطر)
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+# عدد الصفوف المنسقة التي يحتفظ بها الكاتب المحاذى في الذاكرة قبل نقلها إلى ملف مؤقت
+ALIGN_MEMORY_ROWS = 100_000
+
+WRITER_FORMATS = ("text", "aligned", "csv", "jsonl", "columnar")
+
+
+class ResultWriter:
+    """
+    الواجهة المشتركة لكتّاب النتائج.
+
+    تستدعى الدوال بالترتيب: start(title) ثم columns(names) عند وصول أول دفعة، ثم
+    rows(batch) لكل دفعة، ثم finish(row_count, truncated). تُستخدم heading() للعناوين
+    و message() للرسائل الجانبية (الأخطاء، الملخصات) التي لا تعد جزءًا من البيانات.
+    """
+
+    binary = False
+
+    def __init__(self, stream=None, path=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        self._owns_stream = path is not None
+        if path is not None:
+            if self.binary:
+                stream = open(path, "wb", buffering=buffer_size)
+            else:
+                stream = open(path, "w", encoding="utf-8", newline="", buffering=buffer_size)
+        elif stream is None:
+            stream = sys.stdout.buffer if self.binary else sys.stdout
+        self.stream = stream
+
+    def heading(self, text):
+        pass
+
+    def message(self, text):
+        # الرسائل لا تختلط بالبيانات في الصيغ القابلة للتحليل
+        sys.stderr.write(text)
+
+    def start(self, title):
+        pass
+
+    def columns(self, names):
+        pass
+
+    def rows(self, rows):
+        """يكتب دفعة من الصفوف ويعيد الحجم التقريبي المكتوب (بالأحرف أو البايتات)."""
+        raise NotImplementedError
+
+    def finish(self, row_count, truncated=False):
+        pass
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        if self._owns_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _str_column(column):
+    return list(map(str, column))
+
+
+def _map_distinct(function, column, *args):
+    """
+    يطبق function على قيم العمود؛ إذا تكررت القيم (تواريخ بلا وقت، إدخال دفعة واحدة)
+    تُحول القيم المميزة مرة واحدة كما في قاموس الصيغة العمودية.
+    """
+    distinct = dict.fromkeys(column)
+    if len(distinct) * 2 <= len(column):
+        texts = dict(zip(distinct, map(function, distinct, *map(itertools.repeat, args))))
+        return list(map(texts.__getitem__, column))
+    return list(map(function, column, *map(itertools.repeat, args)))
+
+
+def _datetime_column(column):
+    # isoformat(" ") هو نفسه str(datetime) دون البحث عن __str__ لكل قيمة، وتنسيق التاريخ
+    # أغلى تحويل في الصف
+    return _map_distinct(datetime.datetime.isoformat, column, " ")
+
+
+# محول نصي لكل عمود حسب نوع أول قيمة فيه؛ النصوص تبقى كما هي
+_TEXT_CONVERTERS = {str: tuple, datetime.datetime: _datetime_column}
+
+
+class _TextColumns:
+    """
+    يحول دفعة صفوف إلى أعمدة من النصوص: يُختار محول لكل عمود من أول قيمة غير NULL
+    ويُحفظ لبقية النتيجة، فيُحوَّل العمود كاملًا بـ map بدل فحص النوع لكل خلية.
+    """
+
+    def __init__(self, null):
+        self.null = null
+        self._converters = []
+
+    def reset(self, width):
+        self._converters = [None] * width
+
+    def convert(self, rows, generic=False):
+        columns = []
+        for index, column in enumerate(zip(*rows)):
+            if any(map(operator.is_, column, itertools.repeat(None))):
+                if all(map(operator.is_, column, itertools.repeat(None))):
+                    columns.append([self.null] * len(column))
+                else:
+                    columns.append([self.null if item is None else str(item) for item in column])
+                continue
+            converter = self._converters[index] if index < len(self._converters) else _str_column
+            if converter is None:
+                converter = self._converters[index] = _TEXT_CONVERTERS.get(type(column[0]), _str_column)
+            if generic and converter is not _str_column:
+                converter = _str_column
+            try:
+                columns.append(converter(column))
+            except TypeError:
+                # قيمة من نوع آخر في العمود (datetime.isoformat ترفضها): تحويل عام
+                columns.append(_str_column(column))
+        return columns
+
+    def lines(self, rows, separator):
+        """يعيد أسطر الدفعة؛ إذا وُجدت قيمة غير نصية في عمود نصي يُعاد التحويل العام."""
+        try:
+            return list(map(separator.join, zip(*self.convert(rows))))
+        except TypeError:
+            return list(map(separator.join, zip(*self.convert(rows, generic=True))))
+
+
+class TextWriter(ResultWriter):
+    """
+    نص مقروء بنفس تنسيق execute_and_print الأصلي: "a | b | c".
+
+    مع align=True تُحاذى الأعمدة على عرض أطول قيمة في النتيجة كاملة: تُحفظ الدفعات
+    المنسقة حتى نهاية النتيجة ثم تُكتب، وما زاد عن ALIGN_MEMORY_ROWS صف يُنقل إلى ملف
+    مؤقت حتى تبقى الذاكرة محدودة.
+    """
+
+    def __init__(self, stream=None, path=None, buffer_size=DEFAULT_BUFFER_SIZE, align=False):
+        super().__init__(stream, path, buffer_size)
+        self.align = align
+        self._names = []
+        self._widths = []
+        self._pending = []
+        self._pending_rows = 0
+        self._spill = None
+        self._text = _TextColumns("NULL")
+
+    def heading(self, text):
+        self._flush_aligned()
+        self.stream.write(text)
+
+    def message(self, text):
+        self._flush_aligned()
+        self.stream.write(text)
+
+    def start(self, title):
+        self._flush_aligned()
+        self.stream.write(f"\n## {title}\n")
+
+    def columns(self, names):
+        self._names = list(names)
+        self._widths = [len(name) for name in self._names]
+        self._text.reset(len(self._names))
+        if not self.align:
+            # طباعة رؤوس الأعمدة
+            self.stream.write(" | ".join(self._names) + "\n")
+            self.stream.write("-" * (sum(len(name) + 3 for name in self._names) - 3) + "\n") # خط فاصل
+
+    def rows(self, rows):
+        # طباعة الصفوف
+        if not rows:
+            return 0
+        if self.align:
+            try:
+                return self._buffer(self._text.convert(rows))
+            except TypeError:
+                return self._buffer(self._text.convert(rows, generic=True))
+        text = "\n".join(self._text.lines(rows, " | ")) + "\n"
+        self.stream.write(text)
+        return len(text)
+
+    def _buffer(self, columns):
+        # الدفعات تُحفظ أعمدةً حتى يُحسب العرض وتُحاذى القيم بـ map على العمود كاملًا؛ ويُحفظ
+        # طول العمود الذي كل قيمه بطول واحد (تواريخ، رموز، NULL) فلا يُعاد حشوه إذا ساوى العرض
+        lengths = [{len(column[0])} if column[0] == column[-1] and column.count(column[0]) == len(column)
+                   else set(map(len, column)) for column in columns]
+        self._widths = [max(width, max(column)) for width, column in zip(self._widths, lengths)]
+        self._pending.append((columns, [column.pop() if len(column) == 1 else -1 for column in lengths]))
+        count = len(columns[0]) if columns else 0
+        self._pending_rows += count
+        if self._pending_rows > ALIGN_MEMORY_ROWS:
+            if self._spill is None:
+                self._spill = tempfile.TemporaryFile()
+            for batch in self._pending:
+                data = marshal.dumps(batch)
+                self._spill.write(struct.pack("<Q", len(data)) + data)
+            self._pending = []
+            self._pending_rows = 0
+        return count * (sum(self._widths) + 3 * len(self._widths))
+
+    def _batches(self):
+        if self._spill is not None:
+            self._spill.seek(0)
+            while True:
+                header = self._spill.read(8)
+                if not header:
+                    break
+                yield marshal.loads(self._spill.read(struct.unpack("<Q", header)[0]))
+            self._spill.close()
+            self._spill = None
+        yield from self._pending
+        self._pending = []
+        self._pending_rows = 0
+
+    def _flush_aligned(self):
+        if not self.align or not self._names:
+            return
+        widths = self._widths
+        out = [" | ".join(name.ljust(width) for name, width in zip(self._names, widths)).rstrip(),
+               "-+-".join("-" * width for width in widths)]
+        self._names = []
+        for columns, lengths in self._batches():
+            # العمود الذي قيمه بطول واحد يُحشى بإضافة المسافات إلى الفاصل بعده، وغيره بـ ljust،
+            # ثم يُركب كل سطر بـ join واحد على القيم والفواصل متتالية
+            parts = []
+            for column, length, width in zip(columns[:-1], lengths, widths):
+                if length < 0:
+                    parts += (map(str.ljust, column, itertools.repeat(width)), itertools.repeat(" | "))
+                else:
+                    parts += (column, itertools.repeat(" " * (width - length) + " | "))
+            parts.append(columns[-1])
+            out.extend(map(str.rstrip, map("".join, zip(*parts))))
+            self.stream.write("\n".join(out) + "\n")
+            out = []
+        if out:
+            self.stream.write("\n".join(out) + "\n")
+
+    def finish(self, row_count, truncated=False):
+        self._flush_aligned()
+        if row_count == 0:
+            self.stream.write("  لا توجد نتائج.\n")
+        elif truncated:
+            self.stream.write(f"  ... تم الاكتفاء بأول {row_count} صف (max_rows).\n")
+
+    def close(self):
+        self._flush_aligned()
+        super().close()
+
+
+class CsvWriter(ResultWriter):
+    """
+    CSV (RFC 4180). كل نتيجة تبدأ بصف عناوين الأعمدة وتُفصل النتائج بسطر فارغ؛
+    NULL يُكتب كحقل فارغ، والقيم الأخرى بتمثيلها النصي (Decimal بدقته الكاملة).
+    """
+
+    def __init__(self, stream=None, path=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        super().__init__(stream, path, buffer_size)
+        self._chunk = io.StringIO()
+        self._csv = csv.writer(self._chunk, lineterminator="\n")
+        self._results = 0
+        self._width = 0
+        self._text = _TextColumns("")
+
+    def columns(self, names):
+        if self._results:
+            self.stream.write("\n")
+        self._results += 1
+        self._width = len(names)
+        self._text.reset(self._width)
+        self._csv.writerow(names)
+        self._drain()
+
+    def rows(self, rows):
+        # المسار السريع: سطر لكل صف بضم القيم مباشرة، ثم تحقق بعدّ الفواصل والأسطر على
+        # النص كاملًا؛ إذا احتاجت قيمة إلى اقتباس تُكتب الدفعة بـ csv.writerows
+        if self._width > 1 and rows:
+            text = "\n".join(self._text.lines(rows, ",")) + "\n"
+            if (text.count(",") == (self._width - 1) * len(rows) and text.count("\n") == len(rows)
+                    and '"' not in text and "\r" not in text):
+                self.stream.write(text)
+                return len(text)
+        self._csv.writerows(rows)
+        return self._drain()
+
+    def _drain(self):
+        text = self._chunk.getvalue()
+        self._chunk.seek(0)
+        self._chunk.truncate()
+        self.stream.write(text)
+        return len(text)
+
+
+def _json_default(value):
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return str(value)
+
+
+# محول JSON لكل نوع عمود: (دالة القيمة، هل تُحاط بعلامتي اقتباس). الدوال غير المقيدة
+# (Decimal.__str__ ...) ترفض القيم من نوع آخر بـ TypeError، فيُعاد العمود بالمحول العام
+# بدل إخراج نص خاطئ
+_JSON_CONVERTERS = {
+    str: (json.encoder.encode_basestring, False),
+    int: (int.__repr__, False),
+    bool: ({True: "true", False: "false"}.__getitem__, False),
+    decimal.Decimal: (decimal.Decimal.__str__, True),
+    datetime.datetime: (datetime.datetime.isoformat, True),
+    datetime.date: (datetime.date.isoformat, True),
+    datetime.time: (datetime.time.isoformat, True),
+    uuid.UUID: (uuid.UUID.__str__, True),
+}
+
+
+# أنواع فرعية تقبلها دوال المحولات دون خطأ لكن بنص خاطئ: int.__repr__(True) يعطي "True"
+# و date.isoformat لقيمة datetime يسقط الوقت، فيُتحقق من أنواع هذين العمودين مرة لكل دفعة
+_JSON_SUBCLASSES = {int: bool, datetime.date: datetime.datetime}
+
+
+class JsonLinesWriter(ResultWriter):
+    """
+    JSON Lines: سطر وصفي لكل نتيجة {"result": ..., "columns": [...]} ثم كائن لكل صف.
+    Decimal يُكتب كنص للحفاظ على الدقة، والتواريخ بصيغة ISO 8601، و NULL كـ null.
+
+    يُختار محول لكل عمود من نوع أول قيمة فيه ويُحفظ لبقية النتيجة، وتُحول الأعمدة
+    كاملة ثم تُركب الأسطر بقالب % واحد بدل ترميز قاموس لكل صف.
+    """
+
+    def __init__(self, stream=None, path=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        super().__init__(stream, path, buffer_size)
+        self._encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"),
+                                        default=_json_default).encode
+        self._title = None
+        self._names = []
+        self._keys = None
+        self._templates = {}
+        self._converters = []
+
+    def start(self, title):
+        self._title = title
+
+    def columns(self, names):
+        self._names = list(names)
+        self.stream.write(self._encode({"result": self._title, "columns": self._names}) + "\n")
+        # الأسماء المكررة تُدمج في القاموس كما يفعل json، فتبقى على المسار العام
+        self._keys = None
+        if len(set(self._names)) == len(self._names):
+            self._keys = [json.encoder.encode_basestring(name).replace("%", "%%") + ":"
+                          for name in self._names]
+        self._templates = {}
+        self._converters = [None] * len(self._names)
+
+    def rows(self, rows):
+        if self._keys is None or not rows:
+            names = self._names
+            encode = self._encode
+            text = "".join([encode(dict(zip(names, row))) + "\n" for row in rows])
+        else:
+            columns, quoted = zip(*[self._convert(index, column)
+                                    for index, column in enumerate(zip(*rows))])
+            template = self._templates.get(quoted)
+            if template is None:
+                template = self._templates[quoted] = "{" + ",".join(
+                    key + ('"%s"' if quote else "%s") for key, quote in zip(self._keys, quoted)) + "}"
+            text = "\n".join(map(template.__mod__, zip(*columns))) + "\n"
+        self.stream.write(text)
+        return len(text)
+
+    def _convert(self, index, column):
+        """يعيد (قيم العمود بصيغة JSON، هل يضيف القالب علامتي الاقتباس)."""
+        converter = self._converters[index]
+        if converter is None:
+            first = next((value for value in column if value is not None), None)
+            if first is None:
+                return ["null"] * len(column), False
+            kind = type(first)
+            converter = self._converters[index] = _JSON_CONVERTERS.get(kind, (self._encode, False)) + \
+                (_JSON_SUBCLASSES.get(kind),)
+        function, quoted, subclass = converter
+        try:
+            if subclass is not None and subclass in set(map(type, column)):
+                raise TypeError(subclass)
+            if not any(map(operator.is_, column, itertools.repeat(None))):
+                # القالب يضيف الاقتباس، فتبقى كل القيم في map واحدة
+                if function is datetime.datetime.isoformat:
+                    return _map_distinct(function, column), quoted
+                return list(map(function, column)), quoted
+            if quoted:
+                return ["null" if value is None else '"%s"' % function(value) for value in column], False
+            return ["null" if value is None else function(value) for value in column], False
+        except (TypeError, KeyError):
+            return ["null" if value is None else self._encode(value) for value in column], False
+
+
+# --- الصيغة العمودية الثنائية ---
+# الملف: COLUMNAR_MAGIC ثم سجلات متتالية، كل سجل يبدأ بحرف يحدد نوعه:
+#   R  بداية نتيجة: العنوان، عدد الأعمدة، أسماء الأعمدة
+#   G  مجموعة صفوف: عدد الصفوف ثم لكل عمود: نوع (بايت)، أعلام (بايت)، خريطة NULL إذا
+#      وُجدت قيم NULL، ثم القيم غير NULL فقط. العمود الذي كل قيمه NULL نوعه "0" بلا بيانات.
+#   E  نهاية نتيجة: إجمالي عدد الصفوف
+# الأعداد الصحيحة little-endian بأصغر عرض يتسع للقيم (b/h/i/q، يسبقها حرف العرض):
+#   Decimal: مقياس (بايت) ثم القيم × 10^المقياس، datetime: ميكروثوانٍ منذ 1970-01-01،
+#   date: أيام منذ 1970-01-01، النصوص: أطوال UTF-8 ثم البيانات متصلة، أو قاموس قيم
+#   مميزة ثم أرقامها إذا تكررت القيم.
+COLUMNAR_MAGIC = b"AWCOL\x02"
+
+_COLUMN_NULL = b"0"
+_COLUMN_INT = b"q"
+_COLUMN_FLOAT = b"d"
+_COLUMN_BOOL = b"?"
+_COLUMN_TEXT = b"s"
+_COLUMN_TEXT_DICT = b"S"
+_COLUMN_DECIMAL = b"n"
+_COLUMN_DECIMAL_TEXT = b"N"
+_COLUMN_DATETIME = b"t"
+_COLUMN_DATE = b"D"
+_COLUMN_BYTES = b"b"
+
+_HAS_NULLS = 1
+
+_INT_WIDTHS = tuple((code, -(1 << (8 * size - 1)), (1 << (8 * size - 1)) - 1)
+                    for code, size in (("b", 1), ("h", 2), ("i", 4), ("q", 8)))
+# أكبر عدد صحيح يمثله double بدقة؛ الأعمدة التي تخلط int و float تُخزن كـ double ضمنه
+_EXACT_FLOAT_INT = 1 << 53
+# سياق بدقة كافية لـ DECIMAL(38, s) حتى لا يُقرب scaleb أي قيمة
+_DECIMAL_CONTEXT = decimal.Context(prec=100)
+_EPOCH = datetime.datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def _pack_text(value):
+    data = value.encode("utf-8")
+    return struct.pack("<I", len(data)) + data
+
+
+def _pack_ints(values):
+    """يعيد حرف العرض ثم القيم بأصغر عرض يتسع لها، أو None إذا تجاوزت int64."""
+    low, high = (min(values), max(values)) if values else (0, 0)
+    for code, minimum, maximum in _INT_WIDTHS:
+        if minimum <= low and high <= maximum:
+            return code.encode("ascii") + struct.pack(f"<{len(values)}{code}", *values)
+    return None
+
+
+def _unpack_ints(data, pos, count):
+    code = chr(data[pos])
+    values = list(struct.unpack_from(f"<{count}{code}", data, pos + 1))
+    return values, pos + 1 + struct.calcsize(code) * count
+
+
+def _pack_blobs(blobs):
+    lengths = _pack_ints(list(map(len, blobs)))
+    return lengths + b"".join(blobs)
+
+
+def _unpack_blobs(data, pos, count):
+    lengths, pos = _unpack_ints(data, pos, count)
+    blobs = []
+    for length in lengths:
+        blobs.append(data[pos:pos + length])
+        pos += length
+    return blobs, pos
+
+
+def _column_kind(types):
+    """يحدد نوع العمود من أنواع قيمه غير NULL."""
+    if len(types) == 1:
+        (kind,) = types
+        if kind is bool:
+            return _COLUMN_BOOL
+        if kind is int:
+            return _COLUMN_INT
+        if kind is float:
+            return _COLUMN_FLOAT
+        if kind is decimal.Decimal:
+            return _COLUMN_DECIMAL
+        if kind is datetime.datetime:
+            return _COLUMN_DATETIME
+        if kind is datetime.date:
+            return _COLUMN_DATE
+    if types <= {int, float}:
+        return _COLUMN_FLOAT
+    if types <= {int, decimal.Decimal}:
+        return _COLUMN_DECIMAL
+    if types <= {bytes, bytearray, memoryview}:
+        return _COLUMN_BYTES
+    return _COLUMN_TEXT
+
+
+def _encode_decimals(values):
+    """Decimal كأعداد صحيحة × 10^المقياس؛ None إذا لم يتسع int64 أو وُجدت NaN/Infinity."""
+    if not all(map(decimal.Decimal.is_finite, values)):
+        return None
+    # أعمدة DECIMAL(p, s) لها مقياس واحد عادةً، فيُجرب مقياس القيمة الأولى ثم يُتحقق منه
+    scale = max(0, -values[0].as_tuple().exponent)
+    scaled = list(map(_DECIMAL_CONTEXT.scaleb, values, itertools.repeat(scale)))
+    ints = list(map(int, scaled))
+    if not all(map(operator.eq, scaled, ints)):
+        scale = max(0, max(-value.as_tuple().exponent for value in values))
+        ints = [int(_DECIMAL_CONTEXT.scaleb(value, scale)) for value in values]
+    if scale > 255:
+        return None
+    packed = _pack_ints(ints)
+    return None if packed is None else bytes((scale,)) + packed
+
+
+def _encode_values(kind, values, types):
+    """يعيد (النوع، البيانات) للقيم غير NULL؛ قد يتغير النوع إلى صيغة احتياطية."""
+    if kind == _COLUMN_INT:
+        packed = _pack_ints(values)
+        if packed is not None:
+            return kind, packed
+        kind = _COLUMN_DECIMAL_TEXT
+    elif kind == _COLUMN_FLOAT:
+        if types == {float} or all(type(value) is float or -_EXACT_FLOAT_INT <= value <= _EXACT_FLOAT_INT
+                                   for value in values):
+            return kind, struct.pack(f"<{len(values)}d", *values)
+        kind = _COLUMN_TEXT
+    elif kind == _COLUMN_BOOL:
+        return kind, bytes(values)
+    elif kind == _COLUMN_DECIMAL:
+        if int in types:
+            values = [value if type(value) is decimal.Decimal else decimal.Decimal(value) for value in values]
+        packed = _encode_decimals(values)
+        if packed is not None:
+            return kind, packed
+        kind = _COLUMN_DECIMAL_TEXT
+    elif kind == _COLUMN_DATETIME:
+        try:
+            ticks = list(map(operator.floordiv, map(operator.sub, values, itertools.repeat(_EPOCH)),
+                             itertools.repeat(_MICROSECOND)))
+        except TypeError:
+            # قيم بمنطقة زمنية لا تُطرح من تاريخ بلا منطقة؛ تُحفظ نصًا
+            kind = _COLUMN_TEXT
+        else:
+            return kind, _pack_ints(ticks)
+    elif kind == _COLUMN_DATE:
+        return kind, _pack_ints([value.toordinal() - _EPOCH_ORDINAL for value in values])
+    elif kind == _COLUMN_BYTES:
+        return kind, _pack_blobs([bytes(value) for value in values])
+
+    texts = list(map(str, values))
+    if kind == _COLUMN_TEXT:
+        distinct = dict.fromkeys(texts)
+        if len(distinct) * 2 <= len(texts):
+            # قيم متكررة (الحالة، طريقة الدفع...): قاموس مرة واحدة ثم رقم لكل صف
+            codes = {text: index for index, text in enumerate(distinct)}
+            return _COLUMN_TEXT_DICT, (struct.pack("<I", len(codes))
+                                       + _pack_blobs([text.encode("utf-8") for text in codes])
+                                       + _pack_ints(list(map(codes.__getitem__, texts))))
+    return kind, _pack_blobs([text.encode("utf-8") for text in texts])
+
+
+def _encode_column(values):
+    present = [value for value in values if value is not None]
+    if not present:
+        return _COLUMN_NULL
+    types = set(map(type, present))
+    kind, payload = _encode_values(_column_kind(types), present, types)
+    if len(present) == len(values):
+        return kind + bytes((0,)) + payload
+    nulls = bytearray((len(values) + 7) // 8)
+    for index, value in enumerate(values):
+        if value is None:
+            nulls[index >> 3] |= 1 << (index & 7)
+    return kind + bytes((_HAS_NULLS,)) + bytes(nulls) + payload
+
+
+class ColumnarWriter(ResultWriter):
+    """
+    صيغة ثنائية عمودية مضغوطة: كل دفعة تُكتب كمجموعة صفوف، والأعداد تُخزن كمصفوفات
+    ثابتة الطول بدل النصوص. تقرأ بالدالة read_columnar.
+    """
+
+    binary = True
+
+    def __init__(self, stream=None, path=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        super().__init__(stream, path, buffer_size)
+        self.stream.write(COLUMNAR_MAGIC)
+        self._title = None
+        self._started = False
+
+    def start(self, title):
+        self._title = title
+        self._started = False
+
+    def columns(self, names):
+        record = [b"R", _pack_text(self._title or ""), struct.pack("<I", len(names))]
+        record.extend(_pack_text(name) for name in names)
+        self.stream.write(b"".join(record))
+        self._started = True
+
+    def rows(self, rows):
+        columns = list(zip(*rows))
+        record = [b"G", struct.pack("<I", len(rows))]
+        record.extend(_encode_column(values) for values in columns)
+        data = b"".join(record)
+        self.stream.write(data)
+        return len(data)
+
+    def finish(self, row_count, truncated=False):
+        if self._started:
+            self.stream.write(b"E" + struct.pack("<Q", row_count))
+
+
+def _decode_values(kind, count, data, pos):
+    if kind == _COLUMN_INT:
+        return _unpack_ints(data, pos, count)
+    if kind == _COLUMN_FLOAT:
+        return list(struct.unpack_from(f"<{count}d", data, pos)), pos + 8 * count
+    if kind == _COLUMN_BOOL:
+        return [bool(b) for b in data[pos:pos + count]], pos + count
+    if kind == _COLUMN_DECIMAL:
+        scale = data[pos]
+        ints, pos = _unpack_ints(data, pos + 1, count)
+        return [_DECIMAL_CONTEXT.scaleb(decimal.Decimal(value), -scale) for value in ints], pos
+    if kind == _COLUMN_DATETIME:
+        ticks, pos = _unpack_ints(data, pos, count)
+        return [_EPOCH + datetime.timedelta(microseconds=value) for value in ticks], pos
+    if kind == _COLUMN_DATE:
+        days, pos = _unpack_ints(data, pos, count)
+        return [datetime.date.fromordinal(value + _EPOCH_ORDINAL) for value in days], pos
+    if kind == _COLUMN_TEXT_DICT:
+        (size,) = struct.unpack_from("<I", data, pos)
+        words, pos = _unpack_blobs(data, pos + 4, size)
+        words = [word.decode("utf-8") for word in words]
+        codes, pos = _unpack_ints(data, pos, count)
+        return [words[code] for code in codes], pos
+    blobs, pos = _unpack_blobs(data, pos, count)
+    if kind == _COLUMN_BYTES:
+        return blobs, pos
+    if kind == _COLUMN_DECIMAL_TEXT:
+        return [decimal.Decimal(blob.decode("ascii")) for blob in blobs], pos
+    return [blob.decode("utf-8") for blob in blobs], pos
+
+
+def _decode_column(kind, count, data, pos):
+    if kind == _COLUMN_NULL:
+        return [None] * count, pos
+    flags = data[pos]
+    pos += 1
+    if not flags & _HAS_NULLS:
+        return _decode_values(kind, count, data, pos)
+    nulls = data[pos:pos + (count + 7) // 8]
+    pos += len(nulls)
+    is_null = [bool(nulls[i >> 3] & (1 << (i & 7))) for i in range(count)]
+    values, pos = _decode_values(kind, count - sum(is_null), data, pos)
+    present = iter(values)
+    return [None if null else next(present) for null in is_null], pos
+
+
+def read_columnar(path):
+    """
+    يقرأ ملفًا بالصيغة العمودية ويعيد مولدًا ينتج (العنوان، أسماء الأعمدة، الصفوف) لكل نتيجة.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(COLUMNAR_MAGIC):
+        raise ValueError(f"'{path}' ليس ملفًا بالصيغة العمودية")
+    pos = len(COLUMNAR_MAGIC)
+
+    def read_text(pos):
+        (length,) = struct.unpack_from("<I", data, pos)
+        pos += 4
+        return data[pos:pos + length].decode("utf-8"), pos + length
+
+    title, names, rows = None, [], []
+    while pos < len(data):
+        tag = data[pos:pos + 1]
+        pos += 1
+        if tag == b"R":
+            title, pos = read_text(pos)
+            (count,) = struct.unpack_from("<I", data, pos)
+            pos += 4
+            names = []
+            for _ in range(count):
+                name, pos = read_text(pos)
+                names.append(name)
+            rows = []
+        elif tag == b"G":
+            (count,) = struct.unpack_from("<I", data, pos)
+            pos += 4
+            columns = []
+            for _ in names:
+                kind = data[pos:pos + 1]
+                values, pos = _decode_column(kind, count, data, pos + 1)
+                columns.append(values)
+            rows.extend(zip(*columns))
+        elif tag == b"E":
+            pos += 8
+            yield title, names, [list(row) for row in rows]
+        else:
+            raise ValueError(f"سجل غير معروف {tag!r} عند الموضع {pos - 1}")
+
+
+class RecordingWriter(ResultWriter):
+    """
+    يسجل كل الاستدعاءات في الذاكرة ليعيد تشغيلها لاحقًا على كاتب آخر بالترتيب.
+    يُستخدم عند تنفيذ الأقسام بالتوازي حتى تبقى المخرجات بترتيب الأقسام الأصلي.
+    """
+
+    def __init__(self):
+        self.stream = None
+        self._owns_stream = False
+        self._calls = []
+
+    def heading(self, text):
+        self._calls.append(("heading", (text,)))
+
+    def message(self, text):
+        self._calls.append(("message", (text,)))
+
+    def start(self, title):
+        self._calls.append(("start", (title,)))
+
+    def columns(self, names):
+        self._calls.append(("columns", (names,)))
+
+    def rows(self, rows):
+        self._calls.append(("rows", (rows,)))
+        return sum(len(str(item)) + 3 for row in rows for item in row)
+
+    def finish(self, row_count, truncated=False):
+        self._calls.append(("finish", (row_count, truncated)))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def replay(self, writer):
+        for name, args in self._calls:
+            getattr(writer, name)(*args)
+        self._calls.clear()
+
+
+def create_writer(fmt="text", path=None, stream=None, buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    ينشئ كاتب نتائج حسب الصيغة: text, aligned, csv, jsonl, columnar.
+
+    Args:
+        fmt (str): صيغة المخرجات.
+        path (str): مسار ملف المخرجات (None للكتابة إلى stdout).
+        stream: مجرى بديل للكتابة (يُتجاهل عند تمرير path).
+        buffer_size (int): حجم مخزن الكتابة للملف.
+    """
+    if fmt == "text":
+        return TextWriter(stream, path, buffer_size)
+    if fmt == "aligned":
+        return TextWriter(stream, path, buffer_size, align=True)
+    if fmt == "csv":
+        return CsvWriter(stream, path, buffer_size)
+    if fmt == "jsonl":
+        return JsonLinesWriter(stream, path, buffer_size)
+    if fmt == "columnar":
+        return ColumnarWriter(stream, path, buffer_size)
+    raise ValueError(f"صيغة غير مدعومة: {fmt} (المتاح: {', '.join(WRITER_FORMATS)})")
@@ -0,0 +1,250 @@
+import datetime
+import decimal
+import hashlib
+import json
+import os
+import uuid
+
+# يُرفع عند تغيير بنية ملف اللقطة، فتُهمل اللقطات القديمة تلقائيًا
+# (2: القيم غير الأصلية في JSON تُحفظ بوسم نوعها بدل تحويلها إلى نص)
+SNAPSHOT_FORMAT_VERSION = 2
+
+# كل كائنات المستخدم مع تواريخ الإنشاء والتعديل. الكائنات التابعة (القيود، المشغلات،
+# المفاتيح) تُنسب إلى الجدول المالك لها، لأن أقسام المخطط تجمع صفوفها حسب الجدول.
+OBJECTS_QUERY = """
+SELECT
+    o.object_id,
+    SCHEMA_NAME(COALESCE(p.schema_id, o.schema_id)) AS OwnerSchema,
+    COALESCE(p.name, o.name) AS OwnerName,
+    CONVERT(VARCHAR(33), o.create_date, 126) AS CreateDate,
+    CONVERT(VARCHAR(33), o.modify_date, 126) AS ModifyDate
+FROM
+    sys.objects AS o
+LEFT JOIN
+    sys.objects AS p ON o.parent_object_id = p.object_id
+WHERE
+    o.is_ms_shipped = 0;
+"""
+
+# حد عدد المعاملات في استعلام واحد (SQL Server يسمح بـ 2100 كحد أقصى)
+OWNER_FILTER_CHUNK = 500
+
+FETCH_BATCH_SIZE = 1000
+
+
+def owner_key(schema, name):
+    """المفتاح الموحد لكائن مالك: schema.name"""
+    return f"{schema}.{name}"
+
+
+def owner_sort_key(key):
+    # يحاكي ترتيب ORDER BY Schema, Name في الاستعلامات الأصلية (ترتيب غير حساس لحالة الأحرف)
+    schema, _, name = key.partition(".")
+    return schema.casefold(), name.casefold()
+
+
+def sections_fingerprint(sections):
+    """بصمة لنصوص استعلامات الأقسام؛ أي تعديل عليها يبطل اللقطة المحفوظة."""
+    digest = hashlib.sha256()
+    for section in sections:
+        digest.update(f"{section.number}\0{section.query}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+# وسوم أنواع القيم التي لا يمثلها JSON؛ تُحفظ كـ {"$وسم": نص} وتُستعاد بنوعها الأصلي حتى
+# تُطبع صفوف اللقطة كما تُطبع صفوف الاستعلام المباشر (Decimal بدقته، التواريخ كـ datetime)
+_JSON_TYPES = (
+    ("$datetime", datetime.datetime, datetime.datetime.isoformat, datetime.datetime.fromisoformat),
+    ("$date", datetime.date, datetime.date.isoformat, datetime.date.fromisoformat),
+    ("$time", datetime.time, datetime.time.isoformat, datetime.time.fromisoformat),
+    ("$decimal", decimal.Decimal, str, decimal.Decimal),
+    ("$bytes", (bytes, bytearray), lambda value: bytes(value).hex(), bytes.fromhex),
+    ("$uuid", uuid.UUID, str, uuid.UUID),
+)
+_JSON_DECODERS = {tag: decode for tag, _, _, decode in _JSON_TYPES}
+
+
+def _json_value(value):
+    # datetime يسبق date لأنه نوع فرعي منه
+    for tag, types, encode, _ in _JSON_TYPES:
+        if isinstance(value, types):
+            return {tag: encode(value)}
+    raise TypeError(f"نوع غير مدعوم في لقطة المخطط: {type(value).__name__}")
+
+
+def _json_object(obj):
+    if len(obj) == 1:
+        tag, text = next(iter(obj.items()))
+        decode = _JSON_DECODERS.get(tag)
+        if decode is not None:
+            return decode(text)
+    return obj
+
+
+def load_snapshot(path):
+    """يقرأ اللقطة من الملف، ويعيد None إذا لم يكن الملف موجودًا أو كان تالفًا."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f, object_hook=_json_object)
+    except (OSError, ValueError):
+        return None
+
+
+def save_snapshot(snapshot, path):
+    """يحفظ اللقطة بشكل ذري (ملف مؤقت ثم استبدال) حتى لا يبقى ملف نصف مكتوب."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False, default=_json_value)
+    os.replace(tmp_path, path)
+
+
+def fetch_objects(cursor):
+    """يعيد قاموس {object_id: [owner_key, create_date, modify_date]} لكائنات المستخدم."""
+    cursor.execute(OBJECTS_QUERY)
+    objects = {}
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+        if not rows:
+            break
+        for object_id, schema, name, created, modified in rows:
+            objects[str(object_id)] = [owner_key(schema, name), created, modified]
+    return objects
+
+
+def _fetch_grouped(cursor, query, params=None):
+    """ينفذ استعلام قسم ويعيد (أسماء الأعمدة، {owner_key: [rows]}) مع الحفاظ على ترتيب الصفوف."""
+    if params:
+        cursor.execute(query, params)
+    else:
+        cursor.execute(query)
+    columns = [column[0] for column in cursor.description]
+    owners = {}
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+        if not rows:
+            break
+        for row in rows:
+            owners.setdefault(owner_key(row[0], row[1]), []).append(list(row))
+    return columns, owners
+
+
+def _owner_filtered_query(query, columns, count):
+    # أول عمودين في كل قسم هما المخطط واسم الكائن المالك؛ نغلف الاستعلام الأصلي
+    # (بعد حذف ORDER BY الخارجي) ونقيده بالكائنات المتغيرة فقط
+    base = query.rstrip().rstrip(";").rsplit("ORDER BY", 1)[0]
+    placeholders = ", ".join("?" * count)
+    return (
+        f"SELECT * FROM (\n{base}\n) AS q\n"
+        f"WHERE CONCAT(q.[{columns[0]}], '.', q.[{columns[1]}]) IN ({placeholders});"
+    )
+
+
+def build_snapshot(cursor, sections, identity):
+    """يجلب كل الأقسام كاملة ويبني لقطة جديدة."""
+    snapshot = {
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "fingerprint": sections_fingerprint(sections),
+        "identity": identity,
+        "objects": fetch_objects(cursor),
+        "sections": {},
+    }
+    for section in sections:
+        columns, owners = _fetch_grouped(cursor, section.query)
+        snapshot["sections"][str(section.number)] = {"columns": columns, "owners": owners}
+    snapshot["refreshed_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+    return snapshot
+
+
+def diff_objects(old_objects, new_objects):
+    """
+    يقارن قائمتي كائنات ويعيد (added, altered, dropped) كمجموعات من مفاتيح الكائنات المالكة.
+    """
+    added, altered, dropped = set(), set(), set()
+    for object_id, entry in new_objects.items():
+        previous = old_objects.get(object_id)
+        if previous is None:
+            added.add(entry[0])
+        elif previous != entry:
+            altered.add(entry[0])
+            if previous[0] != entry[0]:  # إعادة تسمية
+                dropped.add(previous[0])
+    for object_id, entry in old_objects.items():
+        if object_id not in new_objects:
+            dropped.add(entry[0])
+    return added, altered, dropped
+
+
+def refresh_snapshot(cursor, snapshot, sections):
+    """
+    يحدّث اللقطة تزايديًا: يعيد جلب صفوف الكائنات التي أضيفت أو عُدلت أو حُذفت فقط.
+
+    Returns:
+        dict: ملخص التغييرات {"added": [...], "altered": [...], "dropped": [...]}.
+    """
+    new_objects = fetch_objects(cursor)
+    added, altered, dropped = diff_objects(snapshot["objects"], new_objects)
+    dirty = sorted(added | altered | dropped, key=owner_sort_key)
+
+    if dirty:
+        for section in sections:
+            cached = snapshot["sections"][str(section.number)]
+            owners = cached["owners"]
+            for key in dirty:
+                owners.pop(key, None)
+            for start in range(0, len(dirty), OWNER_FILTER_CHUNK):
+                chunk = dirty[start:start + OWNER_FILTER_CHUNK]
+                query = _owner_filtered_query(section.query, cached["columns"], len(chunk))
+                _, fresh = _fetch_grouped(cursor, query, chunk)
+                owners.update(fresh)
+        snapshot["refreshed_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+
+    snapshot["objects"] = new_objects
+    return {
+        "added": sorted(added - altered, key=owner_sort_key),
+        "altered": sorted(altered, key=owner_sort_key),
+        "dropped": sorted(dropped - added - altered, key=owner_sort_key),
+    }
+
+
+def is_snapshot_valid(snapshot, sections, identity):
+    return (
+        snapshot is not None
+        and snapshot.get("version") == SNAPSHOT_FORMAT_VERSION
+        and snapshot.get("fingerprint") == sections_fingerprint(sections)
+        and snapshot.get("identity") == identity
+    )
+
+
+def get_schema_snapshot(cursor, sections, path, identity):
+    """
+    يعيد لقطة محدثة للمخطط مستخدمًا ملف التخزين المؤقت إن كان صالحًا.
+
+    Args:
+        cursor: مؤشر قاعدة البيانات.
+        sections (list): أقسام المخطط (SchemaSection).
+        path (str): مسار ملف اللقطة.
+        identity (str): معرف الخادم/قاعدة البيانات؛ لقطة لقاعدة أخرى لا يعاد استخدامها.
+
+    Returns:
+        tuple: (snapshot, changes) حيث changes يساوي None عند البناء الكامل.
+    """
+    snapshot = load_snapshot(path)
+    if is_snapshot_valid(snapshot, sections, identity):
+        changes = refresh_snapshot(cursor, snapshot, sections)
+        if any(changes.values()):
+            save_snapshot(snapshot, path)
+        return snapshot, changes
+
+    snapshot = build_snapshot(cursor, sections, identity)
+    save_snapshot(snapshot, path)
+    return snapshot, None
+
+
+def snapshot_rows(snapshot, section_number):
+    """يعيد (الأعمدة، الصفوف) لقسم من اللقطة مرتبة كما في الاستعلام الأصلي."""
+    cached = snapshot["sections"][str(section_number)]
+    owners = cached["owners"]
+    rows = []
+    for key in sorted(owners, key=owner_sort_key):
+        rows.extend(owners[key])
+    return cached["columns"], rows
@@ -1,4 +1,18 @@
-import pyodbc
+import argparse
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+import module_definitions
+import offline_schema
+import performance_advisor
+import schema_cache
+from db_pool import ConnectionPool, PoolError
+from module_definitions import DEFINITION_HASH_EXPRESSION, DEFINITIONS_CACHE_FILE
+from result_writers import WRITER_FORMATS, RecordingWriter, TextWriter, create_writer
 
 # معلومات الاتصال بقاعدة البيانات
 SERVER_NAME = r'DESKTOP-0QOGPV9\SQLEXPRESS'
@@ -15,275 +29,706 @@ CONNECTION_STRING = (
     f"PWD={PASSWORD};"
 )
 
-def connect_to_database():
+# عدد الصفوف التي تُجلب في كل دفعة عند طباعة النتائج (fetchmany)
+FETCH_BATCH_SIZE = 1000
+
+# ملف لقطة المخطط المستخدمة لتسريع التشغيلات اللاحقة (--cache)
+SCHEMA_CACHE_FILE = "schema_snapshot.json"
+
+def _pyodbc():
+    # يُستورد المشغل عند أول اتصال فقط، فيعمل --offline و--fixtures على أجهزة بلا pyodbc
+    import pyodbc
+    return pyodbc
+
+def create_connection_pool(min_size=1, max_size=5, **kwargs):
+    """
+    ينشئ مجمع اتصالات لقاعدة البيانات باستخدام CONNECTION_STRING.
+
+    Args:
+        min_size (int): عدد الاتصالات المفتوحة مسبقًا.
+        max_size (int): الحد الأقصى لعدد الاتصالات.
+        **kwargs: خيارات إضافية تُمرر إلى ConnectionPool (idle_timeout, probe_query, ...).
+    """
+    return ConnectionPool(lambda: _pyodbc().connect(CONNECTION_STRING),
+                          min_size=min_size, max_size=max_size, **kwargs)
+
+def connect_to_database(pool=None):
     """
     يتصل بقاعدة البيانات ويعيد كائن الاتصال والمؤشر.
+
+    عند تمرير pool يُستعار الاتصال من المجمع بدل فتح اتصال جديد، واستدعاء
+    cnxn.close() يعيده إلى المجمع.
     """
+    db_error = _pyodbc().Error
     try:
-        cnxn = pyodbc.connect(CONNECTION_STRING)
+        cnxn = pool.acquire() if pool else _pyodbc().connect(CONNECTION_STRING)
         cursor = cnxn.cursor()
         print("✅ تم الاتصال بقاعدة البيانات بنجاح!")
         return cnxn, cursor
-    except pyodbc.Error as ex:
+    except (db_error, PoolError) as ex:
         sqlstate = ex.args[0]
         print(f"❌ حدث خطأ أثناء الاتصال بقاعدة البيانات: {sqlstate}")
         print(ex)
         return None, None
 
-def execute_and_print(cursor, title, query, params=None):
+def _resolve_writer(writer, out):
+    # الكاتب الافتراضي: نص بالتنسيق الأصلي على المجرى out (أو stdout)
+    if writer is not None:
+        return writer
+    return TextWriter(out if out is not None else sys.stdout)
+
+def print_result(title, column_names, rows, out=None, writer=None):
+    """
+    يطبع نتيجة محفوظة مسبقًا (مثل صفوف لقطة المخطط) بنفس مسار مخرجات execute_and_print.
+    """
+    writer = _resolve_writer(writer, out)
+    writer.start(title)
+    if rows:
+        writer.columns(column_names)
+        for start in range(0, len(rows), FETCH_BATCH_SIZE):
+            writer.rows(rows[start:start + FETCH_BATCH_SIZE])
+    writer.finish(len(rows))
+
+def execute_and_print(cursor, title, query, params=None, batch_size=FETCH_BATCH_SIZE,
+                      max_rows=None, report_memory=False, out=None, writer=None, label=None):
     """
     ينفذ استعلامًا ويطبع نتائجه بشكل منظم.
+
+    تُجلب الصفوف على دفعات عبر fetchmany وتُكتب كل دفعة فور وصولها، لذا يبقى
+    استهلاك الذاكرة وزمن ظهور أول صف ثابتين مهما كبر حجم الجدول.
+
+    Args:
+        cursor: مؤشر قاعدة البيانات.
+        title (str): عنوان النتائج.
+        query (str): نص الاستعلام.
+        params (tuple): معاملات الاستعلام (اختياري).
+        batch_size (int): عدد الصفوف في كل دفعة fetchmany.
+        max_rows (int): أقصى عدد من الصفوف يتم طباعته (None = بلا حد).
+        report_memory (bool): طباعة الذروة القصوى لاستهلاك الذاكرة أثناء الجلب.
+        out: مجرى الكتابة للنص (افتراضي: sys.stdout).
+        writer (ResultWriter): كاتب النتائج (csv, jsonl, ...)؛ يحل محل out إن مُرر.
+        label (str): وسم الاستعلام في إحصاءات القياس (افتراضي: title).
+
+    Returns:
+        int: عدد الصفوف المطبوعة، أو None عند حدوث خطأ.
     """
     if not cursor:
-        return
+        return None
+    writer = _resolve_writer(writer, out)
+
+    started_tracing = report_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
 
-    print(f"\n## {title}")
+    # قياس أزمنة التنفيذ والجلب والتنسيق (None إذا لم يكن القياس مفعلًا)
+    timer = instrumentation.start_query(label or title)
+    writer.start(title)
+    row_count = 0
+    written = 0
+    db_error = _pyodbc().Error
     try:
         if params:
             cursor.execute(query, params)
         else:
             cursor.execute(query)
+        if timer:
+            timer.lap("execute")
 
-        rows = cursor.fetchall()
-        if rows:
-            # طباعة رؤوس الأعمدة
-            column_names = [column[0] for column in cursor.description]
-            print(" | ".join(column_names))
-            print("-" * (sum(len(name) + 3 for name in column_names) - 3)) # خط فاصل
+        header_written = False
+        while max_rows is None or row_count < max_rows:
+            size = batch_size if max_rows is None else min(batch_size, max_rows - row_count)
+            rows = cursor.fetchmany(size)
+            if timer:
+                timer.lap("fetch")
+            if not rows:
+                break
 
-            # طباعة الصفوف
-            for row in rows:
-                print(" | ".join(str(item) if item is not None else "NULL" for item in row))
-        else:
-            print("  لا توجد نتائج.")
-    except pyodbc.Error as ex:
-        sqlstate = ex.args[0]
-        print(f"❌ حدث خطأ أثناء جلب {title.lower()}: {sqlstate}")
-        print(ex)
+            if not header_written:
+                writer.columns([column[0] for column in cursor.description])
+                header_written = True
+            written += writer.rows(rows) or 0
+            row_count += len(rows)
+            if timer:
+                timer.lap("format")
 
-def get_database_full_schema(cursor):
-    """
-    يجلب معلومات شاملة حول مخطط قاعدة البيانات (من الألف إلى الياء).
-    """
-    if not cursor:
-        return
+        # بلوغ max_rows لا يعني وجود صفوف أخرى؛ صف إضافي واحد يحسم ذلك
+        truncated = max_rows is not None and row_count >= max_rows and bool(cursor.fetchmany(1))
+        if truncated and timer:
+            timer.lap("fetch")
+        writer.finish(row_count, truncated=truncated)
+        if timer:
+            timer.done(row_count, written)
+    except db_error as ex:
+        if timer:
+            timer.lap("fetch")
+            timer.done(row_count, written, error=True)
+        sqlstate = ex.args[0]
+        writer.message(f"❌ حدث خطأ أثناء جلب {title.lower()}: {sqlstate}\n")
+        writer.message(f"{ex}\n")
+        row_count = None
+    finally:
+        if report_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            writer.message(f"  📊 ذروة استهلاك الذاكرة أثناء الجلب: {peak / 1024:.1f} KB\n")
 
-    print("\n" + "="*70)
-    print("           عرض شامل لمخطط قاعدة البيانات (من الألف إلى الياء)")
-    print("="*70)
+    return row_count
 
-    # 1. تفاصيل شاملة عن جميع الجداول والأعمدة والمفاتيح الأساسية والأجنبية
-    print("\n--- 1. تفاصيل الجداول والأعمدة والمفاتيح الأساسية والأجنبية ---")
-    detailed_table_column_fk_pk_query = """
+# 1. تفاصيل شاملة عن جميع الجداول والأعمدة والمفاتيح الأساسية والأجنبية
+DETAILED_TABLE_COLUMN_FK_PK_QUERY = """
+SELECT
+    t.TABLE_SCHEMA,
+    t.TABLE_NAME,
+    c.COLUMN_NAME,
+    c.DATA_TYPE,
+    CASE
+        WHEN c.CHARACTER_MAXIMUM_LENGTH = -1 THEN 'MAX'
+        WHEN c.CHARACTER_MAXIMUM_LENGTH IS NULL THEN ''
+        ELSE CAST(c.CHARACTER_MAXIMUM_LENGTH AS NVARCHAR(10))
+    END AS MaxLength,
+    c.NUMERIC_PRECISION,
+    c.NUMERIC_SCALE,
+    c.IS_NULLABLE,
+    CASE
+        WHEN pk.COLUMN_NAME IS NOT NULL THEN 'YES'
+        ELSE 'NO'
+    END AS IsPrimaryKey,
+    CASE
+        WHEN fk.ForeignKeyColumnName IS NOT NULL THEN 'YES'
+        ELSE 'NO'
+    END AS IsForeignKey,
+    fk.ReferencedTableName,
+    fk.ReferencedColumnName
+FROM
+    INFORMATION_SCHEMA.TABLES AS t
+INNER JOIN
+    INFORMATION_SCHEMA.COLUMNS AS c ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+LEFT JOIN (
     SELECT
-        t.TABLE_SCHEMA,
-        t.TABLE_NAME,
-        c.COLUMN_NAME,
-        c.DATA_TYPE,
-        CASE
-            WHEN c.CHARACTER_MAXIMUM_LENGTH = -1 THEN 'MAX'
-            WHEN c.CHARACTER_MAXIMUM_LENGTH IS NULL THEN ''
-            ELSE CAST(c.CHARACTER_MAXIMUM_LENGTH AS NVARCHAR(10))
-        END AS MaxLength,
-        c.NUMERIC_PRECISION,
-        c.NUMERIC_SCALE,
-        c.IS_NULLABLE,
-        CASE
-            WHEN pk.COLUMN_NAME IS NOT NULL THEN 'YES'
-            ELSE 'NO'
-        END AS IsPrimaryKey,
-        CASE
-            WHEN fk.ForeignKeyColumnName IS NOT NULL THEN 'YES'
-            ELSE 'NO'
-        END AS IsForeignKey,
-        fk.ReferencedTableName,
-        fk.ReferencedColumnName
+        kcu.TABLE_SCHEMA,
+        kcu.TABLE_NAME,
+        kcu.COLUMN_NAME
     FROM
-        INFORMATION_SCHEMA.TABLES AS t
+        INFORMATION_SCHEMA.TABLE_CONSTRAINTS AS tc
     INNER JOIN
-        INFORMATION_SCHEMA.COLUMNS AS c ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
-    LEFT JOIN (
-        SELECT
-            kcu.TABLE_SCHEMA,
-            kcu.TABLE_NAME,
-            kcu.COLUMN_NAME
-        FROM
-            INFORMATION_SCHEMA.TABLE_CONSTRAINTS AS tc
-        INNER JOIN
-            INFORMATION_SCHEMA.KEY_COLUMN_USAGE AS kcu ON tc.CONSTRAINT_NAME = kcu.CONSTRAINT_NAME AND tc.TABLE_SCHEMA = kcu.TABLE_SCHEMA AND tc.TABLE_NAME = kcu.TABLE_NAME
-        WHERE
-            tc.CONSTRAINT_TYPE = 'PRIMARY KEY'
-    ) AS pk ON c.TABLE_SCHEMA = pk.TABLE_SCHEMA AND c.TABLE_NAME = pk.TABLE_NAME AND c.COLUMN_NAME = pk.COLUMN_NAME
-    LEFT JOIN (
-        SELECT
-            kcu.TABLE_SCHEMA AS ForeignTableSchema,
-            kcu.TABLE_NAME AS ForeignTableName,
-            kcu.COLUMN_NAME AS ForeignKeyColumnName,
-            rc.UNIQUE_CONSTRAINT_SCHEMA AS ReferencedTableSchema,
-            ptc.TABLE_NAME AS ReferencedTableName,
-            ccu.COLUMN_NAME AS ReferencedColumnName
-        FROM
-            INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS AS rc
-        INNER JOIN
-            INFORMATION_SCHEMA.KEY_COLUMN_USAGE AS kcu ON kcu.CONSTRAINT_SCHEMA = rc.CONSTRAINT_SCHEMA AND kcu.CONSTRAINT_NAME = rc.CONSTRAINT_NAME
-        INNER JOIN
-            INFORMATION_SCHEMA.CONSTRAINT_COLUMN_USAGE AS ccu ON ccu.CONSTRAINT_SCHEMA = rc.UNIQUE_CONSTRAINT_SCHEMA AND ccu.CONSTRAINT_NAME = rc.UNIQUE_CONSTRAINT_NAME
-        INNER JOIN
-            INFORMATION_SCHEMA.TABLE_CONSTRAINTS AS ptc ON ptc.CONSTRAINT_SCHEMA = rc.UNIQUE_CONSTRAINT_SCHEMA AND ptc.CONSTRAINT_NAME = rc.UNIQUE_CONSTRAINT_NAME
-        WHERE
-            ptc.CONSTRAINT_TYPE = 'PRIMARY KEY'
-    ) AS fk ON c.TABLE_SCHEMA = fk.ForeignTableSchema AND c.TABLE_NAME = fk.ForeignTableName AND c.COLUMN_NAME = fk.ForeignKeyColumnName
+        INFORMATION_SCHEMA.KEY_COLUMN_USAGE AS kcu ON tc.CONSTRAINT_NAME = kcu.CONSTRAINT_NAME AND tc.TABLE_SCHEMA = kcu.TABLE_SCHEMA AND tc.TABLE_NAME = kcu.TABLE_NAME
     WHERE
-        t.TABLE_TYPE = 'BASE TABLE'
-    ORDER BY
-        t.TABLE_SCHEMA, t.TABLE_NAME, c.ORDINAL_POSITION;
-    """
-    execute_and_print(cursor, "تفاصيل الجداول والأعمدة والمفاتيح (PK/FK)", detailed_table_column_fk_pk_query)
-
-    # 2. جلب جميع الفهارس (Indexes) لكل جدول
-    print("\n--- 2. الفهارس (Indexes) ---")
-    indexes_query = """
+        tc.CONSTRAINT_TYPE = 'PRIMARY KEY'
+) AS pk ON c.TABLE_SCHEMA = pk.TABLE_SCHEMA AND c.TABLE_NAME = pk.TABLE_NAME AND c.COLUMN_NAME = pk.COLUMN_NAME
+LEFT JOIN (
     SELECT
-        SCHEMA_NAME(t.schema_id) AS TableSchema,
-        t.name AS TableName,
-        ind.name AS IndexName,
-        ind.type_desc AS IndexType,
-        STRING_AGG(col.name, ', ') WITHIN GROUP (ORDER BY ic.key_ordinal) AS IndexColumns,
-        CASE WHEN ind.is_unique = 1 THEN 'YES' ELSE 'NO' END AS IsUnique
+        kcu.TABLE_SCHEMA AS ForeignTableSchema,
+        kcu.TABLE_NAME AS ForeignTableName,
+        kcu.COLUMN_NAME AS ForeignKeyColumnName,
+        rc.UNIQUE_CONSTRAINT_SCHEMA AS ReferencedTableSchema,
+        ptc.TABLE_NAME AS ReferencedTableName,
+        ccu.COLUMN_NAME AS ReferencedColumnName
     FROM
-        sys.indexes AS ind
+        INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS AS rc
     INNER JOIN
-        sys.tables AS t ON ind.object_id = t.object_id
+        INFORMATION_SCHEMA.KEY_COLUMN_USAGE AS kcu ON kcu.CONSTRAINT_SCHEMA = rc.CONSTRAINT_SCHEMA AND kcu.CONSTRAINT_NAME = rc.CONSTRAINT_NAME
     INNER JOIN
-        sys.index_columns AS ic ON ind.object_id = ic.object_id AND ind.index_id = ic.index_id
+        INFORMATION_SCHEMA.CONSTRAINT_COLUMN_USAGE AS ccu ON ccu.CONSTRAINT_SCHEMA = rc.UNIQUE_CONSTRAINT_SCHEMA AND ccu.CONSTRAINT_NAME = rc.UNIQUE_CONSTRAINT_NAME
     INNER JOIN
-        sys.columns AS col ON ic.object_id = col.object_id AND ic.column_id = col.column_id
+        INFORMATION_SCHEMA.TABLE_CONSTRAINTS AS ptc ON ptc.CONSTRAINT_SCHEMA = rc.UNIQUE_CONSTRAINT_SCHEMA AND ptc.CONSTRAINT_NAME = rc.UNIQUE_CONSTRAINT_NAME
     WHERE
-        t.is_ms_shipped = 0 -- Exclude system tables
-        AND ind.name IS NOT NULL -- Exclude heap (no index name)
-    GROUP BY
-        SCHEMA_NAME(t.schema_id), t.name, ind.name, ind.type_desc, ind.is_unique
-    ORDER BY
-        TableSchema, TableName, IndexName;
+        ptc.CONSTRAINT_TYPE = 'PRIMARY KEY'
+) AS fk ON c.TABLE_SCHEMA = fk.ForeignTableSchema AND c.TABLE_NAME = fk.ForeignTableName AND c.COLUMN_NAME = fk.ForeignKeyColumnName
+WHERE
+    t.TABLE_TYPE = 'BASE TABLE'
+ORDER BY
+    t.TABLE_SCHEMA, t.TABLE_NAME, c.ORDINAL_POSITION;
+"""
+
+# 2. جلب جميع الفهارس (Indexes) لكل جدول
+INDEXES_QUERY = """
+SELECT
+    SCHEMA_NAME(t.schema_id) AS TableSchema,
+    t.name AS TableName,
+    ind.name AS IndexName,
+    ind.type_desc AS IndexType,
+    STRING_AGG(col.name, ', ') WITHIN GROUP (ORDER BY ic.key_ordinal) AS IndexColumns,
+    CASE WHEN ind.is_unique = 1 THEN 'YES' ELSE 'NO' END AS IsUnique
+FROM
+    sys.indexes AS ind
+INNER JOIN
+    sys.tables AS t ON ind.object_id = t.object_id
+INNER JOIN
+    sys.index_columns AS ic ON ind.object_id = ic.object_id AND ind.index_id = ic.index_id
+INNER JOIN
+    sys.columns AS col ON ic.object_id = col.object_id AND ic.column_id = col.column_id
+WHERE
+    t.is_ms_shipped = 0 -- Exclude system tables
+    AND ind.name IS NOT NULL -- Exclude heap (no index name)
+GROUP BY
+    SCHEMA_NAME(t.schema_id), t.name, ind.name, ind.type_desc, ind.is_unique
+ORDER BY
+    TableSchema, TableName, IndexName;
+"""
+
+# 3. جلب جميع الإجراءات المخزنة (Stored Procedures) وتفاصيلها
+# التعريف الكامل لا يُنقل هنا: تجزئته فقط، والنص يُجلب عند الطلب (--definitions)
+STORED_PROCEDURES_QUERY = f"""
+SELECT
+    SCHEMA_NAME(SCHEMA_ID) AS RoutineSchema,
+    o.name AS ProcedureName,
+    o.type_desc AS ObjectType,
+    o.modify_date AS ModifyDate,
+    {DEFINITION_HASH_EXPRESSION} AS DefinitionHash
+FROM
+    sys.objects AS o
+INNER JOIN
+    sys.sql_modules AS m ON o.object_id = m.object_id
+WHERE
+    o.type = 'P' -- 'P' for Stored Procedures
+ORDER BY
+    RoutineSchema, ProcedureName;
+"""
+
+# 4. جلب جميع الدوال (Functions) وتفاصيلها
+FUNCTIONS_QUERY = f"""
+SELECT
+    SCHEMA_NAME(SCHEMA_ID) AS RoutineSchema,
+    o.name AS FunctionName,
+    o.type_desc AS ObjectType,
+    o.modify_date AS ModifyDate,
+    {DEFINITION_HASH_EXPRESSION} AS DefinitionHash
+FROM
+    sys.objects AS o
+INNER JOIN
+    sys.sql_modules AS m ON o.object_id = m.object_id
+WHERE
+    o.type IN ('FN', 'IF', 'TF') -- 'FN' for Scalar functions, 'IF' for Inlined table-function, 'TF' for Table functions
+ORDER BY
+    RoutineSchema, FunctionName;
+"""
+
+# 5. جلب جميع المشاهدات (Views) وتفاصيلها
+VIEWS_QUERY = f"""
+SELECT
+    SCHEMA_NAME(SCHEMA_ID) AS ViewSchema,
+    o.name AS ViewName,
+    o.modify_date AS ModifyDate,
+    {DEFINITION_HASH_EXPRESSION} AS DefinitionHash
+FROM
+    sys.objects AS o
+INNER JOIN
+    sys.sql_modules AS m ON o.object_id = m.object_id
+WHERE
+    o.type = 'V' -- 'V' for Views
+ORDER BY
+    ViewSchema, ViewName;
+"""
+
+# 6. جلب جميع القيود (Constraints) الأخرى (Unique, Check, Default)
+CONSTRAINTS_QUERY = """
+SELECT
+    SCHEMA_NAME(t.schema_id) AS TableSchema,
+    t.name AS TableName,
+    c.name AS ConstraintName,
+    c.type_desc AS ConstraintType,
+    OBJECT_DEFINITION(c.object_id) AS ConstraintDefinition -- For CHECK/DEFAULT constraints
+FROM
+    sys.tables AS t
+INNER JOIN
+    sys.objects AS c ON t.object_id = c.parent_object_id
+WHERE
+    c.type IN ('UQ', 'C', 'D') -- 'UQ' for Unique, 'C' for Check, 'D' for Default
+ORDER BY
+    TableSchema, TableName, ConstraintType, ConstraintName;
+"""
+
+# 7. جلب جميع المشغلات (Triggers)
+TRIGGERS_QUERY = f"""
+SELECT
+    SCHEMA_NAME(t.schema_id) AS TableSchema,
+    t.name AS TableName,
+    tr.name AS TriggerName,
+    CASE
+        WHEN tr.is_instead_of_trigger = 1 THEN 'INSTEAD OF'
+        ELSE 'AFTER'
+    END AS TriggerType,
+    tr.is_disabled AS IsDisabled,
+    tr.modify_date AS ModifyDate,
+    {DEFINITION_HASH_EXPRESSION} AS DefinitionHash
+FROM
+    sys.triggers AS tr
+INNER JOIN
+    sys.tables AS t ON tr.parent_id = t.object_id
+INNER JOIN
+    sys.sql_modules AS m ON tr.object_id = m.object_id
+WHERE
+    tr.parent_class_desc = 'OBJECT_OR_COLUMN' -- For DML triggers on tables
+ORDER BY
+    TableSchema, TableName, TriggerName;
+"""
+
+# أقسام عرض المخطط بالترتيب الذي تُطبع به
+SchemaSection = namedtuple("SchemaSection", ["number", "heading", "title", "query"])
+
+SCHEMA_SECTIONS = [
+    SchemaSection(1, "تفاصيل الجداول والأعمدة والمفاتيح الأساسية والأجنبية", "تفاصيل الجداول والأعمدة والمفاتيح (PK/FK)", DETAILED_TABLE_COLUMN_FK_PK_QUERY),
+    SchemaSection(2, "الفهارس (Indexes)", "الفهارس", INDEXES_QUERY),
+    SchemaSection(3, "الإجراءات المخزنة (Stored Procedures)", "الإجراءات المخزنة", STORED_PROCEDURES_QUERY),
+    SchemaSection(4, "الدوال (Functions)", "الدوال", FUNCTIONS_QUERY),
+    SchemaSection(5, "المشاهدات (Views)", "المشاهدات", VIEWS_QUERY),
+    SchemaSection(6, "القيود (Constraints) الأخرى", "القيود", CONSTRAINTS_QUERY),
+    SchemaSection(7, "المشغلات (Triggers)", "المشغلات", TRIGGERS_QUERY),
+]
+
+def _run_schema_section(cursor, section, writer):
+    """يطبع قسمًا واحدًا من أقسام المخطط ويعيد زمن تنفيذه بالثواني."""
+    started = time.perf_counter()
+    writer.heading(f"\n--- {section.number}. {section.heading} ---\n")
+    execute_and_print(cursor, section.title, section.query, writer=writer)
+    return time.perf_counter() - started
+
+def _run_schema_section_pooled(pool, section):
+    """ينفذ قسمًا على اتصال مستقل من المجمع ويعيد (المخرجات المسجلة، الزمن)."""
+    recording = RecordingWriter()
+    elapsed = 0.0
+    db_error = _pyodbc().Error
+    try:
+        with pool.connection() as cnxn:
+            elapsed = _run_schema_section(cnxn.cursor(), section, recording)
+    except (db_error, PoolError) as ex:
+        recording.heading(f"\n--- {section.number}. {section.heading} ---\n")
+        recording.message(f"❌ تعذر الحصول على اتصال لقسم {section.title}: {ex}\n")
+    return recording, elapsed
+
+def _print_section_timings(timings, wall_time, writer):
+    """يطبع ملخص أزمنة الأقسام ونسبة التسريع مقارنة بالتنفيذ المتتابع."""
+    lines = ["\n--- ملخص أزمنة الأقسام ---"]
+    for section, elapsed in timings:
+        lines.append(f"  {section.number}. {section.title}: {elapsed * 1000:.1f} ms")
+    sequential_time = sum(elapsed for _, elapsed in timings)
+    lines.append(f"  مجموع أزمنة الأقسام (التنفيذ المتتابع): {sequential_time * 1000:.1f} ms")
+    lines.append(f"  الزمن الفعلي: {wall_time * 1000:.1f} ms")
+    if wall_time > 0:
+        lines.append(f"  التسريع: {sequential_time / wall_time:.2f}x")
+    writer.message("\n".join(lines) + "\n")
+
+def _print_schema_from_cache(cursor, cache_path, writer):
     """
-    execute_and_print(cursor, "الفهارس", indexes_query)
+    يطبع المخطط من اللقطة المحفوظة بعد تحديثها تزايديًا، ويعيد False إن تعذر ذلك.
+    """
+    started = time.perf_counter()
+    db_error = _pyodbc().Error
+    try:
+        snapshot, changes = schema_cache.get_schema_snapshot(
+            cursor, SCHEMA_SECTIONS, cache_path, identity=_live_identity())
+    except db_error as ex:
+        writer.message(f"⚠️ تعذر استخدام لقطة المخطط المحفوظة ({ex}); سيتم الجلب المباشر.\n")
+        return False
+    elapsed = time.perf_counter() - started
 
-    # 3. جلب جميع الإجراءات المخزنة (Stored Procedures) وتفاصيلها
-    print("\n--- 3. الإجراءات المخزنة (Stored Procedures) ---")
-    stored_procedures_query = """
-    SELECT
-        SCHEMA_NAME(SCHEMA_ID) AS RoutineSchema,
-        o.name AS ProcedureName,
-        o.type_desc AS ObjectType,
-        LEFT(m.definition, 500) AS ProcedureDefinition_Snippet -- Limit definition to 500 chars for readability
-    FROM
-        sys.objects AS o
-    INNER JOIN
-        sys.sql_modules AS m ON o.object_id = m.object_id
-    WHERE
-        o.type = 'P' -- 'P' for Stored Procedures
-    ORDER BY
-        RoutineSchema, ProcedureName;
+    if changes is None:
+        writer.message(f"\n🗂️ تم بناء لقطة جديدة للمخطط وحفظها في {cache_path} ({elapsed * 1000:.1f} ms)\n")
+    else:
+        writer.message(f"\n🗂️ تم استخدام لقطة المخطط من {cache_path} ({elapsed * 1000:.1f} ms): "
+                       f"{len(changes['added'])} مضاف، {len(changes['altered'])} معدل، "
+                       f"{len(changes['dropped'])} محذوف\n")
+
+    _print_snapshot_sections(snapshot, writer)
+    return True
+
+def _print_snapshot_sections(snapshot, writer):
+    """يطبع أقسام لقطة المخطط (من الخادم أو من السكربتات) بنفس مسار المخرجات."""
+    for section in SCHEMA_SECTIONS:
+        writer.heading(f"\n--- {section.number}. {section.heading} ---\n")
+        column_names, rows = schema_cache.snapshot_rows(snapshot, section.number)
+        print_result(section.title, column_names, rows, writer=writer)
+
+def _live_identity():
+    return f"{SERVER_NAME}/{DATABASE_NAME}"
+
+def get_database_full_schema(cursor, concurrent=False, max_workers=4, pool=None,
+                             show_timings=False, use_cache=False,
+                             cache_path=SCHEMA_CACHE_FILE, out=None, writer=None):
     """
-    execute_and_print(cursor, "الإجراءات المخزنة", stored_procedures_query)
+    يجلب معلومات شاملة حول مخطط قاعدة البيانات (من الألف إلى الياء).
 
-    # 4. جلب جميع الدوال (Functions) وتفاصيلها
-    print("\n--- 4. الدوال (Functions) ---")
-    functions_query = """
-    SELECT
-        SCHEMA_NAME(SCHEMA_ID) AS RoutineSchema,
-        o.name AS FunctionName,
-        o.type_desc AS ObjectType,
-        LEFT(m.definition, 500) AS FunctionDefinition_Snippet -- Limit definition
-    FROM
-        sys.objects AS o
-    INNER JOIN
-        sys.sql_modules AS m ON o.object_id = m.object_id
-    WHERE
-        o.type IN ('FN', 'IF', 'TF') -- 'FN' for Scalar functions, 'IF' for Inlined table-function, 'TF' for Table functions
-    ORDER BY
-        RoutineSchema, FunctionName;
+    في الوضع المتزامن (concurrent=True) تُنفذ الأقسام على مجموعة خيوط، كل قسم على
+    اتصال مستقل من المجمع، ثم تُطبع النتائج بترتيب الأقسام الأصلي.
+
+    Args:
+        cursor: مؤشر قاعدة البيانات (يُستخدم في الوضع المتتابع).
+        concurrent (bool): تنفيذ الأقسام بالتوازي.
+        max_workers (int): الحد الأقصى لعدد الأقسام التي تُنفذ في الوقت نفسه.
+        pool (ConnectionPool): مجمع الاتصالات للوضع المتزامن؛ يُنشأ مجمع مؤقت إن لم يُمرر.
+        show_timings (bool): طباعة ملخص أزمنة الأقسام (يُطبع دائمًا في الوضع المتزامن).
+        use_cache (bool): استخدام لقطة المخطط المحفوظة وإعادة جلب الكائنات المتغيرة فقط
+            (حسب create_date و modify_date في sys.objects).
+        cache_path (str): مسار ملف لقطة المخطط.
+        out: مجرى الكتابة للنص (افتراضي: sys.stdout).
+        writer (ResultWriter): كاتب النتائج (csv, jsonl, ...)؛ يحل محل out إن مُرر.
     """
-    execute_and_print(cursor, "الدوال", functions_query)
+    if not cursor:
+        return
+    writer = _resolve_writer(writer, out)
 
-    # 5. جلب جميع المشاهدات (Views) وتفاصيلها
-    print("\n--- 5. المشاهدات (Views) ---")
-    views_query = """
-    SELECT
-        SCHEMA_NAME(SCHEMA_ID) AS ViewSchema,
-        o.name AS ViewName,
-        LEFT(m.definition, 500) AS ViewDefinition_Snippet -- Limit definition
-    FROM
-        sys.objects AS o
-    INNER JOIN
-        sys.sql_modules AS m ON o.object_id = m.object_id
-    WHERE
-        o.type = 'V' -- 'V' for Views
-    ORDER BY
-        ViewSchema, ViewName;
+    writer.heading("\n" + "="*70 + "\n")
+    writer.heading("           عرض شامل لمخطط قاعدة البيانات (من الألف إلى الياء)\n")
+    writer.heading("="*70 + "\n")
+
+    if use_cache and _print_schema_from_cache(cursor, cache_path, writer):
+        return
+
+    started = time.perf_counter()
+    timings = []
+    if not concurrent:
+        for section in SCHEMA_SECTIONS:
+            timings.append((section, _run_schema_section(cursor, section, writer)))
+    else:
+        workers = max(1, min(max_workers, len(SCHEMA_SECTIONS)))
+        own_pool = pool is None
+        if own_pool:
+            pool = create_connection_pool(min_size=0, max_size=workers)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_run_schema_section_pooled, pool, section)
+                           for section in SCHEMA_SECTIONS]
+                # الطباعة بترتيب الأقسام: ننتظر كل قسم بدوره بينما تستمر البقية بالعمل
+                for section, future in zip(SCHEMA_SECTIONS, futures):
+                    recording, elapsed = future.result()
+                    recording.replay(writer)
+                    timings.append((section, elapsed))
+        finally:
+            if own_pool:
+                pool.close()
+
+    if concurrent or show_timings:
+        _print_section_timings(timings, time.perf_counter() - started, writer)
+
+def print_offline_schema(scripts=None, out=None, writer=None):
     """
-    execute_and_print(cursor, "المشاهدات", views_query)
+    يطبع المخطط من سكربتات database/*.sql دون اتصال بالخادم، بنفس أقسام وأعمدة العرض
+    الحي. ModifyDate فارغ، و DefinitionHash محسوب من نص التعريف في السكربت.
 
-    # 6. جلب جميع القيود (Constraints) الأخرى (Unique, Check, Default)
-    print("\n--- 6. القيود (Constraints) الأخرى ---")
-    constraints_query = """
-    SELECT
-        SCHEMA_NAME(t.schema_id) AS TableSchema,
-        t.name AS TableName,
-        c.name AS ConstraintName,
-        c.type_desc AS ConstraintType,
-        OBJECT_DEFINITION(c.object_id) AS ConstraintDefinition -- For CHECK/DEFAULT constraints
-    FROM
-        sys.tables AS t
-    INNER JOIN
-        sys.objects AS c ON t.object_id = c.parent_object_id
-    WHERE
-        c.type IN ('UQ', 'C', 'D') -- 'UQ' for Unique, 'C' for Check, 'D' for Default
-    ORDER BY
-        TableSchema, TableName, ConstraintType, ConstraintName;
+    Args:
+        scripts (list): مسارات السكربتات بترتيب تنفيذها (افتراضي: offline_schema.DEFAULT_SCRIPTS).
     """
-    execute_and_print(cursor, "القيود", constraints_query)
+    writer = _resolve_writer(writer, out)
+    started = time.perf_counter()
+    snapshot = offline_schema.build_offline_snapshot(SCHEMA_SECTIONS, scripts)
+    elapsed = time.perf_counter() - started
 
-    # 7. جلب جميع المشغلات (Triggers)
-    print("\n--- 7. المشغلات (Triggers) ---")
-    triggers_query = """
-    SELECT
-        SCHEMA_NAME(t.schema_id) AS TableSchema,
-        t.name AS TableName,
-        tr.name AS TriggerName,
-        LEFT(OBJECT_DEFINITION(tr.object_id), 500) AS TriggerDefinition_Snippet, -- Limit definition
-        CASE
-            WHEN tr.is_instead_of_trigger = 1 THEN 'INSTEAD OF'
-            ELSE 'AFTER'
-        END AS TriggerType,
-        tr.is_disabled AS IsDisabled
-    FROM
-        sys.triggers AS tr
-    INNER JOIN
-        sys.tables AS t ON tr.parent_id = t.object_id
-    WHERE
-        tr.parent_class_desc = 'OBJECT_OR_COLUMN' -- For DML triggers on tables
-    ORDER BY
-        TableSchema, TableName, TriggerName;
+    writer.heading("\n" + "="*70 + "\n")
+    writer.heading("           مخطط قاعدة البيانات من السكربتات (بدون اتصال)\n")
+    writer.heading("="*70 + "\n")
+    writer.message(f"\n📜 {snapshot['identity']} ({elapsed * 1000:.1f} ms)\n")
+    for warning in snapshot["warnings"]:
+        writer.message(f"  ⚠️ {warning}\n")
+    _print_snapshot_sections(snapshot, writer)
+
+def print_schema_drift(cursor, scripts=None, cache_path=SCHEMA_CACHE_FILE, compare_definitions=False,
+                       out=None, writer=None):
     """
-    execute_and_print(cursor, "المشغلات", triggers_query)
+    يقارن المخطط المعرف في السكربتات بالمخطط على الخادم ويطبع الفروق.
+
+    اللقطة الحية تُقرأ عبر لقطة المخطط المحفوظة (cache_path) وتُحدّث تزايديًا، فلا يُعاد
+    جلب المخطط كاملًا في كل مقارنة.
+
+    Args:
+        cursor: مؤشر قاعدة البيانات.
+        scripts (list): مسارات السكربتات.
+        cache_path (str): ملف لقطة المخطط الحية.
+        compare_definitions (bool): مقارنة DefinitionHash أيضًا (يختلف بأي تغيير في المسافات).
+
+    Returns:
+        int: عدد الفروق، أو None عند تعذر قراءة المخطط الحي.
+    """
+    if not cursor:
+        return None
+    writer = _resolve_writer(writer, out)
+    offline = offline_schema.build_offline_snapshot(SCHEMA_SECTIONS, scripts)
+    db_error = _pyodbc().Error
+    try:
+        live, _ = schema_cache.get_schema_snapshot(cursor, SCHEMA_SECTIONS, cache_path,
+                                                   identity=_live_identity())
+    except db_error as ex:
+        writer.message(f"❌ تعذر قراءة المخطط من الخادم: {ex}\n")
+        return None
+    ignored = ("ModifyDate",) if compare_definitions else offline_schema.DIFF_IGNORED_COLUMNS
+    rows = offline_schema.diff_snapshots(offline, live, ignored_columns=ignored)
+    writer.heading("\n--- الفروق بين السكربتات والخادم ---\n")
+    print_result("فروق المخطط", ["Section", "ObjectName", "Change", "Detail"], rows, writer=writer)
+    if not rows:
+        writer.message("✅ المخطط على الخادم يطابق السكربتات.\n")
+    return len(rows)
+
+def print_module_definitions(cursor, names, cache_path=DEFINITIONS_CACHE_FILE, out=None, writer=None):
+    """
+    يطبع التعريف الكامل للإجراءات والدوال والمشاهدات والمشغلات المطلوبة فقط.
+
+    التعريفات تُجلب على دفعات وتُحفظ حسب تجزئتها، فالتعريف الذي لم يتغير منذ آخر
+    طلب يُقرأ من ملف الذاكرة دون نقله من الخادم.
+
+    Args:
+        cursor: مؤشر قاعدة البيانات.
+        names (list): أسماء الكائنات بصيغة schema.name (للمشغل: مخطط جدوله.اسم المشغل).
+        cache_path (str): ملف ذاكرة التعريفات (None = بلا حفظ).
+    """
+    if not cursor:
+        return
+    writer = _resolve_writer(writer, out)
+    db_error = _pyodbc().Error
+    try:
+        definitions = module_definitions.fetch_definitions(
+            cursor, names, module_definitions.DefinitionCache(cache_path))
+    except db_error as ex:
+        writer.message(f"❌ حدث خطأ أثناء جلب التعريفات: {ex.args[0]}\n")
+        writer.message(f"{ex}\n")
+        return
+    missing = [name for name in names if name not in definitions]
+    if missing:
+        writer.message(f"⚠️ كائنات غير موجودة أو بلا تعريف: {', '.join(missing)}\n")
+    rows = [(name, definition_hash, definition)
+            for name, (definition_hash, definition) in definitions.items()]
+    print_result("تعريفات الكائنات", ["ObjectName", "DefinitionHash", "Definition"], rows,
+                 writer=writer)
+
+def print_performance_diagnostics(cursor=None, fixtures_path=None, record_path=None,
+                                  top=performance_advisor.DEFAULT_TOP_QUERIES, out=None, writer=None):
+    """
+    يطبع قسم تشخيص الأداء: الفهارس الناقصة، استخدام الفهارس مقابل تكلفة تحديثها، تجزئة
+    الفهارس وحجمها، وأثقل الاستعلامات؛ كل جزء مرتب حسب الأثر التقديري.
+
+    Args:
+        cursor: مؤشر قاعدة البيانات (غير مطلوب مع fixtures_path).
+        fixtures_path (str): ملف DMV مسجل مسبقًا؛ يُحلل دون اتصال بالخادم.
+        record_path (str): حفظ نتائج DMV الخام في هذا الملف لإعادة تحليلها لاحقًا.
+        top (int): عدد أعلى الاستعلامات بالمعالج وبالقراءات.
+    """
+    writer = _resolve_writer(writer, out)
+    writer.heading("\n--- 8. تشخيص الأداء (الفهارس والاستعلامات) ---\n")
+    if fixtures_path:
+        snapshot = performance_advisor.load_fixtures(fixtures_path)
+    else:
+        if not cursor:
+            return
+        db_error = _pyodbc().Error
+        try:
+            snapshot = performance_advisor.collect(cursor, top)
+        except db_error as ex:
+            writer.message(f"❌ تعذر قراءة إحصاءات الأداء (تتطلب صلاحية VIEW SERVER STATE): {ex}\n")
+            return
+        if record_path:
+            performance_advisor.save_fixtures(snapshot, record_path)
+            writer.message(f"💾 تم حفظ نتائج DMV في {record_path}\n")
+    writer.message(f"⏱️ إحصاءات منذ {snapshot.get('server_start_time')} "
+                   f"({performance_advisor.uptime_days(snapshot):.1f} يوم)\n")
+    for title, column_names, rows in performance_advisor.analyze(snapshot):
+        print_result(title, column_names, rows, writer=writer)
 
 
 # --- الجزء الرئيسي للسكربت ---
+def parse_args(argv=None):
+    """يقرأ خيارات سطر الأوامر للسكربت."""
+    parser = argparse.ArgumentParser(description="عرض مخطط قاعدة بيانات AlwaseetGroup وتنفيذ استعلامات تجريبية.")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="تنفيذ أقسام المخطط بالتوازي على اتصالات مستقلة")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="الحد الأقصى لعدد الأقسام المتزامنة (افتراضي: 4)")
+    parser.add_argument("--timings", action="store_true",
+                        help="طباعة ملخص أزمنة أقسام المخطط")
+    parser.add_argument("--cache", action="store_true",
+                        help="استخدام لقطة المخطط المحفوظة وتحديث الكائنات المتغيرة فقط")
+    parser.add_argument("--cache-file", default=SCHEMA_CACHE_FILE,
+                        help=f"مسار ملف لقطة المخطط (افتراضي: {SCHEMA_CACHE_FILE})")
+    parser.add_argument("--format", choices=WRITER_FORMATS, default="text",
+                        help="صيغة مخرجات النتائج (افتراضي: text)")
+    parser.add_argument("--output",
+                        help="ملف المخرجات (افتراضي: الطباعة على الشاشة)")
+    parser.add_argument("--query",
+                        help="تنفيذ استعلام SELECT مخصص وكتابة نتائجه بدل الأمثلة")
+    parser.add_argument("--definitions",
+                        help="طباعة التعريف الكامل لكائنات محددة (schema.name مفصولة بفواصل) بدل الأمثلة")
+    parser.add_argument("--definitions-cache", default=DEFINITIONS_CACHE_FILE,
+                        help=f"ملف ذاكرة التعريفات حسب التجزئة (افتراضي: {DEFINITIONS_CACHE_FILE})")
+    parser.add_argument("--offline", action="store_true",
+                        help="عرض المخطط من سكربتات database/*.sql دون اتصال بالخادم ثم الخروج")
+    parser.add_argument("--scripts",
+                        help="سكربتات المخطط مفصولة بفواصل بترتيب تنفيذها (افتراضي: init.sql, create_views.sql, test-data.sql)")
+    parser.add_argument("--drift", action="store_true",
+                        help="مقارنة المخطط على الخادم بالسكربتات وطباعة الفروق بدل الأمثلة")
+    parser.add_argument("--drift-definitions", action="store_true",
+                        help="مع --drift: مقارنة تجزئات تعريفات الإجراءات والمشاهدات أيضًا")
+    parser.add_argument("--performance", action="store_true",
+                        help="إضافة قسم تشخيص الأداء (الفهارس الناقصة، الاستخدام، التجزئة، أثقل الاستعلامات)")
+    parser.add_argument("--performance-record",
+                        help="حفظ نتائج DMV الخام لقسم الأداء في ملف JSON")
+    parser.add_argument("--fixtures",
+                        help="تحليل نتائج DMV مسجلة (من --performance-record) دون اتصال بالخادم ثم الخروج")
+    parser.add_argument("--stats-report",
+                        help="قياس أزمنة كل استعلام وكتابة تقرير JSON إلى هذا الملف عند الخروج")
+    parser.add_argument("--stats-stream",
+                        help="كتابة سجل JSON Lines لكل استعلام فور انتهائه إلى هذا الملف")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.stats_report or args.stats_stream:
+        instrumentation.enable(report_path=args.stats_report, stream_path=args.stats_stream)
+
+    scripts = [path.strip() for path in args.scripts.split(",") if path.strip()] if args.scripts else None
+    if args.offline:
+        writer = create_writer(args.format, args.output)
+        print_offline_schema(scripts, writer=writer)
+        writer.close()
+        sys.exit(0)
+
+    if args.fixtures:
+        writer = create_writer(args.format, args.output)
+        print_performance_diagnostics(fixtures_path=args.fixtures, writer=writer)
+        writer.close()
+        sys.exit(0)
+
     cnxn, cursor = connect_to_database()
 
     if cnxn and cursor:
+        writer = create_writer(args.format, args.output)
+
+        if args.query:
+            # استعلام مخصص فقط، بنفس مسار المخطط وبالصيغة المطلوبة
+            execute_and_print(cursor, "نتائج الاستعلام", args.query, writer=writer)
+            writer.close()
+            cursor.close()
+            cnxn.close()
+            sys.exit(0)
+
+        if args.drift:
+            differences = print_schema_drift(cursor, scripts, cache_path=args.cache_file,
+                                             compare_definitions=args.drift_definitions, writer=writer)
+            writer.close()
+            cursor.close()
+            cnxn.close()
+            sys.exit(0 if differences == 0 else 1)
+
+        if args.definitions:
+            names = [name.strip() for name in args.definitions.split(",") if name.strip()]
+            print_module_definitions(cursor, names, cache_path=args.definitions_cache, writer=writer)
+            writer.close()
+            cursor.close()
+            cnxn.close()
+            sys.exit(0)
+
         # استدعاء الدالة الجديدة لعرض المخطط الكامل
-        get_database_full_schema(cursor)
+        get_database_full_schema(cursor, concurrent=args.concurrent, max_workers=args.workers,
+                                 show_timings=args.timings, use_cache=args.cache,
+                                 cache_path=args.cache_file, writer=writer)
+        if args.performance or args.performance_record:
+            print_performance_diagnostics(cursor, record_path=args.performance_record, writer=writer)
 
-        print("\n" + "="*70)
-        print("           أمثلة على تنفيذ استعلامات البيانات")
-        print("="*70)
+        writer.heading("\n" + "="*70 + "\n")
+        writer.heading("           أمثلة على تنفيذ استعلامات البيانات\n")
+        writer.heading("="*70 + "\n")
 
         # مثال على SELECT
         select_query = "SELECT TOP 5 UserId, Username, Email, Role FROM settings.Users"
-        execute_and_print(cursor, "أول 5 مستخدمين من settings.Users", select_query)
+        execute_and_print(cursor, "أول 5 مستخدمين من settings.Users", select_query, writer=writer)
+        writer.close()
 
         # أمثلة INSERT/UPDATE/DELETE (تذكير: كن حذرًا عند استخدامها!)
         # لاستخدامها، قم بإزالة التعليق وتعديلها لتناسب بياناتك
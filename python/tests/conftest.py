@@ -0,0 +1,13 @@
+import os
+import sys
+
+# الوحدات في python/ سكربتات مستقلة وليست حزمة، فتُضاف إلى مسار الاستيراد
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# الاختبارات لا تتصل بـ SQL Server؛ عند غياب المشغل تُستخدم واجهته الوهمية حتى تُستورد
+# الوحدات التي تعتمد على pyodbc.Error وما شابه
+try:
+    import pyodbc  # noqa: F401
+except ImportError:
+    import fake_pyodbc
+    sys.modules["pyodbc"] = fake_pyodbc
@@ -0,0 +1,55 @@
+import datetime
+import decimal
+
+from aggregates import AggregateStore
+
+NOW = datetime.datetime(2024, 5, 20, 12, 0)
+RETENTION_START = NOW - datetime.timedelta(days=32)
+
+
+def make_store(tmp_path):
+    return AggregateStore(str(tmp_path / "aggregates.sqlite"))
+
+
+def test_refetched_invoices_and_products_are_not_counted_twice(tmp_path):
+    store = make_store(tmp_path)
+    invoices = [
+        (1, datetime.datetime(2024, 5, 10, 9, 0), 7, decimal.Decimal("100.00"), "Paid", decimal.Decimal("0")),
+        (2, datetime.datetime(2024, 5, 11, 9, 0), 7, decimal.Decimal("50.25"), "Unpaid", decimal.Decimal("50.25")),
+    ]
+    products = [(10, 7, 2, 5), (11, 7, 9, 5)]
+    mark = datetime.datetime(2024, 5, 11, 9, 0)
+
+    for _ in range(2):  # الدفعة نفسها تُجلب مرتين عند حدود الصفحات
+        store.apply_invoices(invoices, RETENTION_START, "timestamp", mark, 2)
+        store.apply_products(products, "timestamp", mark, 11)
+
+    assert store.read_kpis(NOW) == [
+        (7, decimal.Decimal("150.25"), 2, decimal.Decimal("50.25"), 2, 1)]
+
+
+def test_changed_invoice_replaces_its_previous_contribution(tmp_path):
+    store = make_store(tmp_path)
+    mark = datetime.datetime(2024, 5, 10, 9, 0)
+    store.apply_products([(10, 7, 9, 5)], "timestamp", mark, 10)
+    store.apply_invoices([(1, mark, 7, decimal.Decimal("100.00"), "Unpaid", decimal.Decimal("100.00"))],
+                         RETENTION_START, "timestamp", mark, 1)
+    store.apply_invoices([(1, mark, 7, decimal.Decimal("100.00"), "Paid", decimal.Decimal("0"))],
+                         RETENTION_START, "timestamp", mark, 1)
+
+    assert store.read_kpis(NOW) == [
+        (7, decimal.Decimal("100.00"), 1, decimal.Decimal("0.00"), 1, 0)]
+
+
+def test_reapplied_journal_batch_does_not_change_balances(tmp_path):
+    store = make_store(tmp_path)
+    store.replace_accounts([(1, "1000", "Cash", "Asset", 7, 1)], "1|x")
+    posted = [(1, 1, 1500), (2, 1, -250)]
+    pending = [(3, 20, 1, 400)]
+
+    store.apply_journal(posted, pending, 3)
+    store.post_pending([20])
+    store.apply_journal(posted, pending, 3)
+
+    assert store.read_balances()[0][4] == decimal.Decimal("16.50")
+    assert store.pending_entry_ids() == []
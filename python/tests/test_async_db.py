@@ -0,0 +1,110 @@
+import asyncio
+import contextlib
+import threading
+
+import pytest
+
+import fake_pyodbc
+from async_db import AsyncDatabase, QueryTimeoutError
+from db_pool import ConnectionPool
+
+
+class Server:
+    """استعلام WAITFOR يبقى جاريًا حتى يُلغى بـ cursor.cancel() كما في SQLCancel."""
+
+    def __init__(self):
+        self.cancels = 0
+        self.running = threading.Event()
+        self.cancelled = threading.Event()
+        self.catalog = fake_pyodbc.FakeCatalog()
+        self.catalog.register("WAITFOR", self.wait)
+        self.catalog.register("FROM numbers", lambda query, params: (["n"], [(n,) for n in range(10)]))
+
+    def wait(self, query, params):
+        self.running.set()
+        if not self.cancelled.wait(5):
+            raise AssertionError("لم يُلغ الاستعلام")
+        raise fake_pyodbc.OperationalError("HY008", "Operation canceled")
+
+    def connect(self):
+        server = self
+
+        class Cursor(fake_pyodbc.Cursor):
+            def cancel(self):
+                server.cancels += 1
+                server.cancelled.set()
+                super().cancel()
+
+        class Connection(fake_pyodbc.Connection):
+            def cursor(self):
+                return Cursor(self)
+
+        return Connection(self.catalog)
+
+    def database(self, max_concurrency=1):
+        pool = ConnectionPool(self.connect, min_size=0, max_size=max_concurrency,
+                              probe_query=None, reap_interval=0)
+        return pool, AsyncDatabase(pool, max_concurrency=max_concurrency)
+
+
+def checked_out(pool):
+    stats = pool.stats()
+    return stats["size"] - stats["idle"]
+
+
+def test_timeout_cancels_the_query_on_the_server():
+    server = Server()
+    pool, db = server.database()
+
+    async def main():
+        async with db:
+            with pytest.raises(QueryTimeoutError):
+                await db.fetchall("WAITFOR DELAY '00:10'", timeout=0.05)
+            # المقعد والاتصال متاحان للاستعلام التالي
+            columns, rows = await db.fetchall("SELECT n FROM numbers", timeout=2)
+            assert (columns, len(rows)) == (["n"], 10)
+
+    asyncio.run(main())
+    assert server.cancels == 1
+    assert checked_out(pool) == 0
+    pool.close()
+
+
+def test_cancelled_task_returns_its_connection_and_seat():
+    server = Server()
+    pool, db = server.database()
+
+    async def main():
+        async with db:
+            task = asyncio.create_task(db.fetchall("WAITFOR DELAY '00:10'"))
+            await asyncio.get_running_loop().run_in_executor(None, server.running.wait, 2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert not db._semaphore.locked()
+            await db.fetchall("SELECT n FROM numbers", timeout=2)
+
+    asyncio.run(main())
+    assert server.cancels == 1
+    assert checked_out(pool) == 0
+    pool.close()
+
+
+def test_stream_closed_early_returns_its_connection():
+    server = Server()
+    pool, db = server.database()
+
+    async def main():
+        async with db:
+            async with contextlib.aclosing(db.stream("SELECT n FROM numbers", batch_size=2)) as rows:
+                async for row in rows:
+                    assert row == (0,)
+                    break
+            assert not db._semaphore.locked()
+            assert checked_out(pool) == 0
+            # الاتصال الوحيد في المجمع يُستخدم من جديد
+            assert len((await db.fetchall("SELECT n FROM numbers", timeout=2))[1]) == 10
+
+    asyncio.run(main())
+    assert pool.stats()["size"] == 1
+    pool.close()
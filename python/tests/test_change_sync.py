@@ -0,0 +1,140 @@
+import datetime
+import itertools
+
+import fake_pyodbc
+from change_sync import LocalStore, SyncTable, detect_method, fetch_upper_bound, iter_changes, sync_table
+
+TABLE = SyncTable("dbo.Items", ["ItemId", "Name"], "ItemId", "dbo.Items AS t",
+                  "COALESCE(t.UpdatedAt, t.CreatedAt, '19000101')", "dbo.Items", "t")
+
+EPOCH = datetime.datetime(1900, 1, 1)
+
+
+def ticks(value):
+    """وحدات 100 نانوثانية منذ 1900، بدقة DATETIME2(7)."""
+    return (value - EPOCH) // datetime.timedelta(microseconds=1) * 10
+
+
+def from_ticks(value):
+    # pyodbc يعيد datetime بدقة الميكروثانية فتضيع الخانة السابعة
+    return EPOCH + datetime.timedelta(microseconds=value // 10)
+
+
+class Server:
+    """يحاكي جدولًا بعمود DATETIME2(7) ويطبق شرط keyset كما يفعل SQL Server."""
+
+    def __init__(self, rows):
+        self.rows = rows  # (ItemId, Name, ticks)
+        self.catalog = fake_pyodbc.FakeCatalog()
+        self.catalog.register("sys.columns", lambda query, params: (["name"], []))
+        self.catalog.register("SYSDATETIME()", lambda query, params: (
+            [""], [(datetime.datetime(2030, 1, 1),)]))
+        self.catalog.register("SyncMark", self.changes)
+
+    def changes(self, query, params):
+        top, mark, _, last_key, upper = params
+        rounded = "CONVERT(DATETIME2(6)" in query
+
+        def row_mark(row):
+            return row[2] // 10 * 10 if rounded else row[2]
+
+        selected = sorted(
+            (row for row in self.rows
+             if (row_mark(row) > ticks(mark)
+                 or (row_mark(row) == ticks(mark) and row[0] > last_key))
+             and row_mark(row) < ticks(upper)),
+            key=lambda row: (row_mark(row), row[0]))
+        return (["ItemId", "Name", "SyncMark"],
+                [(row[0], row[1], from_ticks(row_mark(row))) for row in selected[:top]])
+
+    def cursor(self):
+        return fake_pyodbc.Connection(self.catalog).cursor()
+
+
+def test_rows_sharing_a_sub_microsecond_timestamp_are_fetched_once():
+    shared = ticks(datetime.datetime(2024, 5, 1, 10, 30)) + 3  # خانة سابعة غير صفرية
+    rows = [(key, f"item {key}", shared) for key in range(1, 13)]
+    rows.append((13, "later", shared + 70))
+    server = Server(rows)
+    cursor = server.cursor()
+
+    method, expression = detect_method(cursor, TABLE)
+    assert method == "timestamp"
+    upper = fetch_upper_bound(cursor, method)
+    pages = list(itertools.islice(
+        iter_changes(cursor, TABLE, expression, datetime.datetime(1900, 1, 1), 0, upper,
+                     batch_size=5), 10))
+
+    keys = [row[0] for page in pages for row in page]
+    assert keys == list(range(1, 14))
+    assert [len(page) for page in pages] == [5, 5, 3]
+
+
+def test_resume_from_saved_mark_skips_rows_already_synced():
+    shared = ticks(datetime.datetime(2024, 5, 1, 10, 30)) + 9
+    server = Server([(key, str(key), shared) for key in range(1, 8)])
+    cursor = server.cursor()
+    _, expression = detect_method(cursor, TABLE)
+
+    first = next(iter_changes(cursor, TABLE, expression, datetime.datetime(1900, 1, 1), 0,
+                              datetime.datetime(2030, 1, 1), batch_size=4))
+    mark, last_key = first[-1][-1], first[-1][0]
+    pages = itertools.islice(iter_changes(cursor, TABLE, expression, mark, last_key,
+                                          datetime.datetime(2030, 1, 1), batch_size=4), 10)
+    rest = [row[0] for page in pages for row in page]
+    assert rest == [5, 6, 7]
+
+
+ITEMS = SyncTable("sales.InvoiceItems", ["InvoiceItemId", "InvoiceId", "ProductId"], "InvoiceItemId",
+                  "sales.InvoiceItems AS ii INNER JOIN sales.Invoices AS i ON i.InvoiceId = ii.InvoiceId",
+                  "COALESCE(i.UpdatedAt, i.CreatedAt, '19000101')", "sales.InvoiceItems", "ii",
+                  "InvoiceId")
+
+
+class InvoiceServer:
+    """بنود فواتير تتبع علامة فاتورتها، كما في SYNC_TABLES."""
+
+    def __init__(self):
+        self.updated = {}  # InvoiceId -> آخر تعديل
+        self.items = {}  # InvoiceItemId -> (InvoiceId, ProductId)
+        self.catalog = fake_pyodbc.FakeCatalog()
+        self.catalog.register("sys.columns", lambda query, params: (["name"], []))
+        self.catalog.register("SYSDATETIME()", lambda query, params: (
+            [""], [(datetime.datetime(2030, 1, 1),)]))
+        self.catalog.register("SyncMark", self.changes)
+
+    def changes(self, query, params):
+        top, mark, _, last_key, upper = params
+        selected = sorted(
+            (self.updated[invoice], item, invoice, product)
+            for item, (invoice, product) in self.items.items()
+            if (self.updated[invoice], item) > (mark, last_key) and self.updated[invoice] < upper)
+        return (["InvoiceItemId", "InvoiceId", "ProductId", "SyncMark"],
+                [(item, invoice, product, mark) for mark, item, invoice, product in selected[:top]])
+
+    def cursor(self):
+        return fake_pyodbc.Connection(self.catalog).cursor()
+
+
+def test_edited_invoice_replaces_its_local_items(tmp_path):
+    server = InvoiceServer()
+    created = datetime.datetime(2024, 5, 1, 9)
+    server.updated = {1: created, 2: created}
+    server.items = {1: (1, 100), 2: (1, 101), 3: (1, 102), 4: (2, 100), 5: (2, 103)}
+    store = LocalStore(str(tmp_path / "replica.sqlite"))
+    try:
+        sync_table(server.cursor(), store, ITEMS, batch_size=2)
+
+        # تعديل الفاتورة 1: حذف بند، تغيير بند، إضافة بند؛ بنودها تتوزع على صفحتين
+        server.updated[1] = created + datetime.timedelta(hours=1)
+        del server.items[2]
+        server.items[3] = (1, 109)
+        server.items[6] = (1, 104)
+        result = sync_table(server.cursor(), store, ITEMS, batch_size=2)
+
+        assert result["rows"] == 3
+        local = store.db.execute(
+            'SELECT InvoiceItemId, InvoiceId, ProductId FROM "sales_InvoiceItems" ORDER BY 1').fetchall()
+        assert local == [(1, 1, 100), (3, 1, 109), (4, 2, 100), (5, 2, 103), (6, 1, 104)]
+    finally:
+        store.close()
@@ -0,0 +1,162 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from db_pool import ConnectionPool, ConnectionReleasedError, PoolClosedError, PoolTimeoutError
+
+
+class Connector:
+    """ينشئ اتصالات SQLite في الذاكرة ويحتفظ بها لفحص ما أُغلق منها."""
+
+    def __init__(self):
+        self.created = []
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        raw = sqlite3.connect(":memory:", check_same_thread=False)
+        with self.lock:
+            self.created.append(raw)
+        return raw
+
+
+def is_closed(raw):
+    try:
+        raw.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+def make_pool(connector, **kwargs):
+    kwargs.setdefault("reap_interval", 0)
+    return ConnectionPool(connector, **kwargs)
+
+
+def test_reuses_idle_connection_and_counts_hits():
+    connector = Connector()
+    pool = make_pool(connector, min_size=1, max_size=2)
+    with pool.connection() as first:
+        first_raw = first._raw
+    with pool.connection() as second:
+        assert second._raw is first_raw
+    stats = pool.stats()
+    assert len(connector.created) == 1
+    assert (stats["checkouts"], stats["hits"], stats["misses"]) == (2, 2, 0)
+    assert stats["hit_rate"] == 1.0
+    assert (stats["size"], stats["idle"]) == (1, 1)
+    pool.close()
+
+
+def test_opens_new_connection_up_to_max_size_then_times_out():
+    connector = Connector()
+    pool = make_pool(connector, min_size=0, max_size=2)
+    first = pool.acquire()
+    second = pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.05)
+    stats = pool.stats()
+    assert (stats["misses"], stats["waits"], stats["size"]) == (2, 1, 2)
+    assert stats["max_wait"] >= 0.05
+    first.close()
+    second.close()
+    pool.close()
+
+
+def test_waiting_acquire_gets_released_connection():
+    pool = make_pool(Connector(), min_size=0, max_size=1)
+    held = pool.acquire()
+    threading.Timer(0.05, held.close).start()
+    with pool.connection(timeout=2) as conn:
+        assert conn._raw is held._raw
+    assert pool.stats()["waits"] == 1
+    pool.close()
+
+
+def test_release_closes_cursors_and_rolls_back():
+    pool = make_pool(Connector(), min_size=1, max_size=1)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO t VALUES (1)")
+    with pytest.raises(sqlite3.ProgrammingError):
+        cursor.fetchall()
+    with pool.connection() as conn:
+        assert conn.cursor().execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.close()
+
+
+def test_use_after_release_raises():
+    pool = make_pool(Connector(), min_size=1, max_size=1)
+    conn = pool.acquire()
+    conn.close()
+    with pytest.raises(ConnectionReleasedError):
+        conn.cursor()
+    with pytest.raises(ConnectionReleasedError):
+        conn.commit()
+    conn.close()  # الإغلاق الثاني لا يعيد الاتصال مرتين
+    assert pool.stats()["idle"] == 1
+    pool.close()
+
+
+def test_dead_connection_fails_probe_and_is_replaced():
+    connector = Connector()
+    pool = make_pool(connector, min_size=1, max_size=1)
+    connector.created[0].close()
+    with pool.connection() as conn:
+        assert conn._raw is not connector.created[0]
+    stats = pool.stats()
+    assert (stats["probe_failures"], stats["discarded"], stats["size"]) == (1, 1, 1)
+    pool.close()
+
+
+def test_probe_skipped_for_recently_returned_connection():
+    connector = Connector()
+    pool = make_pool(connector, min_size=1, max_size=1, probe_after=60)
+    with pool.connection():
+        pass
+    connector.created[0].close()
+    with pool.connection() as conn:
+        assert conn._raw is connector.created[0]
+    assert pool.stats()["probe_failures"] == 0
+    pool.close()
+
+
+def test_idle_connections_above_min_size_are_evicted_on_release():
+    connector = Connector()
+    pool = make_pool(connector, min_size=1, max_size=3, idle_timeout=0.05)
+    held = [pool.acquire() for _ in range(3)]
+    for conn in held:
+        conn.close()
+    time.sleep(0.1)
+    assert pool.evict_idle() == 2
+    stats = pool.stats()
+    assert (stats["evictions"], stats["size"], stats["idle"]) == (2, 1, 1)
+    assert sum(is_closed(raw) for raw in connector.created) == 2
+    pool.close()
+
+
+def test_background_reaper_evicts_without_acquire():
+    connector = Connector()
+    pool = ConnectionPool(connector, min_size=0, max_size=2, idle_timeout=0.05, reap_interval=0.02)
+    pool.acquire().close()
+    deadline = time.monotonic() + 2
+    while pool.stats()["size"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.stats()["evictions"] == 1
+    assert is_closed(connector.created[0])
+    pool.close()
+
+
+def test_closed_pool_raises_closed_error_and_closes_returned_connections():
+    connector = Connector()
+    pool = make_pool(connector, min_size=1, max_size=2)
+    held = pool.acquire()
+    pool.close()
+    with pytest.raises(PoolClosedError):
+        pool.acquire()
+    held.close()
+    assert all(is_closed(raw) for raw in connector.created)
+    assert pool.stats()["size"] == 0
@@ -0,0 +1,16 @@
+import os
+import subprocess
+import sys
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# الأدوات كلها تُستورد على جهاز بلا pyodbc (--offline، --fixtures، التحقق من الملفات)؛
+# المشغل يُطلب عند أول اتصال فقط عبر test._pyodbc()
+MODULES = ["test", "export_invoices", "load_products", "change_sync", "async_db",
+           "query_registry", "aggregates", "performance_advisor", "offline_schema"]
+
+
+def test_modules_import_without_the_driver():
+    code = "import sys; sys.modules['pyodbc'] = None\n" + "".join(f"import {name}\n" for name in MODULES)
+    result = subprocess.run([sys.executable, "-c", code], cwd=PYTHON_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
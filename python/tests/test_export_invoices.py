@@ -0,0 +1,132 @@
+import datetime
+import json
+
+import fake_pyodbc
+import pytest
+from db_pool import ConnectionPool
+from export_invoices import Checkpoint, export_invoices
+
+
+class Invoices:
+    """كتالوج وهمي بحدود تواريخ قابلة للتغيير وأقسام فارغة."""
+
+    def __init__(self, first, last):
+        self.bounds = (first, last)
+        self.bounds_queries = 0
+        self.catalog = fake_pyodbc.FakeCatalog()
+        self.catalog.register("MIN(InvoiceDate)", self.bounds_query)
+        self.catalog.register("i.InvoiceDate >= ?", lambda query, params: (["InvoiceId"], []))
+
+    def bounds_query(self, query, params):
+        self.bounds_queries += 1
+        return ["First", "Last"], [self.bounds]
+
+    def pool(self):
+        return ConnectionPool(lambda: fake_pyodbc.Connection(self.catalog), min_size=0, max_size=2,
+                              probe_query=None, reap_interval=0)
+
+
+def run(source, tmp_path, **kwargs):
+    pool = source.pool()
+    try:
+        return export_invoices(partition_days=10, workers=2, output_dir=str(tmp_path), pool=pool, **kwargs)
+    finally:
+        pool.close()
+
+
+def test_resume_keeps_resolved_range_when_new_invoices_arrive(tmp_path):
+    source = Invoices(datetime.datetime(2024, 1, 1, 9), datetime.datetime(2024, 1, 25, 17))
+    assert run(source, tmp_path)
+    saved = json.loads((tmp_path / "checkpoint.json").read_text(encoding="utf-8"))
+    assert saved["range"] == {"start": "2024-01-01", "end": "2024-01-25"}
+
+    source.bounds = (datetime.datetime(2024, 1, 1, 9), datetime.datetime(2024, 2, 3, 8))
+    assert run(source, tmp_path)
+    # الفترة المحفوظة تُستخدم دون إعادة حساب MIN/MAX
+    assert source.bounds_queries == 1
+
+
+def test_explicit_range_must_match_saved_checkpoint(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = Checkpoint(path, {"partition_days": 10, "format": "csv"})
+    checkpoint.start, checkpoint.end = datetime.date(2024, 1, 1), datetime.date(2024, 1, 25)
+    checkpoint.mark_done("2024-01-01_2024-01-11", {"invoices": 3})
+
+    params = {"partition_days": 10, "format": "csv"}
+    assert Checkpoint(path, params).load(end=datetime.date(2024, 1, 25))
+    assert not Checkpoint(path, params).load(end=datetime.date(2024, 2, 3))
+    assert not Checkpoint(path, {"partition_days": 7, "format": "csv"}).load()
+
+    resumed = Checkpoint(path, params)
+    assert resumed.load()
+    assert (resumed.start, resumed.end) == (datetime.date(2024, 1, 1), datetime.date(2024, 1, 25))
+    assert list(resumed.completed) == ["2024-01-01_2024-01-11"]
+
+
+def test_version_one_checkpoint_is_still_resumable(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    path.write_text(json.dumps({
+        "version": 1,
+        "params": {"start": "2024-01-01", "end": "2024-01-25", "partition_days": 10, "format": "csv"},
+        "completed": {"2024-01-01_2024-01-11": {"invoices": 3}},
+    }), encoding="utf-8")
+
+    checkpoint = Checkpoint(str(path), {"partition_days": 10, "format": "csv"})
+    assert checkpoint.load()
+    assert checkpoint.end == datetime.date(2024, 1, 25)
+
+
+class DailyInvoices(Invoices):
+    """فاتورة ببندين لكل يوم؛ interrupt_at يحاكي Ctrl-C أثناء تصدير القسم الذي يبدأ به."""
+
+    def __init__(self, first, last, interrupt_at=None):
+        super().__init__(first, last)
+        self.interrupt_at = interrupt_at
+        self.exported = []
+        self.catalog.register("i.InvoiceDate >= ?", self.invoices)
+        self.catalog.register("ii.InvoiceItemId", self.items)
+
+    def _days(self, lo, hi):
+        return [(lo + datetime.timedelta(days=day)).toordinal() for day in range((hi - lo).days)]
+
+    def invoices(self, query, params):
+        lo, hi = params
+        if lo == self.interrupt_at:
+            raise KeyboardInterrupt
+        self.exported.append(lo)
+        return ["InvoiceId", "InvoiceDate"], [(day, datetime.date.fromordinal(day)) for day in self._days(lo, hi)]
+
+    def items(self, query, params):
+        return ["InvoiceItemId", "InvoiceId"], [
+            (day * 10 + line, day) for day in self._days(*params) for line in (1, 2)]
+
+
+def test_partitions_are_written_to_their_own_files_and_resumed(tmp_path):
+    source = DailyInvoices(datetime.datetime(2024, 1, 1), datetime.datetime(2024, 1, 25),
+                           interrupt_at=datetime.date(2024, 1, 11))
+    pool = source.pool()
+    try:
+        with pytest.raises(KeyboardInterrupt):
+            export_invoices(partition_days=10, workers=1, output_dir=str(tmp_path), pool=pool)
+    finally:
+        pool.close()
+
+    saved = json.loads((tmp_path / "checkpoint.json").read_text(encoding="utf-8"))
+    assert "2024-01-01_2024-01-11" in saved["completed"]
+    assert "2024-01-11_2024-01-21" not in saved["completed"]
+    assert not list(tmp_path.glob("*/*.part"))
+
+    source.interrupt_at = None
+    first_run, source.exported = source.exported, []
+    assert run(source, tmp_path)
+    # الأقسام المكتملة لا يُعاد تصديرها
+    assert sorted(first_run + source.exported) == [
+        datetime.date(2024, 1, 1), datetime.date(2024, 1, 11), datetime.date(2024, 1, 21)]
+
+    assert sorted(path.name for path in (tmp_path / "invoices").iterdir()) == [
+        "2024-01-01_2024-01-11.csv", "2024-01-11_2024-01-21.csv", "2024-01-21_2024-01-26.csv"]
+    lines = (tmp_path / "invoices" / "2024-01-21_2024-01-26.csv").read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "InvoiceId,InvoiceDate" and len(lines) == 6
+    assert lines[1].endswith(",2024-01-21") and lines[-1].endswith(",2024-01-25")
+    items = (tmp_path / "invoice_items" / "2024-01-01_2024-01-11.csv").read_text(encoding="utf-8")
+    assert len(items.splitlines()) == 1 + 10 * 2
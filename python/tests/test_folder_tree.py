@@ -0,0 +1,282 @@
+import os
+import threading
+import time
+
+import pytest
+
+import folder_tree
+
+
+def make_tree(root):
+    (root / "a").mkdir()
+    (root / "x.py").write_text("")
+    (root / "a" / "y.py").write_text("")
+
+
+def make_deep_tree(directory, width=3, depth=3):
+    for index in range(width):
+        (directory / f"f{index}.txt").write_text("")
+        if depth:
+            (directory / f"d{index}").mkdir()
+            make_deep_tree(directory / f"d{index}", width, depth - 1)
+
+
+def walked(root, **options):
+    return [(level, path, list(files)) for level, path, files, _ in folder_tree.walk_tree(str(root), **options)]
+
+
+def listed_files(output):
+    return [line.strip()[2:] for line in output.read_text(encoding="utf-8").splitlines()
+            if line.strip().startswith("📄")]
+
+
+def test_output_and_its_temp_file_are_not_listed(tmp_path):
+    make_tree(tmp_path)
+    output = tmp_path / "folder_tree.txt"
+    output.write_text("previous run")
+
+    folder_tree.write_folder_tree(str(tmp_path), str(output), ignore=folder_tree.build_ignore(), workers=1)
+
+    assert listed_files(output) == ["x.py", "y.py"]
+
+
+def test_cache_files_inside_the_tree_are_not_listed(tmp_path):
+    make_tree(tmp_path)
+    output = tmp_path / "folder_tree.txt"
+    with folder_tree.TreeCache(str(tmp_path / "folder_tree_cache.sqlite"), str(tmp_path)) as cache:
+        folder_tree.write_folder_tree(str(tmp_path), str(output), ignore=folder_tree.build_ignore(),
+                                      workers=1, cache=cache)
+
+    assert listed_files(output) == ["x.py", "y.py"]
+
+
+def test_unchanged_listing_with_new_mtime_does_not_rewrite(tmp_path):
+    make_tree(tmp_path)
+    output = tmp_path / "folder_tree.txt"
+    cache_path = str(tmp_path / "folder_tree_cache.sqlite")
+    ignore = folder_tree.build_ignore()
+
+    def run():
+        with folder_tree.TreeCache(cache_path, str(tmp_path)) as cache:
+            return folder_tree.write_folder_tree(str(tmp_path), str(output), ignore=ignore, workers=1,
+                                                 cache=cache)
+
+    run()
+    run()
+    # ملف مؤقت أُنشئ وحُذف: يتغير mtime المجلد وتبقى قائمته كما هي
+    (tmp_path / "a" / "scratch.tmp").write_text("")
+    (tmp_path / "a" / "scratch.tmp").unlink()
+    assert run()["written"] is False
+    assert listed_files(output) == ["x.py", "y.py"]
+
+
+def test_walk_order_does_not_depend_on_workers(tmp_path):
+    make_deep_tree(tmp_path)
+    sequential = walked(tmp_path, workers=1)
+
+    assert len(sequential) == 1 + 3 + 9 + 27
+    # الترتيب العمقي: كل مجلد يليه ما تحته قبل شقيقه التالي
+    assert [os.path.relpath(path, tmp_path) for _, path, _ in sequential[:3]] == [
+        ".", "d0", os.path.join("d0", "d0")]
+    for workers in (2, 4, 16):
+        assert walked(tmp_path, workers=workers) == sequential
+    assert walked(tmp_path, workers=4, max_depth=1) == [node for node in sequential if node[0] <= 1]
+
+
+def test_default_workers_are_used_only_for_slow_reads(tmp_path):
+    make_deep_tree(tmp_path)
+    sequential = walked(tmp_path, workers=1)
+
+    def scanner(delay):
+        threads = set()
+
+        def scan(path):
+            threads.add(threading.current_thread().name)
+            time.sleep(delay)
+            return folder_tree.scan_directory(path)
+        return threads, scan
+
+    fast_threads, fast = scanner(0)
+    assert walked(tmp_path, scan=fast) == sequential
+    assert fast_threads == {threading.current_thread().name}
+
+    slow_threads, slow = scanner(folder_tree.SLOW_SCAN_SECONDS * 2)
+    assert walked(tmp_path, scan=slow) == sequential
+    assert len(slow_threads) > 1
+
+
+def ignored(patterns, relative, is_dir=False):
+    return folder_tree.IgnoreMatcher(patterns).ignored(relative.rsplit("/", 1)[-1], relative, is_dir)
+
+
+def test_last_matching_rule_decides_negation():
+    assert not ignored(["*.py", "!x.py"], "src/x.py")
+    assert ignored(["*.py", "!x.py"], "src/y.py")
+    # النفي قبل القاعدة العامة لا أثر له
+    assert ignored(["!x.py", "*.py"], "src/x.py")
+    assert ignored(["*.py", "!x.py", "/src/x.py"], "src/x.py")
+
+
+def test_anchored_and_double_star_directory_patterns():
+    assert ignored(["/build/"], "build", is_dir=True)
+    assert not ignored(["/build/"], "src/build", is_dir=True)
+    assert ignored(["build/"], "src/build", is_dir=True)
+
+    for relative in ("tmp", "a/tmp", "a/b/tmp"):
+        assert ignored(["**/tmp/"], relative, is_dir=True)
+    assert not ignored(["**/tmp/"], "a/tmp")
+    assert not ignored(["**/tmp/"], "a/tmpfiles", is_dir=True)
+
+
+def test_directory_only_pattern_does_not_match_a_file():
+    assert ignored(["logs/"], "app/logs", is_dir=True)
+    assert not ignored(["logs/"], "app/logs")
+    assert folder_tree.IgnoreMatcher(["logs/", "*.tmp"]).filter("app", ["logs", "a.tmp", "b.txt"], False) == [
+        "logs", "b.txt"]
+
+
+def test_ignored_directories_are_not_read(tmp_path):
+    for directory in ("src/build/deep", "build", "node_modules/pkg"):
+        (tmp_path / directory).mkdir(parents=True)
+        (tmp_path / directory / "keep.txt").write_text("")
+    read = []
+
+    def scan(path):
+        read.append(os.path.relpath(path, tmp_path))
+        return folder_tree.scan_directory(path)
+
+    # النفي لا يعيد ملفًا داخل مجلد مستثنى، كما في git
+    ignore = folder_tree.IgnoreMatcher(["/build/", "node_modules/", "!node_modules/pkg/keep.txt"])
+    nodes = list(folder_tree.walk_tree(str(tmp_path), ignore, workers=1, scan=scan))
+
+    assert sorted(read) == [".", "src", os.path.join("src", "build"), os.path.join("src", "build", "deep")]
+    assert len(nodes) == len(read)
+
+
+def tree_lines(output):
+    # بعد سطري العنوان والسطر الفارغ
+    return output.read_text(encoding="utf-8").splitlines()[3:]
+
+
+def test_summary_and_sizes_total_the_whole_subtree(tmp_path):
+    root = tmp_path / "root"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "top.txt").write_bytes(b"x" * 100)
+    (root / "a" / "one.txt").write_bytes(b"x" * 1000)
+    (root / "a" / "b" / "two.txt").write_bytes(b"x" * 2048)
+    (root / "a" / "b" / "three.txt").write_bytes(b"")
+    output = tmp_path / "tree.txt"
+    ignore = folder_tree.IgnoreMatcher()
+
+    folder_tree.write_folder_tree(str(root), str(output), ignore=ignore, workers=1, summary=True)
+    assert [line for line in tree_lines(output) if "📁" in line] == [
+        "📁 root/  (4 ملف)", "    📁 a/  (3 ملف)", "        📁 b/  (2 ملف)"]
+
+    # المجلدات الأعمق من max_depth لا تُكتب لكن ملفاتها تدخل في المجاميع
+    stats = folder_tree.write_folder_tree(str(root), str(output), ignore=ignore, workers=1, sizes=True,
+                                          max_depth=1)
+    assert tree_lines(output) == [
+        "📁 root/  (4 ملف، 3.1 KB)",
+        "    📄 top.txt",
+        "    📁 a/  (3 ملف، 3.0 KB)",
+        "        📄 one.txt",
+    ]
+    assert (stats["directories"], stats["files"]) == (3, 4)
+
+
+def test_max_files_summarises_the_rest_of_a_directory(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    for index in range(5):
+        (root / f"f{index}.txt").write_text("")
+    output = tmp_path / "tree.txt"
+
+    stats = folder_tree.write_folder_tree(str(root), str(output), ignore=folder_tree.IgnoreMatcher(), workers=1,
+                                          max_files=2)
+
+    assert tree_lines(output) == ["📁 root/", "    📄 f0.txt", "    📄 f1.txt", "    📄 … و3 ملف آخر"]
+    assert stats["files"] == 5
+
+
+class CachedTree:
+    """شجرة خارج مجلد النتائج وذاكرته، تُكتب بذاكرة المجلدات كما في generate_folder_tree."""
+
+    def __init__(self, tmp_path, monkeypatch):
+        # المجلدات المعدلة قبل التشغيل السابق موثوقة فورًا بدل انتظار ثانيتين
+        monkeypatch.setattr(folder_tree, "RACY_WINDOW_NS", 0)
+        self.root = tmp_path / "root"
+        self.output = tmp_path / "tree.txt"
+        self.cache_path = str(tmp_path / "cache.sqlite")
+        self.ignore = folder_tree.IgnoreMatcher()
+        for directory in ("a", "b", "c/d"):
+            (self.root / directory).mkdir(parents=True)
+            for index in range(3):
+                (self.root / directory / f"{index}.txt").write_text("")
+
+    def write(self, **options):
+        with folder_tree.TreeCache(self.cache_path, str(self.root)) as cache:
+            return folder_tree.write_folder_tree(str(self.root), str(self.output), ignore=self.ignore, workers=1,
+                                                 cache=cache, **options)
+
+    def fresh(self, tmp_path, **options):
+        output = tmp_path / "fresh.txt"
+        folder_tree.write_folder_tree(str(self.root), str(output), ignore=self.ignore, workers=1, **options)
+        return output.read_bytes()
+
+
+def test_only_the_changed_directory_is_regenerated(tmp_path, monkeypatch):
+    tree = CachedTree(tmp_path, monkeypatch)
+    tree.write()
+    copied = []
+    copy_range = folder_tree._copy_range
+    monkeypatch.setattr(folder_tree, "_copy_range",
+                        lambda source, target, start, length: copied.append(length) or copy_range(
+                            source, target, start, length))
+
+    (tree.root / "b" / "new.txt").write_text("")
+    stats = tree.write()
+
+    assert (stats["written"], stats["spliced"], stats["rescanned"]) == (True, True, 1)
+    # كل المجلدات عدا b (الجذر وa وc وc/d؛ الجذر وc بلا ملفات) تُنسخ من الملف السابق
+    assert len(copied) == stats["directories"] - 1 == 4
+    assert tree.output.read_bytes() == tree.fresh(tmp_path)
+
+
+def test_changed_settings_rewrite_the_whole_file(tmp_path, monkeypatch):
+    tree = CachedTree(tmp_path, monkeypatch)
+    tree.write()
+    monkeypatch.setattr(folder_tree, "_copy_range", lambda *args: pytest.fail("أُعيد استخدام جزء قديم"))
+
+    stats = tree.write(max_files=1)
+
+    assert (stats["written"], stats["spliced"], stats["rescanned"]) == (True, False, 0)
+    assert tree.output.read_bytes() == tree.fresh(tmp_path, max_files=1)
+    assert tree.write(max_files=1)["written"] is False
+
+
+def test_diff_lists_added_and_removed_files_and_directories(tmp_path, monkeypatch, capsys):
+    tree = CachedTree(tmp_path, monkeypatch)
+    tree.write()
+
+    (tree.root / "a" / "new.txt").write_text("")
+    (tree.root / "b" / "0.txt").unlink()
+    (tree.root / "e").mkdir()
+    for name in os.listdir(tree.root / "c" / "d"):
+        (tree.root / "c" / "d" / name).unlink()
+    (tree.root / "c" / "d").rmdir()
+    capsys.readouterr()
+    folder_tree.generate_folder_tree(str(tree.root), str(tree.output), ignore=tree.ignore, workers=1,
+                                     cache_file=tree.cache_path, show_changes=True)
+
+    printed = capsys.readouterr().out
+    changes = printed.split("🔀")[1].split("\n✅")[0].strip().splitlines()[1:]
+    assert [line.strip() for line in changes] == [
+        f"+ {os.path.join('a', 'new.txt')}",
+        f"- {os.path.join('b', '0.txt')}",
+        f"- {os.path.join('c', 'd', '')}",
+        f"- {os.path.join('c', 'd', '0.txt')}",
+        f"- {os.path.join('c', 'd', '1.txt')}",
+        f"- {os.path.join('c', 'd', '2.txt')}",
+        f"+ {os.path.join('e', '')}",
+    ]
+    assert tree.output.read_bytes() == tree.fresh(tmp_path)
@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+
+import instrumentation
+from instrumentation import QueryRecorder
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_latency_histogram_buckets_include_their_upper_bound():
+    recorder = QueryRecorder()
+    for seconds in (0.0004, 0.001, 0.0011, 0.004, 0.2, 61.0):
+        recorder.record("q", execute=seconds / 2, fetch=seconds / 4, format_seconds=seconds / 4, rows=1)
+
+    stats = recorder.report()["queries"]["q"]
+
+    assert stats["histogram_ms"] == {"<=1": 2, "<=2": 1, "<=5": 1, "<=250": 1, ">60000": 1}
+    assert stats["count"] == 6 and stats["rows"] == 6
+    assert stats["p50_ms"] == 2.0
+    # المئين في الفئة المفتوحة هو أطول زمن مسجل
+    assert stats["p99_ms"] == 61000.0
+    assert stats["max_ms"]["format"] == 15250.0
+
+
+def run_with_env(code, report_path=None):
+    env = dict(os.environ)
+    env.pop(instrumentation.REPORT_ENV_VAR, None)
+    if report_path:
+        env[instrumentation.REPORT_ENV_VAR] = report_path
+    return subprocess.run([sys.executable, "-c", code], cwd=PYTHON_DIR, env=env,
+                          capture_output=True, text=True, check=True).stdout
+
+
+def test_env_toggle_enables_recording_and_writes_report_at_exit(tmp_path):
+    code = ("import instrumentation\n"
+            "timer = instrumentation.start_query('probe')\n"
+            "print(timer is not None)\n"
+            "if timer:\n"
+            "    timer.lap('execute')\n"
+            "    timer.done(3, 10)\n")
+    assert run_with_env(code).strip() == "False"
+    assert not list(tmp_path.iterdir())
+
+    report_path = tmp_path / "stats.json"
+    assert run_with_env(code, str(report_path)).strip() == "True"
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert report["queries"]["probe"]["count"] == 1
+    assert report["queries"]["probe"]["rows"] == 3
+
+
+def test_disable_stops_recording():
+    recorder = instrumentation.enable()
+    try:
+        assert instrumentation.start_query("q") is not None
+        assert instrumentation.get_recorder() is recorder
+    finally:
+        instrumentation.disable()
+    assert instrumentation.start_query("q") is None
@@ -0,0 +1,112 @@
+import csv
+import json
+
+import pytest
+
+import fake_pyodbc
+from load_products import ProductValidator, iter_json_array, load_products
+
+
+class Products:
+    """
+    كتالوج وهمي يرفض إدراج أي صف باركوده ضمن bad كما يفعل قيد على الخادم، ولا يثبت
+    الصفوف المدرجة إلا عند commit.
+    """
+
+    def __init__(self, bad=()):
+        self.bad = set(bad)
+        self.staged = []
+        self.inserted = []
+        self.catalog = fake_pyodbc.FakeCatalog()
+        self.catalog.register("SELECT Barcode", lambda query, params: (["Barcode"], []))
+        self.catalog.register("INSERT INTO inventory.Products", self.insert)
+
+    def insert(self, query, params):
+        rows = params if params and isinstance(params[0], (list, tuple)) else [params]
+        if any(row[1] in self.bad for row in rows):
+            raise fake_pyodbc.Error("23000", "Violation of CHECK constraint")
+        self.staged.extend(row[1] for row in rows)
+
+    def connect(self):
+        products = self
+
+        class Connection(fake_pyodbc.Connection):
+            def commit(self):
+                products.inserted.extend(products.staged)
+                products.staged.clear()
+
+            def rollback(self):
+                products.staged.clear()
+
+        return Connection(self.catalog)
+
+
+def write_products(path, count):
+    records = [{"name": f"P{i}", "barcode": f"B{i:05d}", "purchasePrice": "1.00", "salePrice": "2.00"}
+               for i in range(count)]
+    path.write_text(json.dumps(records), encoding="utf-8")
+
+
+def test_failed_transaction_isolates_bad_rows_by_bisection(tmp_path):
+    write_products(tmp_path / "products.json", 1000)
+    products = Products(bad={"B00137", "B00800"})
+    rejects = tmp_path / "rejects.csv"
+    cnxn = products.connect()
+
+    stats = load_products(cnxn, str(tmp_path / "products.json"), batch_size=100, commit_size=1000,
+                          reject_path=str(rejects), check_categories=False)
+
+    assert stats["inserted"] == 998
+    assert stats["rejected"] == 2
+    assert sorted(products.inserted) == sorted(f"B{i:05d}" for i in range(1000) if i not in (137, 800))
+    with open(rejects, encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["_record"] for row in rows] == ["138", "801"]
+    # التنصيف: عشرات المحاولات بدل 1000 إدراج فردي
+    assert products.catalog.counters["executes"] < 120
+
+
+def test_barcode_duplicates_are_case_insensitive():
+    validator = ProductValidator(existing_barcodes={"ABC-1"})
+    records = [
+        {"name": "a", "barcode": "abc-1", "purchasePrice": "1", "salePrice": "2"},
+        {"name": "b", "barcode": "X9", "purchasePrice": "1", "salePrice": "2"},
+        {"name": "c", "barcode": "x9", "purchasePrice": "1", "salePrice": "2"},
+    ]
+
+    valid, rejected = validator.validate(records)
+
+    assert [index for index, _ in valid] == [1]
+    assert [index for index, _ in rejected] == [0, 2]
+
+
+def test_json_array_is_streamed_across_chunks(tmp_path):
+    records = [{"name": f"P{i}", "price": 12345 + i, "tags": ["a", "b"], "note": "x" * (i % 7)}
+               for i in range(200)]
+    path = tmp_path / "products.json"
+    path.write_text(json.dumps(records, indent=2), encoding="utf-8")
+
+    # أجزاء صغيرة تقطع العناصر والأرقام في منتصفها
+    assert list(iter_json_array(str(path), chunk_size=7)) == records
+    assert list(iter_json_array(str(path), chunk_size=1)) == records
+
+
+def test_malformed_json_array_is_rejected(tmp_path):
+    path = tmp_path / "products.json"
+    for text in ("[,,1]", "[1 2]", "[1,]", "[1, 2", "{}", ""):
+        path.write_text(text, encoding="utf-8")
+        with pytest.raises(ValueError):
+            list(iter_json_array(str(path), chunk_size=2))
+    path.write_text(" [ ] ", encoding="utf-8")
+    assert list(iter_json_array(str(path), chunk_size=2)) == []
+
+
+def test_description_and_image_url_are_not_length_limited():
+    validator = ProductValidator()
+    long_text = "x" * 10000
+
+    valid, rejected = validator.validate([{"name": "a", "purchasePrice": "1", "salePrice": "2",
+                                           "description": long_text, "imageUrl": long_text}])
+
+    assert rejected == []
+    assert len(valid) == 1
@@ -0,0 +1,112 @@
+import hashlib
+
+import fake_pyodbc
+import module_definitions
+from module_definitions import DefinitionCache
+
+
+class Server:
+    """sys.sql_modules مصغر؛ الأسماء تُحل كما يحلها OBJECT_ID (بلا أقواس ولا حساسية للحالة)."""
+
+    def __init__(self, definitions):
+        self.modules = {}
+        for object_id, (name, definition) in enumerate(definitions.items(), 100):
+            self.modules[object_id] = (name, definition)
+        self.queries = []
+        self.catalog = fake_pyodbc.FakeCatalog()
+        self.catalog.register("AS requested(ObjectName)", self._hashes)
+        self.catalog.register("m.definition AS Definition", self._definitions)
+        self.cursor = fake_pyodbc.Connection(self.catalog).cursor()
+
+    @staticmethod
+    def _key(name):
+        return ".".join(part.strip("[]") for part in name.split(".")).casefold()
+
+    @staticmethod
+    def _hash(definition):
+        return hashlib.sha256(definition.encode("utf-8")).hexdigest().upper()
+
+    def _object_id(self, name):
+        return next((object_id for object_id, (module, _) in self.modules.items()
+                     if self._key(module) == self._key(name)), None)
+
+    def _hashes(self, query, params):
+        self.queries.append(("hashes", list(params)))
+        rows = []
+        for name in params:
+            object_id = self._object_id(name)
+            if object_id is not None:
+                rows.append((name, object_id, self._hash(self.modules[object_id][1])))
+        return ["ObjectName", "ObjectId", "DefinitionHash"], rows
+
+    def _definitions(self, query, params):
+        self.queries.append(("definitions", list(params)))
+        return ["ObjectId", "DefinitionHash", "Definition"], [
+            (object_id, self._hash(definition), definition)
+            for object_id, (_, definition) in self.modules.items() if object_id in params]
+
+    def alter(self, name, definition):
+        object_id = self._object_id(name)
+        self.modules[object_id] = (self.modules[object_id][0], definition)
+
+
+DEFINITIONS = {
+    "sales.sp_x": "CREATE PROCEDURE sales.sp_x AS SELECT 1;",
+    "sales.vw_Totals": "CREATE VIEW sales.vw_Totals AS SELECT 2 AS n;",
+    "inventory.fn_Stock": "CREATE FUNCTION inventory.fn_Stock() RETURNS INT AS BEGIN RETURN 3 END;",
+}
+
+
+def test_names_are_resolved_by_object_id_and_returned_as_requested():
+    server = Server(DEFINITIONS)
+    names = ["SALES.sp_x", "[sales].[SP_X]", "sales.missing", "[inventory].[fn_Stock]"]
+
+    definitions = module_definitions.fetch_definitions(server.cursor, names, DefinitionCache(None))
+
+    assert list(definitions) == ["SALES.sp_x", "[sales].[SP_X]", "[inventory].[fn_Stock]"]
+    assert definitions["[sales].[SP_X]"] == definitions["SALES.sp_x"]
+    assert definitions["SALES.sp_x"][1] == DEFINITIONS["sales.sp_x"]
+    # الكائن المطلوب باسمين يُنقل تعريفه مرة واحدة
+    assert server.queries[1] == ("definitions", [100, 102])
+
+
+def test_names_and_definitions_are_fetched_in_batches():
+    definitions = {f"dbo.sp_{index}": f"CREATE PROCEDURE dbo.sp_{index} AS SELECT {index};"
+                   for index in range(5)}
+    server = Server(definitions)
+
+    result = module_definitions.fetch_definitions(server.cursor, list(definitions), DefinitionCache(None),
+                                                  batch_size=2)
+
+    assert {name: definition for name, (_, definition) in result.items()} == definitions
+    assert [(kind, len(params)) for kind, params in server.queries] == [
+        ("hashes", 2), ("hashes", 2), ("hashes", 1),
+        ("definitions", 2), ("definitions", 2), ("definitions", 1)]
+
+
+def test_cached_definitions_are_reused_by_hash(tmp_path):
+    server = Server(DEFINITIONS)
+    cache_path = str(tmp_path / "definitions.json")
+    names = list(DEFINITIONS)
+    module_definitions.fetch_definitions(server.cursor, names, DefinitionCache(cache_path))
+
+    # تشغيل جديد بالملف نفسه: التجزئات فقط تُجلب، ولا تعريف يُنقل
+    server.queries.clear()
+    first = module_definitions.fetch_definitions(server.cursor, names, DefinitionCache(cache_path))
+    assert [kind for kind, _ in server.queries] == ["hashes"]
+
+    # التجزئات الممررة من أقسام المخطط تُغني حتى عن استعلام التجزئات
+    server.queries.clear()
+    hashes = {name: definition_hash for name, (definition_hash, _) in first.items()}
+    assert module_definitions.fetch_definitions(
+        server.cursor, names, DefinitionCache(cache_path), hashes=hashes) == first
+    assert server.queries == []
+
+    # الكائن الذي تغير وحده يُجلب من جديد، ولو مُررت تجزئته القديمة
+    server.queries.clear()
+    server.alter("sales.vw_Totals", "CREATE VIEW sales.vw_Totals AS SELECT 4 AS n;")
+    stale = dict(hashes, **{"sales.vw_Totals": "0" * 64})
+    result = module_definitions.fetch_definitions(server.cursor, names, DefinitionCache(cache_path),
+                                                  hashes=stale)
+    assert result["sales.vw_Totals"][1] == "CREATE VIEW sales.vw_Totals AS SELECT 4 AS n;"
+    assert server.queries == [("hashes", ["sales.vw_Totals"]), ("definitions", [101])]
@@ -0,0 +1,62 @@
+import offline_schema
+
+SCRIPT = """
+CREATE TABLE inventory.Items (
+    ItemId INT PRIMARY KEY,
+    Quantity INT NOT NULL,
+    Price DECIMAL(10, 2) NOT NULL CHECK (Price >= 0),
+    Total AS (Quantity * Price),
+    Status NVARCHAR(20) NOT NULL,
+    CONSTRAINT CK_Items_Status CHECK (Status IN ('Active', 'Archived'))
+);
+"""
+
+# ما يعيده الخادم للجدول نفسه: نوع العمود المحسوب مستنتج، وتعريفات CHECK بصيغة OBJECT_DEFINITION
+LIVE_SECTIONS = {
+    1: [["inventory", "Items", "ItemId", "int", "", 10, 0, "NO", "YES", "NO", None, None],
+        ["inventory", "Items", "Quantity", "int", "", 10, 0, "NO", "NO", "NO", None, None],
+        ["inventory", "Items", "Price", "decimal", "", 10, 2, "NO", "NO", "NO", None, None],
+        ["inventory", "Items", "Total", "decimal", "", 21, 2, "YES", "NO", "NO", None, None],
+        ["inventory", "Items", "Status", "nvarchar", "20", None, None, "NO", "NO", "NO", None, None]],
+    6: [["inventory", "Items", "CK__Items__Price__5EBF139D", "CHECK_CONSTRAINT", "([Price]>=(0))"],
+        ["inventory", "Items", "CK_Items_Status", "CHECK_CONSTRAINT",
+         "([Status]='Archived' OR [Status]='Active')"]],
+}
+
+
+def snapshot(rows_by_section):
+    return {"sections": {str(number): {"columns": offline_schema.SECTION_COLUMNS[number],
+                                       "owners": {"inventory.Items": rows}}
+                         for number, rows in rows_by_section.items()}}
+
+
+def offline_sections():
+    model = offline_schema.SchemaModel()
+    model.parse(SCRIPT)
+    rows = model.section_rows()
+    return {number: rows[number]["inventory.Items"] for number in (1, 6)}
+
+
+def test_check_definitions_use_the_server_form():
+    assert offline_schema.normalize_check("Price >= 0") == "([Price]>=(0))"
+    assert offline_schema.normalize_check("([Price]>=(0))") == "([Price]>=(0))"
+    assert offline_schema.normalize_check("Quantity > 0 AND Discount BETWEEN 0 AND 100") == \
+        "([Quantity]>(0) AND ([Discount]>=(0) AND [Discount]<=(100)))"
+    assert offline_schema.normalize_check("LEN(Name) > 0") == "(len([Name])>(0))"
+
+
+def test_computed_columns_and_checks_match_the_live_schema():
+    offline = offline_sections()
+    computed = [row for row in offline[1] if row[2] == "Total"]
+    assert computed[0][3] == offline_schema.COMPUTED_DATA_TYPE
+
+    assert offline_schema.diff_snapshots(snapshot(offline), snapshot(LIVE_SECTIONS)) == []
+
+
+def test_real_check_differences_are_still_reported():
+    live = dict(LIVE_SECTIONS)
+    live[6] = [LIVE_SECTIONS[6][0][:4] + ["([Price]>(0))"], LIVE_SECTIONS[6][1]]
+
+    differences = offline_schema.diff_snapshots(snapshot(offline_sections()), snapshot(live))
+
+    assert [(row[0], row[1]) for row in differences] == [(6, "inventory.Items")]
@@ -0,0 +1,69 @@
+import os
+
+import performance_advisor
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "dmv_snapshot.json")
+
+
+def load_snapshot():
+    return performance_advisor.load_fixtures(FIXTURE)
+
+
+def as_dicts(result):
+    columns, rows = result
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def test_prefix_suggestion_is_merged_into_the_wider_index():
+    rows = as_dicts(performance_advisor.rank_missing_indexes(load_snapshot()))
+
+    assert [(row["TableName"], row["KeyColumns"], row["IncludedColumns"]) for row in rows] == [
+        ("inventory.Products", "Barcode", ""),
+        ("sales.SalesInvoices", "CompanyId, InvoiceDate", "TotalAmount"),
+        ("sales.SalesInvoices", "CompanyId", "Notes"),
+    ]
+    merged = rows[1]
+    # 10 × 90% × 100 + 5 × 80% × 50 على مدى 10 أيام
+    assert merged["MergedSuggestions"] == 1
+    assert merged["Requests"] == 150
+    assert merged["EstimatedImpact"] == 1100.0
+    assert merged["ImpactPerDay"] == 110.0
+    assert merged["SuggestedIndex"] == ("CREATE NONCLUSTERED INDEX [IX_SalesInvoices_CompanyId_InvoiceDate] "
+                                        "ON sales.SalesInvoices (CompanyId, InvoiceDate) INCLUDE (TotalAmount);")
+    # الأعمدة المضمنة غير المغطاة تمنع الدمج
+    assert rows[2]["MergedSuggestions"] == 0
+
+
+def test_primary_keys_and_unique_indexes_are_never_drop_candidates():
+    rows = as_dicts(performance_advisor.rank_index_usage(load_snapshot()))
+
+    assert [row["IndexName"] for row in rows] == [
+        "sales.SalesInvoices.IX_SalesInvoices_Status",
+        "sales.SalesInvoices.IX_SalesInvoices_CustomerId",
+    ]
+    assert rows[0]["Reads"] == 0 and rows[0]["EstimatedImpact"] == 200.0
+    assert rows[0]["Recommendation"].startswith("غير مستخدم")
+    assert rows[1]["EstimatedImpact"] == 50.0
+    assert rows[1]["Recommendation"].startswith("تكلفة التحديث")
+
+
+def test_fragmentation_thresholds():
+    rows = as_dicts(performance_advisor.rank_fragmentation(load_snapshot()))
+    by_index = {row["IndexName"].rsplit(".", 1)[1]: row for row in rows}
+
+    assert by_index["PK_SalesInvoices"]["Recommendation"] == "ALTER INDEX ... REBUILD"
+    assert by_index["IX_SalesInvoices_Status"]["Recommendation"] == "ALTER INDEX ... REBUILD"
+    assert by_index["IX_SalesInvoices_CustomerId"]["Recommendation"] == "ALTER INDEX ... REORGANIZE"
+    assert by_index["IX_Products_Name"]["Recommendation"] == "ALTER INDEX ... REORGANIZE"
+    assert by_index["PK_Products"]["Recommendation"] == "لا حاجة"
+    small = by_index["UQ_Products_Barcode"]
+    assert small["Recommendation"] == "لا حاجة (فهرس صغير)"
+    assert small["EstimatedImpact"] == 0.0
+    assert rows[0]["IndexName"] == "sales.SalesInvoices.IX_SalesInvoices_CustomerId"
+    assert rows[-1]["IndexName"] == "inventory.Products.UQ_Products_Barcode"
+
+
+def test_fixture_sections_all_render():
+    titles = [title for title, _, rows in performance_advisor.analyze(load_snapshot()) if rows]
+
+    assert titles == [title for title, _ in performance_advisor.ADVISOR_SECTIONS]
@@ -0,0 +1,73 @@
+import query_registry
+from query_registry import ResultCache, estimate_size
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def rows(count, text="x" * 100):
+    return [(index, text) for index in range(count)]
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_registry.time, "monotonic", clock)
+    cache = ResultCache()
+    cache.put("kpis", ["n"], [(1,)], ttl=60)
+
+    clock.now += 59
+    assert cache.get("kpis") == (["n"], [(1,)])
+    clock.now += 1
+    assert cache.get("kpis") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+    assert (stats["entries"], stats["bytes"]) == (0, 0)
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    size = estimate_size(["n", "text"], rows(10))
+    cache = ResultCache(max_bytes=size * 3)
+    for key in ("a", "b", "c"):
+        cache.put(key, ["n", "text"], rows(10), ttl=60)
+    assert cache.get("a") is not None  # "b" يصبح الأقدم استخدامًا
+
+    cache.put("d", ["n", "text"], rows(10), ttl=60)
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in ("a", "c", "d"))
+
+    # نتيجة كبيرة تخرج ما يلزم فقط، والنتيجة الأكبر من الحد لا تُخزن
+    cache.put("big", ["n", "text"], rows(20), ttl=60)
+    assert [key for key in ("a", "c", "d") if cache.get(key) is not None] == ["d"]
+    cache.put("huge", ["n", "text"], rows(40), ttl=60)
+    assert cache.get("huge") is None
+
+    stats = cache.stats()
+    assert (stats["evictions"], stats["oversize"]) == (3, 1)
+    assert stats["bytes"] == estimate_size(["n", "text"], rows(10)) + estimate_size(["n", "text"], rows(20))
+    assert stats["bytes"] <= cache.max_bytes
+
+
+def test_invalidate_by_table_schema_or_everything():
+    cache = ResultCache()
+    cache.put("kpis", ["n"], [(1,)], 60, ("sales.vw_DashboardKPIs", "sales.Invoices", "inventory.Products"))
+    cache.put("restock", ["n"], [(2,)], 60, ("inventory.vw_ProductDetails", "inventory.Products"))
+    cache.put("balances", ["n"], [(3,)], 60, ("accounting.JournalEntries",))
+
+    assert cache.invalidate(schema="SALES", table="invoices") == 1
+    assert cache.get("kpis") is None
+    assert cache.invalidate(table="Inventory.PRODUCTS") == 1
+    assert cache.invalidate(table="JournalEntries") == 0
+    assert cache.invalidate(schema="Accounting") == 1
+    assert cache.stats()["entries"] == 0
+
+    cache.put("kpis", ["n"], [(1,)], 60, ("sales.Invoices",))
+    cache.put("restock", ["n"], [(2,)], 60, ("inventory.Products",))
+    assert cache.invalidate() == 2
+    assert cache.stats()["invalidations"] == 5
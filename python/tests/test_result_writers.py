@@ -0,0 +1,131 @@
+import csv
+import datetime
+import decimal
+import io
+import json
+
+import result_writers
+from result_writers import create_writer, read_columnar
+
+
+def write_columnar(path, names, batches):
+    with create_writer("columnar", str(path)) as writer:
+        writer.start("result")
+        writer.columns(names)
+        for batch in batches:
+            writer.rows(batch)
+        writer.finish(sum(len(batch) for batch in batches))
+    return list(read_columnar(str(path)))
+
+
+def test_columnar_round_trips_mixed_and_null_columns(tmp_path):
+    utc = datetime.timezone.utc
+    rows = [
+        (1, 1.5, decimal.Decimal("1"), decimal.Decimal("10.25"), datetime.datetime(2024, 1, 2, 3, 4, 5, 6),
+         datetime.date(2024, 5, 1), None, "Paid", b"\x00\x01", 2 ** 70, datetime.datetime(2024, 1, 1, tzinfo=utc)),
+        (2, 2, 3, None, None, datetime.date(1900, 1, 1), None, "Paid", None, 5, None),
+        (None, None, decimal.Decimal("-0.5"), decimal.Decimal("Infinity"), datetime.datetime(1950, 6, 1),
+         None, None, None, b"", None, None),
+    ]
+    names = [f"c{index}" for index in range(len(rows[0]))]
+
+    [(title, read_names, read_rows)] = write_columnar(tmp_path / "r.awcol", names, [rows[:2], rows[2:]])
+
+    assert (title, read_names) == ("result", names)
+    for read, original in zip(read_rows, rows):
+        assert read[:10] == list(original[:10])
+    # القيم بمنطقة زمنية تُحفظ نصًا
+    assert read_rows[0][10] == "2024-01-01 00:00:00+00:00"
+    # int و float في عمود واحد تُقرأ كـ float دون التحول إلى نص
+    assert read_rows[1][1] == 2.0 and isinstance(read_rows[1][1], float)
+
+
+def test_all_null_column_carries_no_data():
+    assert result_writers._encode_column([None] * 1000) == result_writers._COLUMN_NULL
+
+
+def test_columnar_is_smaller_than_csv(tmp_path):
+    rows = [(index, f"INV-{index:08d}", datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=index),
+             decimal.Decimal("150.00"), None, "Cash", "Paid") for index in range(5000)]
+    names = ["InvoiceId", "InvoiceNumber", "InvoiceDate", "TotalAmount", "Notes", "PaymentMethod", "Status"]
+    write_columnar(tmp_path / "r.awcol", names, [rows])
+    with create_writer("csv", str(tmp_path / "r.csv")) as writer:
+        writer.columns(names)
+        writer.rows(rows)
+
+    assert (tmp_path / "r.awcol").stat().st_size < (tmp_path / "r.csv").stat().st_size / 2
+
+
+def test_aligned_widths_cover_every_batch(monkeypatch):
+    monkeypatch.setattr(result_writers, "ALIGN_MEMORY_ROWS", 2)
+    out = io.StringIO()
+    writer = create_writer("aligned", stream=out)
+    writer.start("t")
+    writer.columns(["id", "name"])
+    writer.rows([(1, "a"), (2, None)])
+    writer.rows([(3, "a much longer name"), (12345, "x")])
+    writer.rows([(5, "y")])
+    writer.finish(5)
+
+    lines = out.getvalue().splitlines()[2:]
+    assert lines[0] == "id    | name"
+    assert lines[1] == "------+-------------------"
+    assert [line.index("|") for line in lines[2:]] == [6] * 5
+
+
+def write_text(fmt, names, batches):
+    out = io.StringIO()
+    writer = create_writer(fmt, stream=out)
+    writer.start("t")
+    writer.columns(names)
+    for batch in batches:
+        writer.rows(batch)
+    writer.finish(sum(len(batch) for batch in batches))
+    return out.getvalue()
+
+
+MIXED_ROWS = [
+    (1, "Cash", decimal.Decimal("10.50"), datetime.datetime(2024, 1, 2, 3, 4, 5), True, None),
+    (2, 'a "quoted", value', None, datetime.datetime(2024, 1, 2, 3, 4, 5), False, 1.5),
+    (None, "line\nbreak", decimal.Decimal("-0.01"), None, None, None),
+    (4, "", decimal.Decimal("3"), datetime.datetime(2024, 2, 1), True, 2.25),
+]
+MIXED_NAMES = ["Id", "Name", "Amount", "At", "Flag", "Ratio"]
+
+
+def test_csv_fast_path_matches_csv_module():
+    plain = [(index, f"INV-{index}", decimal.Decimal("1.10"), None) for index in range(50)]
+    for batches in ([plain], [plain[:10], MIXED_ROWS, plain[10:]]):
+        expected = io.StringIO()
+        out = csv.writer(expected, lineterminator="\n")
+        out.writerow(["Id", "Name", "Amount", "At"])
+        for batch in batches:
+            out.writerows(row[:4] for row in batch)
+
+        assert write_text("csv", ["Id", "Name", "Amount", "At"], [
+            [row[:4] for row in batch] for batch in batches]) == expected.getvalue()
+
+
+def test_jsonl_matches_json_dumps_per_row():
+    # عمود int يظهر فيه bool، وعمود date يظهر فيه datetime، وعمود نص فيه رقم
+    rows = [row + (datetime.date(2024, 1, 1), 7, "x") for row in MIXED_ROWS]
+    rows[1] = rows[1][:6] + (datetime.datetime(2024, 1, 1, 12), True, 5)
+    names = MIXED_NAMES + ["Day", "Count", "Text"]
+
+    lines = write_text("jsonl", names, [rows[:2], rows[2:]]).splitlines()
+
+    assert json.loads(lines[0]) == {"result": "t", "columns": names}
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"),
+                              default=result_writers._json_default).encode
+    assert lines[1:] == [encode(dict(zip(names, row))) for row in rows]
+
+
+def test_text_writers_match_str_with_mixed_column_types():
+    rows = [(1, datetime.datetime(2024, 1, 1)), ("two", "not a date"), (3.5, None)]
+
+    plain = write_text("text", ["a", "b"], [rows]).splitlines()
+    aligned = write_text("aligned", ["a", "b"], [rows]).splitlines()
+
+    assert plain[-3:] == ["1 | 2024-01-01 00:00:00", "two | not a date", "3.5 | NULL"]
+    assert [line.split("|")[0].rstrip() for line in aligned[-3:]] == ["1", "two", "3.5"]
+    assert [line.split("| ")[1] for line in aligned[-3:]] == ["2024-01-01 00:00:00", "not a date", "NULL"]
@@ -0,0 +1,137 @@
+import collections
+import datetime
+import decimal
+
+import fake_pyodbc
+import schema_cache
+
+Section = collections.namedtuple("Section", ["number", "query"])
+
+COLUMNS_QUERY = "SELECT TableSchema, TableName, ColumnName, Scale, ModifyDate FROM test_columns ORDER BY 1, 2;"
+INDEXES_QUERY = "SELECT TableSchema, TableName, IndexName FROM test_indexes ORDER BY 1, 2;"
+SECTIONS = [Section(1, COLUMNS_QUERY), Section(2, INDEXES_QUERY)]
+
+MODIFIED = datetime.datetime(2025, 1, 1, 8, 30)
+
+
+class Database:
+    """قاعدة وهمية: جداول بأعمدتها وفهارسها، وتاريخ تعديل لكل جدول."""
+
+    def __init__(self):
+        self.tables = {
+            1: ["sales", "Invoices", MODIFIED, ["InvoiceId", "Total"]],
+            2: ["sales", "Payments", MODIFIED, ["PaymentId"]],
+            3: ["inventory", "Products", MODIFIED, ["ProductId", "Price"]],
+        }
+        self.section_params = []
+        self.catalog = fake_pyodbc.FakeCatalog()
+        self.catalog.register("sys.objects AS o", self._objects)
+        self.catalog.register("FROM test_columns", self._section(
+            ["TableSchema", "TableName", "ColumnName", "Scale", "ModifyDate"], self._columns))
+        self.catalog.register("FROM test_indexes", self._section(
+            ["TableSchema", "TableName", "IndexName"], self._indexes))
+
+    def cursor(self):
+        return fake_pyodbc.Connection(self.catalog).cursor()
+
+    def _objects(self, query, params):
+        return ["object_id", "OwnerSchema", "OwnerName", "CreateDate", "ModifyDate"], [
+            (object_id, schema, name, "2024-01-01T00:00:00", modified.isoformat())
+            for object_id, (schema, name, modified, _) in sorted(self.tables.items())]
+
+    def _columns(self):
+        for schema, name, modified, columns in self.tables.values():
+            for column in columns:
+                yield (schema, name, column, decimal.Decimal("18.2"), modified)
+
+    def _indexes(self):
+        for schema, name, _, _ in self.tables.values():
+            yield (schema, name, f"PK_{name}")
+
+    def _section(self, columns, rows):
+        def handler(query, params):
+            self.section_params.append(params)
+            wanted = set(params)
+            selected = [row for row in rows() if not params or f"{row[0]}.{row[1]}" in wanted]
+            return columns, sorted(selected, key=lambda row: (row[0].casefold(), row[1].casefold()))
+        return handler
+
+
+def all_rows(snapshot):
+    return {number: schema_cache.snapshot_rows(snapshot, number)[1] for number in (1, 2)}
+
+
+def test_diff_objects_reports_added_altered_and_dropped():
+    old = {"1": ["sales.A", "c", "m1"], "2": ["sales.B", "c", "m1"], "3": ["sales.C", "c", "m1"]}
+    new = {"1": ["sales.A", "c", "m2"], "2": ["sales.B", "c", "m1"], "4": ["sales.D", "c", "m1"],
+           "3": ["sales.E", "c", "m1"]}
+
+    added, altered, dropped = schema_cache.diff_objects(old, new)
+
+    assert added == {"sales.D"}
+    # إعادة التسمية: الاسم الجديد معدل والقديم محذوف
+    assert altered == {"sales.A", "sales.E"}
+    assert dropped == {"sales.C"}
+
+
+def test_refresh_refetches_only_changed_owners(tmp_path):
+    database = Database()
+    path = str(tmp_path / "schema.json")
+    snapshot, changes = schema_cache.get_schema_snapshot(database.cursor(), SECTIONS, path, "srv/db")
+    assert changes is None
+
+    database.tables[1][2] = MODIFIED + datetime.timedelta(hours=1)
+    database.tables[1][3].append("Notes")
+    del database.tables[2]
+    database.tables[4] = ["sales", "Returns", MODIFIED, ["ReturnId"]]
+    database.section_params.clear()
+
+    snapshot, changes = schema_cache.get_schema_snapshot(database.cursor(), SECTIONS, path, "srv/db")
+
+    assert changes == {"added": ["sales.Returns"], "altered": ["sales.Invoices"], "dropped": ["sales.Payments"]}
+    # كل قسم يُسأل عن الكائنات المتغيرة فقط
+    assert database.section_params == [("sales.Invoices", "sales.Payments", "sales.Returns")] * 2
+    fresh = schema_cache.build_snapshot(database.cursor(), SECTIONS, "srv/db")
+    assert all_rows(snapshot) == all_rows(fresh)
+    assert all_rows(schema_cache.load_snapshot(path)) == all_rows(fresh)
+
+
+def test_unchanged_database_is_served_from_the_snapshot(tmp_path):
+    database = Database()
+    path = str(tmp_path / "schema.json")
+    schema_cache.get_schema_snapshot(database.cursor(), SECTIONS, path, "srv/db")
+    database.section_params.clear()
+
+    _, changes = schema_cache.get_schema_snapshot(database.cursor(), SECTIONS, path, "srv/db")
+
+    assert changes == {"added": [], "altered": [], "dropped": []}
+    assert database.section_params == []
+
+
+def test_changed_section_query_or_identity_rebuilds(tmp_path):
+    database = Database()
+    path = str(tmp_path / "schema.json")
+    schema_cache.get_schema_snapshot(database.cursor(), SECTIONS, path, "srv/db")
+    edited = [SECTIONS[0], Section(2, INDEXES_QUERY.replace("ORDER BY 1, 2", "ORDER BY 2, 1"))]
+
+    _, changes = schema_cache.get_schema_snapshot(database.cursor(), edited, path, "srv/db")
+    assert changes is None
+    _, changes = schema_cache.get_schema_snapshot(database.cursor(), edited, path, "srv/db")
+    assert changes is not None
+
+    for identity in ("other-srv/db", "srv/other-db"):
+        _, changes = schema_cache.get_schema_snapshot(database.cursor(), edited, path, identity)
+        assert changes is None
+
+
+def test_snapshot_keeps_decimal_and_datetime_types(tmp_path):
+    database = Database()
+    path = str(tmp_path / "schema.json")
+    built, _ = schema_cache.get_schema_snapshot(database.cursor(), SECTIONS, path, "srv/db")
+
+    loaded = schema_cache.load_snapshot(path)
+
+    row = schema_cache.snapshot_rows(loaded, 1)[1][0]
+    assert row[3] == decimal.Decimal("18.2") and isinstance(row[3], decimal.Decimal)
+    assert row[4] == MODIFIED and isinstance(row[4], datetime.datetime)
+    assert all_rows(loaded) == all_rows(built)
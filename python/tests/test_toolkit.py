@@ -0,0 +1,99 @@
+import io
+import time
+
+import fake_pyodbc
+import test as toolkit
+from db_pool import ConnectionPool
+from result_writers import TextWriter
+
+
+def numbers(count):
+    catalog = fake_pyodbc.FakeCatalog()
+    catalog.register("FROM numbers", lambda query, params: (["n"], [(n,) for n in range(count)]))
+    return fake_pyodbc.Connection(catalog).cursor()
+
+
+def run(cursor, max_rows, query="SELECT n FROM numbers"):
+    out = io.StringIO()
+    count = toolkit.execute_and_print(cursor, "numbers", query, max_rows=max_rows, batch_size=2,
+                                      writer=TextWriter(out))
+    return count, out.getvalue()
+
+
+def printed(text):
+    return [line for line in text.splitlines() if line.isdigit()]
+
+
+def test_truncation_is_reported_only_when_rows_remain():
+    count, text = run(numbers(5), max_rows=5)
+    assert count == 5 and "max_rows" not in text
+
+    count, text = run(numbers(6), max_rows=5)
+    assert count == 5 and "max_rows" in text
+    # الصف الإضافي يُجلب للتحقق فقط ولا يُطبع
+    assert printed(text) == ["0", "1", "2", "3", "4"]
+
+    count, text = run(numbers(3), max_rows=None)
+    assert count == 3 and "max_rows" not in text
+
+
+def test_driver_errors_are_reported_not_raised():
+    count, text = run(numbers(1), max_rows=None, query="SELECT * FROM missing")
+    assert count is None
+    assert "42000" in text
+
+
+class SchemaServer:
+    """لكل قسم صفوف مميزة؛ الأقسام الأولى أبطأ فتنتهي الأقسام بعكس ترتيبها."""
+
+    def __init__(self, failing=()):
+        self.catalog = fake_pyodbc.FakeCatalog()
+        for section in toolkit.SCHEMA_SECTIONS:
+            self.catalog.register(section.query, self._handler(section.number, section.number in failing))
+
+    def _handler(self, number, failing):
+        def handler(query, params):
+            time.sleep((len(toolkit.SCHEMA_SECTIONS) - number) * 0.005)
+            if failing:
+                raise fake_pyodbc.ProgrammingError("42S02", f"Invalid object name (section {number})")
+            return [f"Section{number}", "Value"], [(f"s{number}", index) for index in range(3)]
+        return handler
+
+    def pool(self):
+        return ConnectionPool(lambda: fake_pyodbc.Connection(self.catalog), min_size=0, max_size=3,
+                              probe_query=None, reap_interval=0)
+
+
+def full_schema(server, concurrent):
+    out = io.StringIO()
+    pool = server.pool()
+    try:
+        with pool.connection() as cnxn:
+            toolkit.get_database_full_schema(cnxn.cursor(), concurrent=concurrent, max_workers=3, pool=pool,
+                                             writer=TextWriter(out))
+    finally:
+        pool.close()
+    # ملخص الأزمنة يُطبع في الوضع المتزامن فقط
+    return out.getvalue().split("\n--- ملخص أزمنة الأقسام ---")[0]
+
+
+def test_concurrent_sections_print_in_sequential_order():
+    server = SchemaServer()
+
+    sequential = full_schema(server, concurrent=False)
+    concurrent = full_schema(server, concurrent=True)
+
+    assert concurrent == sequential
+    headings = [line for line in concurrent.splitlines() if line.startswith("--- ")]
+    assert [heading.split(".")[0] for heading in headings] == [
+        f"--- {section.number}" for section in toolkit.SCHEMA_SECTIONS]
+
+
+def test_failing_section_is_reported_without_losing_the_others():
+    output = full_schema(SchemaServer(failing={3}), concurrent=True)
+
+    assert "42S02" in output and "section 3" in output
+    for section in toolkit.SCHEMA_SECTIONS:
+        assert f"--- {section.number}. {section.heading} ---" in output
+        if section.number != 3:
+            assert f"s{section.number} | 2" in output